@@ -41,8 +41,112 @@ class AIConfig:
     max_tokens: int = 8000
     temperature: float = 0.1
     timeout: int = 30
+    output_format: str = 'code'  # 'code' or 'scene_graph' (JSON compiled by utils.scene_compiler)
+    layout_solver: bool = True  # lay out nBHK commands with utils.floor_layout instead of the model
+    parts_library: bool = True  # build gears, bolts, flanges... with utils.parts_library instead of the model
     groq: GroqConfig = field(default_factory=GroqConfig)
 
+@dataclass
+class WorkerPoolConfig:
+    """Headless FreeCAD worker pool configuration"""
+    enabled: bool = False
+    size: int = 2
+    command: Optional[List[str]] = None  # full worker command, overrides discovery
+    freecadcmd_path: Optional[str] = None
+    use_stub: bool = False  # run workers against utils.freecad_stub (no FreeCAD needed)
+    startup_timeout: float = 60.0
+    run_timeout: float = 120.0
+    max_runs_per_worker: int = 50  # recycle workers to bound leaked memory
+    artifacts_directory: str = "generated/artifacts"
+    shape_cache_directory: Optional[str] = "generated/shape_cache"  # None disables the BRep cache
+    shape_cache_max_mb: int = 512
+    parallel_build: bool = False  # build independent subassemblies in separate workers
+
+@dataclass
+class SandboxConfig:
+    """Limits for running generated scripts in a child process"""
+    timeout: float = 120.0  # wall-clock seconds
+    cpu_time_limit: Optional[int] = 120  # seconds of CPU (POSIX only)
+    memory_limit_mb: Optional[int] = 4096  # address space (POSIX only)
+    max_output_chars: int = 100_000
+
+@dataclass
+class GuiBridgeConfig:
+    """Loading models into an already running FreeCAD GUI"""
+    enabled: bool = True
+    handshake_file: Optional[str] = None  # defaults to ~/.voice_to_cad/gui_bridge.json
+    connect_timeout: float = 0.5
+    load_timeout: float = 300.0
+    document_slot: str = "VoiceToCAD"
+    mode: str = "replace"  # "replace" the previous model or open a "new" document
+    start_with_launch: bool = True  # start the listener when FreeCAD is launched
+
+@dataclass
+class SupervisorConfig:
+    """Tracking of launched FreeCAD processes"""
+    max_live_per_user: int = 2
+    log_directory: str = "logs/freecad_runs"
+    history_size: int = 50  # finished processes kept for the status view
+    tail_lines: int = 200
+
+@dataclass
+class ExportConfig:
+    """Headless STEP/BREP/STL/GLB export of generated models"""
+    enabled: bool = False
+    formats: List[str] = field(default_factory=lambda: ["step", "brep", "stl"])
+    cache_directory: str = "generated/exports"  # content-addressed artifacts
+    stl_linear_tolerance: float = 0.1  # mm, for STL and GLB meshes
+    stl_angular_tolerance: float = 0.5  # radians
+
+@dataclass
+class ResultCacheConfig:
+    """Recorded outcomes of earlier script runs"""
+    enabled: bool = True
+    directory: str = "generated/results"
+    max_entries: int = 2000
+    reject_known_failures: bool = True  # fail scripts that failed before without running them
+
+@dataclass
+class InterferenceConfig:
+    """Overlap, gap and bounds checks on object bounding boxes (mm)"""
+    enabled: bool = True
+    min_overlap: float = 1.0  # penetration on every axis that counts as a collision
+    joint_fraction: float = 0.1  # smaller overlaps (of the smaller box) are wall joints, not collisions
+    min_gap: float = 2.0  # closer objects are deliberate offsets
+    max_gap: float = 50.0  # farther objects are not meant to meet
+    overhang_height: float = 500.0  # objects starting higher above the foundation may overhang it
+
+@dataclass
+class ThumbnailConfig:
+    """PNG thumbnails rendered on the CPU from the evaluator's shapes or an exported STL"""
+    enabled: bool = True
+    directory: str = "generated/thumbnails"
+    size: int = 160  # pixels, square
+    views: List[str] = field(default_factory=lambda: ["isometric", "top"])
+    history_limit: int = 12  # past generations shown with thumbnails
+    evaluation_timeout: float = 5.0  # seconds to evaluate a script without a cached thumbnail
+    memory_limit_mb: Optional[int] = 4096  # address space of that evaluation (POSIX only)
+    render_workers: int = 1  # background threads rendering thumbnails for the gallery
+
+@dataclass
+class MeshPreviewConfig:
+    """In-browser WebGL preview of generated models"""
+    enabled: bool = True
+    max_bytes: int = 1_000_000  # payload cap; larger meshes are decimated by vertex clustering
+    max_triangles: Optional[int] = None
+    height: int = 480  # pixels
+
+@dataclass
+class PlanConfig:
+    """2D floor plans (SVG and DXF) drawn from the evaluator's shapes, without FreeCAD"""
+    enabled: bool = True
+    directory: str = "generated/plans"
+    formats: List[str] = field(default_factory=lambda: ["svg", "dxf"])
+    cut_height: float = 1200.0  # mm, height of the horizontal section
+    scale: int = 100  # SVG drawing scale 1:scale
+    evaluation_timeout: float = 5.0  # seconds to evaluate a script without a geometry preview
+    memory_limit_mb: Optional[int] = 4096  # address space of that evaluation (POSIX only)
+
 @dataclass
 class FreeCADConfig:
     """FreeCAD configuration"""
@@ -59,6 +163,33 @@ class FreeCADConfig:
     python_path: Optional[str] = None
     working_directory: str = "generated"
     default_document_name: str = "VoiceToCAD_Model"
+    discovery_cache_file: Optional[str] = None  # defaults to ~/.voice_to_cad/freecad_discovery.json
+
+    # Generated code optimization
+    optimize_generated_code: bool = True
+    fuse_strategy: str = "multifuse"  # "multifuse" or "compound"
+    instancing_mode: Optional[str] = "link"  # "link", "placement" or None to disable
+    benchmark_optimizations: bool = False
+
+    # Static cost estimation
+    cost_weights: Dict[str, float] = field(default_factory=dict)  # overrides for CostWeights
+    cost_warning_seconds: float = 60.0
+    auto_draft_seconds: Optional[float] = None  # reduce to "draft" detail above this estimate
+
+    # Geometry checks without FreeCAD (utils.geometry_evaluator, in a child process)
+    geometry_preview: bool = True
+    geometry_preview_timeout: float = 5.0
+
+    worker_pool: WorkerPoolConfig = field(default_factory=WorkerPoolConfig)
+    sandbox: SandboxConfig = field(default_factory=SandboxConfig)
+    gui_bridge: GuiBridgeConfig = field(default_factory=GuiBridgeConfig)
+    supervisor: SupervisorConfig = field(default_factory=SupervisorConfig)
+    export: ExportConfig = field(default_factory=ExportConfig)
+    result_cache: ResultCacheConfig = field(default_factory=ResultCacheConfig)
+    interference: InterferenceConfig = field(default_factory=InterferenceConfig)
+    thumbnails: ThumbnailConfig = field(default_factory=ThumbnailConfig)
+    mesh_preview: MeshPreviewConfig = field(default_factory=MeshPreviewConfig)
+    plans: PlanConfig = field(default_factory=PlanConfig)
 
 @dataclass
 class UIConfig:
@@ -154,6 +285,22 @@ class ConfigurationManager:
         config.debug = os.getenv('DEBUG', 'false').lower() == 'true'
         config.log_level = os.getenv('LOG_LEVEL', 'INFO')
         config.environment = os.getenv('ENVIRONMENT', 'production')
+        config.freecad.benchmark_optimizations = os.getenv('BENCHMARK_OPTIMIZATIONS', 'false').lower() == 'true'
+        config.freecad.worker_pool.enabled = os.getenv('FREECAD_WORKER_POOL', 'false').lower() == 'true'
+        config.freecad.worker_pool.parallel_build = os.getenv('FREECAD_PARALLEL_BUILD', 'false').lower() == 'true'
+        config.freecad.export.enabled = os.getenv('FREECAD_EXPORTS', 'false').lower() == 'true'
+        config.freecad.result_cache.enabled = os.getenv('FREECAD_RESULT_CACHE', 'true').lower() == 'true'
+        config.freecad.geometry_preview = os.getenv('GEOMETRY_PREVIEW', 'true').lower() == 'true'
+        config.freecad.interference.enabled = os.getenv('INTERFERENCE_CHECKS', 'true').lower() == 'true'
+        config.freecad.thumbnails.enabled = os.getenv('THUMBNAILS', 'true').lower() == 'true'
+        config.freecad.mesh_preview.enabled = os.getenv('MESH_PREVIEW', 'true').lower() == 'true'
+        config.freecad.plans.enabled = os.getenv('PLANS', 'true').lower() == 'true'
+        config.ai.output_format = os.getenv('AI_OUTPUT_FORMAT', config.ai.output_format).lower()
+        config.ai.layout_solver = os.getenv('LAYOUT_SOLVER', 'true').lower() == 'true'
+        config.ai.parts_library = os.getenv('PARTS_LIBRARY', 'true').lower() == 'true'
+        auto_draft_seconds = os.getenv('AUTO_DRAFT_SECONDS')
+        if auto_draft_seconds:
+            config.freecad.auto_draft_seconds = float(auto_draft_seconds)
         
         # Override FreeCAD path if provided
         freecad_path = os.getenv('FREECAD_PATH')
@@ -197,11 +344,11 @@ class ConfigurationManager:
             if Path(self._config.freecad.installation_path).exists():
                 return self._config.freecad.installation_path
         
-        # Try alternative paths
-        for path in self._config.freecad.alternative_paths:
-            if Path(path).exists():
-                self._config.freecad.installation_path = path
-                return path
+        # Cached discovery; imported here because it depends on this module
+        from services.freecad_discovery import get_discovery
+        installation = get_discovery(self._config.freecad).resolve()
+        if installation and installation.module_path:
+            return installation.module_path
         
         return None
     
@@ -1,7 +1,7 @@
 import streamlit as st
 import sys
-import subprocess
 import os
+import uuid
 from pathlib import Path
 from datetime import datetime
 
@@ -95,6 +95,8 @@ def main():
         st.session_state.voice_command = ""
     if 'command_source' not in st.session_state:
         st.session_state.command_source = ""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     
     # Debug section (can be removed later)
     with st.expander("🔧 Debug Info", expanded=False):
@@ -292,7 +294,7 @@ def main():
                 "🎨 Quality Level:",
                 ["professional", "standard", "draft"],
                 index=0,
-                help="Professional: High detail, Standard: Balanced, Draft: Quick generation"
+                help="Professional: Full detail, Standard: Openings and furniture without small details, Draft: Plain masses for a fast preview"
             )
             st.markdown('</div>', unsafe_allow_html=True)
         
@@ -364,8 +366,71 @@ def main():
                             return
                             
                         st.success(f"✅ Code saved to: {filepath}")
-                        
-                        execution_result = freecad_service.execute_code_and_open_freecad(generated_code, filepath)
+
+                        # Warn before launching scripts that are predicted to be slow
+                        cost_estimate = freecad_service.last_cost_estimate
+                        if cost_estimate:
+                            if cost_estimate.predicted_seconds > config.freecad.cost_warning_seconds:
+                                st.warning(f"⏱️ This model is estimated to take ~{cost_estimate.predicted_seconds:.0f}s "
+                                           f"to build ({cost_estimate.boolean_ops} boolean operations). "
+                                           f"Consider the draft quality level for a faster preview.")
+                            else:
+                                st.caption(f"⏱️ Estimated build time: ~{cost_estimate.predicted_seconds:.1f}s "
+                                           f"({cost_estimate.level})")
+
+                        # Sanity-check the geometry in-process before anything launches FreeCAD
+                        geometry = freecad_service.last_geometry_report
+                        if geometry and geometry.success:
+                            size = " × ".join(f"{extent / 1000:.1f}" for extent in geometry.size) if geometry.size else "empty"
+                            approximate = "~" if geometry.approximate else ""
+                            st.caption(f"📐 {geometry.object_count} objects, {size} m, "
+                                       f"{approximate}{geometry.volume / 1e9:.2f} m³ of solid")
+                            for issue in geometry.issues:
+                                st.warning(f"📐 {issue}")
+                            if model_type == "3d":
+                                thumbnails = freecad_service.render_thumbnails(generated_code, geometry.shapes)
+                                if thumbnails:
+                                    for column, (view, path) in zip(st.columns(len(thumbnails)), thumbnails.items()):
+                                        column.image(str(path), caption=view.title())
+                                preview = freecad_service.build_mesh_preview(generated_code, geometry.shapes)
+                                if preview:
+                                    from ui.preview_component import render_mesh_preview
+                                    st.markdown("#### 🧊 3D Preview")
+                                    render_mesh_preview(preview.data, config.freecad.mesh_preview.height)
+                                    decimated = (f", decimated from {preview.original_triangles:,}"
+                                                 if preview.decimated else "")
+                                    st.caption(f"{preview.triangles:,} triangles{decimated}, "
+                                               f"{len(preview.data) / 1024:.0f} KB")
+                            interference = freecad_service.last_interference_report
+                            if interference and not interference.clean:
+                                issues = interference.issues()
+                                with st.expander(f"🧱 {len(issues)} overlap/placement issues", expanded=False):
+                                    for issue in issues:
+                                        st.write(f"• {issue}")
+                        elif geometry:
+                            st.warning(f"📐 Geometry check {geometry.status}: {geometry.error}")
+
+                        # 2D plans are drawn on this server, so FreeCAD is only launched for 3D models
+                        plan = None
+                        if model_type == "2d" and config.freecad.plans.enabled:
+                            plan = freecad_service.export_plan(generated_code, report=geometry)
+                            if plan.success:
+                                import base64
+                                st.markdown("#### 📐 Floor Plan")
+                                if "svg" in plan.files:
+                                    svg = base64.b64encode(Path(plan.files["svg"]).read_bytes()).decode("ascii")
+                                    st.markdown(f'<img src="data:image/svg+xml;base64,{svg}" '
+                                                f'style="width: 100%; border-radius: 8px;">', unsafe_allow_html=True)
+                                st.caption(f"Section at {config.freecad.plans.cut_height:.0f} mm, "
+                                           f"drawn in {plan.elapsed * 1000:.0f} ms without FreeCAD")
+                            else:
+                                st.warning(f"📐 Floor plan {plan.status}: {plan.error}")
+
+                        if plan and plan.success:
+                            execution_result = None
+                        else:
+                            execution_result = freecad_service.execute_code_and_open_freecad(
+                                generated_code, filepath, owner=st.session_state.session_id)
 
                         # Always show the returned execution message to the user
                         if execution_result:
@@ -394,20 +459,38 @@ def main():
                                     custom_exe = st.text_input("Path to FreeCAD executable (leave blank to skip)")
                                     if st.button("� Launch with custom executable") and custom_exe:
                                         try:
-                                            subprocess.Popen([custom_exe, filepath], shell=False)
+                                            freecad_service.supervisor.spawn([custom_exe, filepath],
+                                                                             st.session_state.session_id, "custom")
                                             st.success("✅ Launched FreeCAD using the custom executable (check your desktop).")
                                         except Exception as e:
                                             st.error(f"Failed to launch with provided executable: {e}")
 
-                                    # Allow server-side execution as last-resort (dangerous)
+                                    # Server-side execution as last resort, isolated in a limited child process
                                     if st.checkbox("Run generated code on this server (only if you trust it)"):
                                         if st.button("⚠️ Execute on server now"):
-                                            try:
-                                                exec(generated_code, {})
-                                                st.success("✅ Code executed on server (check server logs).")
-                                            except Exception as e:
-                                                st.error(f"Server execution failed: {e}")
+                                            sandboxed = freecad_service.run_sandboxed(generated_code)
+                                            if sandboxed.success:
+                                                st.success(f"✅ Code executed on server: {sandboxed.object_count} objects "
+                                                           f"in {sandboxed.elapsed:.2f}s")
+                                                checked = freecad_service.check_interference(sandboxed.objects)
+                                                for issue in (checked.issues() if checked else []):
+                                                    st.warning(f"🧱 {issue}")
+                                            else:
+                                                st.error(f"Server execution failed ({sandboxed.status}): {sandboxed.error}")
+                                            if sandboxed.stdout or sandboxed.stderr:
+                                                st.code(sandboxed.stdout + sandboxed.stderr, language='text')
                         
+                        # Show what the optimizer changed in the generated script
+                        optimization_report = freecad_service.last_optimization_report
+                        if optimization_report and optimization_report.changed:
+                            with st.expander("⚡ Optimization Report", expanded=False):
+                                st.write(f"Boolean operations: {optimization_report.boolean_ops_before} → {optimization_report.boolean_ops_after}")
+                                if optimization_report.speedup:
+                                    st.write(f"Execution time: {optimization_report.execution_time_before:.2f}s → "
+                                             f"{optimization_report.execution_time_after:.2f}s "
+                                             f"({optimization_report.speedup:.1f}x faster)")
+                                st.json(optimization_report.applied)
+
                         # Results display in columns
                         code_col, download_col = st.columns([3, 1])
                         
@@ -425,6 +508,32 @@ def main():
                                 mime="text/plain",
                                 use_container_width=True
                             )
+                            if plan and plan.success:
+                                from services.plan_service import MIME_TYPES as PLAN_MIME_TYPES
+                                for fmt, path in plan.files.items():
+                                    st.download_button(
+                                        label=f"📥 Download {fmt.upper()}",
+                                        data=Path(path).read_bytes(),
+                                        file_name=f"floor_plan_{st.session_state.timestamp}.{fmt}",
+                                        mime=PLAN_MIME_TYPES[fmt],
+                                        use_container_width=True
+                                    )
+                            elif config.freecad.export.enabled:
+                                with st.spinner("Exporting CAD files..."):
+                                    exported = freecad_service.export_model(generated_code, quality_level=quality)
+                                if exported.success:
+                                    from services.export_service import MIME_TYPES
+                                    for fmt, path in exported.files.items():
+                                        with open(path, "rb") as f:
+                                            st.download_button(
+                                                label=f"📥 Download {fmt.upper()}",
+                                                data=f.read(),
+                                                file_name=f"freecad_model_{st.session_state.timestamp}{Path(path).suffix}",
+                                                mime=MIME_TYPES[fmt],
+                                                use_container_width=True
+                                            )
+                                else:
+                                    st.warning(f"Export failed ({exported.status}): {exported.error}")
                     else:
                         st.error("❌ Failed to generate code")
                         
@@ -433,6 +542,47 @@ def main():
     else:
         st.info("💡 Generation section: No valid command found. Please set a command first.")
     
+    # Past generations, drawn from cached thumbnails without launching FreeCAD
+    from config.settings import config
+    thumbnail_config = config.freecad.thumbnails
+    if thumbnail_config.enabled:
+        from services.file_service import FileService
+        from services.thumbnail_service import get_thumbnail_service
+        past_files = FileService(config.file, config.get_directories()).get_generated_files()
+        past_files = past_files[:thumbnail_config.history_limit]
+        if past_files:
+            with st.expander(f"🗂️ Past Generations ({len(past_files)})", expanded=False):
+                thumbnail_service = get_thumbnail_service(thumbnail_config)
+                columns = st.columns(4)
+                for index, past in enumerate(past_files):
+                    with columns[index % 4]:
+                        code = Path(past["path"]).read_text(encoding=config.file.encoding)
+                        # Only what is on disk; missing thumbnails render in the background
+                        thumbnail = thumbnail_service.cached(code)
+                        if thumbnail:
+                            st.image(str(thumbnail), use_container_width=True)
+                        elif thumbnail_service.failed(code):
+                            st.write("🚫 No preview")
+                        else:
+                            thumbnail_service.render_later(code)
+                            st.write("⏳ Rendering preview")
+                        st.caption(f"{past['name']} · {past['modified']:%Y-%m-%d %H:%M}")
+    
+    # FreeCAD processes launched for this session
+    from services.process_supervisor import get_supervisor
+    supervisor = get_supervisor(config.freecad.supervisor)
+    processes = supervisor.status(owner=st.session_state.session_id)
+    if processes:
+        with st.expander(f"🖥️ FreeCAD Processes ({sum(p['running'] for p in processes)} running)", expanded=False):
+            st.dataframe(processes, use_container_width=True)
+            for process in processes:
+                if process["running"] and st.button(f"⏹️ Stop {process['label']} (pid {process['pid']})",
+                                                    key=f"stop_{process['pid']}"):
+                    supervisor.terminate(process["pid"], owner=st.session_state.session_id)
+                    st.rerun()
+            selected_pid = st.selectbox("Show output of", [p["pid"] for p in processes])
+            st.code(supervisor.tail(selected_pid) or "(no output yet)", language="text")
+    
     # Footer
     st.markdown("---")
     st.markdown("""
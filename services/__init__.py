@@ -7,10 +7,16 @@ from .audio_service import AudioService
 from .ai_service import AIService
 from .freecad_service import FreeCADService
 from .file_service import FileService
+from .worker_pool import FreeCADWorkerPool
+from .export_service import ExportService
+from .result_cache import ExecutionResultCache
 
 __all__ = [
     'AudioService',
     'AIService', 
     'FreeCADService',
-    'FileService'
+    'FileService',
+    'FreeCADWorkerPool',
+    'ExportService',
+    'ExecutionResultCache'
 ]
\ No newline at end of file
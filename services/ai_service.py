@@ -1,3 +1,4 @@
+import ast
 import logging
 import json
 from typing import Optional, Dict, Any, List
@@ -11,6 +12,12 @@ except ImportError:
     GROQ_AVAILABLE = False
 
 from config.settings import AIConfig
+from utils.level_of_detail import apply_detail_sections, level_of_detail, prompt_guidance
+from utils.exceptions import LayoutError, SceneGraphError
+from utils.floor_layout import layout_scene, parse_layout_command, solve_layout
+from utils.parts_library import match_part, part_script, spec_summary
+from utils.scene_compiler import compile_scene
+from utils.scene_graph import SCENE_GRAPH_FORMAT, Scene, parse_scene
 
 class AIService:
     def __init__(self, ai_config: AIConfig):
@@ -114,16 +121,36 @@ class AIService:
     
     def generate_freecad_code(self, command: str, model_type: str = "3d", 
                              quality_level: str = "professional", include_materials: bool = True) -> Optional[str]:
+        command_lower = command.lower()
+        house = (any(keyword in command_lower for keyword in ['2bhk', '2 bhk', 'two bedroom', 'apartment', 'house', 'structured'])
+                 and not any(school_keyword in command_lower for school_keyword in ['school', 'college', 'university']))
+        school = any(keyword in command_lower for keyword in ['school', 'college', 'university', 'campus', 'academic', 'classroom', 'education'])
+        # Architecture comes first: a house "with a washer area" is not a washer
+        native_code = self._create_solved_layout(command, quality_level)
+        if not native_code and not (house or school):
+            native_code = self._create_library_part(command, quality_level)
+        if native_code:
+            return native_code
         if not self.client:
             return None
         
-        command_lower = command.lower()
-        if any(keyword in command_lower for keyword in ['2bhk', '2 bhk', 'two bedroom', 'apartment', 'house', 'structured']) and not any(school_keyword in command_lower for school_keyword in ['school', 'college', 'university']):
-            return self._create_simple_2bhk_model()
-        elif any(keyword in command_lower for keyword in ['school', 'college', 'university', 'campus', 'academic', 'classroom', 'education']):
-            return self._create_school_model()
+        if house:
+            return self._create_simple_2bhk_model(quality_level)
+        elif school:
+            return self._create_school_model(quality_level)
         elif any(keyword in command_lower for keyword in ['cube', 'box', 'simple']):
             return self._create_simple_cube()
+
+        if self.config.output_format == "scene_graph":
+            scene = self.generate_scene_graph(command, model_type, quality_level)
+            code = compile_scene(scene, level_of_detail(quality_level)) if scene is not None else None
+            if code is not None:
+                try:
+                    ast.parse(code)
+                    return code
+                except SyntaxError as e:
+                    self.logger.error(f"Compiled scene graph does not parse: {e}")
+            self.logger.warning("No usable scene graph, generating FreeCAD code instead")
             
         try:
             self.logger.info(f"Generating {quality_level} {model_type} FreeCAD code")
@@ -164,7 +191,7 @@ class AIService:
                         self.logger.warning("Generated code failed validation, trying to create working version")
                         # Try to create a working version for common requests
                         if "2bhk" in command.lower() or "apartment" in command.lower() or "house" in command.lower():
-                            return self._create_simple_2bhk_model()
+                            return self._create_simple_2bhk_model(quality_level)
                         elif "cube" in command.lower() or "box" in command.lower():
                             return self._create_simple_cube()
                         else:
@@ -187,6 +214,88 @@ class AIService:
             
             return None
     
+    def _create_solved_layout(self, command: str, quality_level: str) -> Optional[str]:
+        """FreeCAD code for an nBHK command laid out by the floor-plan solver
+        
+        Plain 2BHK requests keep the hand-drawn template; other room programs
+        and plot sizes are solved here without the language model.
+        """
+        if not self.config.layout_solver:
+            return None
+        command_lower = command.lower()
+        if any(keyword in command_lower for keyword in ['school', 'college', 'university', 'campus']):
+            return None
+        request = parse_layout_command(command)
+        if request is None or request.default:
+            return None
+        try:
+            layout = solve_layout(request)
+        except LayoutError as e:
+            self.logger.warning(f"Layout solver: {e}")
+            return None
+        for warning in layout.warnings:
+            self.logger.warning(f"Layout solver: {warning}")
+        self.logger.info(f"Solved a {request.bedrooms}BHK layout on a {layout.plot_length / 1000:.1f} x "
+                         f"{layout.plot_width / 1000:.1f} m plot with {len(layout.rooms)} rooms")
+        return compile_scene(layout_scene(layout), level_of_detail(quality_level))
+
+    def _create_library_part(self, command: str, quality_level: str) -> Optional[str]:
+        """FreeCAD code for a mechanical part (gear, bolt, flange...) from the parts library"""
+        if not self.config.parts_library:
+            return None
+        match = match_part(command)
+        if match is None:
+            return None
+        part, spec = match
+        try:
+            code = part_script(part, spec, level_of_detail(quality_level))
+        except ValueError as e:
+            self.logger.warning(f"Parts library: {e}")
+            return None
+        self.logger.info(f"Built a {part.name} from the parts library ({spec_summary(spec)})")
+        return code
+
+    def generate_scene_graph(self, command: str, model_type: str = "3d",
+                             quality_level: str = "professional") -> Optional[Scene]:
+        """Ask the model for a scene graph instead of code; ``None`` when it is unusable"""
+        if not self.client:
+            return None
+
+        try:
+            self.logger.info(f"Generating {quality_level} {model_type} scene graph")
+            response = self.client.chat.completions.create(
+                model=self.config.groq.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"You are a CAD modelling expert. {SCENE_GRAPH_FORMAT}"
+                    },
+                    {
+                        "role": "user",
+                        "content": (f"Describe a {model_type} model of: {command}. "
+                                    f"{prompt_guidance(level_of_detail(quality_level))}")
+                    }
+                ],
+                max_tokens=self.config.max_tokens,
+                temperature=self.config.temperature,
+                response_format={"type": "json_object"}
+            )
+            content = response.choices[0].message.content if response and response.choices else None
+            if not content:
+                self.logger.warning("AI returned empty response for scene graph generation")
+                return None
+            content = re.sub(r'^\s*```(?:json)?\s*|\s*```\s*$', '', content)
+            scene = parse_scene(content)
+            self.logger.info(f"Scene graph with {len(scene.objects)} objects generated")
+            return scene
+
+        except SceneGraphError as e:
+            self.logger.warning(f"Generated scene graph rejected: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Scene graph generation failed: {e}")
+            return None
+
     def _get_system_prompt(self) -> str:
         return """You are a FreeCAD expert. Generate clean, working FreeCAD Python code.
 
@@ -201,7 +310,11 @@ Generate clean, working FreeCAD code."""
 
     def _create_professional_prompt(self, command: str, model_type: str, quality_level: str, include_materials: bool) -> str:
         
-        return f"Create FreeCAD {model_type} model for: {command}. Use import FreeCAD, import Part, create document, build model, end with doc.recompute()."
+        # 2D plans are drawn from a section of the model, which needs solid walls rather than Draft sketches
+        plan_guidance = ("Build walls and room areas as Part.makeBox solids standing on z=0 and cut openings "
+                         "from them; do not use Draft or Sketcher. ") if model_type == "2d" else ""
+        return (f"Create FreeCAD {model_type} model for: {command}. Use import FreeCAD, import Part, create document, build model, end with doc.recompute(). "
+                f"{plan_guidance}{prompt_guidance(level_of_detail(quality_level))}")
     
     def _clean_generated_code(self, code: str) -> str:
         try:
@@ -321,9 +434,9 @@ Generate clean, working FreeCAD code."""
             self.logger.error(f"Code validation failed: {e}")
             return False
     
-    def _create_simple_2bhk_model(self) -> str:
+    def _create_simple_2bhk_model(self, quality_level: str = "professional") -> str:
         """Create a structured architectural 2BHK house model with proper room layout"""
-        return '''import FreeCAD
+        template = '''import FreeCAD
 import Part
 import Draft
 
@@ -363,11 +476,21 @@ floor_obj.Label = "Floor"
 # ==== STEP 2: CREATE EXTERIOR WALLS WITH OPENINGS ====
 print("Step 2: Creating Exterior Wall System...")
 
+# Reuse walls built by earlier runs when executed in the headless worker
+try:
+    from shape_cache import memoize_shape
+except ImportError:
+    def memoize_shape(function):
+        return function
+
+@memoize_shape
 def create_wall_with_openings(length, width, height, openings=None):
     """Create a wall with door/window openings"""
     wall = Part.makeBox(length, width, height)
     
+    # [detail:openings]
     if openings:
+        opening_boxes = []
         for opening in openings:
             opening_box = Part.makeBox(
                 opening['width'], 
@@ -379,7 +502,10 @@ def create_wall_with_openings(length, width, height, openings=None):
                 -50, 
                 opening['z']
             ))
-            wall = wall.cut(opening_box)
+            opening_boxes.append(opening_box)
+        # Cut all openings at once: one boolean per wall instead of one per opening
+        wall = wall.cut(Part.makeCompound(opening_boxes))
+    # [/detail]
     
     return wall
 
@@ -413,10 +539,12 @@ left_openings = [
 ]
 # Special handling for side wall (rotate opening)
 left_wall = Part.makeBox(WALL_THICKNESS, HOUSE_WIDTH, WALL_HEIGHT)
+# [detail:openings]
 # Cut window opening
 window_cut = Part.makeBox(WALL_THICKNESS + 100, WINDOW_WIDTH, WINDOW_HEIGHT)
 window_cut = window_cut.translate(FreeCAD.Vector(-50, 3000, SLAB_THICKNESS + 1000))
 left_wall = left_wall.cut(window_cut)
+# [/detail]
 left_wall = left_wall.translate(FreeCAD.Vector(0, 0, SLAB_THICKNESS))
 left_obj = doc.addObject("Part::Feature", "Left_Wall")
 left_obj.Shape = left_wall
@@ -425,10 +553,12 @@ left_obj.Label = "Left Wall"
 
 # Right Wall (West) with Bedroom Window
 right_wall = Part.makeBox(WALL_THICKNESS, HOUSE_WIDTH, WALL_HEIGHT)
+# [detail:openings]
 # Cut bedroom window
 bedroom_window = Part.makeBox(WALL_THICKNESS + 100, WINDOW_WIDTH, WINDOW_HEIGHT)
 bedroom_window = bedroom_window.translate(FreeCAD.Vector(-50, 6000, SLAB_THICKNESS + 1000))
 right_wall = right_wall.cut(bedroom_window)
+# [/detail]
 right_wall = right_wall.translate(FreeCAD.Vector(HOUSE_LENGTH - WALL_THICKNESS, 0, SLAB_THICKNESS))
 right_obj = doc.addObject("Part::Feature", "Right_Wall")
 right_obj.Shape = right_wall
@@ -440,10 +570,12 @@ print("Step 3: Creating Interior Partition Walls...")
 
 # Horizontal Wall separating Living Room from Bedrooms (with corridor door)
 main_partition = Part.makeBox(HOUSE_LENGTH - 2*WALL_THICKNESS, WALL_THICKNESS, WALL_HEIGHT)
+# [detail:openings]
 # Cut corridor door opening
 corridor_door = Part.makeBox(DOOR_WIDTH, WALL_THICKNESS + 100, 2100)
 corridor_door = corridor_door.translate(FreeCAD.Vector(5000, -50, 0))
 main_partition = main_partition.cut(corridor_door)
+# [/detail]
 main_partition = main_partition.translate(FreeCAD.Vector(WALL_THICKNESS, 6000, SLAB_THICKNESS))
 main_partition_obj = doc.addObject("Part::Feature", "Main_Partition")
 main_partition_obj.Shape = main_partition
@@ -452,14 +584,16 @@ main_partition_obj.Label = "Living-Bedroom Partition"
 
 # Vertical Wall separating Master Bedroom from Second Bedroom (with doors)
 bedroom_separator = Part.makeBox(WALL_THICKNESS, HOUSE_WIDTH - 6000 - WALL_THICKNESS, WALL_HEIGHT)
-# Cut Master Bedroom door
+# [detail:openings]
+# Master Bedroom door
 master_door = Part.makeBox(WALL_THICKNESS + 100, DOOR_WIDTH, 2100)
 master_door = master_door.translate(FreeCAD.Vector(-50, 500, 0))
-bedroom_separator = bedroom_separator.cut(master_door)
-# Cut Second Bedroom door  
+# Second Bedroom door  
 second_door = Part.makeBox(WALL_THICKNESS + 100, DOOR_WIDTH, 2100)
 second_door = second_door.translate(FreeCAD.Vector(-50, 2000, 0))
-bedroom_separator = bedroom_separator.cut(second_door)
+# Cut both doors in a single boolean
+bedroom_separator = bedroom_separator.cut(Part.makeCompound([master_door, second_door]))
+# [/detail]
 bedroom_separator = bedroom_separator.translate(FreeCAD.Vector(6000, 6000 + WALL_THICKNESS, SLAB_THICKNESS))
 bedroom_separator_obj = doc.addObject("Part::Feature", "Bedroom_Separator")
 bedroom_separator_obj.Shape = bedroom_separator
@@ -468,10 +602,12 @@ bedroom_separator_obj.Label = "Bedroom Separator Wall"
 
 # Kitchen Wall (separating kitchen from living room with door)
 kitchen_wall = Part.makeBox(WALL_THICKNESS, 3000, WALL_HEIGHT)
+# [detail:openings]
 # Cut kitchen door
 kitchen_door = Part.makeBox(WALL_THICKNESS + 100, DOOR_WIDTH, 2100)
 kitchen_door = kitchen_door.translate(FreeCAD.Vector(-50, 1500, 0))
 kitchen_wall = kitchen_wall.cut(kitchen_door)
+# [/detail]
 kitchen_wall = kitchen_wall.translate(FreeCAD.Vector(3000, WALL_THICKNESS, SLAB_THICKNESS))
 kitchen_obj = doc.addObject("Part::Feature", "Kitchen_Wall")
 kitchen_obj.Shape = kitchen_wall
@@ -480,10 +616,12 @@ kitchen_obj.Label = "Kitchen Wall"
 
 # Bathroom Wall (with door)
 bathroom_wall = Part.makeBox(2500, WALL_THICKNESS, WALL_HEIGHT)
+# [detail:openings]
 # Cut bathroom door
 bathroom_door = Part.makeBox(DOOR_WIDTH, WALL_THICKNESS + 100, 2100)
 bathroom_door = bathroom_door.translate(FreeCAD.Vector(500, -50, 0))
 bathroom_wall = bathroom_wall.cut(bathroom_door)
+# [/detail]
 bathroom_wall = bathroom_wall.translate(FreeCAD.Vector(WALL_THICKNESS, 3500, SLAB_THICKNESS))
 bathroom_obj = doc.addObject("Part::Feature", "Bathroom_Wall")
 bathroom_obj.Shape = bathroom_wall
@@ -504,6 +642,7 @@ roof_obj.Label = "Roof Slab"
 # Create Room Labels as Text (conceptual room areas)
 print("Step 5: Defining Room Areas...")
 
+# [detail:furniture]
 # Living Room area indicator
 living_area = Part.makeBox(5500, 3500, 50)
 living_area = living_area.translate(FreeCAD.Vector(500, 500, SLAB_THICKNESS + 1))
@@ -543,10 +682,12 @@ bathroom_obj = doc.addObject("Part::Feature", "Bathroom")
 bathroom_obj.Shape = bathroom_area  
 bathroom_obj.ViewObject.ShapeColor = (0.7, 0.9, 0.9)  # Light cyan
 bathroom_obj.Label = "Bathroom (4 sq.m)"
+# [/detail]
 
 # ==== STEP 6: ADD ARCHITECTURAL DETAILS ====
 print("Step 6: Adding Architectural Features...")
 
+# [detail:small_features]
 # Main Entrance Canopy
 canopy = Part.makeBox(2000, 800, 150)
 canopy = canopy.translate(FreeCAD.Vector(4500, -800, WALL_HEIGHT + SLAB_THICKNESS + 200))
@@ -571,6 +712,7 @@ window1_obj = doc.addObject("Part::Feature", "Front_Window_Frame")
 window1_obj.Shape = window_frame1
 window1_obj.ViewObject.ShapeColor = (0.3, 0.3, 0.3)  # Gray aluminum
 window1_obj.Label = "Front Window Frame"
+# [/detail]
 
 # Recompute the document to update all objects
 doc.recompute()
@@ -616,6 +758,7 @@ print("• Professional structural layout")
 print("="*50)
 print("STRUCTURED MODEL COMPLETE - Ready for Review!")
 '''
+        return apply_detail_sections(template, level_of_detail(quality_level))
 
     def _create_simple_cube(self) -> str:
         """Create a simple cube model"""
@@ -636,9 +779,9 @@ doc.recompute()
 print("Simple cube created successfully!")
 '''
 
-    def _create_school_model(self) -> str:
+    def _create_school_model(self, quality_level: str = "professional") -> str:
         """Create a structured school building model with proper educational layout"""
-        return '''import FreeCAD
+        template = '''import FreeCAD
 import Part
 
 # Create new document
@@ -683,11 +826,21 @@ floor_obj.Label = "Ground Floor"
 # ==== STEP 2: CREATE EXTERIOR WALLS ====
 print("Step 2: Creating Exterior Wall System...")
 
+# Reuse walls built by earlier runs when executed in the headless worker
+try:
+    from shape_cache import memoize_shape
+except ImportError:
+    def memoize_shape(function):
+        return function
+
+@memoize_shape
 def create_wall_with_openings(length, width, height, openings=None):
     """Create a wall with door/window openings"""
     wall = Part.makeBox(length, width, height)
     
+    # [detail:openings]
     if openings:
+        opening_boxes = []
         for opening in openings:
             opening_box = Part.makeBox(
                 opening['width'], 
@@ -699,7 +852,10 @@ def create_wall_with_openings(length, width, height, openings=None):
                 -50, 
                 opening['z']
             ))
-            wall = wall.cut(opening_box)
+            opening_boxes.append(opening_box)
+        # Cut all openings at once: one boolean per wall instead of one per opening
+        wall = wall.cut(Part.makeCompound(opening_boxes))
+    # [/detail]
     
     return wall
 
@@ -736,11 +892,15 @@ back_obj.Label = "School Back Wall"
 
 # Left Wall with Windows
 left_wall = Part.makeBox(WALL_THICKNESS, SCHOOL_WIDTH, FLOOR_HEIGHT)
-# Cut multiple windows
+# [detail:openings]
+# Cut multiple windows with one compound tool
+window_cuts = []
 for i, y_pos in enumerate([5000, 10000, 15000, 20000, 25000]):
     window_cut = Part.makeBox(WALL_THICKNESS + 100, WINDOW_WIDTH, WINDOW_HEIGHT)
     window_cut = window_cut.translate(FreeCAD.Vector(-50, y_pos, SLAB_THICKNESS + 1000))
-    left_wall = left_wall.cut(window_cut)
+    window_cuts.append(window_cut)
+left_wall = left_wall.cut(Part.makeCompound(window_cuts))
+# [/detail]
 left_wall = left_wall.translate(FreeCAD.Vector(0, 0, SLAB_THICKNESS))
 left_obj = doc.addObject("Part::Feature", "Left_Wall")
 left_obj.Shape = left_wall
@@ -749,11 +909,15 @@ left_obj.Label = "School Left Wall"
 
 # Right Wall with Windows
 right_wall = Part.makeBox(WALL_THICKNESS, SCHOOL_WIDTH, FLOOR_HEIGHT)
-# Cut multiple windows
+# [detail:openings]
+# Cut multiple windows with one compound tool
+window_cuts = []
 for i, y_pos in enumerate([5000, 10000, 15000, 20000, 25000]):
     window_cut = Part.makeBox(WALL_THICKNESS + 100, WINDOW_WIDTH, WINDOW_HEIGHT)
     window_cut = window_cut.translate(FreeCAD.Vector(-50, y_pos, SLAB_THICKNESS + 1000))
-    right_wall = right_wall.cut(window_cut)
+    window_cuts.append(window_cut)
+right_wall = right_wall.cut(Part.makeCompound(window_cuts))
+# [/detail]
 right_wall = right_wall.translate(FreeCAD.Vector(SCHOOL_LENGTH - WALL_THICKNESS, 0, SLAB_THICKNESS))
 right_obj = doc.addObject("Part::Feature", "Right_Wall")
 right_obj.Shape = right_wall
@@ -765,12 +929,16 @@ print("Step 3: Creating Interior Educational Spaces...")
 
 # Central Corridor Wall
 corridor_wall = Part.makeBox(SCHOOL_LENGTH - 2*WALL_THICKNESS, WALL_THICKNESS, FLOOR_HEIGHT)
-# Cut doors for classroom access
+# [detail:openings]
+# Cut doors for classroom access with one compound tool
 door_positions = [5000, 12000, 19000, 26000, 33000, 40000]
+corridor_doors = []
 for pos in door_positions:
     corridor_door = Part.makeBox(DOOR_WIDTH, WALL_THICKNESS + 100, 2100)
     corridor_door = corridor_door.translate(FreeCAD.Vector(pos, -50, 0))
-    corridor_wall = corridor_wall.cut(corridor_door)
+    corridor_doors.append(corridor_door)
+corridor_wall = corridor_wall.cut(Part.makeCompound(corridor_doors))
+# [/detail]
 corridor_wall = corridor_wall.translate(FreeCAD.Vector(WALL_THICKNESS, 15000, SLAB_THICKNESS))
 corridor_obj = doc.addObject("Part::Feature", "Central_Corridor_Wall")
 corridor_obj.Shape = corridor_wall
@@ -810,6 +978,7 @@ roof_obj.Label = "School Roof"
 # ==== STEP 5: CREATE EDUCATIONAL SPACES ====
 print("Step 5: Defining Educational Areas...")
 
+# [detail:furniture]
 # Reception/Entrance Hall
 reception_area = Part.makeBox(8000, 12000, 100)
 reception_area = reception_area.translate(FreeCAD.Vector(21000, 1500, SLAB_THICKNESS + 1))
@@ -869,10 +1038,12 @@ science_obj = doc.addObject("Part::Feature", "Science_Lab")
 science_obj.Shape = science_lab
 science_obj.ViewObject.ShapeColor = (0.7, 0.8, 0.9)  # Light blue
 science_obj.Label = "Science Lab (72 sq.m)"
+# [/detail]
 
 # ==== STEP 6: ADD ARCHITECTURAL FEATURES ====
 print("Step 6: Adding School Architectural Features...")
 
+# [detail:small_features]
 # Main Entrance Canopy
 entrance_canopy = Part.makeBox(4000, 1500, 200)
 entrance_canopy = entrance_canopy.translate(FreeCAD.Vector(23000, -1500, FLOOR_HEIGHT + SLAB_THICKNESS + 300))
@@ -888,6 +1059,7 @@ sign_obj = doc.addObject("Part::Feature", "School_Sign")
 sign_obj.Shape = sign_board
 sign_obj.ViewObject.ShapeColor = (0.2, 0.4, 0.8)  # School blue
 sign_obj.Label = "School Name Board"
+# [/detail]
 
 # Recompute the document
 doc.recompute()
@@ -935,6 +1107,7 @@ print("• Emergency exit provisions")
 print("="*60)
 print("EDUCATIONAL BUILDING COMPLETE - Ready for Academic Use!")
 '''
+        return apply_detail_sections(template, level_of_detail(quality_level))
     
     def get_model_suggestions(self, partial_description: str) -> List[str]:
         """
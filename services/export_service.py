@@ -0,0 +1,146 @@
+"""
+Headless export of generated models to STEP, BREP, STL and GLB
+
+``ExportService`` runs a generated script through a runner (the worker
+pool or the sandbox) and stores the exported files content-addressed:
+each artifact lives at ``<cache>/<key[:2]>/<key>.<ext>`` where ``key`` is
+the canonical script hash combined with the format and its options (mesh
+tessellation tolerances). A model that was exported before is served
+from disk without running FreeCAD, and a request for an additional format
+only exports the missing one.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Optional, Dict, Any, List
+
+from config.settings import ExportConfig
+from services.freecad_worker import EXPORT_FORMATS
+from services.worker_pool import WorkerResult
+from utils.script_hash import script_hash
+
+EXTENSIONS = {"fcstd": "FCStd", "step": "step", "iges": "iges", "brep": "brep", "stl": "stl", "glb": "glb"}
+
+MIME_TYPES = {
+    "fcstd": "application/octet-stream",
+    "step": "model/step",
+    "iges": "model/iges",
+    "brep": "application/octet-stream",
+    "stl": "model/stl",
+    "glb": "model/gltf-binary",
+}
+
+# Tessellated formats, exported at the configured mesh tolerances
+MESH_FORMATS = ("stl", "glb")
+
+# Executes ``code`` and writes the requested exports
+ExportRunner = Callable[[str, List[Dict[str, Any]]], WorkerResult]
+
+
+@dataclass
+class ExportResult:
+    """Exported files of one model, by format"""
+    script_hash: str
+    status: str = "ok"  # "ok" or the failed run's status
+    files: Dict[str, str] = field(default_factory=dict)
+    cached: List[str] = field(default_factory=list)  # formats served from disk
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.status == "ok"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ExportService:
+    """Export models once and keep the artifacts on disk"""
+
+    def __init__(self, config: ExportConfig, runner: ExportRunner):
+        self.config = config
+        self.runner = runner
+        self.cache_directory = Path(config.cache_directory).resolve()
+        self.logger = logging.getLogger(__name__)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def export_options(self, fmt: str, linear_tolerance: Optional[float] = None,
+                       angular_tolerance: Optional[float] = None) -> Dict[str, Any]:
+        """Options passed to the worker for ``fmt``; part of the artifact key"""
+        if fmt not in MESH_FORMATS:
+            return {}
+        return {"linear_tolerance": linear_tolerance or self.config.stl_linear_tolerance,
+                "angular_tolerance": angular_tolerance or self.config.stl_angular_tolerance}
+
+    def artifact_path(self, code: str, fmt: str, options: Dict[str, Any]) -> Path:
+        key = script_hash(code, dict(options, format=fmt))
+        return self.cache_directory / key[:2] / f"{key}.{EXTENSIONS[fmt]}"
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def export(self, code: str, formats: Optional[List[str]] = None,
+               linear_tolerance: Optional[float] = None,
+               angular_tolerance: Optional[float] = None) -> ExportResult:
+        """Artifacts for ``code`` in ``formats``, running the script only for missing ones"""
+        formats = [fmt.lower() for fmt in (formats or self.config.formats)]
+        unsupported = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+        if unsupported:
+            raise ValueError(f"Unsupported export format(s): {', '.join(unsupported)}")
+
+        key = script_hash(code)
+        targets = {}
+        for fmt in formats:
+            options = self.export_options(fmt, linear_tolerance, angular_tolerance)
+            targets[fmt] = (self.artifact_path(code, fmt, options), options)
+
+        # Concurrent requests for the same model wait for one export
+        with self._lock_for(key):
+            missing = [fmt for fmt, (path, _) in targets.items() if not path.is_file()]
+            result = ExportResult(script_hash=key, cached=[fmt for fmt in formats if fmt not in missing])
+            if missing:
+                run = self._run_exports(code, {fmt: targets[fmt] for fmt in missing})
+                result.elapsed = run.elapsed
+                if not run.success:
+                    result.status, result.error = run.status, run.error
+                    self.logger.warning(f"Export of {key[:12]} failed ({run.status}): {run.error}")
+                    return result
+
+        result.files = {fmt: str(path) for fmt, (path, _) in targets.items()}
+        self.logger.info(f"Exported {key[:12]}: {', '.join(formats)} "
+                         f"({len(result.cached)} from cache)")
+        return result
+
+    def _run_exports(self, code: str, targets: Dict[str, Any]) -> WorkerResult:
+        """Export into staging files, then move them into place atomically"""
+        staging, exports = {}, []
+        for fmt, (path, options) in targets.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # FreeCAD picks the format from the extension, so the staging file keeps it
+            staging[fmt] = path.with_name(f".{path.stem}.{uuid.uuid4().hex}.partial{path.suffix}")
+            exports.append(dict(options, format=fmt, path=str(staging[fmt])))
+
+        start = time.perf_counter()
+        try:
+            result = self.runner(code, exports)
+            if result.success:
+                missing = [fmt for fmt, path in staging.items() if not path.is_file()]
+                if missing:
+                    result.status, result.error = "error", f"No {', '.join(missing)} file was written"
+                else:
+                    for fmt, path in staging.items():
+                        os.replace(path, targets[fmt][0])
+        finally:
+            for path in staging.values():
+                if path.exists():
+                    path.unlink()
+        result.elapsed = result.elapsed or time.perf_counter() - start
+        return result
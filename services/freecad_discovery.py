@@ -0,0 +1,228 @@
+"""
+FreeCAD installation discovery with a persisted cache
+
+Finding FreeCAD means globbing Program Files, stat-ing a dozen candidate
+paths and sometimes shelling out to ``where``. ``FreeCADDiscovery`` does
+that once, stores the executable, version, module path and FreeCADCmd
+location in a JSON cache together with a fingerprint (mtime and size) of
+the executable, and afterwards only re-stats that one file to confirm the
+cached answer is still valid.
+"""
+
+import glob
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from config.settings import FreeCADConfig
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".voice_to_cad", "freecad_discovery.json")
+
+# Bumped when the cached record changes shape
+CACHE_VERSION = 1
+
+MODULE_FILES = ("FreeCAD.so", "FreeCAD.pyd", "FreeCAD.dylib")
+
+# A failed discovery is not repeated more often than this
+MISSING_RETRY_SECONDS = 300.0
+
+
+@dataclass
+class FreeCADInstallation:
+    """A resolved FreeCAD installation"""
+    executable: str
+    version: Optional[str] = None
+    module_path: Optional[str] = None  # directory containing the FreeCAD Python module
+    freecadcmd: Optional[str] = None
+    mtime: float = 0.0
+    size: int = 0
+
+    def fingerprint_matches(self) -> bool:
+        """Cheap validity check: one stat of the executable"""
+        try:
+            stat = os.stat(self.executable)
+        except OSError:
+            return False
+        return stat.st_mtime == self.mtime and stat.st_size == self.size
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class FreeCADDiscovery:
+    """Resolves the FreeCAD executable once and revalidates it cheaply"""
+
+    def __init__(self, config: FreeCADConfig):
+        self.config = config
+        self.cache_file = Path(config.discovery_cache_file or DEFAULT_CACHE_FILE)
+        self.logger = logging.getLogger(__name__)
+        self._installation: Optional[FreeCADInstallation] = None
+        self._missing_since: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def resolve(self) -> Optional[FreeCADInstallation]:
+        """Cached installation if still valid, otherwise a fresh discovery"""
+        with self._lock:
+            if self._installation and self._installation.fingerprint_matches():
+                return self._installation
+            if self._missing_since and time.monotonic() - self._missing_since < MISSING_RETRY_SECONDS:
+                return None
+
+            installation = self._load_cache()
+            if installation is None:
+                installation = self.discover()
+                if installation:
+                    self._save_cache(installation)
+            self._installation = installation
+            self._missing_since = None if installation else time.monotonic()
+            return installation
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._installation = None
+            self._missing_since = None
+            try:
+                self.cache_file.unlink()
+            except OSError:
+                pass
+
+    def _load_cache(self) -> Optional[FreeCADInstallation]:
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (record.get("cache_version") != CACHE_VERSION
+                or record.get("configured_path") != self.config.installation_path):
+            return None
+        try:
+            installation = FreeCADInstallation(**record["installation"])
+        except (KeyError, TypeError):
+            return None
+        if not installation.fingerprint_matches():
+            self.logger.info(f"Cached FreeCAD at {installation.executable} changed or vanished, rediscovering")
+            return None
+        return installation
+
+    def _save_cache(self, installation: FreeCADInstallation) -> None:
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump({"cache_version": CACHE_VERSION,
+                           "configured_path": self.config.installation_path,
+                           "installation": installation.to_dict()}, f, indent=2)
+        except OSError as e:
+            self.logger.warning(f"Could not write FreeCAD discovery cache: {e}")
+
+    def candidate_executables(self) -> List[str]:
+        """Executable paths to probe, most specific first"""
+        system = platform.system()
+        candidates = []
+
+        if self.config.installation_path:
+            configured = Path(self.config.installation_path)
+            names = ["FreeCAD.exe", "bin/FreeCAD.exe"] if system == "Windows" else ["FreeCAD", "freecad", "bin/FreeCAD"]
+            candidates.extend(str(configured / name) for name in names)
+
+        if system == "Windows":
+            for program_files in (r"C:\Program Files", r"C:\Program Files (x86)"):
+                # Newest version first
+                for directory in sorted(glob.glob(os.path.join(program_files, "FreeCAD*")), reverse=True):
+                    candidates.append(os.path.join(directory, "bin", "FreeCAD.exe"))
+        elif system == "Darwin":
+            candidates.append("/Applications/FreeCAD.app/Contents/MacOS/FreeCAD")
+        else:
+            candidates.extend(["/usr/bin/freecad", "/usr/local/bin/freecad", "/opt/freecad/bin/FreeCAD"])
+        return candidates
+
+    def _find_executable(self) -> Optional[str]:
+        for path in self.candidate_executables():
+            if os.path.isfile(path):
+                return path
+
+        found = shutil.which("FreeCAD") or shutil.which("freecad")
+        if found:
+            return found
+        if platform.system() == "Windows":
+            try:
+                result = subprocess.run(["where", "FreeCAD"], capture_output=True, text=True, timeout=10)
+                if result.returncode == 0 and result.stdout.strip():
+                    return result.stdout.strip().splitlines()[0]
+            except (OSError, subprocess.SubprocessError) as e:
+                self.logger.debug(f"PATH search failed: {e}")
+        return None
+
+    def _find_freecadcmd(self, executable: str) -> Optional[str]:
+        directory = Path(executable).resolve().parent
+        for name in ("FreeCADCmd.exe", "FreeCADCmd", "freecadcmd"):
+            if (directory / name).is_file():
+                return str(directory / name)
+        return shutil.which("FreeCADCmd") or shutil.which("freecadcmd")
+
+    def _find_module_path(self, executable: str) -> Optional[str]:
+        root = Path(executable).resolve().parent
+        directories = [root, root.parent / "lib", root.parent / "lib" / "freecad" / "lib",
+                       root.parent / "Resources" / "lib"]
+        if self.config.installation_path:
+            directories.insert(0, Path(self.config.installation_path))
+        directories.extend(Path(path) for path in self.config.alternative_paths)
+        for directory in directories:
+            if any((directory / name).is_file() for name in MODULE_FILES):
+                return str(directory)
+        return None
+
+    def _detect_version(self, executable: str, freecadcmd: Optional[str]) -> Optional[str]:
+        if freecadcmd:
+            try:
+                result = subprocess.run([freecadcmd, "--version"], capture_output=True, text=True, timeout=20)
+                match = re.search(r"(\d+\.\d+(?:\.\d+)?)", result.stdout + result.stderr)
+                if match:
+                    return match.group(1)
+            except (OSError, subprocess.SubprocessError) as e:
+                self.logger.debug(f"Version probe failed: {e}")
+        # Fall back to the version in the install directory, e.g. "FreeCAD 0.21"
+        match = re.search(r"FreeCAD[ _-]?(\d+\.\d+(?:\.\d+)?)", executable, re.IGNORECASE)
+        return match.group(1) if match else None
+
+    def discover(self) -> Optional[FreeCADInstallation]:
+        """Full probe of the filesystem; slow, so results are cached"""
+        executable = self._find_executable()
+        if not executable:
+            self.logger.error("FreeCAD executable not found; searched: "
+                              + ", ".join(self.candidate_executables()[:5]))
+            return None
+
+        stat = os.stat(executable)
+        freecadcmd = self._find_freecadcmd(executable)
+        installation = FreeCADInstallation(
+            executable=executable,
+            version=self._detect_version(executable, freecadcmd),
+            module_path=self._find_module_path(executable),
+            freecadcmd=freecadcmd,
+            mtime=stat.st_mtime,
+            size=stat.st_size,
+        )
+        self.logger.info(f"Discovered FreeCAD {installation.version or '(unknown version)'} at {executable}")
+        return installation
+
+
+_discoveries: Dict[Any, FreeCADDiscovery] = {}
+_discoveries_lock = threading.Lock()
+
+
+def get_discovery(config: FreeCADConfig) -> FreeCADDiscovery:
+    """Process-wide discovery per configured path, so the hot path does one stat"""
+    key = (config.installation_path, config.discovery_cache_file)
+    with _discoveries_lock:
+        if key not in _discoveries:
+            _discoveries[key] = FreeCADDiscovery(config)
+        return _discoveries[key]
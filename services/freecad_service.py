@@ -2,17 +2,51 @@ import logging
 import re
 import subprocess
 import tempfile
+import time
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 import ast
 
 from config.settings import FreeCADConfig
+from utils.code_optimizer import LevelOfDetailPass, OptimizationReport, build_passes, optimize_code
+from utils.cost_estimator import CostEstimate, CostWeights, estimate_cost
+from utils.exceptions import WorkerPoolError
+from utils.geometry_evaluator import GeometryReport, Shape, evaluate_isolated
+from utils.interference import InterferenceReport, check_interference
+from utils.level_of_detail import LevelOfDetail, level_of_detail
+from utils.mesh_decimation import PreviewPayload, build_preview
+from utils.rasterizer import mesh_from_shapes, read_stl
+from utils.scene_compiler import is_compiled_scene
+from utils.script_hash import script_hash
+from services.worker_pool import WorkerResult, get_worker_pool
+from services.sandbox import SandboxResult, ScriptSandbox
+from services.gui_bridge import FreeCADGuiBridge
+from services.process_supervisor import get_supervisor
+from services.freecad_discovery import get_discovery
+from services.export_service import ExportResult, ExportService
+from services.result_cache import ExecutionResultCache
+from services.parallel_builder import ParallelBuildResult, ParallelBuilder
+from services.thumbnail_service import ThumbnailService
+from services.plan_service import PlanResult, PlanService
 
 class FreeCADService:
     def __init__(self, freecad_config: FreeCADConfig):
         self.config = freecad_config
         self.logger = logging.getLogger(__name__)
         self.freecad_available = self._detect_freecad()
+        self.last_optimization_report: Optional[OptimizationReport] = None
+        self.last_cost_estimate: Optional[CostEstimate] = None
+        self.last_geometry_report: Optional[GeometryReport] = None
+        self.last_interference_report: Optional[InterferenceReport] = None
+        self.last_mesh_preview: Optional[PreviewPayload] = None
+        self.cost_weights = CostWeights.from_dict(self.config.cost_weights)
+        self.gui_bridge = FreeCADGuiBridge(self.config.gui_bridge)
+        self.supervisor = get_supervisor(self.config.supervisor)
+        self.discovery = get_discovery(self.config)
+        self.exporter = ExportService(self.config.export, self._run_for_export)
+        self.results = ExecutionResultCache(self.config.result_cache)
+        self.thumbnails = ThumbnailService(self.config.thumbnails)
+        self.plans = PlanService(self.config.plans)
         
     def _detect_freecad(self) -> bool:
         try:
@@ -43,7 +77,26 @@ class FreeCADService:
             )
             
             if generated_code:
-                return self._enhance_code(generated_code, quality_level)
+                enhanced_code = self._enhance_code(generated_code, quality_level)
+                level = level_of_detail(quality_level)
+                # Scene graphs and library parts are compiled at the requested level already
+                compiled = is_compiled_scene(generated_code)
+                if self.config.optimize_generated_code:
+                    enhanced_code, _ = self.optimize_code(enhanced_code, None if compiled else level)
+                elif not level.full and not compiled:
+                    # Leaving out detail is part of the quality level, not an optimization
+                    enhanced_code, _ = optimize_code(enhanced_code, [LevelOfDetailPass(level)])
+                
+                estimate = self.estimate_cost(enhanced_code)
+                if (estimate and quality_level != "draft" and self.config.auto_draft_seconds and not compiled
+                        and estimate.predicted_seconds > self.config.auto_draft_seconds):
+                    self.logger.info(f"Estimated {estimate.predicted_seconds:.1f}s exceeds "
+                                     f"{self.config.auto_draft_seconds:.1f}s, reducing to draft detail")
+                    # Same script at draft detail; asking the model again could return a different one
+                    enhanced_code, _ = optimize_code(enhanced_code, [LevelOfDetailPass(level_of_detail("draft"))])
+                    self.estimate_cost(enhanced_code)
+                self.preview_geometry(enhanced_code)
+                return enhanced_code
             return None
             
         except Exception as e:
@@ -73,6 +126,93 @@ if hasattr(FreeCAD, 'Gui'):
             self.logger.warning(f"Code enhancement failed: {e}")
             return code
     
+    def optimize_code(self, code: str, level: Optional[LevelOfDetail] = None) -> Tuple[str, OptimizationReport]:
+        """Run the AST optimizer and optionally time both script versions"""
+        optimized, report = optimize_code(
+            code, build_passes(self.config.fuse_strategy, self.config.instancing_mode, level))
+        
+        if report.changed and self.config.benchmark_optimizations and self.freecad_available:
+            report.execution_time_before = self._time_execution(code)
+            report.execution_time_after = self._time_execution(optimized)
+            if report.speedup:
+                self.logger.info(f"Optimized script runs {report.speedup:.2f}x faster "
+                                 f"({report.execution_time_before:.3f}s -> {report.execution_time_after:.3f}s)")
+        
+        self.last_optimization_report = report
+        return optimized, report
+    
+    def _time_execution(self, code: str) -> Optional[float]:
+        """Execute a script once in the sandbox and return its run time in seconds"""
+        result = self.run_sandboxed(code)
+        if not result.success:
+            self.logger.warning(f"Benchmark execution failed: {result.error}")
+            return None
+        return result.elapsed
+    
+    def freecad_version(self) -> str:
+        """Version of the FreeCAD that runs scripts; part of execution record keys"""
+        if self.config.worker_pool.use_stub:
+            return "stub"
+        installation = self.discovery.resolve()
+        return (installation.version if installation else None) or "unknown"
+    
+    def run_sandboxed(self, code: str, exports: Optional[List[Dict[str, str]]] = None) -> SandboxResult:
+        """Run a script in a resource-limited child process instead of this one"""
+        version = self.freecad_version()
+        # Export runs write new files, so only plain runs are answered from the record
+        known = self.results.get(code, version) if not exports else None
+        if known:
+            self.logger.info(f"Sandboxed run {known.status} from execution record {known.script_hash[:12]}")
+            return known.to_result(SandboxResult)
+        
+        sandbox = ScriptSandbox(self.config.sandbox, self.config.worker_pool, self.config.installation_path)
+        result = sandbox.run(code, exports)
+        self.results.record(code, version, result)
+        self.logger.info(f"Sandboxed run {result.status} in {result.elapsed:.2f}s")
+        return result
+    
+    def estimate_cost(self, code: str) -> Optional[CostEstimate]:
+        """Predict how long a script will run without executing it"""
+        try:
+            estimate = estimate_cost(code, self.cost_weights)
+        except SyntaxError as e:
+            self.logger.warning(f"Cost estimation skipped, script does not parse: {e}")
+            return None
+        self.last_cost_estimate = estimate
+        return estimate
+    
+    def preview_geometry(self, code: str) -> Optional[GeometryReport]:
+        """Bounding boxes and volumes from the NumPy model, no FreeCAD needed
+        
+        The evaluator runs in a child process: generated code is untrusted.
+        """
+        if not self.config.geometry_preview:
+            return None
+        report = evaluate_isolated(code, self.config.geometry_preview_timeout, self.config.sandbox.memory_limit_mb)
+        self.last_geometry_report = report
+        if not report.success:
+            self.logger.warning(f"Geometry preview {report.status}: {report.error}")
+        for issue in report.issues:
+            self.logger.warning(f"Geometry check: {issue}")
+        if report.success:
+            self.check_interference(report.objects, report.shapes)
+        return report
+    
+    def check_interference(self, objects: List[Dict[str, Any]],
+                           shapes: Optional[Dict[str, Shape]] = None) -> Optional[InterferenceReport]:
+        """Collisions, gaps and out-of-bounds objects from per-object bounding boxes
+        
+        ``objects`` come from a worker or sandbox run or from ``preview_geometry``.
+        """
+        if not self.config.interference.enabled:
+            return None
+        report = check_interference(objects, self.config.interference, shapes=shapes)
+        self.last_interference_report = report
+        if not report.clean:
+            self.logger.info(f"Interference check: {len(report.collisions)} collisions, {len(report.gaps)} gaps, "
+                             f"{len(report.out_of_bounds)} out of bounds among {report.object_count} objects")
+        return report
+    
     def analyze_generated_code(self, code: str) -> Dict[str, Any]:
         """Analyze generated code and provide metrics"""
         try:
@@ -81,6 +221,9 @@ if hasattr(FreeCAD, 'Gui'):
             
             object_operations = len(re.findall(r'addObject', code))
             part_operations = len(re.findall(r'Part\.', code))
+            estimate = self.estimate_cost(code)
+            geometry = self.preview_geometry(code)
+            interference = self.last_interference_report if geometry and geometry.success else None
             
             return {
                 "statistics": {
@@ -93,12 +236,19 @@ if hasattr(FreeCAD, 'Gui'):
                     "has_objects": object_operations > 0,
                     "proper_structure": 'newDocument' in code and 'recompute' in code,
                     "has_imports": 'import FreeCAD' in code
-                }
+                },
+                "cost": {
+                    **estimate.to_dict(),
+                    "exceeds_warning": estimate.predicted_seconds > self.config.cost_warning_seconds
+                } if estimate else {},
+                "geometry": geometry.to_dict() if geometry else {},
+                "interference": interference.to_dict() if interference else {}
             }
         except Exception as e:
-            return {"error": str(e), "statistics": {}, "quality": {}}
+            return {"error": str(e), "statistics": {}, "quality": {}, "cost": {}, "geometry": {}, "interference": {}}
     
-    def execute_code_and_open_freecad(self, code: str, filename: str = None) -> Dict[str, Any]:
+    def execute_code_and_open_freecad(self, code: str, filename: str = None,
+                                      owner: str = "default") -> Dict[str, Any]:
         try:
             if not filename:
                 from datetime import datetime
@@ -120,22 +270,67 @@ if hasattr(FreeCAD, 'Gui'):
                 "message": f"Code saved to {filepath.name}"
             }
             
-            freecad_launched = self._launch_freecad_with_script(str(filepath))
+            # Execution records come from headless runs, which fail on GUI-only
+            # statements, so a failed record never blocks opening the window.
+            # A pool worker builds the model once and saves it; the GUI then
+            # only opens that document instead of running the script again
+            headless, document_path = None, None
+            if self.config.worker_pool.enabled:
+                saved = filepath.with_suffix(".FCStd").resolve()
+                headless = self.run_headless(code, [{"format": "fcstd", "path": str(saved)}])
+            if headless:
+                result["headless"] = headless.to_dict()
+                if not headless.success:
+                    result["execution_error"] = headless.error
+                elif str(saved) in headless.artifacts:
+                    document_path = str(saved)
+                    result["document"] = document_path
+            
+            # Prefer a FreeCAD window that is already running the loader macro
+            if document_path:
+                loaded = self.gui_bridge.load_document(document_path)
+            else:
+                loaded = self.gui_bridge.load_script(str(filepath))
+            if loaded is not None:
+                result["executed"] = loaded.get("status") == "ok"
+                result["gui_opened"] = True
+                result["reused_gui"] = True
+                if result["executed"]:
+                    result["message"] += f" → loaded into running FreeCAD ({loaded.get('object_count', 0)} objects)"
+                else:
+                    result["execution_error"] = loaded.get("error")
+                    result["message"] += f" → running FreeCAD failed to load it: {loaded.get('error')}"
+                return result
+            
+            if not self.supervisor.can_spawn(owner):
+                result["executed"] = False
+                result["process_limit_reached"] = True
+                result["message"] += (f" but {self.config.supervisor.max_live_per_user} FreeCAD windows are "
+                                      f"already open; close one to launch another")
+                return result
+            
+            freecad_launched = self._launch_freecad_with_script(str(filepath), owner, document_path)
             
             if freecad_launched:
                 result["executed"] = True
                 result["gui_opened"] = True
                 result["message"] += " → FreeCAD launched automatically!"
             else:
-                if self.freecad_available:
-                    try:
-                        exec(code)
-                        result["executed"] = True
+                if headless:
+                    result["executed"] = headless.success
+                    if headless.success:
+                        result["message"] += f" and executed headless ({headless.object_count} objects in {headless.elapsed:.2f}s)"
+                    else:
+                        result["message"] += f" but headless execution failed: {headless.error}"
+                elif self.freecad_available:
+                    sandboxed = self.run_sandboxed(code)
+                    result["sandbox"] = sandboxed.to_dict()
+                    result["executed"] = sandboxed.success
+                    if sandboxed.success:
                         result["message"] += " and executed"
-                    except Exception as e:
-                        result["executed"] = False
-                        result["execution_error"] = str(e)
-                        result["message"] += f" but execution failed: {e}"
+                    else:
+                        result["execution_error"] = sandboxed.error
+                        result["message"] += f" but execution failed: {sandboxed.error}"
                 else:
                     result["executed"] = False
                     result["message"] += " (FreeCAD not found)"
@@ -150,108 +345,138 @@ if hasattr(FreeCAD, 'Gui'):
                 "message": f"Failed to process code: {e}"
             }
     
-    def _launch_freecad_with_script(self, script_path: str) -> bool:
+    def run_headless(self, code: str, exports: Optional[List[Dict[str, str]]] = None) -> Optional[WorkerResult]:
+        """Run a script in the headless worker pool; ``None`` if no worker can be started"""
+        version = self.freecad_version()
+        known = self.results.get(code, version) if not exports else None
+        if known:
+            self.logger.info(f"Headless run {known.status} from execution record {known.script_hash[:12]}")
+            return known.to_result()
+        
+        try:
+            pool = get_worker_pool(self.config.worker_pool, self.config.installation_path, self.config.sandbox)
+            result = pool.run(code, exports)
+        except WorkerPoolError as e:
+            self.logger.warning(f"Headless execution unavailable: {e}")
+            return None
+        
+        self.results.record(code, version, result)
+        self.logger.info(f"Headless run {result.status}: {result.object_count} objects "
+                         f"in {result.elapsed:.2f}s (worker {result.worker_pid})")
+        return result
+    
+    def build_parallel(self, code: str) -> Optional[ParallelBuildResult]:
+        """Build independent subassemblies concurrently; ``None`` if no worker can be started"""
+        try:
+            pool = get_worker_pool(self.config.worker_pool, self.config.installation_path, self.config.sandbox)
+            builder = ParallelBuilder(pool, self.config.worker_pool.artifacts_directory, self.cost_weights)
+            return builder.build(code)
+        except WorkerPoolError as e:
+            self.logger.warning(f"Parallel build unavailable: {e}")
+            return None
+    
+    def _run_for_export(self, code: str, exports: List[Dict[str, Any]]) -> WorkerResult:
+        """Prefer a warm pool worker, otherwise a one-shot sandbox"""
+        if self.config.worker_pool.enabled and self.config.worker_pool.parallel_build:
+            build = self.build_parallel(code)
+            if build and build.success:
+                # The assembly only loads finished shapes, so exporting it is cheap
+                code = Path(build.assembly_path).read_text(encoding="utf-8")
+        result = self.run_headless(code, exports) if self.config.worker_pool.enabled else None
+        return result or self.run_sandboxed(code, exports)
+    
+    def export_model(self, code: str, formats: Optional[List[str]] = None,
+                     linear_tolerance: Optional[float] = None,
+                     angular_tolerance: Optional[float] = None,
+                     quality_level: Optional[str] = None) -> ExportResult:
+        """STEP/BREP/STL files for a script, reused from disk when it was exported before
+
+        Without explicit tolerances, a draft or standard ``quality_level``
+        tessellates the STL as coarsely as its level of detail allows.
+        """
+        if quality_level is not None:
+            level = level_of_detail(quality_level)
+            linear_tolerance = linear_tolerance or level.linear_tolerance
+            angular_tolerance = angular_tolerance or level.angular_tolerance
+        
+        version = self.freecad_version()
+        known = self.results.get(code, version)
+        if known and not known.success:
+            return ExportResult(script_hash=script_hash(code), status=known.status, error=known.error)
+        
+        exported = self.exporter.export(code, formats, linear_tolerance, angular_tolerance)
+        if exported.success:
+            self.results.add_artifacts(code, version, exported.files)
+        return exported
+    
+    def _exported_stl(self, code: str) -> Optional[str]:
+        known = self.results.get(code, self.freecad_version())
+        return known.artifacts.get("stl") if known and known.success else None
+    
+    def render_thumbnails(self, code: str, shapes: Optional[Dict[str, Shape]] = None) -> Dict[str, Path]:
+        """Cached PNG views of a script's model, from its exported STL when there is one"""
+        return self.thumbnails.thumbnails(code, shapes=shapes, stl_path=self._exported_stl(code))
+    
+    def build_mesh_preview(self, code: str, shapes: Optional[Dict[str, Shape]] = None) -> Optional[PreviewPayload]:
+        """Compact mesh for the browser preview, decimated to the configured payload size
+        
+        The mesh is the exported STL when there is one, otherwise the
+        evaluator's ``shapes`` (evaluated here when not given).
+        """
+        settings = self.config.mesh_preview
+        if not settings.enabled:
+            return None
+        stl_path = self._exported_stl(code)
+        if stl_path:
+            mesh = read_stl(stl_path)
+        else:
+            if shapes is None:
+                report = evaluate_isolated(code, self.config.geometry_preview_timeout,
+                                           self.config.sandbox.memory_limit_mb)
+                if not report.success:
+                    return None
+                shapes = report.shapes
+            mesh = mesh_from_shapes(shapes)
+        payload = build_preview(mesh, settings.max_triangles, settings.max_bytes)
+        self.last_mesh_preview = payload
+        if payload and payload.decimated:
+            self.logger.info(f"Preview mesh decimated from {payload.original_triangles} to {payload.triangles} "
+                             f"triangles ({len(payload.data)} bytes) in {payload.elapsed:.2f}s")
+        return payload
+    
+    def export_plan(self, code: str, formats: Optional[List[str]] = None,
+                    report: Optional[GeometryReport] = None) -> PlanResult:
+        """SVG/DXF floor plan of a script's model, drawn without FreeCAD
+        
+        ``report`` is this script's geometry preview, evaluated here when not given.
+        """
+        result = self.plans.export(code, formats, report)
+        if result.status not in ("ok", "disabled"):
+            self.logger.warning(f"Plan export {result.status}: {result.error}")
+        return result
+    
+    def _launch_freecad_with_script(self, script_path: str, owner: str = "default",
+                                    document_path: Optional[str] = None) -> bool:
+        """Start FreeCAD on a script, or on ``document_path`` when the model was already built"""
         try:
-            import os
             import platform
-            import glob
-            
-            freecad_paths = []
             
-            if platform.system() == "Windows":
-                program_files_dirs = [
-                    r"C:\Program Files",
-                    r"C:\Program Files (x86)"
-                ]
-                
-                for pf_dir in program_files_dirs:
-                    if os.path.exists(pf_dir):
-                        freecad_dirs = glob.glob(os.path.join(pf_dir, "FreeCAD*"))
-                        for freecad_dir in freecad_dirs:
-                            freecad_exe = os.path.join(freecad_dir, "bin", "FreeCAD.exe")
-                            if os.path.exists(freecad_exe):
-                                freecad_paths.append(freecad_exe)
-                
-                common_paths = [
-                    r"C:\Program Files\FreeCAD 0.21\bin\FreeCAD.exe",
-                    r"C:\Program Files\FreeCAD 0.20\bin\FreeCAD.exe",
-                    r"C:\Program Files\FreeCAD 0.22\bin\FreeCAD.exe",
-                    r"C:\Program Files (x86)\FreeCAD 0.21\bin\FreeCAD.exe",
-                    r"C:\Program Files (x86)\FreeCAD 0.20\bin\FreeCAD.exe",
-                    r"C:\Program Files (x86)\FreeCAD 0.22\bin\FreeCAD.exe",
-                    r"C:\Program Files\FreeCAD\bin\FreeCAD.exe",
-                    r"C:\Program Files (x86)\FreeCAD\bin\FreeCAD.exe",
-                ]
-                freecad_paths.extend(common_paths)
-                
-            elif platform.system() == "Darwin":  # macOS
-                freecad_paths = [
-                    "/Applications/FreeCAD.app/Contents/MacOS/FreeCAD",
-                ]
-            else:  # Linux
-                freecad_paths = [
-                    "/usr/bin/freecad",
-                    "/usr/local/bin/freecad",
-                    "/opt/freecad/bin/FreeCAD",
-                ]
-            
-            # Add configured path if available
-            if self.config.installation_path:
-                if platform.system() == "Windows":
-                    freecad_exe = Path(self.config.installation_path) / "FreeCAD.exe"
-                else:
-                    freecad_exe = Path(self.config.installation_path) / "FreeCAD"
-                freecad_paths.insert(0, str(freecad_exe))
-            
-            # Find working FreeCAD executable
-            freecad_exe = None
-            
-            # First, try configured path
-            if self.config.installation_path:
-                if platform.system() == "Windows":
-                    config_exe = Path(self.config.installation_path) / "FreeCAD.exe" 
-                    if not config_exe.exists():
-                        config_exe = Path(self.config.installation_path) / "bin" / "FreeCAD.exe"
-                else:
-                    config_exe = Path(self.config.installation_path) / "FreeCAD"
-                
-                if config_exe.exists():
-                    freecad_exe = str(config_exe)
-                    self.logger.info(f"Using configured FreeCAD: {freecad_exe}")
-            
-            # If not found, search in standard locations
-            if not freecad_exe:
-                self.logger.info(f"Searching for FreeCAD in {len(freecad_paths)} locations...")
-                for i, path in enumerate(freecad_paths):
-                    self.logger.info(f"Checking {i+1}/{len(freecad_paths)}: {path}")
-                    if Path(path).exists():
-                        freecad_exe = path
-                        self.logger.info(f"✅ Found FreeCAD at: {path}")
-                        break
-            
-            # Try to find in PATH
-            if not freecad_exe and platform.system() == "Windows":
-                try:
-                    result = subprocess.run(["where", "FreeCAD"], 
-                                          capture_output=True, text=True, shell=True)
-                    if result.returncode == 0:
-                        freecad_exe = result.stdout.strip().split('\n')[0]
-                        self.logger.info(f"Found FreeCAD in PATH: {freecad_exe}")
-                except Exception as e:
-                    self.logger.debug(f"PATH search failed: {e}")
-            
-            if not freecad_exe:
-                # Show user where we searched
+            installation = self.discovery.resolve()
+            if not installation:
                 self.logger.error("❌ FreeCAD executable not found!")
-                self.logger.error("Searched locations:")
-                for path in freecad_paths[:5]:  # Show first 5 for brevity
-                    self.logger.error(f"  - {path}")
-                self.logger.error("  ... and more locations")
                 return False
+            freecad_exe = installation.executable
             
             # Launch FreeCAD with the script
             abs_script_path = Path(script_path).resolve()
             
+            # Files given to FreeCAD run in order: start the loader first so
+            # later generations can reuse this window
+            startup_files = [str(Path(document_path).resolve()) if document_path else str(abs_script_path)]
+            if self.config.gui_bridge.enabled and self.config.gui_bridge.start_with_launch:
+                startup_files.insert(0, str(self.gui_bridge.loader_macro_path()))
+            label = abs_script_path.stem
+            
             # Launch FreeCAD with multiple fallback methods
             success = False
             
@@ -259,10 +484,7 @@ if hasattr(FreeCAD, 'Gui'):
                 # Method 1: Launch FreeCAD and execute script directly
                 try:
                     self.logger.info("🚀 Attempting Method 1: Direct script execution")
-                    process = subprocess.Popen([
-                        freecad_exe,
-                        str(abs_script_path)
-                    ], shell=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    self.supervisor.spawn([freecad_exe, *startup_files], owner, label)
                     self.logger.info("✅ FreeCAD launched with direct script execution")
                     success = True
                 except Exception as e:
@@ -272,11 +494,7 @@ if hasattr(FreeCAD, 'Gui'):
                 if not success:
                     try:
                         self.logger.info("🚀 Attempting Method 2: Macro execution")
-                        process = subprocess.Popen([
-                            freecad_exe, 
-                            "--run-python", 
-                            str(abs_script_path)
-                        ], shell=False)
+                        self.supervisor.spawn([freecad_exe, "--run-python", str(abs_script_path)], owner, label)
                         self.logger.info("✅ FreeCAD launched with macro execution")
                         success = True
                     except Exception as e:
@@ -305,7 +523,7 @@ except Exception as e:
 ''')
                         
                         # Launch FreeCAD
-                        process = subprocess.Popen([freecad_exe], shell=False)
+                        self.supervisor.spawn([freecad_exe], owner, label)
                         self.logger.info("✅ FreeCAD launched - auto-load script created")
                         success = True
                         
@@ -316,7 +534,7 @@ except Exception as e:
                 if not success:
                     try:
                         self.logger.info("🚀 Attempting Method 4: Basic FreeCAD launch")
-                        process = subprocess.Popen([freecad_exe], shell=False)
+                        self.supervisor.spawn([freecad_exe], owner, label)
                         self.logger.info("✅ FreeCAD launched - please load script manually")
                         success = True
                     except Exception as e:
@@ -326,13 +544,13 @@ except Exception as e:
                 # Linux/macOS: different approach
                 try:
                     self.logger.info("🚀 Launching FreeCAD on Linux/macOS with script")
-                    process = subprocess.Popen([freecad_exe, str(abs_script_path)], shell=False)
+                    self.supervisor.spawn([freecad_exe, *startup_files], owner, label)
                     self.logger.info("✅ FreeCAD launched successfully on Linux/macOS")
                     success = True
                 except Exception as e:
                     try:
                         self.logger.info("🚀 Launching basic FreeCAD on Linux/macOS")
-                        process = subprocess.Popen([freecad_exe], shell=False)
+                        self.supervisor.spawn([freecad_exe], owner, label)
                         self.logger.info("✅ FreeCAD launched - please load script manually")
                         success = True
                     except Exception as e2:
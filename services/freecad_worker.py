@@ -0,0 +1,354 @@
+"""
+Headless FreeCAD worker process
+
+Runs inside ``FreeCADCmd`` (``FreeCADCmd freecad_worker.py``) or a plain
+Python interpreter with FreeCAD's lib directory on its path, and executes
+scripts sent by ``services.worker_pool.FreeCADWorkerPool``. The worker
+only uses the standard library so it can run without this repository on
+``sys.path``.
+
+Protocol
+--------
+Messages are single-line JSON objects (UTF-8, ``\\n`` terminated). Requests
+arrive on stdin; responses are written to the worker's original stdout.
+Anything the executed script prints is captured and returned in the
+response, and stray output from FreeCAD itself goes to stderr, so stdout
+carries protocol messages only.
+
+On start-up the worker announces itself::
+
+    {"type": "ready", "pid": 1234, "freecad_version": "0.21.2", "stub": false}
+
+Requests (``id`` is echoed back in the response)::
+
+    {"type": "run", "id": "7", "code": "...",
+     "exports": [{"format": "step", "path": "/tmp/model.step"}]}
+    {"type": "ping", "id": "8"}
+    {"type": "shutdown", "id": "9"}
+
+``run`` executes ``code`` with a fresh, active document and closes every
+document the script created afterwards. With ``"collect_shapes": true``
+the response also carries ``"shapes": [{"name", "label", "type", "brep"}]``
+with the BRep of every visible object, for reassembly elsewhere. The
+response is::
+
+    {"type": "result", "id": "7", "status": "ok" | "error",
+     "elapsed": 0.42, "object_count": 12,
+     "objects": [{"name": "Wall", "type": "Part::Feature", "label": "Wall"}],
+     "artifacts": ["/tmp/model.step"], "stdout": "...", "stderr": "...",
+     "error": null, "traceback": null}
+
+Supported export formats are ``fcstd``, ``step``, ``iges``, ``brep``,
+``stl`` and ``glb``. An ``stl`` export may carry ``linear_tolerance`` (mm)
+and ``angular_tolerance`` (radians); the mesh is then tessellated at that
+tolerance and written as binary STL. ``glb`` is always tessellated (at
+0.1 mm unless given) and written by ``mesh_writer`` as quantized glTF
+binary, which needs NumPy. ``ping`` answers ``{"type": "pong", "id": ...}`` and ``shutdown``
+answers ``{"type": "bye", "id": ...}`` before the worker exits.
+
+Environment
+-----------
+``FREECAD_WORKER_LIB``   directory added to ``sys.path`` before importing FreeCAD
+``FREECAD_WORKER_STUB``  ``1`` to use ``utils.freecad_stub`` instead of FreeCAD
+                         (``FREECAD_WORKER_ROOT`` must point at this repository)
+``FREECAD_WORKER_MEMORY_MB``    address-space limit (RLIMIT_AS, POSIX only)
+``FREECAD_WORKER_CPU_SECONDS``  CPU time limit per run (RLIMIT_CPU, POSIX only)
+``FREECAD_WORKER_MAX_OUTPUT``   characters of script stdout/stderr kept per run
+``FREECAD_SHAPE_CACHE_DIR``     BRep cache for ``shape_cache.memoize_shape``
+``FREECAD_SHAPE_CACHE_MB``      size of that cache before LRU eviction
+
+Scripts can ``from shape_cache import memoize_shape`` (see
+``services/shape_cache.py``); a run's cache hits and misses are reported
+as ``"shape_cache": {"hits": 3, "misses": 1}`` in its result.
+"""
+import contextlib
+import io
+import json
+import math
+import os
+import struct
+import sys
+import time
+import traceback
+
+EXPORT_FORMATS = ('fcstd', 'step', 'iges', 'brep', 'stl', 'glb')
+
+DEFAULT_LINEAR_TOLERANCE = 0.1  # mm, for mesh exports without one
+
+TRUNCATION_MARKER = '\n... [output truncated]\n'
+
+
+def _apply_limits():
+    """Apply the memory limit requested through the environment"""
+    try:
+        import resource
+    except ImportError:  # Windows: only the parent's wall-clock timeout applies
+        return
+
+    memory_mb = os.environ.get('FREECAD_WORKER_MEMORY_MB')
+    if memory_mb:
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _limit_cpu():
+    """Give the next run ``FREECAD_WORKER_CPU_SECONDS`` of CPU time
+
+    A pool worker lives for many runs, so the soft RLIMIT_CPU moves on
+    from the CPU time already used; SIGXCPU ends the worker when a run
+    goes past it. The hard limit is left alone (it could not be raised
+    again), the parent's wall-clock timeout kills what ignores SIGXCPU.
+    """
+    cpu_seconds = os.environ.get('FREECAD_WORKER_CPU_SECONDS')
+    if not cpu_seconds:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + int(cpu_seconds)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _truncate(text):
+    limit = int(os.environ.get('FREECAD_WORKER_MAX_OUTPUT', 0))
+    if limit and len(text) > limit:
+        return text[:limit] + TRUNCATION_MARKER
+    return text
+
+
+def _load_freecad():
+    """Import FreeCAD (or the stub) and return ``(module, is_stub)``"""
+    if os.environ.get('FREECAD_WORKER_STUB') == '1':
+        sys.path.insert(0, os.environ.get('FREECAD_WORKER_ROOT', os.getcwd()))
+        from utils import freecad_stub
+        return freecad_stub.install(), True
+
+    library = os.environ.get('FREECAD_WORKER_LIB')
+    if library and library not in sys.path:
+        sys.path.append(library)
+    import FreeCAD
+    return FreeCAD, False
+
+
+def _shape_objects(document):
+    return [obj for obj in document.Objects
+            if hasattr(obj, 'Shape') and obj.TypeId != 'App::Link' and not obj.Shape.isNull()]
+
+
+def _write_binary_stl(path, points, facets):
+    """Binary STL from ``Shape.tessellate`` output (points, index triples)"""
+    with open(path, 'wb') as f:
+        f.write(b'Voice-to-CAD binary STL'.ljust(80, b' '))
+        f.write(struct.pack('<I', len(facets)))
+        for facet in facets:
+            a, b, c = ((p.x, p.y, p.z) for p in (points[i] for i in facet))
+            u = (b[0] - a[0], b[1] - a[1], b[2] - a[2])
+            v = (c[0] - a[0], c[1] - a[1], c[2] - a[2])
+            n = (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+            length = math.sqrt(n[0] * n[0] + n[1] * n[1] + n[2] * n[2]) or 1.0
+            f.write(struct.pack('<12fH', n[0] / length, n[1] / length, n[2] / length, *a, *b, *c, 0))
+
+
+def _mesh_from_shape(shape, linear_tolerance, angular_tolerance=None):
+    """MeshPart mesh of ``shape`` at the given tolerances, or None without MeshPart"""
+    try:
+        import MeshPart
+    except ImportError:
+        return None
+    options = {'Shape': shape, 'LinearDeflection': linear_tolerance, 'Relative': False}
+    if angular_tolerance:
+        options['AngularDeflection'] = angular_tolerance
+    return MeshPart.meshFromShape(**options)
+
+
+def _mesh_writer():
+    """``services/mesh_writer.py``, or None when NumPy is not available"""
+    try:
+        import mesh_writer
+    except ImportError:
+        return None
+    return mesh_writer
+
+
+def _export_mesh(shape, fmt, path, linear_tolerance, angular_tolerance=None):
+    """Tessellate ``shape`` at the given tolerances and write binary STL or GLB"""
+    mesh = _mesh_from_shape(shape, linear_tolerance, angular_tolerance)
+    if mesh is not None and fmt == 'stl':
+        # Mesh writes binary STL for the .stl extension
+        mesh.write(path)
+        return
+    points, facets = mesh.Topology if mesh is not None else shape.tessellate(linear_tolerance)
+    writer = _mesh_writer()
+    if writer is None:
+        if fmt == 'glb':
+            raise ValueError("GLB export needs NumPy")
+        _write_binary_stl(path, points, facets)
+        return
+    writer.WRITERS[fmt](path, [(p.x, p.y, p.z) for p in points], facets)
+
+
+def export_documents(freecad, documents, exports):
+    """Write the requested export files and return their paths"""
+    import Part
+
+    artifacts = []
+    for export in exports:
+        fmt, path = export['format'].lower(), export['path']
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        objects = [obj for document in documents for obj in _shape_objects(document)]
+        if fmt == 'fcstd':
+            documents[-1].saveAs(path)
+        elif fmt in ('step', 'iges'):
+            Part.export(objects, path)
+        else:
+            compound = Part.makeCompound([obj.Shape for obj in objects])
+            if fmt == 'brep':
+                compound.exportBrep(path)
+            elif export.get('linear_tolerance') or fmt == 'glb':
+                _export_mesh(compound, fmt, path, export.get('linear_tolerance') or DEFAULT_LINEAR_TOLERANCE,
+                             export.get('angular_tolerance'))
+            else:
+                compound.exportStl(path)
+        artifacts.append(path)
+    return artifacts
+
+
+def _shape_cache_stats():
+    shape_cache = sys.modules.get('shape_cache')
+    cache = shape_cache.get_cache() if shape_cache else None
+    return cache.stats() if cache else {'hits': 0, 'misses': 0}
+
+
+def _bound_box(obj):
+    """[xmin, ymin, zmin, xmax, ymax, zmax] of an object's shape, or None"""
+    try:
+        shape = obj.Shape
+        if shape.isNull():
+            return None
+        box = shape.BoundBox
+        return [box.XMin, box.YMin, box.ZMin, box.XMax, box.YMax, box.ZMax]
+    except Exception:
+        # Objects without geometry (groups, spreadsheets) or invalid shapes
+        return None
+
+
+def _collect_shapes(documents):
+    """BRep text of every visible object, links resolved to their shapes"""
+    import Part
+
+    shapes = []
+    for document in documents:
+        for obj in document.Objects:
+            if getattr(obj, 'Visibility', True) is False:
+                continue
+            shape = Part.getShape(obj)
+            if shape.isNull():
+                continue
+            shapes.append({'name': obj.Name, 'label': obj.Label, 'type': obj.TypeId,
+                           'brep': shape.exportBrepToString()})
+    return shapes
+
+
+def run_script(freecad, request):
+    """Execute one ``run`` request and build its response"""
+    _limit_cpu()
+    cache_before = _shape_cache_stats()
+    existing = set(freecad.listDocuments())
+    document = freecad.newDocument('WorkerModel')
+    freecad.setActiveDocument(document.Name)
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    response = {'type': 'result', 'id': request.get('id'), 'status': 'ok',
+                'error': None, 'traceback': None, 'artifacts': []}
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            exec(compile(request['code'], '<generated>', 'exec'), {'__name__': '__main__'})
+            documents = [freecad.getDocument(name) for name in freecad.listDocuments()
+                         if name not in existing]
+            for doc in documents:
+                doc.recompute()
+        response['elapsed'] = time.perf_counter() - start
+        # The placeholder document only counts if the script used it
+        documents = [doc for doc in documents if doc is not document or doc.Objects] or [document]
+        response['objects'] = [{'name': obj.Name, 'type': obj.TypeId, 'label': obj.Label,
+                                'bound_box': _bound_box(obj)}
+                               for doc in documents for obj in doc.Objects]
+        response['object_count'] = len(response['objects'])
+        response['artifacts'] = export_documents(freecad, documents, request.get('exports') or [])
+        if request.get('collect_shapes'):
+            response['shapes'] = _collect_shapes(documents)
+    except BaseException as e:
+        response.update(status='error', error=f"{type(e).__name__}: {e}",
+                        traceback=traceback.format_exc(), object_count=0, objects=[])
+        response.setdefault('elapsed', time.perf_counter() - start)
+        if isinstance(e, KeyboardInterrupt):
+            raise
+    finally:
+        for name in set(freecad.listDocuments()) - existing:
+            freecad.closeDocument(name)
+
+    cache_after = _shape_cache_stats()
+    response['shape_cache'] = {name: cache_after[name] - cache_before[name] for name in cache_after}
+    response['stdout'] = _truncate(stdout.getvalue())
+    response['stderr'] = _truncate(stderr.getvalue())
+    return response
+
+
+def serve(requests, protocol):
+    """Answer requests from ``requests`` until shutdown or end of input"""
+    _apply_limits()
+    freecad, is_stub = _load_freecad()
+    # Scripts import helpers that live next to this file (shape_cache)
+    here = os.path.dirname(os.path.abspath(__file__))
+    if here not in sys.path:
+        sys.path.insert(0, here)
+
+    def send(message):
+        protocol.write(json.dumps(message) + '\n')
+        protocol.flush()
+
+    send({'type': 'ready', 'pid': os.getpid(), 'stub': is_stub,
+          'freecad_version': '.'.join(str(part) for part in freecad.Version()[:3])})
+
+    for line in requests:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            send({'type': 'error', 'id': None, 'error': f"Invalid request: {e}"})
+            continue
+
+        kind = request.get('type')
+        if kind == 'run':
+            send(run_script(freecad, request))
+        elif kind == 'ping':
+            send({'type': 'pong', 'id': request.get('id')})
+        elif kind == 'shutdown':
+            send({'type': 'bye', 'id': request.get('id')})
+            break
+        else:
+            send({'type': 'error', 'id': request.get('id'), 'error': f"Unknown request type: {kind}"})
+
+
+def main():
+    # Keep a private handle on stdout for protocol messages and point fd 1
+    # at stderr so output from FreeCAD's C++ side cannot corrupt the stream
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    serve(sys.stdin, protocol)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Client for the loader macro running inside an open FreeCAD GUI
+
+``services/gui_loader_macro.py`` listens on a local socket inside FreeCAD.
+When it is reachable, generated models are loaded into that window (new
+or replacing the previous model) instead of launching another FreeCAD.
+"""
+
+import json
+import logging
+import socket
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from config.settings import GuiBridgeConfig
+from services.gui_loader_macro import HANDSHAKE_FILE
+
+LOADER_MACRO = Path(__file__).resolve().with_name("gui_loader_macro.py")
+
+
+class FreeCADGuiBridge:
+    """Talks to the loader macro using the protocol documented there"""
+
+    def __init__(self, config: GuiBridgeConfig):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def handshake_file(self) -> Path:
+        return Path(self.config.handshake_file or HANDSHAKE_FILE)
+
+    @staticmethod
+    def loader_macro_path() -> Path:
+        return LOADER_MACRO
+
+    def _handshake(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.handshake_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _request(self, message: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        """Send one request; ``None`` when no listener answers"""
+        handshake = self._handshake()
+        if not handshake:
+            return None
+        message = dict(message, token=handshake.get("token"))
+        try:
+            with socket.create_connection((handshake["host"], handshake["port"]),
+                                          timeout=self.config.connect_timeout) as connection:
+                connection.settimeout(timeout)
+                connection.sendall((json.dumps(message) + "\n").encode("utf-8"))
+                with connection.makefile("r", encoding="utf-8") as reader:
+                    line = reader.readline()
+        except (OSError, KeyError) as e:
+            self.logger.debug(f"FreeCAD loader not reachable: {e}")
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+    def ping(self) -> Optional[Dict[str, Any]]:
+        response = self._request({"type": "ping"}, self.config.connect_timeout)
+        return response if response and response.get("status") == "ok" else None
+
+    def is_available(self) -> bool:
+        return self.config.enabled and self.ping() is not None
+
+    def load_script(self, script_path: str, mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Load a script into the running FreeCAD; ``None`` if no GUI is listening"""
+        if not self.config.enabled:
+            return None
+        response = self._request({
+            "type": "load",
+            "script_path": str(Path(script_path).resolve()),
+            "slot": self.config.document_slot,
+            "mode": mode or self.config.mode,
+        }, self.config.load_timeout)
+        if response is not None:
+            self.logger.info(f"Running FreeCAD loaded {script_path}: {response}")
+        return response
+
+    def load_document(self, document_path: str, mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Open a saved FCStd in the running FreeCAD; ``None`` if no GUI is listening"""
+        if not self.config.enabled:
+            return None
+        response = self._request({
+            "type": "load",
+            "document_path": str(Path(document_path).resolve()),
+            "slot": self.config.document_slot,
+            "mode": mode or self.config.mode,
+        }, self.config.load_timeout)
+        if response is not None:
+            self.logger.info(f"Running FreeCAD opened {document_path}: {response}")
+        return response
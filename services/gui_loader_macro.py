@@ -0,0 +1,216 @@
+"""
+Voice-to-CAD loader macro for an already running FreeCAD GUI
+
+Run this file once inside FreeCAD (Macro > Macros... or by passing it on
+the FreeCAD command line before a script). It starts a small TCP listener
+on 127.0.0.1 so the Voice-to-CAD app can load new models into the open
+window instead of starting another FreeCAD process for every generation.
+
+The listener writes a handshake file (``~/.voice_to_cad/gui_bridge.json``)
+with its port, a random token and its pid, and removes it on shutdown.
+
+Protocol
+--------
+One request per connection: the client sends a single JSON line and the
+listener answers with a single JSON line. Every request carries the token
+from the handshake file.
+
+    {"type": "ping", "token": "..."}
+    -> {"status": "ok", "type": "pong", "pid": 4242, "freecad_version": "0.21.2"}
+
+    {"type": "load", "token": "...", "script_path": "/abs/model.py",
+     "slot": "VoiceToCAD", "mode": "replace"}
+    -> {"status": "ok", "documents": ["Model"], "object_count": 14}
+    -> {"status": "error", "error": "NameError: name 'x' is not defined"}
+
+A ``load`` request may carry ``"document_path": "/abs/model.FCStd"``
+instead of ``script_path``; the saved document is then opened as it is,
+without running anything.
+
+``mode`` is ``replace`` (close the documents the previous load into the
+same ``slot`` created) or ``new`` (keep them). Scripts run in FreeCAD's
+main thread; the listener thread only queues them.
+
+Only the standard library (plus FreeCAD/PySide when running inside
+FreeCAD) is used, so the macro works without this repository installed.
+"""
+import hmac
+import json
+import os
+import queue
+import secrets
+import socketserver
+import threading
+import traceback
+
+HANDSHAKE_FILE = os.path.join(os.path.expanduser('~'), '.voice_to_cad', 'gui_bridge.json')
+LOAD_MODES = ('replace', 'new')
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            response = self.server.loader.handle(request)
+        except ValueError as e:
+            response = {'status': 'error', 'error': f"Invalid request: {e}"}
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LoaderServer:
+    """Socket listener that forwards ``load`` requests to a handler
+
+    ``load_handler(request) -> dict`` does the actual work; ``dispatch``
+    decides which thread runs it (FreeCAD needs its main thread, tests can
+    call it directly).
+    """
+
+    def __init__(self, load_handler, dispatch=None, host='127.0.0.1', port=0,
+                 token=None, handshake_file=HANDSHAKE_FILE, info=None):
+        self.load_handler = load_handler
+        self.dispatch = dispatch or (lambda function, request: function(request))
+        self.host = host
+        self.port = port
+        self.token = token or secrets.token_hex(16)
+        self.handshake_file = handshake_file
+        self.info = info or {}
+        self._server = None
+
+    def handle(self, request):
+        if not hmac.compare_digest(str(request.get('token', '')), self.token):
+            return {'status': 'error', 'error': 'Invalid token'}
+        kind = request.get('type')
+        if kind == 'ping':
+            return dict(self.info, status='ok', type='pong', pid=os.getpid())
+        if kind == 'load':
+            if request.get('mode', 'replace') not in LOAD_MODES:
+                return {'status': 'error', 'error': f"Unknown mode: {request.get('mode')}"}
+            try:
+                return self.dispatch(self.load_handler, request)
+            except Exception as e:
+                return {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+        return {'status': 'error', 'error': f"Unknown request type: {kind}"}
+
+    def start(self):
+        self._server = _Server((self.host, self.port), _RequestHandler)
+        self._server.loader = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        directory = os.path.dirname(self.handshake_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.handshake_file, 'w', encoding='utf-8') as f:
+            json.dump({'host': self.host, 'port': self.port, 'token': self.token, 'pid': os.getpid()}, f)
+        if hasattr(os, 'chmod'):
+            os.chmod(self.handshake_file, 0o600)
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        try:
+            with open(self.handshake_file, encoding='utf-8') as f:
+                owned = json.load(f).get('port') == self.port
+            if owned:
+                os.remove(self.handshake_file)
+        except (OSError, ValueError):
+            pass
+
+
+class FreeCADLoader:
+    """Loads scripts or saved documents into the running FreeCAD, tracking documents per slot"""
+
+    def __init__(self):
+        self.slots = {}
+
+    def __call__(self, request):
+        import FreeCAD
+
+        slot = request.get('slot') or 'default'
+        if request.get('mode', 'replace') == 'replace':
+            for name in self.slots.pop(slot, []):
+                if name in FreeCAD.listDocuments():
+                    FreeCAD.closeDocument(name)
+
+        existing = set(FreeCAD.listDocuments())
+        try:
+            if request.get('document_path'):
+                FreeCAD.openDocument(request['document_path'])
+            else:
+                with open(request['script_path'], encoding='utf-8') as f:
+                    code = compile(f.read(), request['script_path'], 'exec')
+                exec(code, {'__name__': '__main__', '__file__': request['script_path']})
+        except Exception as e:
+            FreeCAD.Console.PrintError(traceback.format_exc())
+            return {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+        finally:
+            created = [name for name in FreeCAD.listDocuments() if name not in existing]
+            self.slots.setdefault(slot, []).extend(created)
+
+        documents = [FreeCAD.getDocument(name) for name in created]
+        if FreeCAD.GuiUp and documents:
+            import FreeCADGui
+            FreeCAD.setActiveDocument(documents[-1].Name)
+            FreeCADGui.ActiveDocument.activeView().viewIsometric()
+            FreeCADGui.SendMsgToActiveView('ViewFit')
+        return {'status': 'ok', 'documents': created,
+                'object_count': sum(len(doc.Objects) for doc in documents)}
+
+
+class QtDispatcher:
+    """Runs handlers in the Qt main thread by polling a queue from a QTimer"""
+
+    def __init__(self, timeout=300.0, interval_ms=100):
+        from PySide import QtCore
+
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._timer = QtCore.QTimer()
+        self._timer.timeout.connect(self._drain)
+        self._timer.start(interval_ms)
+
+    def _drain(self):
+        while True:
+            try:
+                function, request, done, result = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result.append(function(request))
+            except Exception as e:
+                result.append({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+            done.set()
+
+    def __call__(self, function, request):
+        done, result = threading.Event(), []
+        self._queue.put((function, request, done, result))
+        if not done.wait(self.timeout):
+            return {'status': 'error', 'error': 'Timed out waiting for the FreeCAD main thread'}
+        return result[0]
+
+
+def start_in_freecad(port=0):
+    """Start (or keep) the listener inside the running FreeCAD"""
+    import FreeCAD
+
+    existing = getattr(FreeCAD, '_voice_to_cad_loader', None)
+    if existing is not None:
+        return existing
+    version = '.'.join(str(part) for part in FreeCAD.Version()[:3])
+    server = LoaderServer(FreeCADLoader(), dispatch=QtDispatcher(), port=port,
+                          info={'freecad_version': version}).start()
+    FreeCAD._voice_to_cad_loader = server  # keep references alive for the session
+    FreeCAD.Console.PrintMessage(f"Voice-to-CAD loader listening on 127.0.0.1:{server.port}\n")
+    return server
+
+
+if __name__ == '__main__':
+    start_in_freecad()
@@ -0,0 +1,225 @@
+"""
+Streaming binary STL and quantized GLB writers
+
+Loaded inside the headless FreeCAD worker (``services/freecad_worker.py``
+puts this directory on ``sys.path``) to write tessellated models. Besides
+the standard library it needs NumPy, which FreeCAD ships with; the worker
+falls back to its per-facet STL loop when NumPy is missing.
+
+A mesh is a ``points`` array (m, 3) plus a ``facets`` index array (n, 3).
+Neither writer creates Python objects per triangle: facets are gathered
+into structured NumPy records ``CHUNK_TRIANGLES`` at a time, so peak
+memory stays at a few chunks however large the model is.
+
+* ``write_stl`` streams 50-byte binary STL records through ``StlWriter``,
+  which also accepts chunks of unknown total count and patches the
+  triangle count into the header when it is closed.
+* ``write_glb`` writes glTF 2.0 binary with flat-shaded, unindexed
+  triangles. Positions are quantized to 16-bit integers over the mesh
+  bounds and normals to normalized 8-bit integers (``KHR_mesh_quantization``),
+  interleaved at 12 bytes per vertex; the node's scale and translation
+  restore millimetres. The file is sized up front and the vertex buffer
+  filled through a memory map.
+
+``benchmark`` measures throughput and peak traced memory of both writers;
+run ``python services/mesh_writer.py [triangles]`` for a report.
+"""
+import json
+import os
+import struct
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+CHUNK_TRIANGLES = 1 << 16
+
+STL_HEADER = b'Voice-to-CAD binary STL'.ljust(80, b' ')
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+
+GLB_MAGIC = b'glTF'
+GLB_VERTEX = np.dtype([('position', '<u2', (3,)), ('position_pad', '<u2'),
+                       ('normal', 'i1', (3,)), ('normal_pad', 'i1')])
+POSITION_STEPS = 65535  # quantization levels per axis
+NORMAL_SCALE = 127
+
+# glTF constants
+_ARRAY_BUFFER = 34962
+_BYTE = 5120
+_UNSIGNED_SHORT = 5123
+_TRIANGLES = 4
+
+
+def facet_normals(triangles):
+    """Unit normals of (n, 3, 3) triangles; degenerate ones get a zero normal"""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def _chunks(points, facets, chunk_size):
+    """(n, 3, 3) float64 triangles, ``chunk_size`` at a time"""
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    facets = np.asarray(facets).reshape(-1, 3)
+    for start in range(0, len(facets), chunk_size):
+        yield points[facets[start:start + chunk_size]]
+
+
+class StlWriter:
+    """Binary STL written chunk by chunk; the header count is fixed up on close"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._file.write(STL_HEADER + struct.pack('<I', 0))
+
+    def write(self, triangles):
+        """Append (k, 3, 3) triangles"""
+        triangles = np.asarray(triangles, dtype=float).reshape(-1, 3, 3)
+        records = np.zeros(len(triangles), dtype=STL_RECORD)
+        records['normal'] = facet_normals(triangles)
+        records['vertices'] = triangles
+        records.tofile(self._file)
+        self.count += len(triangles)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(80)
+        self._file.write(struct.pack('<I', self.count))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_stl(path, points, facets, chunk_size=CHUNK_TRIANGLES):
+    """Binary STL of an indexed mesh; returns the triangle count"""
+    with StlWriter(path) as writer:
+        for triangles in _chunks(points, facets, chunk_size):
+            writer.write(triangles)
+    return writer.count
+
+
+def _glb_document(count, lower, step):
+    """glTF JSON for ``count`` triangles quantized from ``lower`` in ``step`` mm"""
+    document = {'asset': {'version': '2.0', 'generator': 'Voice-to-CAD mesh_writer'},
+                'scene': 0, 'scenes': [{'nodes': []}]}
+    if not count:
+        return document
+    vertices = 3 * count
+    top = [POSITION_STEPS if s > 0 else 0 for s in step]
+    document.update({
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0, 'translation': [float(v) for v in lower],
+                   'scale': [float(s) if s > 0 else 1.0 for s in step]}],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0, 'NORMAL': 1}, 'material': 0,
+                                    'mode': _TRIANGLES}]}],
+        'materials': [{'pbrMetallicRoughness': {'baseColorFactor': [0.8, 0.8, 0.8, 1.0],
+                                                'metallicFactor': 0.0, 'roughnessFactor': 0.9},
+                       'doubleSided': True}],
+        'buffers': [{'byteLength': vertices * GLB_VERTEX.itemsize}],
+        'bufferViews': [{'buffer': 0, 'byteOffset': 0, 'byteLength': vertices * GLB_VERTEX.itemsize,
+                         'byteStride': GLB_VERTEX.itemsize, 'target': _ARRAY_BUFFER}],
+        'accessors': [
+            {'bufferView': 0, 'byteOffset': GLB_VERTEX.fields['position'][1], 'componentType': _UNSIGNED_SHORT,
+             'count': vertices, 'type': 'VEC3', 'min': [0, 0, 0], 'max': top},
+            {'bufferView': 0, 'byteOffset': GLB_VERTEX.fields['normal'][1], 'componentType': _BYTE,
+             'normalized': True, 'count': vertices, 'type': 'VEC3'},
+        ],
+        'extensionsUsed': ['KHR_mesh_quantization'],
+        'extensionsRequired': ['KHR_mesh_quantization'],
+    })
+    return document
+
+
+def write_glb(path, points, facets, chunk_size=CHUNK_TRIANGLES):
+    """Quantized, flat-shaded GLB of an indexed mesh; returns the triangle count"""
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    facets = np.asarray(facets).reshape(-1, 3)
+    count = len(facets)
+    lower, step = np.zeros(3), np.zeros(3)
+    if count:
+        # Bounds of the referenced points only, so the quantized range is fully used
+        used = np.zeros(len(points), dtype=bool)
+        used[facets.ravel()] = True
+        rows = 3 * chunk_size
+        bounds = np.array([[block.min(axis=0), block.max(axis=0)]
+                           for block in (points[start:start + rows][used[start:start + rows]]
+                                         for start in range(0, len(points), rows)) if len(block)])
+        lower, upper = bounds[:, 0].min(axis=0), bounds[:, 1].max(axis=0)
+        step = (upper - lower) / POSITION_STEPS
+
+    content = json.dumps(_glb_document(count, lower, step), separators=(',', ':')).encode('utf-8')
+    content += b' ' * (-len(content) % 4)
+    binary_length = 3 * count * GLB_VERTEX.itemsize  # a multiple of 4
+    offset = 12 + 8 + len(content) + (8 if count else 0)
+    with open(path, 'wb') as f:
+        f.write(GLB_MAGIC + struct.pack('<II', 2, offset + binary_length))
+        f.write(struct.pack('<I', len(content)) + b'JSON' + content)
+        if count:
+            f.write(struct.pack('<I', binary_length) + b'BIN\0')
+            f.truncate(offset + binary_length)
+    if not count:
+        return 0
+
+    buffer = np.memmap(path, dtype=GLB_VERTEX, mode='r+', offset=offset, shape=(3 * count,))
+    scale = np.divide(1.0, step, out=np.zeros(3), where=step > 0)
+    start = 0
+    for triangles in _chunks(points, facets, chunk_size):
+        vertices = buffer[3 * start:3 * (start + len(triangles))]
+        vertices['position'] = np.rint((triangles - lower) * scale).reshape(-1, 3)
+        vertices['normal'] = np.repeat(np.rint(facet_normals(triangles) * NORMAL_SCALE), 3, axis=0)
+        start += len(triangles)
+    buffer.flush()
+    del buffer
+    return count
+
+
+WRITERS = {'stl': write_stl, 'glb': write_glb}
+
+
+def _synthetic_mesh(triangles):
+    """A grid surface of about ``triangles`` triangles in a 100 m square"""
+    side = max(int(np.sqrt(triangles / 2)), 1)
+    x, y = np.meshgrid(np.linspace(0, 100000, side + 1), np.linspace(0, 100000, side + 1), indexing='ij')
+    points = np.stack([x.ravel(), y.ravel(), 500 * np.sin(x.ravel() / 3000) * np.cos(y.ravel() / 4000)], axis=1)
+    corner = (np.arange(side)[:, None] * (side + 1) + np.arange(side)[None, :]).ravel()
+    facets = np.concatenate([np.stack([corner, corner + side + 1, corner + 1], axis=1),
+                             np.stack([corner + 1, corner + side + 1, corner + side + 2], axis=1)])
+    return points, facets
+
+
+def benchmark(triangles=1_000_000, directory=None, formats=('stl', 'glb')):
+    """Seconds, triangles per second, file size and peak traced memory per writer"""
+    import tempfile
+
+    points, facets = _synthetic_mesh(triangles)
+    report = {}
+    with tempfile.TemporaryDirectory(dir=directory) as scratch:
+        for fmt in formats:
+            path = os.path.join(scratch, f'benchmark.{fmt}')
+            tracemalloc.start()
+            start = time.perf_counter()
+            WRITERS[fmt](path, points, facets)
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = os.path.getsize(path)
+            report[fmt] = {'triangles': len(facets), 'seconds': seconds,
+                           'triangles_per_second': len(facets) / seconds if seconds else float('inf'),
+                           'megabytes': size / 2 ** 20, 'bytes_per_triangle': size / len(facets),
+                           'peak_memory_mb': peak / 2 ** 20}
+    return report
+
+
+if __name__ == '__main__':
+    for fmt, result in benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000).items():
+        print(f"{fmt}: {result['triangles']:,} triangles in {result['seconds']:.2f}s "
+              f"({result['triangles_per_second'] / 1e6:.1f}M/s), {result['megabytes']:.1f} MB "
+              f"({result['bytes_per_triangle']:.0f} B/triangle), peak {result['peak_memory_mb']:.1f} MB")
@@ -0,0 +1,148 @@
+"""
+Parallel building of independent subassemblies in headless workers
+
+``ParallelBuilder`` splits a script with ``utils.script_partition``,
+groups the subassemblies into one part per worker (balanced by predicted
+cost), builds the parts concurrently in a ``FreeCADWorkerPool`` and
+collects every object's BRep. The shapes are written next to an assembly
+script that loads them into a single document, replays the GUI styling
+and runs the original tail, so opening or exporting the model no longer
+repeats any boolean work.
+"""
+
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field, asdict, replace
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from config.settings import WorkerPoolConfig
+from services.worker_pool import FreeCADWorkerPool
+from utils.cost_estimator import CostWeights
+from utils.script_hash import script_hash
+from utils.script_partition import ScriptPartition, partition_script
+
+
+@dataclass
+class PartBuild:
+    """One part built by one worker"""
+    index: int
+    subassemblies: int
+    status: str
+    elapsed: float = 0.0
+    object_count: int = 0
+    worker_pid: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class ParallelBuildResult:
+    """Outcome of a parallel build"""
+    status: str
+    script_hash: str
+    parts: List[PartBuild] = field(default_factory=list)
+    wall_seconds: float = 0.0
+    assembly_path: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.status == "ok"
+
+    @property
+    def serial_seconds(self) -> float:
+        """Build time of all parts added up, i.e. the sequential equivalent"""
+        return sum(part.elapsed for part in self.parts)
+
+    @property
+    def parallelism(self) -> float:
+        """How much part work overlapped (serial time / wall time)"""
+        return self.serial_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["serial_seconds"] = self.serial_seconds
+        result["parallelism"] = self.parallelism
+        return result
+
+
+class ParallelBuilder:
+    """Build a script's subassemblies concurrently and reassemble them"""
+
+    def __init__(self, pool: FreeCADWorkerPool, artifacts_directory: str,
+                 weights: Optional[CostWeights] = None):
+        self.pool = pool
+        self.artifacts_directory = Path(artifacts_directory).resolve()
+        self.weights = weights
+        self.logger = logging.getLogger(__name__)
+
+    def build(self, code: str) -> ParallelBuildResult:
+        key = script_hash(code)
+        partition = partition_script(code, self.weights) or ScriptPartition.whole(code)
+        batches = partition.batches(self.pool.config.size)
+
+        start = time.perf_counter()
+        futures = [self.pool.submit(partition.part_script(batch), collect_shapes=True) for batch in batches]
+        results = [future.result() for future in futures]
+        wall_seconds = time.perf_counter() - start
+
+        parts = [PartBuild(index=index, subassemblies=len(batch), status=result.status,
+                           elapsed=result.elapsed, object_count=len(result.shapes),
+                           worker_pid=result.worker_pid, error=result.error)
+                 for index, (batch, result) in enumerate(zip(batches, results))]
+        build = ParallelBuildResult(status="ok", script_hash=key, parts=parts, wall_seconds=wall_seconds)
+        failed = [part for part in parts if part.status != "ok"]
+        if failed:
+            build.status, build.error = failed[0].status, failed[0].error
+            self.logger.warning(f"Parallel build of {key[:12]} failed in part {failed[0].index}: {build.error}")
+            return build
+
+        directory = self.artifacts_directory / key
+        directory.mkdir(parents=True, exist_ok=True)
+        loads = []
+        for index, result in enumerate(results):
+            part_loads = []
+            for position, shape in enumerate(result.shapes):
+                safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", shape["name"])
+                path = directory / f"{index:02d}_{position:03d}_{safe_name}.brep"
+                path.write_text(shape["brep"], encoding="utf-8")
+                part_loads.append((shape["name"], shape["label"], str(path)))
+            loads.append(part_loads)
+
+        presentation = [[item for sub in batch for item in sub.presentation] for batch in batches]
+        assembly_path = directory / "assembly.py"
+        assembly_path.write_text(partition.assembly_script(loads, presentation), encoding="utf-8")
+        build.assembly_path = str(assembly_path)
+        self.logger.info(f"Built {key[:12]} in {len(parts)} parallel parts: {wall_seconds:.2f}s wall, "
+                         f"{build.serial_seconds:.2f}s of part work ({build.parallelism:.1f}x overlap)")
+        return build
+
+
+def scaling_report(code: str, config: WorkerPoolConfig, artifacts_directory: str,
+                   worker_counts: Optional[List[int]] = None,
+                   library_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Build ``code`` with 1..N workers and report the speedup against core count"""
+    cores = os.cpu_count() or 1
+    if worker_counts is None:
+        worker_counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+    rows, baseline = [], None
+    for count in worker_counts:
+        with FreeCADWorkerPool(replace(config, size=count), library_path) as pool:
+            # Start every worker first so start-up time is not measured
+            for future in [pool.submit("pass") for _ in range(count)]:
+                future.result()
+            build = ParallelBuilder(pool, artifacts_directory).build(code)
+        baseline = baseline or build.wall_seconds
+        speedup = baseline / build.wall_seconds if build.wall_seconds else 0.0
+        rows.append({
+            "workers": count,
+            "cores": cores,
+            "parts": len(build.parts),
+            "status": build.status,
+            "wall_seconds": round(build.wall_seconds, 3),
+            "speedup": round(speedup, 2),
+            "efficiency": round(speedup / count, 2),
+        })
+    return rows
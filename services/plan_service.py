@@ -0,0 +1,119 @@
+"""
+2D floor plan export without FreeCAD
+
+``PlanService`` turns a generated script into SVG and DXF plan drawings
+through the in-process geometry evaluator and ``utils.floor_plan``, so
+"2d" requests finish in milliseconds on servers with no CAD install.
+Drawings are stored like exports, at ``<directory>/<key[:2]>/<key>.<ext>``
+where ``key`` is the canonical script hash combined with the format, cut
+height and scale; a plan drawn before is served from disk.
+"""
+
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.settings import PlanConfig
+from utils.floor_plan import WRITERS, Plan, plan_from_report
+from utils.geometry_evaluator import GeometryReport, evaluate_isolated
+from utils.script_hash import script_hash
+
+MIME_TYPES = {"svg": "image/svg+xml", "dxf": "image/vnd.dxf"}
+
+
+@dataclass
+class PlanResult:
+    """Plan drawings of one model, by format"""
+    script_hash: str
+    status: str = "ok"  # "ok", "disabled", "empty" or the failed evaluation's status
+    files: Dict[str, str] = field(default_factory=dict)
+    cached: List[str] = field(default_factory=list)  # formats served from disk
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    plan: Optional[Plan] = field(default=None, repr=False)  # None when every format was cached
+
+    @property
+    def success(self) -> bool:
+        return self.status == "ok"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"script_hash": self.script_hash, "status": self.status, "files": self.files,
+                "cached": self.cached, "elapsed": self.elapsed, "error": self.error}
+
+
+class PlanService:
+    """Draw floor plans once and keep the drawings on disk"""
+
+    def __init__(self, config: PlanConfig):
+        self.config = config
+        self.directory = Path(config.directory).resolve()
+        self.logger = logging.getLogger(__name__)
+
+    def path(self, code: str, fmt: str) -> Path:
+        options = {"format": fmt, "cut_height": self.config.cut_height}
+        if fmt == "svg":
+            options["scale"] = self.config.scale
+        key = script_hash(code, options)
+        return self.directory / key[:2] / f"{key}.{fmt}"
+
+    def export(self, code: str, formats: Optional[List[str]] = None,
+               report: Optional[GeometryReport] = None) -> PlanResult:
+        """Plan drawings of ``code`` in ``formats`` (default: the configured ones)
+
+        ``report`` (a geometry preview of this script) spares evaluating it again.
+        """
+        start = time.perf_counter()
+        result = PlanResult(script_hash(code))
+        if not self.config.enabled:
+            result.status = "disabled"
+            return result
+        formats = formats or self.config.formats
+        unknown = [fmt for fmt in formats if fmt not in WRITERS]
+        if unknown:
+            raise ValueError(f"Unsupported plan format: {', '.join(unknown)}")
+
+        paths = {fmt: self.path(code, fmt) for fmt in formats}
+        result.cached = [fmt for fmt, path in paths.items() if path.is_file()]
+        missing = [fmt for fmt in formats if fmt not in result.cached]
+        if missing:
+            if report is None or not report.success:
+                report = evaluate_isolated(code, self.config.evaluation_timeout, self.config.memory_limit_mb)
+            if not report.success:
+                result.status, result.error = report.status, report.error
+                result.elapsed = time.perf_counter() - start
+                return result
+            result.plan = plan_from_report(report, self.config.cut_height)
+            if result.plan.empty:
+                result.status, result.error = "empty", "The model has no geometry to draw in plan"
+                result.elapsed = time.perf_counter() - start
+                return result
+            for fmt in missing:
+                if not self._write(fmt, result.plan, paths[fmt]):
+                    result.status, result.error = "error", f"Could not write the {fmt.upper()} plan"
+                    del paths[fmt]
+
+        result.files = {fmt: str(path) for fmt, path in paths.items()}
+        result.elapsed = time.perf_counter() - start
+        self.logger.info(f"Plan {result.script_hash[:12]}: {', '.join(result.files)} in "
+                         f"{result.elapsed * 1000:.1f} ms ({len(result.cached)} cached)")
+        return result
+
+    def _write(self, fmt: str, plan: Plan, path: Path) -> bool:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.partial")
+        try:
+            if fmt == "svg":
+                WRITERS[fmt](plan, str(partial), self.config.scale)
+            else:
+                WRITERS[fmt](plan, str(partial))
+            os.replace(partial, path)
+            return True
+        except OSError as e:
+            self.logger.warning(f"Could not store plan {path.name}: {e}")
+            if partial.exists():
+                partial.unlink()
+            return False
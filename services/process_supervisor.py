@@ -0,0 +1,175 @@
+"""
+Supervisor for FreeCAD processes launched by the app
+
+Every FreeCAD window started for a user goes through ``ProcessSupervisor``.
+A watcher thread per process drains its combined stdout/stderr into a
+per-run log file (so a chatty script can never block on a full pipe),
+then waits for the exit code, which also reaps the process. The
+supervisor enforces a per-user cap on live processes and keeps a short
+history for the UI.
+"""
+
+import logging
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from config.settings import SupervisorConfig
+from utils.exceptions import ProcessLimitError
+
+
+@dataclass
+class SupervisedProcess:
+    """A launched process and what is known about it"""
+    process: subprocess.Popen
+    owner: str
+    label: str
+    command: List[str]
+    log_path: Path
+    started_at: float = field(default_factory=time.time)
+    ended_at: Optional[float] = None
+    exit_code: Optional[int] = None
+    tail: deque = field(default_factory=deque)
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @property
+    def running(self) -> bool:
+        return self.ended_at is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.ended_at or time.time()
+        return {
+            "pid": self.pid,
+            "owner": self.owner,
+            "label": self.label,
+            "command": " ".join(self.command),
+            "running": self.running,
+            "exit_code": self.exit_code,
+            "started_at": datetime.fromtimestamp(self.started_at).strftime("%H:%M:%S"),
+            "runtime_seconds": round(end - self.started_at, 1),
+            "log_path": str(self.log_path),
+        }
+
+
+class ProcessSupervisor:
+    """Owns every spawned FreeCAD process"""
+
+    def __init__(self, config: SupervisorConfig):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._live: Dict[int, SupervisedProcess] = {}
+        self._finished: deque = deque(maxlen=config.history_size)
+
+    def live_count(self, owner: str) -> int:
+        with self._lock:
+            return sum(1 for entry in self._live.values() if entry.owner == owner)
+
+    def can_spawn(self, owner: str) -> bool:
+        return self.live_count(owner) < self.config.max_live_per_user
+
+    def spawn(self, command: List[str], owner: str, label: str = "FreeCAD") -> SupervisedProcess:
+        """Start ``command`` for ``owner``; raises ``ProcessLimitError`` at the cap"""
+        with self._lock:
+            live = sum(1 for entry in self._live.values() if entry.owner == owner)
+            if live >= self.config.max_live_per_user:
+                raise ProcessLimitError(
+                    f"{live} FreeCAD processes already running (limit {self.config.max_live_per_user})")
+
+            # Everything that can fail without a process happens first
+            log_directory = Path(self.config.log_directory)
+            log_directory.mkdir(parents=True, exist_ok=True)
+            safe_label = re.sub(r"[^A-Za-z0-9_-]+", "_", label)[:40]
+            log_prefix = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{safe_label}"
+
+            process = subprocess.Popen(command, shell=False, stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            try:
+                log_path = log_directory / f"{log_prefix}_{process.pid}.log"
+                entry = SupervisedProcess(process=process, owner=owner, label=label, command=list(command),
+                                          log_path=log_path, tail=deque(maxlen=self.config.tail_lines))
+                threading.Thread(target=self._watch, args=(entry,), daemon=True,
+                                 name=f"supervise-{process.pid}").start()
+            except BaseException:
+                # Nobody would drain or reap an untracked process
+                process.kill()
+                process.stdout.close()
+                process.wait()
+                raise
+            self._live[process.pid] = entry
+
+        self.logger.info(f"Started {label} (pid {process.pid}) for {owner}, log: {log_path}")
+        return entry
+
+    def _watch(self, entry: SupervisedProcess) -> None:
+        """Drain output into the run log, then reap the process"""
+        with open(entry.log_path, "wb") as log:
+            log.write(f"$ {' '.join(entry.command)}\n".encode("utf-8"))
+            for line in iter(entry.process.stdout.readline, b""):
+                log.write(line)
+                log.flush()
+                entry.tail.append(line.decode("utf-8", errors="replace").rstrip("\n"))
+            entry.process.stdout.close()
+            entry.exit_code = entry.process.wait()
+            log.write(f"\n[exit code {entry.exit_code}]\n".encode("utf-8"))
+
+        with self._lock:
+            entry.ended_at = time.time()
+            self._live.pop(entry.pid, None)
+            self._finished.append(entry)
+        self.logger.info(f"{entry.label} (pid {entry.pid}) exited with code {entry.exit_code}")
+
+    def status(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Live and recently finished processes, newest first"""
+        with self._lock:
+            entries = list(self._live.values()) + list(self._finished)
+        if owner is not None:
+            entries = [entry for entry in entries if entry.owner == owner]
+        return [entry.to_dict() for entry in sorted(entries, key=lambda e: e.started_at, reverse=True)]
+
+    def tail(self, pid: int) -> str:
+        """Last lines of output of a live or recently finished process"""
+        with self._lock:
+            entry = self._live.get(pid) or next((e for e in self._finished if e.pid == pid), None)
+        return "\n".join(entry.tail) if entry else ""
+
+    def terminate(self, pid: int, owner: Optional[str] = None, timeout: float = 5.0) -> bool:
+        """Stop a live process (only the owner's when ``owner`` is given)"""
+        with self._lock:
+            entry = self._live.get(pid)
+        if not entry or (owner is not None and entry.owner != owner):
+            return False
+        entry.process.terminate()
+        try:
+            entry.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            entry.process.kill()
+        return True
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pids = list(self._live)
+        for pid in pids:
+            self.terminate(pid)
+
+
+_supervisor: Optional[ProcessSupervisor] = None
+_supervisor_lock = threading.Lock()
+
+
+def get_supervisor(config: SupervisorConfig) -> ProcessSupervisor:
+    """Process-wide supervisor shared by all sessions"""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = ProcessSupervisor(config)
+        return _supervisor
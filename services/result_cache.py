@@ -0,0 +1,207 @@
+"""
+Execution-result cache for generated scripts
+
+Running the same script twice gives the same outcome, so each run is
+recorded under the canonical script hash plus the FreeCAD version that
+ran it: status, error, timing, the objects it created with their bounding
+boxes, and any exported artifacts. A repeat of a script that succeeded is
+answered from the record without starting FreeCAD, and a script that
+failed is rejected straight away.
+
+Records are small JSON files at ``<directory>/<key[:2]>/<key>.json``; the
+oldest are pruned once there are more than ``max_entries``. Only
+deterministic outcomes ("ok" and script errors) are recorded; timeouts,
+resource limits and crashes depend on the machine and are always rerun,
+as are errors from a missing GUI or module, which only the headless
+worker or stub runs hit.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, asdict, fields
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Type, TypeVar
+
+from config.settings import ResultCacheConfig
+from services.worker_pool import WorkerResult
+from utils.script_hash import script_hash
+
+CACHEABLE_STATUSES = ("ok", "error")
+
+# Errors that depend on where the script ran rather than on the script
+ENVIRONMENT_ERRORS = re.compile(r"^(ImportError|ModuleNotFoundError)\b|\bGui(Up|Document)?\b|ActiveView|ViewObject")
+
+R = TypeVar("R", bound=WorkerResult)
+
+
+@dataclass
+class ExecutionRecord:
+    """Recorded outcome of one script under one FreeCAD version"""
+    script_hash: str
+    freecad_version: str
+    status: str
+    elapsed: float = 0.0
+    object_count: int = 0
+    objects: List[Dict[str, Any]] = field(default_factory=list)  # name, type, label, bound_box
+    artifacts: Dict[str, str] = field(default_factory=dict)  # format -> exported file
+    stdout: str = ""
+    error: Optional[str] = None
+    traceback: Optional[str] = None
+    recorded_at: float = field(default_factory=time.time)
+
+    @property
+    def success(self) -> bool:
+        return self.status == "ok"
+
+    @property
+    def bound_box(self) -> Optional[List[float]]:
+        """[xmin, ymin, zmin, xmax, ymax, zmax] around all objects"""
+        boxes = [obj["bound_box"] for obj in self.objects if obj.get("bound_box")]
+        if not boxes:
+            return None
+        return [min(box[i] for box in boxes) for i in range(3)] + [max(box[i] for box in boxes) for i in range(3, 6)]
+
+    def to_result(self, result_type: Type[R] = WorkerResult) -> R:
+        """The record as a run result, marked as served from the cache"""
+        return result_type(status=self.status, elapsed=self.elapsed, object_count=self.object_count,
+                           objects=list(self.objects), stdout=self.stdout, error=self.error,
+                           traceback=self.traceback, cached=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["bound_box"] = self.bound_box
+        return result
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> 'ExecutionRecord':
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in values.items() if k in known})
+
+
+class ExecutionResultCache:
+    """Outcomes of earlier runs, keyed by script and FreeCAD version"""
+
+    def __init__(self, config: ResultCacheConfig):
+        self.config = config
+        self.directory = Path(config.directory).resolve()
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, code: str, freecad_version: str) -> str:
+        return script_hash(code, {"freecad_version": freecad_version})
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, code: str, freecad_version: str) -> Optional[ExecutionRecord]:
+        """The recorded outcome of ``code``, or ``None`` when it has not run yet"""
+        if not self.config.enabled:
+            return None
+        path = self._path(self.key(code, freecad_version))
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = ExecutionRecord.from_dict(json.load(f))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.warning(f"Ignoring unreadable execution record {path.name}: {e}")
+            self.misses += 1
+            return None
+        if not record.success and not self.config.reject_known_failures:
+            self.misses += 1
+            return None
+        missing = [fmt for fmt, artifact in record.artifacts.items() if not os.path.isfile(artifact)]
+        for fmt in missing:
+            del record.artifacts[fmt]
+        self.hits += 1
+        return record
+
+    @staticmethod
+    def _environment_error(result: WorkerResult) -> bool:
+        """Whether a script error comes from the environment (no GUI, missing module)"""
+        if result.status != "error":
+            return False
+        # The last traceback lines name the failing statement, e.g. FreeCAD.Gui.SendMsgToActiveView
+        failing = "\n".join((result.traceback or "").strip().splitlines()[-3:])
+        return bool(ENVIRONMENT_ERRORS.search(result.error or "") or ENVIRONMENT_ERRORS.search(failing))
+
+    def record(self, code: str, freecad_version: str, result: WorkerResult) -> Optional[ExecutionRecord]:
+        """Store the outcome of a run; results that may differ on a rerun are skipped"""
+        if (not self.config.enabled or result.cached or result.status not in CACHEABLE_STATUSES
+                or self._environment_error(result)):
+            return None
+        key = self.key(code, freecad_version)
+        with self._lock:
+            previous = self._read(key)
+            record = ExecutionRecord(
+                script_hash=key, freecad_version=freecad_version, status=result.status,
+                elapsed=result.elapsed, object_count=result.object_count, objects=list(result.objects),
+                artifacts=previous.artifacts if previous and previous.success and result.success else {},
+                stdout=result.stdout, error=result.error, traceback=result.traceback)
+            self._write(record)
+        return record
+
+    def add_artifacts(self, code: str, freecad_version: str, files: Dict[str, str]) -> None:
+        """Remember exported files of a script that is already recorded"""
+        if not self.config.enabled:
+            return
+        with self._lock:
+            record = self._read(self.key(code, freecad_version))
+            if record is None or not record.success:
+                return
+            record.artifacts.update(files)
+            self._write(record)
+
+    def invalidate(self, code: str, freecad_version: str) -> None:
+        try:
+            self._path(self.key(code, freecad_version)).unlink()
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _read(self, key: str) -> Optional[ExecutionRecord]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return ExecutionRecord.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _write(self, record: ExecutionRecord) -> None:
+        path = self._path(record.script_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.partial")
+        try:
+            with open(partial, "w", encoding="utf-8") as f:
+                json.dump(asdict(record), f)
+            os.replace(partial, path)
+        except OSError as e:
+            self.logger.warning(f"Could not store execution record {record.script_hash[:12]}: {e}")
+            if partial.exists():
+                partial.unlink()
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        """Drop the oldest records beyond ``max_entries``"""
+        records = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                records.append((path.stat().st_mtime, path))
+            except OSError:
+                continue  # pruned by another process
+        records.sort()
+        for _, path in records[:max(0, len(records) - self.config.max_entries)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,142 @@
+"""
+Sandboxed execution of generated FreeCAD scripts
+
+Generated code used to be ``exec()``-ed inside the Streamlit server, where
+an endless loop or a runaway allocation stalls or kills the app for every
+user. ``ScriptSandbox`` runs each script in a one-shot child process
+instead: the headless worker from ``services/freecad_worker.py`` with a
+wall-clock timeout, RLIMIT_AS/RLIMIT_CPU limits and bounded output
+capture. Whatever the script does, the caller gets a ``SandboxResult``.
+"""
+
+import json
+import logging
+import os
+import signal
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List
+
+from config.settings import SandboxConfig, WorkerPoolConfig
+from services.worker_pool import WorkerResult, worker_command, worker_env
+from utils.exceptions import WorkerPoolError
+
+# Signals a child receives when it hits its CPU limit
+CPU_LIMIT_SIGNALS = tuple(getattr(signal, name) for name in ("SIGXCPU", "SIGKILL") if hasattr(signal, name))
+
+
+@dataclass
+class SandboxResult(WorkerResult):
+    """Outcome of a sandboxed run
+
+    ``status`` is one of ``ok``, ``error``, ``timeout``, ``cpu_limit``,
+    ``memory_limit``, ``crashed`` or ``unavailable``.
+    """
+    returncode: Optional[int] = None
+
+
+class ScriptSandbox:
+    """Run scripts in isolated, resource-limited child processes"""
+
+    def __init__(self, config: SandboxConfig, worker_config: WorkerPoolConfig,
+                 library_path: Optional[str] = None):
+        self.config = config
+        self.worker_config = worker_config
+        self.library_path = library_path
+        self.logger = logging.getLogger(__name__)
+
+    def _env(self) -> Dict[str, str]:
+        return worker_env(self.worker_config, self.library_path, self.config)
+
+    def _read_tail(self, handle) -> str:
+        """Last ``max_output_chars`` characters written to a capture file"""
+        handle.seek(0, os.SEEK_END)
+        size = handle.tell()
+        handle.seek(max(0, size - self.config.max_output_chars))
+        return handle.read().decode("utf-8", errors="replace")
+
+    def run(self, code: str, exports: Optional[List[Dict[str, str]]] = None,
+            timeout: Optional[float] = None) -> SandboxResult:
+        """Execute ``code`` in a fresh child process and wait for it"""
+        timeout = timeout or self.config.timeout
+        try:
+            command = worker_command(self.worker_config, self.library_path)
+        except WorkerPoolError as e:
+            return SandboxResult(status="unavailable", error=str(e))
+
+        requests = "".join(json.dumps(message) + "\n" for message in (
+            {"type": "run", "id": "sandbox", "code": code, "exports": exports or []},
+            {"type": "shutdown", "id": "shutdown"},
+        ))
+
+        # Output goes to files rather than pipes so a chatty script can
+        # neither block on a full pipe nor flood the server's memory
+        with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+            start = time.perf_counter()
+            try:
+                process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=stdout, stderr=stderr,
+                                           env=self._env(), start_new_session=(os.name == "posix"))
+            except OSError as e:
+                return SandboxResult(status="unavailable", error=f"Could not start {command[0]}: {e}")
+            timed_out = False
+            try:
+                process.communicate(requests.encode("utf-8"), timeout=timeout)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                self._kill(process)
+            wall_time = time.perf_counter() - start
+
+            stderr_text = self._read_tail(stderr)
+            stdout.seek(0)
+            response = self._find_response(stdout.read().decode("utf-8", errors="replace"))
+
+        if response is not None:
+            result = SandboxResult.from_response(response, process.pid)
+            result.returncode = process.returncode
+            result.stderr = (result.stderr + stderr_text) if stderr_text else result.stderr
+            if result.status == "error" and result.error and result.error.startswith("MemoryError"):
+                result.status = "memory_limit"
+                result.error = f"Script exceeded the {self.config.memory_limit_mb} MB memory limit"
+            return result
+
+        result = SandboxResult(status="crashed", elapsed=wall_time, stderr=stderr_text,
+                               returncode=process.returncode, worker_pid=process.pid)
+        if timed_out:
+            result.status = "timeout"
+            result.error = f"Script exceeded the {timeout:.0f}s time limit"
+        elif (self.config.cpu_time_limit and process.returncode is not None
+              and -process.returncode in CPU_LIMIT_SIGNALS):
+            result.status = "cpu_limit"
+            result.error = f"Script exceeded the {self.config.cpu_time_limit}s CPU limit"
+        elif "MemoryError" in stderr_text:
+            result.status = "memory_limit"
+            result.error = f"Script exceeded the {self.config.memory_limit_mb} MB memory limit"
+        else:
+            result.error = f"Script process exited with code {process.returncode}"
+        self.logger.warning(f"Sandboxed script failed: {result.error}")
+        return result
+
+    @staticmethod
+    def _find_response(output: str) -> Optional[Dict[str, Any]]:
+        for line in output.splitlines():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("type") == "result":
+                return message
+        return None
+
+    @staticmethod
+    def _kill(process: subprocess.Popen) -> None:
+        """Kill the child and anything it started"""
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+        process.wait()
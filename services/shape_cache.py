@@ -0,0 +1,285 @@
+"""
+Cross-run BRep cache for expensive shape constructions
+
+Loaded inside the headless FreeCAD worker (``services/freecad_worker.py``
+puts this directory on ``sys.path``), so regenerating a model with one
+changed room rebuilds only that room: walls with openings and boolean
+results whose inputs did not change are read back from disk.
+
+Generated scripts use it through a guarded import, which leaves them
+runnable in a plain FreeCAD where this module is absent::
+
+    try:
+        from shape_cache import memoize_shape
+    except ImportError:
+        def memoize_shape(function):
+            return function
+
+    @memoize_shape
+    def create_wall_with_openings(length, width, height, openings=None):
+        ...
+
+Entries are keyed by operation (function name, bytecode, the names it
+uses and the values of the globals it reads) plus a hash of the
+arguments (numbers, strings, vectors, lists/dicts of those, and shapes
+by their BRep) and the FreeCAD version. They are stored as BRep files
+under ``FREECAD_SHAPE_CACHE_DIR`` and evicted least recently used once
+the directory exceeds ``FREECAD_SHAPE_CACHE_MB``. A small in-memory
+layer serves repeats within one worker. Callers always receive a copy,
+so in-place ``translate`` on a result never alters the cache.
+
+Only the standard library (plus FreeCAD's ``Part``) is used.
+"""
+import collections
+import functools
+import hashlib
+import os
+import sys
+import threading
+import types
+import uuid
+
+MEMORY_ENTRIES = 64
+
+
+class Uncacheable(TypeError):
+    """An argument has no stable fingerprint"""
+
+
+def _fingerprint(value):
+    if value is None or isinstance(value, (bool, str)):
+        return repr(value)
+    if isinstance(value, (int, float)):
+        # 10 and 10.0 build the same shape
+        return repr(round(float(value), 9))
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_fingerprint(item) for item in value) + ']'
+    if isinstance(value, dict):
+        return '{' + ','.join(f"{_fingerprint(key)}:{_fingerprint(value[key])}"
+                              for key in sorted(value, key=repr)) + '}'
+    if hasattr(value, 'exportBrepToString'):
+        return 'shape:' + hashlib.sha256(value.exportBrepToString().encode('utf-8')).hexdigest()
+    if all(hasattr(value, axis) for axis in ('x', 'y', 'z')):
+        return f"vector({_fingerprint(value.x)},{_fingerprint(value.y)},{_fingerprint(value.z)})"
+    raise Uncacheable(f"Cannot fingerprint {type(value).__name__}")
+
+
+def _code_digest(code):
+    digest = hashlib.sha256(code.co_code)
+    # Global and attribute names: makeCylinder and makeCone differ only here
+    digest.update(repr(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        # Nested code objects repr with their address; hash their contents instead
+        digest.update((_code_digest(const) if hasattr(const, 'co_code') else repr(const)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _referenced_names(code):
+    """Global names used by ``code`` and the functions nested in it"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            names |= _referenced_names(const)
+    return names
+
+
+def _referenced_values(function, seen):
+    """Fingerprints of the globals and closure variables ``function`` reads
+
+    Modules and classes count by name, helper functions by their own
+    operation name; other values must have a fingerprint, otherwise the
+    call is ``Uncacheable``.
+    """
+    values = []
+    cells = zip(function.__code__.co_freevars, function.__closure__ or ())
+    referenced = [(name, function.__globals__[name]) for name in sorted(_referenced_names(function.__code__))
+                  if name in function.__globals__]
+    for name, value in [(name, cell.cell_contents) for name, cell in cells] + referenced:
+        value = getattr(value, '__wrapped__', value)  # memoized helpers
+        if isinstance(value, types.ModuleType):
+            values.append(f"{name}=module:{value.__name__}")
+        elif isinstance(value, type):
+            values.append(f"{name}=class:{value.__module__}.{value.__qualname__}")
+        elif isinstance(value, types.FunctionType):
+            if value not in seen:
+                values.append(f"{name}={operation_name(value, seen)}")
+        elif callable(value) and not hasattr(value, 'exportBrepToString'):
+            # Builtins and C functions
+            values.append(f"{name}=callable:{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', '')}")
+        else:
+            values.append(f"{name}={_fingerprint(value)}")
+    return values
+
+
+def operation_name(function, _seen=None):
+    """Function name plus a digest of its code and of the globals it reads
+
+    Edited helpers miss, and so do helpers whose module constants or
+    helper functions changed. Raises ``Uncacheable`` when the function
+    reads a global without a fingerprint.
+    """
+    seen = (_seen or set()) | {function}
+    digest = hashlib.sha256(_code_digest(function.__code__).encode('utf-8'))
+    for value in _referenced_values(function, seen):
+        digest.update(value.encode('utf-8'))
+    return f"{function.__qualname__}:{digest.hexdigest()[:16]}"
+
+
+class ShapeCache:
+    """BRep files on disk with LRU eviction, plus an in-memory layer"""
+
+    def __init__(self, directory, max_bytes, namespace=''):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._memory = collections.OrderedDict()
+        self._index = None  # key -> size, least recently used first
+        self._lock = threading.RLock()
+
+    def key(self, operation, args=(), kwargs=None):
+        text = f"{self.namespace}|{operation}|{_fingerprint(list(args))}|{_fingerprint(kwargs or {})}"
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.brep')
+
+    def _load_index(self):
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.brep') and not name.startswith('.'):
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        self._index = collections.OrderedDict((key, size) for _, key, size in sorted(entries))
+
+    def get(self, key):
+        """Copy of the cached shape, or ``None``"""
+        import Part
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key].copy()
+
+            path = self._path(key)
+            if not os.path.isfile(path):
+                return None
+            shape = Part.Shape()
+            try:
+                shape.importBrep(path)
+                os.utime(path)  # mtime is the LRU clock shared with other workers
+            except (OSError, RuntimeError, ValueError):
+                return None
+            if self._index is not None and key in self._index:
+                self._index.move_to_end(key)
+            self._remember(key, shape)
+            return shape.copy()
+
+    def put(self, key, shape):
+        with self._lock:
+            self._remember(key, shape.copy())
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Hidden from _load_index, and still ending in .brep for the writer
+            partial = os.path.join(os.path.dirname(path), f".{key}.{uuid.uuid4().hex}.partial.brep")
+            try:
+                shape.exportBrep(partial)
+                os.replace(partial, path)
+            except (OSError, RuntimeError) as e:
+                print(f"shape_cache: could not store {key[:12]}: {e}", file=sys.stderr)
+                if os.path.exists(partial):
+                    os.remove(partial)
+                return
+            if self._index is None:
+                self._load_index()
+            self._index[key] = os.path.getsize(path)
+            self._index.move_to_end(key)
+            self._evict()
+
+    def _remember(self, key, shape):
+        self._memory[key] = shape
+        self._memory.move_to_end(key)
+        while len(self._memory) > MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        total = sum(self._index.values())
+        while total > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            total -= size
+            self._memory.pop(key, None)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get_or_build(self, operation, args, kwargs, build):
+        try:
+            key = self.key(operation, args, kwargs)
+        except Uncacheable:
+            return build()
+        shape = self.get(key)
+        if shape is not None:
+            self.hits += 1
+            return shape
+        self.misses += 1
+        shape = build()
+        if hasattr(shape, 'exportBrep') and not shape.isNull():
+            self.put(key, shape)
+        return shape
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+_cache = None
+_configured = False
+
+
+def configure(directory, max_mb=512, namespace=''):
+    """Use a cache at ``directory``; ``None`` disables caching"""
+    global _cache, _configured
+    _cache = ShapeCache(directory, max_mb * 1024 * 1024, namespace) if directory else None
+    _configured = True
+    return _cache
+
+
+def get_cache():
+    """The process cache, configured from the environment on first use"""
+    if not _configured:
+        namespace = ''
+        if 'FreeCAD' in sys.modules:
+            namespace = '.'.join(str(part) for part in sys.modules['FreeCAD'].Version()[:3])
+        configure(os.environ.get('FREECAD_SHAPE_CACHE_DIR'),
+                  int(os.environ.get('FREECAD_SHAPE_CACHE_MB', 512)), namespace)
+    return _cache
+
+
+def cached_shape(operation, args, build):
+    """``build()`` memoized under ``operation`` and ``args``"""
+    cache = get_cache()
+    return cache.get_or_build(operation, args, None, build) if cache else build()
+
+
+def memoize_shape(function):
+    """Decorator caching a shape-returning function by its arguments
+
+    The operation name is taken at call time, since the globals the
+    function reads may be bound or rebound after it is decorated.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return function(*args, **kwargs)
+        try:
+            operation = operation_name(function)
+        except Uncacheable:
+            return function(*args, **kwargs)
+        return cache.get_or_build(operation, args, kwargs, lambda: function(*args, **kwargs))
+    return wrapper
@@ -0,0 +1,154 @@
+"""
+PNG thumbnails of generated models
+
+``ThumbnailService`` renders a script's model with the NumPy rasterizer
+and keeps the images at ``<directory>/<key[:2]>/<key>.png``, where
+``key`` is the canonical script hash combined with the view and size. The
+mesh comes from an exported STL when one is given, otherwise from the
+shapes of a geometry preview or a fresh run of the evaluator in a child
+process, so no FreeCAD is needed. Scripts that fail deterministically
+(they raise, or build nothing) leave an empty ``<script hash>.failed``
+marker and are not retried on every page load; timeouts and crashes are.
+
+The gallery of past generations never renders on the request path: it
+shows what is on disk and queues the rest with ``render_later`` on the
+process-wide service from ``get_thumbnail_service``.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, List
+
+from config.settings import ThumbnailConfig
+from utils.geometry_evaluator import Shape, evaluate_isolated
+from utils.rasterizer import Mesh, mesh_from_shapes, read_stl, render_png
+from utils.script_hash import script_hash
+
+
+class ThumbnailService:
+    """Render model thumbnails once and keep them on disk"""
+
+    def __init__(self, config: ThumbnailConfig):
+        self.config = config
+        self.directory = Path(config.directory).resolve()
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def path(self, code: str, view: str) -> Path:
+        key = script_hash(code, {"view": view, "size": self.config.size})
+        return self.directory / key[:2] / f"{key}.png"
+
+    def _failed_marker(self, code: str) -> Path:
+        key = script_hash(code)
+        return self.directory / key[:2] / f"{key}.failed"
+
+    def cached(self, code: str, view: Optional[str] = None) -> Optional[Path]:
+        """The PNG of ``view`` if it is already on disk; never renders"""
+        path = self.path(code, view or self.config.views[0])
+        return path if path.is_file() else None
+
+    def failed(self, code: str) -> bool:
+        """Whether ``code`` is known not to produce a thumbnail"""
+        return self._failed_marker(code).exists()
+
+    def render_later(self, code: str) -> bool:
+        """Queue rendering the missing views of ``code``; ``False`` if it is already queued"""
+        key = script_hash(code)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None and not pending.done():
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(1, self.config.render_workers),
+                                                    thread_name_prefix="thumbnails")
+            self._pending = {k: f for k, f in self._pending.items() if not f.done()}
+            self._pending[key] = self._executor.submit(self.thumbnails, code)
+            return True
+
+    def thumbnail(self, code: str, view: Optional[str] = None, shapes: Optional[Dict[str, Shape]] = None,
+                  stl_path: Optional[str] = None) -> Optional[Path]:
+        """The PNG of one view (the first configured by default), or ``None`` if it cannot be drawn"""
+        view = view or self.config.views[0]
+        return self.thumbnails(code, [view], shapes, stl_path).get(view)
+
+    def thumbnails(self, code: str, views: Optional[List[str]] = None, shapes: Optional[Dict[str, Shape]] = None,
+                   stl_path: Optional[str] = None) -> Dict[str, Path]:
+        """PNGs of ``views`` (default: the configured ones) by view name
+
+        ``shapes`` (``GeometryReport.shapes`` of this script) or an exported
+        ``stl_path`` spare evaluating the script again.
+        """
+        if not self.config.enabled:
+            return {}
+        paths = {view: self.path(code, view) for view in views or self.config.views}
+        missing = [view for view, path in paths.items() if not path.is_file()]
+        self.hits += len(paths) - len(missing)
+        if not missing:
+            return paths
+
+        self.misses += len(missing)
+        failed = self._failed_marker(code)
+        mesh = None if failed.exists() else self._mesh(code, shapes, stl_path)
+        if mesh is None or not len(mesh):
+            if mesh is not None:
+                self._write(failed, b"")
+            return {view: path for view, path in paths.items() if view not in missing}
+        for view in missing:
+            if not self._write(paths[view], render_png(mesh, view, self.config.size)):
+                del paths[view]
+        return paths
+
+    def _mesh(self, code: str, shapes: Optional[Dict[str, Shape]], stl_path: Optional[str]) -> Optional[Mesh]:
+        if stl_path:
+            try:
+                return read_stl(stl_path)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Could not read {stl_path} for a thumbnail: {e}")
+        if shapes is None:
+            report = evaluate_isolated(code, self.config.evaluation_timeout, self.config.memory_limit_mb)
+            if not report.success:
+                self.logger.info(f"No thumbnail, geometry evaluation {report.status}: {report.error}")
+                # A script that raises does so every time; a slow or starved run may not
+                if report.status == "error" and not (report.error or "").startswith("MemoryError"):
+                    self._write(self._failed_marker(code), b"")
+                return None
+            shapes = report.shapes
+        return mesh_from_shapes(shapes)
+
+    def _write(self, path: Path, data: bytes) -> bool:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.partial")
+        try:
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+            return True
+        except OSError as e:
+            self.logger.warning(f"Could not store thumbnail {path.name}: {e}")
+            if partial.exists():
+                partial.unlink()
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_services: Dict[str, ThumbnailService] = {}
+_services_lock = threading.Lock()
+
+
+def get_thumbnail_service(config: ThumbnailConfig) -> ThumbnailService:
+    """Process-wide service for a thumbnail directory, so queued renders outlive a page run"""
+    key = str(Path(config.directory).resolve())
+    with _services_lock:
+        if key not in _services:
+            _services[key] = ThumbnailService(config)
+        return _services[key]
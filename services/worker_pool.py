@@ -0,0 +1,339 @@
+"""
+Pool of long-lived headless FreeCAD workers
+
+Starting FreeCAD costs seconds per script. The pool keeps a few worker
+processes (``services/freecad_worker.py`` running under ``FreeCADCmd`` or
+a Python interpreter that can import FreeCAD) alive and sends them scripts
+over their stdin/stdout pipes using the JSON-lines protocol documented in
+that module. Each script runs in a fresh document and comes back as a
+``WorkerResult`` with status, timing, object counts and export paths.
+"""
+
+import atexit
+import importlib.util
+import json
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from itertools import count
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from config.settings import SandboxConfig, WorkerPoolConfig
+from utils.exceptions import WorkerPoolError
+
+WORKER_SCRIPT = Path(__file__).resolve().with_name("freecad_worker.py")
+REPOSITORY_ROOT = WORKER_SCRIPT.parent.parent
+
+FREECADCMD_NAMES = ("FreeCADCmd", "freecadcmd", "FreeCADCmd.exe")
+
+
+def worker_command(config: WorkerPoolConfig, library_path: Optional[str] = None) -> List[str]:
+    """Command line that starts a worker for ``config``"""
+    if config.command:
+        return list(config.command)
+    if config.use_stub:
+        return [sys.executable, str(WORKER_SCRIPT)]
+
+    freecadcmd = config.freecadcmd_path or next(
+        (found for found in map(shutil.which, FREECADCMD_NAMES) if found), None)
+    if freecadcmd and Path(freecadcmd).exists():
+        return [freecadcmd, str(WORKER_SCRIPT)]
+    if library_path or importlib.util.find_spec("FreeCAD"):
+        return [sys.executable, str(WORKER_SCRIPT)]
+    raise WorkerPoolError("No FreeCADCmd executable or FreeCAD library path configured for workers")
+
+
+def worker_env(config: WorkerPoolConfig, library_path: Optional[str] = None,
+               limits: Optional[SandboxConfig] = None) -> Dict[str, str]:
+    """Environment for a worker process (see ``services/freecad_worker.py``)
+
+    ``limits`` adds the sandbox's memory, CPU and output limits; the CPU
+    limit applies to every run separately.
+    """
+    env = dict(os.environ)
+    env["PYTHONUNBUFFERED"] = "1"
+    if config.use_stub:
+        env["FREECAD_WORKER_STUB"] = "1"
+        env["FREECAD_WORKER_ROOT"] = str(REPOSITORY_ROOT)
+    if library_path:
+        env["FREECAD_WORKER_LIB"] = library_path
+    if config.shape_cache_directory:
+        env["FREECAD_SHAPE_CACHE_DIR"] = str(Path(config.shape_cache_directory).resolve())
+        env["FREECAD_SHAPE_CACHE_MB"] = str(config.shape_cache_max_mb)
+    if limits:
+        if limits.memory_limit_mb:
+            env["FREECAD_WORKER_MEMORY_MB"] = str(limits.memory_limit_mb)
+        if limits.cpu_time_limit:
+            env["FREECAD_WORKER_CPU_SECONDS"] = str(limits.cpu_time_limit)
+        env["FREECAD_WORKER_MAX_OUTPUT"] = str(limits.max_output_chars)
+    return env
+
+
+@dataclass
+class WorkerResult:
+    """Outcome of one script run in a worker"""
+    status: str  # "ok", "error", "timeout", "cpu_limit" or "crashed"
+    elapsed: float = 0.0
+    object_count: int = 0
+    objects: List[Dict[str, Any]] = field(default_factory=list)  # name, type, label, bound_box
+    artifacts: List[str] = field(default_factory=list)
+    stdout: str = ""
+    stderr: str = ""
+    error: Optional[str] = None
+    traceback: Optional[str] = None
+    shape_cache: Dict[str, int] = field(default_factory=dict)  # BRep cache hits/misses
+    shapes: List[Dict[str, str]] = field(default_factory=list)  # only with collect_shapes
+    worker_pid: Optional[int] = None
+    cached: bool = False  # answered from the execution-result cache
+
+    @property
+    def success(self) -> bool:
+        return self.status == "ok"
+
+    @classmethod
+    def from_response(cls, response: Dict[str, Any], worker_pid: Optional[int] = None) -> 'WorkerResult':
+        known = {name for name in cls.__dataclass_fields__ if name not in ("worker_pid", "cached")}
+        return cls(worker_pid=worker_pid, **{k: v for k, v in response.items() if k in known})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class WorkerProcess:
+    """One worker subprocess and the threads reading its pipes"""
+
+    def __init__(self, command: List[str], env: Dict[str, str], startup_timeout: float):
+        self.logger = logging.getLogger(__name__)
+        self.runs = 0
+        self._ids = count(1)
+        self._responses: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._stderr_tail: deque = deque(maxlen=200)
+        self.exited = threading.Event()  # set once the worker closed its stdout
+
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            env=env, cwd=str(REPOSITORY_ROOT), text=True, encoding="utf-8", bufsize=1)
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._drain_stderr, daemon=True).start()
+
+        self.info = self._next_response(startup_timeout)
+        if not self.info or self.info.get("type") != "ready":
+            self.stop()
+            raise WorkerPoolError(f"Worker failed to start: {self.stderr_tail() or self.info}")
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_stdout(self) -> None:
+        for line in self.process.stdout:
+            try:
+                self._responses.put(json.loads(line))
+            except ValueError:
+                self.logger.debug(f"Ignoring non-protocol output from worker {self.pid}: {line.rstrip()}")
+        self.exited.set()
+        self._responses.put(None)
+
+    def _drain_stderr(self) -> None:
+        for line in self.process.stderr:
+            self._stderr_tail.append(line)
+
+    def _next_response(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            return self._responses.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stderr_tail(self) -> str:
+        return "".join(self._stderr_tail)
+
+    def request(self, message: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        """Send a request and wait for its response; ``None`` on timeout or exit"""
+        message = dict(message, id=str(next(self._ids)))
+        try:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return None
+
+        deadline = time.monotonic() + timeout
+        while True:
+            response = self._next_response(max(0.0, deadline - time.monotonic()))
+            if response is None or response.get("id") == message["id"]:
+                return response
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.alive:
+            try:
+                self.process.stdin.write(json.dumps({"type": "shutdown", "id": "shutdown"}) + "\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+        self.process.wait()
+
+
+class FreeCADWorkerPool:
+    """Fixed-size pool of headless FreeCAD workers, started on demand
+
+    With ``limits`` every worker runs under the sandbox's resource limits.
+    """
+
+    def __init__(self, config: WorkerPoolConfig, library_path: Optional[str] = None,
+                 limits: Optional[SandboxConfig] = None):
+        self.config = config
+        self.library_path = library_path
+        self.limits = limits
+        self.logger = logging.getLogger(__name__)
+        self._idle: "queue.Queue[WorkerProcess]" = queue.Queue()
+        self._workers: List[WorkerProcess] = []
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+
+    def worker_command(self) -> List[str]:
+        """Command line that starts one worker"""
+        return worker_command(self.config, self.library_path)
+
+    def _spawn(self) -> WorkerProcess:
+        worker = WorkerProcess(self.worker_command(), worker_env(self.config, self.library_path, self.limits),
+                               self.config.startup_timeout)
+        self.logger.info(f"Started FreeCAD worker {worker.pid} "
+                         f"(FreeCAD {worker.info.get('freecad_version')}, stub={worker.info.get('stub')})")
+        return worker
+
+    def _acquire(self) -> WorkerProcess:
+        while not self._closed:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            # Start another worker while the pool is below its size (this
+            # also recovers from workers that died and could not be replaced)
+            with self._lock:
+                if len(self._workers) < self.config.size:
+                    worker = self._spawn()
+                    self._workers.append(worker)
+                    return worker
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                pass
+        raise WorkerPoolError("Worker pool has been shut down")
+
+    def _release(self, worker: WorkerProcess, healthy: bool) -> None:
+        if healthy and worker.runs >= self.config.max_runs_per_worker:
+            self.logger.info(f"Recycling worker {worker.pid} after {worker.runs} runs")
+            healthy = False
+        if healthy and not self._closed:
+            self._idle.put(worker)
+            return
+
+        worker.stop()
+        with self._lock:
+            self._workers.remove(worker)
+            if self._closed:
+                return
+            try:
+                replacement = self._spawn()
+            except WorkerPoolError as e:
+                self.logger.error(f"Could not replace worker {worker.pid}: {e}")
+                return
+            self._workers.append(replacement)
+        self._idle.put(replacement)
+
+    def run(self, code: str, exports: Optional[List[Dict[str, str]]] = None,
+            timeout: Optional[float] = None, collect_shapes: bool = False) -> WorkerResult:
+        """Execute a script in the next free worker and wait for the result"""
+        timeout = timeout or self.config.run_timeout
+        worker = self._acquire()
+        worker.runs += 1
+        response = worker.request({"type": "run", "code": code, "exports": exports or [],
+                                   "collect_shapes": collect_shapes}, timeout)
+
+        if response is None:
+            if not worker.exited.is_set():
+                worker.process.kill()
+                result = WorkerResult(status="timeout", elapsed=timeout,
+                                      error=f"Script exceeded {timeout:.0f}s in worker {worker.pid}")
+            else:
+                returncode = worker.process.wait()
+                result = WorkerResult(status="crashed", error=f"Worker {worker.pid} exited with code {returncode}")
+                if (self.limits and self.limits.cpu_time_limit and hasattr(signal, "SIGXCPU")
+                        and returncode == -signal.SIGXCPU):
+                    result.status = "cpu_limit"
+                    result.error = f"Script exceeded the {self.limits.cpu_time_limit}s CPU limit"
+            result.stderr = worker.stderr_tail()
+            result.worker_pid = worker.pid
+            self.logger.warning(result.error)
+            self._release(worker, healthy=False)
+            return result
+
+        self._release(worker, healthy=True)
+        return WorkerResult.from_response(response, worker.pid)
+
+    def submit(self, code: str, exports: Optional[List[Dict[str, str]]] = None,
+               timeout: Optional[float] = None, collect_shapes: bool = False) -> Future:
+        """Queue a script and return a future resolving to its ``WorkerResult``"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.config.size,
+                                                    thread_name_prefix="freecad-worker")
+        return self._executor.submit(self.run, code, exports, timeout, collect_shapes)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Live workers with their pid, run count and FreeCAD version"""
+        with self._lock:
+            return [{"pid": worker.pid, "alive": worker.alive, "runs": worker.runs,
+                     "freecad_version": worker.info.get("freecad_version"),
+                     "stub": worker.info.get("stub")} for worker in self._workers]
+
+    def shutdown(self) -> None:
+        self._closed = True
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+    def __enter__(self) -> 'FreeCADWorkerPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+
+_pools: Dict[Any, FreeCADWorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(config: WorkerPoolConfig, library_path: Optional[str] = None,
+                    limits: Optional[SandboxConfig] = None) -> FreeCADWorkerPool:
+    """Process-wide pool for a configuration, so workers outlive a single request"""
+    key = (json.dumps(asdict(config), sort_keys=True), library_path,
+           json.dumps(asdict(limits), sort_keys=True) if limits else None)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = FreeCADWorkerPool(config, library_path, limits)
+        return _pools[key]
+
+
+@atexit.register
+def _shutdown_pools() -> None:
+    for pool in list(_pools.values()):
+        pool.shutdown()
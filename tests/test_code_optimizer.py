@@ -0,0 +1,389 @@
+"""
+Tests for the generated code optimizer
+"""
+import ast
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.code_optimizer import (
+    CutBatchingPass, FuseBatchingPass, InstancingPass, LevelOfDetailPass, LoopInvariantHoistingPass,
+    build_passes, optimize_code
+)
+from utils.level_of_detail import LEVELS_OF_DETAIL
+
+
+GEAR_SCRIPT = '''import FreeCAD
+import Part
+
+doc = FreeCAD.newDocument()
+
+# Gear body
+gear = Part.makeCylinder(10, 5)
+
+# Create teeth
+for i in range(20):
+    tooth = Part.makeBox(2, 2, 5)
+    tooth.translate(FreeCAD.Vector(i, 0, 0))
+    gear = gear.fuse(tooth)
+
+doc.addObject("Part::Feature", "Gear").Shape = gear
+'''
+
+
+class TestFuseBatching(unittest.TestCase):
+    """Test accumulate-by-fuse rewriting"""
+
+    def test_loop_is_batched(self):
+        """Fuse inside a loop becomes a single multiFuse"""
+        optimized, report = optimize_code(GEAR_SCRIPT)
+
+        self.assertEqual(report.applied["fuse_batching"], 1)
+        self.assertIn("multiFuse(_fuse_tools_1)", optimized)
+        self.assertNotIn("gear = gear.fuse(tooth)", optimized)
+        self.assertEqual(report.boolean_ops_before, 20)
+        self.assertEqual(report.boolean_ops_after, 1)
+        ast.parse(optimized)
+
+    def test_comments_are_preserved(self):
+        """Untouched statements keep their comments"""
+        optimized, _ = optimize_code(GEAR_SCRIPT)
+        self.assertIn("# Gear body", optimized)
+        self.assertIn("# Create teeth", optimized)
+
+    def test_accumulator_read_in_loop_is_left_alone(self):
+        """Loops that read the partial result are not rewritten"""
+        code = '''
+for i in range(5):
+    print(gear.Volume)
+    gear = gear.fuse(Part.makeBox(1, 1, 1))
+'''
+        optimized, report = optimize_code(code)
+        self.assertFalse(report.changed)
+        self.assertEqual(optimized, code)
+
+    def test_aliased_tool_is_copied(self):
+        """Tools that are not rebuilt per iteration are copied"""
+        code = '''
+for i in range(5):
+    tool.translate(FreeCAD.Vector(1, 0, 0))
+    gear = gear.fuse(tool)
+'''
+        optimized, report = optimize_code(code)
+        self.assertTrue(report.changed)
+        self.assertIn(".append(tool.copy())", optimized)
+
+    def test_statement_chain_is_merged(self):
+        """Consecutive fuses on the same shape are merged"""
+        code = "a = a.fuse(b)\na = a.fuse(c)\na = a.fuse(d)\n"
+        optimized, report = optimize_code(code)
+        self.assertEqual(optimized.strip(), "a = a.multiFuse([b, c, d])")
+        self.assertEqual(report.boolean_ops_after, 1)
+
+    def test_expression_chain_is_merged(self):
+        """a.fuse(b).fuse(c) becomes one multiFuse"""
+        optimized, _ = optimize_code("result = a.fuse(b).fuse(c)\n")
+        self.assertEqual(optimized.strip(), "result = a.multiFuse([b, c])")
+
+    def test_compound_strategy(self):
+        """The compound strategy avoids booleans entirely"""
+        optimized, _ = optimize_code(GEAR_SCRIPT, [FuseBatchingPass(strategy="compound")])
+        self.assertIn("Part.makeCompound([gear] + _fuse_tools_1)", optimized)
+
+    def test_invalid_code_is_returned_unchanged(self):
+        """Code with syntax errors passes through with an error"""
+        code = "for i in range(:\n"
+        optimized, report = optimize_code(code)
+        self.assertEqual(optimized, code)
+        self.assertTrue(report.errors)
+
+
+WALL_SCRIPT = '''import FreeCAD
+import Part
+
+def create_wall_with_openings(length, width, height, openings=None):
+    wall = Part.makeBox(length, width, height)
+    if openings:
+        for opening in openings:
+            opening_box = Part.makeBox(opening['width'], width + 100, opening['height'])
+            opening_box = opening_box.translate(FreeCAD.Vector(opening['x'], -50, opening['z']))
+            wall = wall.cut(opening_box)
+    return wall
+'''
+
+
+class TestCutBatching(unittest.TestCase):
+    """Test single-cut opening batching"""
+
+    def test_wall_with_openings_cuts_once(self):
+        """Openings collected in the loop are cut with one compound"""
+        optimized, report = optimize_code(WALL_SCRIPT)
+        self.assertEqual(report.applied["cut_batching"], 1)
+        self.assertIn("wall = wall.cut(Part.makeCompound(_cut_tools_1))", optimized)
+        self.assertIn("_cut_tools_1.append(opening_box)", optimized)
+
+    def test_interleaved_cuts_are_batched(self):
+        """Cuts separated by tool construction are still merged"""
+        code = '''import Part
+wall = Part.makeBox(10, 1, 3)
+door = Part.makeBox(1, 2, 2)
+wall = wall.cut(door)
+window = Part.makeBox(1, 2, 1)
+wall = wall.cut(window)
+'''
+        optimized, report = optimize_code(code, [CutBatchingPass()])
+        self.assertEqual(report.boolean_ops_after, 1)
+        self.assertIn("_cut_tools_1 = [door]", optimized)
+        self.assertIn("wall = wall.cut(Part.makeCompound(_cut_tools_1))", optimized)
+
+    def test_tool_moved_after_cut_stops_batching(self):
+        """A tool that is changed in place after its cut is not collected early"""
+        code = '''import Part
+wall = wall.cut(door)
+door.translate(v)
+wall = wall.cut(door)
+'''
+        _, report = optimize_code(code, [CutBatchingPass()])
+        self.assertFalse(report.changed)
+
+    def test_requires_part_import(self):
+        """The compound tool needs the Part module"""
+        code = "wall = wall.cut(a)\nwall = wall.cut(b)\n"
+        _, report = optimize_code(code, [CutBatchingPass()])
+        self.assertFalse(report.changed)
+
+    def test_templates_cut_once_per_wall(self):
+        """Built-in templates already batch their openings"""
+        from config.settings import Config
+        from services.ai_service import AIService
+
+        ai_service = AIService(Config().ai)
+        for code in (ai_service._create_simple_2bhk_model(), ai_service._create_school_model()):
+            _, report = optimize_code(code)
+            self.assertEqual(report.applied["cut_batching"], 0)
+
+
+DIVIDER_SCRIPT = '''import FreeCAD
+import Part
+
+doc = FreeCAD.newDocument()
+positions = [8000, 15000, 22000]
+for i, pos in enumerate(positions):
+    divider_wall = Part.makeBox(250, 12000, 3500)
+    divider_wall = divider_wall.translate(FreeCAD.Vector(pos, 250, 200))
+    divider_obj = doc.addObject("Part::Feature", f"Divider_{i+1}")
+    divider_obj.Shape = divider_wall
+    divider_obj.ViewObject.ShapeColor = (0.88, 0.85, 0.80)
+    divider_obj.Label = f"Divider {i+1}"
+'''
+
+
+class TestInstancing(unittest.TestCase):
+    """Test instancing of repeated geometry"""
+
+    def test_loop_becomes_links(self):
+        """Repeated primitives in a loop become links to one hidden base"""
+        optimized, report = optimize_code(DIVIDER_SCRIPT, [InstancingPass(mode="link")])
+        self.assertEqual(report.applied["instancing"], 1)
+        self.assertIn("_instance_base_1.Shape = Part.makeBox(250, 12000, 3500)", optimized)
+        self.assertIn("_instance_base_1.ViewObject.ShapeColor = (0.88, 0.85, 0.8)", optimized)
+        self.assertIn("doc.addObject('App::Link', f'Divider_{i + 1}')", optimized)
+        self.assertIn("divider_obj.Placement = FreeCAD.Placement(FreeCAD.Vector(pos, 250, 200), "
+                      "FreeCAD.Rotation())", optimized)
+        self.assertNotIn("divider_wall", optimized)
+
+    def test_placement_mode_shares_shape(self):
+        """Placement mode keeps features but shares one shape"""
+        optimized, _ = optimize_code(DIVIDER_SCRIPT, [InstancingPass(mode="placement")])
+        self.assertIn("_instance_shape_1 = Part.makeBox(250, 12000, 3500)", optimized)
+        self.assertIn("divider_obj.Shape = _instance_shape_1", optimized)
+        self.assertIn("divider_obj.ViewObject.ShapeColor", optimized)
+
+    def test_per_instance_colour_falls_back_to_placement(self):
+        """Links are not used when each instance has its own colour"""
+        code = DIVIDER_SCRIPT.replace("(0.88, 0.85, 0.80)", "colors[i]")
+        optimized, report = optimize_code(code, [InstancingPass(mode="link")])
+        self.assertEqual(report.applied["instancing"], 1)
+        self.assertNotIn("App::Link", optimized)
+        self.assertIn("divider_obj.Shape = _instance_shape_1", optimized)
+
+    def test_varying_size_is_not_instanced(self):
+        """Shapes whose size depends on the loop are left alone"""
+        code = DIVIDER_SCRIPT.replace("Part.makeBox(250, 12000, 3500)", "Part.makeBox(250, pos, 3500)")
+        _, report = optimize_code(code, [InstancingPass()])
+        self.assertFalse(report.changed)
+
+    def test_shape_read_after_loop_is_not_instanced(self):
+        """The last shape built by the loop stays available when used later"""
+        code = DIVIDER_SCRIPT + "print(divider_wall.Volume)\n"
+        _, report = optimize_code(code, [InstancingPass()])
+        self.assertFalse(report.changed)
+
+    def test_identical_straight_line_primitives_are_shared(self):
+        """Floor and roof slabs of the same size share one shape"""
+        code = '''import FreeCAD
+import Part
+
+doc = FreeCAD.newDocument()
+floor_slab = Part.makeBox(1000, 800, 150)
+floor_obj = doc.addObject("Part::Feature", "Floor")
+floor_obj.Shape = floor_slab
+
+# Roof
+roof_slab = Part.makeBox(1000, 800, 150)
+roof_slab = roof_slab.translate(FreeCAD.Vector(0, 0, 3000))
+roof_obj = doc.addObject("Part::Feature", "Roof")
+roof_obj.Shape = roof_slab
+'''
+        optimized, _ = optimize_code(code, [InstancingPass()])
+        self.assertEqual(optimized.count("Part.makeBox"), 1)
+        self.assertIn("roof_obj.Shape = _instance_shape_1", optimized)
+        self.assertIn("# Roof", optimized)
+
+
+class TestLoopInvariantHoisting(unittest.TestCase):
+    """Test hoisting of invariant shape construction out of loops"""
+
+    def test_moved_primitive_becomes_translated_copy(self):
+        """A primitive moved right after creation is built once"""
+        optimized, report = optimize_code(GEAR_SCRIPT, [LoopInvariantHoistingPass()])
+        self.assertEqual(report.applied["loop_invariant_hoisting"], 1)
+        self.assertIn("_hoisted_1 = Part.makeBox(2, 2, 5)\nfor i in range(20):", optimized)
+        self.assertIn("tooth = _hoisted_1.translated(FreeCAD.Vector(i, 0, 0))", optimized)
+
+    def test_read_only_shape_is_substituted(self):
+        """Shapes that are only read inside the loop need no copy"""
+        code = '''import FreeCAD
+import Part
+for i in range(12):
+    edge = Part.makeCircle(5)
+    face = Part.Face(Part.Wire(edge))
+    tooth = face.extrude(FreeCAD.Vector(0, 0, 3))
+    tooth.translate(FreeCAD.Vector(i, 0, 0))
+    gear = gear.fuse(tooth)
+'''
+        optimized, _ = optimize_code(code, [LoopInvariantHoistingPass()])
+        self.assertIn("_hoisted_2 = Part.Face(Part.Wire(_hoisted_1))", optimized)
+        self.assertIn("_hoisted_3 = _hoisted_2.extrude(FreeCAD.Vector(0, 0, 3))", optimized)
+        self.assertIn("tooth = _hoisted_3.translated(FreeCAD.Vector(i, 0, 0))", optimized)
+        self.assertNotIn("edge", optimized)
+        self.assertNotIn("face =", optimized)
+
+    def test_alias_kept_when_read_after_loop(self):
+        """The loop variable stays bound when code after the loop reads it"""
+        code = '''import Part
+for i in range(3):
+    face = Part.makePlane(2, 2)
+    total = total + face.Area
+print(face.Area)
+'''
+        optimized, _ = optimize_code(code, [LoopInvariantHoistingPass()])
+        self.assertIn("    face = _hoisted_1", optimized)
+
+    def test_mutated_shape_is_copied(self):
+        """Extrusions changed in place later in the body get a fresh copy"""
+        code = '''import FreeCAD
+import Part
+for i in range(3):
+    box = Part.makeBox(1, 1, 1)
+    box.rotate(FreeCAD.Vector(0, 0, 0), FreeCAD.Vector(0, 0, 1), i)
+    box.translate(FreeCAD.Vector(i, 0, 0))
+    parts.append(box)
+    tooth = Part.Face(Part.makePolygon(points, True)).extrude(FreeCAD.Vector(0, 0, 5))
+    tooth.rotate(FreeCAD.Vector(0, 0, 0), FreeCAD.Vector(0, 0, 1), i)
+    tooth.translate(FreeCAD.Vector(i, 0, 0))
+    parts.append(tooth)
+'''
+        optimized, report = optimize_code(code, [LoopInvariantHoistingPass()])
+        self.assertIn("_hoisted_1 = Part.Face(Part.makePolygon(points, True)).extrude(", optimized)
+        self.assertIn("tooth = _hoisted_1.copy()", optimized)
+        # Copying a primitive costs as much as building it again
+        self.assertIn("    box = Part.makeBox(1, 1, 1)", optimized)
+        self.assertEqual(report.applied["loop_invariant_hoisting"], 1)
+
+    def test_gear_teeth_extrusion_is_hoisted(self):
+        """The tooth extrusion, not only its circle, is built once"""
+        code = '''import FreeCAD
+import Part
+for i in range(num_teeth):
+    angle = 360 / num_teeth * i
+    circle = Part.makeCircle(pitch_radius + 2, FreeCAD.Vector(0, 0, 0))
+    tooth = Part.Face(Part.Wire(circle)).extrude(FreeCAD.Vector(0, 0, thickness))
+    tooth.rotate(FreeCAD.Vector(0, 0, 0), FreeCAD.Vector(0, 0, 1), angle)
+    gear = gear.fuse(tooth)
+'''
+        optimized, _ = optimize_code(code, [LoopInvariantHoistingPass()])
+        self.assertIn("_hoisted_2 = Part.Face(Part.Wire(_hoisted_1)).extrude(", optimized)
+        self.assertIn("tooth = _hoisted_2.rotated(FreeCAD.Vector(0, 0, 0)", optimized)
+        self.assertNotIn("extrude", optimized.split("for i in")[1])
+
+    def test_varying_arguments_are_not_hoisted(self):
+        """Constructors that depend on the loop variable stay in place"""
+        code = "import Part\nfor i in range(3):\n    parts.append(Part.makeBox(i, 1, 1))\n" \
+               "for i in range(3):\n    box = Part.makeBox(i + 1, 1, 1)\n    parts.append(box)\n"
+        _, report = optimize_code(code, [LoopInvariantHoistingPass()])
+        self.assertFalse(report.changed)
+
+    def test_unknown_calls_are_not_hoisted(self):
+        """Only whitelisted side-effect free constructors are moved"""
+        code = "import Part\nfor i in range(3):\n    box = make_tooth(2, 3)\n    parts.append(box)\n"
+        _, report = optimize_code(code, [LoopInvariantHoistingPass()])
+        self.assertFalse(report.changed)
+
+
+BRACKET_SCRIPT = '''import FreeCAD
+import Part
+
+doc = FreeCAD.newDocument()
+bracket = Part.makeBox(100, 50, 10)
+bracket = bracket.makeFillet(2, bracket.Edges)
+for x in (20, 80):
+    bracket = bracket.cut(Part.makeCylinder(4, 10, FreeCAD.Vector(x, 25, 0)))
+doc.addObject("Part::Feature", "Bracket").Shape = bracket
+'''
+
+
+class TestLevelOfDetail(unittest.TestCase):
+    """Test stripping of detail below professional quality"""
+
+    def test_draft_drops_fillets_and_openings(self):
+        """Draft keeps the plain mass and coarsens GUI tessellation"""
+        code = BRACKET_SCRIPT.replace("for x in", "# [detail:openings]\nfor x in").replace(
+            "doc.addObject", "# [/detail]\ndoc.addObject")
+        optimized, report = optimize_code(code, [LevelOfDetailPass(LEVELS_OF_DETAIL["draft"])])
+        self.assertNotIn("makeFillet", optimized)
+        self.assertNotIn(".cut(", optimized)
+        self.assertNotIn("bracket = bracket\n", optimized)
+        self.assertIn("ViewObject.Deviation = 2.0", optimized)
+        self.assertEqual(report.boolean_ops_after, 0)
+        ast.parse(optimized)
+
+    def test_draft_keeps_untagged_cuts(self):
+        """Bolt holes and bores are part of the mass; only tagged openings go"""
+        optimized, _ = optimize_code(BRACKET_SCRIPT, [LevelOfDetailPass(LEVELS_OF_DETAIL["draft"])])
+        self.assertNotIn("makeFillet", optimized)
+        self.assertIn("bracket.cut(Part.makeCylinder", optimized)
+        code = ("import Part\nwall = Part.makeBox(4000, 200, 3000)\n"
+                "# [detail:openings]\ndoor = Part.makeBox(900, 200, 2100)\n# [/detail]\n"
+                "wall = wall.cut(door)\nwall = wall.cut(Part.makeCylinder(50, 200))\n")
+        optimized, _ = optimize_code(code, [LevelOfDetailPass(LEVELS_OF_DETAIL["draft"])])
+        self.assertNotIn("wall.cut(door)", optimized)
+        self.assertIn("wall.cut(Part.makeCylinder(50, 200))", optimized)
+
+    def test_standard_keeps_openings(self):
+        """Standard drops fillets only, and its cuts are still batched"""
+        optimized, report = optimize_code(BRACKET_SCRIPT, build_passes(level=LEVELS_OF_DETAIL["standard"]))
+        self.assertNotIn("makeFillet", optimized)
+        self.assertEqual(report.applied["cut_batching"], 1)
+
+    def test_professional_is_untouched(self):
+        """Full detail adds no pass"""
+        passes = build_passes(level=LEVELS_OF_DETAIL["professional"])
+        self.assertFalse(any(isinstance(p, LevelOfDetailPass) for p in passes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Tests for the static execution-cost estimator
+"""
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig
+from services.freecad_service import FreeCADService
+from utils.code_optimizer import optimize_code
+from utils.cost_estimator import CostWeights, calibrate_weights, estimate_cost, order_by_cost
+
+
+GEAR_SCRIPT = '''import FreeCAD
+import Part
+
+doc = FreeCAD.newDocument()
+gear = Part.makeCylinder(10, 5)
+for i in range(20):
+    tooth = Part.makeBox(2, 2, 5)
+    tooth.translate(FreeCAD.Vector(i, 0, 0))
+    gear = gear.fuse(tooth)
+doc.addObject("Part::Feature", "Gear").Shape = gear
+doc.recompute()
+'''
+
+
+class TestCostEstimator(unittest.TestCase):
+    """Test operation counting and time prediction"""
+
+    def test_counts_operations_inside_loops(self):
+        """Operations in a loop are multiplied by its trip count"""
+        estimate = estimate_cost(GEAR_SCRIPT)
+        self.assertEqual(estimate.boolean_ops, 20)
+        self.assertEqual(estimate.primitives, 21)
+        self.assertEqual(estimate.document_objects, 1)
+        self.assertEqual(estimate.recomputes, 1)
+        self.assertEqual(estimate.loop_trips, [20])
+
+    def test_nested_loops_multiply(self):
+        """Nested loop trip counts multiply"""
+        code = "for i in range(4):\n    for j in range(5):\n        a = a.cut(b)\n"
+        estimate = estimate_cost(code)
+        self.assertEqual(estimate.boolean_ops, 20)
+        self.assertEqual(estimate.loop_trips, [4])
+
+    def test_module_constants_resolve_trip_counts(self):
+        """range() over module-level integer constants uses their values"""
+        code = "teeth = 24\nhalf = teeth // 2\nfor i in range(teeth):\n    a = a.fuse(b)\n" \
+               "for i in range(1, half + 1):\n    a = a.cut(b)\n"
+        self.assertEqual(estimate_cost(code).loop_trips, [24, 12])
+        # Rebound names are not constants
+        code = "n = 24\nn = n * 2\nfor i in range(n):\n    a = a.fuse(b)\n"
+        self.assertEqual(estimate_cost(code).loop_trips, [10])
+
+    def test_functions_are_charged_per_call(self):
+        """Helper bodies are counted once per call site"""
+        code = '''import Part
+def make_wall(length):
+    wall = Part.makeBox(length, 200, 3000)
+    return wall.cut(Part.makeBox(900, 300, 2100))
+walls = [make_wall(4000), make_wall(3000)]
+wall3 = make_wall(5000)
+'''
+        estimate = estimate_cost(code)
+        self.assertEqual(estimate.primitives, 6)
+        self.assertEqual(estimate.boolean_ops, 3)
+
+    def test_batched_script_is_cheaper(self):
+        """The optimizer's multiFuse keeps the operands but drops booleans"""
+        optimized, _ = optimize_code(GEAR_SCRIPT)
+        before, after = estimate_cost(GEAR_SCRIPT), estimate_cost(optimized)
+        self.assertEqual(after.boolean_ops, 1)
+        self.assertEqual(after.boolean_operands, 20)
+        self.assertLess(after.predicted_seconds, before.predicted_seconds)
+
+    def test_prediction_uses_weights(self):
+        """Predicted time is the weighted sum of the counts"""
+        weights = CostWeights(startup=1.0, boolean=0.5, boolean_operand=0.0, fillet=0.0,
+                              primitive=0.0, document_object=0.0, recompute=0.0)
+        self.assertAlmostEqual(estimate_cost(GEAR_SCRIPT, weights).predicted_seconds, 11.0)
+
+    def test_levels(self):
+        """Large estimates are flagged as heavy"""
+        code = "for i in range(5000):\n    a = a.fuse(b)\n"
+        self.assertEqual(estimate_cost("x = 1\n").level, "light")
+        self.assertEqual(estimate_cost(code).level, "heavy")
+
+    def test_calibration_recovers_weights(self):
+        """Least squares fits the per-boolean cost from timed samples"""
+        samples = [(f"for i in range({n}):\n    a = a.cut(b)\n", 1.0 + 0.2 * n) for n in (1, 5, 10, 40)]
+        weights = calibrate_weights(samples)
+        self.assertAlmostEqual(weights.startup, 1.0, places=6)
+        self.assertAlmostEqual(weights.boolean + weights.boolean_operand, 0.2, places=6)
+
+    def test_order_by_cost(self):
+        """Jobs are ordered cheapest first, unparsable ones last"""
+        heavy = "for i in range(100):\n    a = a.fuse(b)\n"
+        jobs = [("heavy", heavy), ("broken", "for i in (:\n"), ("light", "a = 1\n")]
+        ordered = order_by_cost(jobs, code_of=lambda job: job[1])
+        self.assertEqual([name for name, _ in ordered], ["light", "heavy", "broken"])
+
+    def test_service_analysis_includes_cost(self):
+        """analyze_generated_code reports the estimate and the warning flag"""
+        service = FreeCADService(FreeCADConfig(cost_warning_seconds=1.0, cost_weights={"boolean": 1.0}))
+        analysis = service.analyze_generated_code(GEAR_SCRIPT)
+        self.assertEqual(analysis["cost"]["boolean_ops"], 20)
+        self.assertTrue(analysis["cost"]["exceeds_warning"])
+        self.assertEqual(service.last_cost_estimate.boolean_ops, 20)
+
+    def test_auto_draft_reuses_the_generated_script(self):
+        """Expensive scripts drop to draft detail without asking the model again"""
+        class Model:
+            calls = 0
+
+            def generate_freecad_code(self, **kwargs):
+                self.calls += 1
+                return "wall = Part.makeBox(4000, 200, 3000)\n" \
+                       "for i in range(40):\n    wall = wall.fuse(Part.makeBox(10, 10, 10))\n" \
+                       "# [detail:openings]\nwall = wall.cut(Part.makeBox(900, 300, 2100))\n# [/detail]\n"
+
+        model = Model()
+        service = FreeCADService(FreeCADConfig(auto_draft_seconds=0.5, optimize_generated_code=False,
+                                               geometry_preview=False))
+        code = service.generate_model("a wall", quality_level="standard", ai_service=model)
+        self.assertEqual(model.calls, 1)
+        self.assertNotIn(".cut(", code)
+        self.assertIn("wall.fuse", code)
+
+
+if __name__ == "__main__":
+    unittest.main()
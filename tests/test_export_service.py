@@ -0,0 +1,131 @@
+"""
+Tests for content-addressed model exports and canonical script hashing
+"""
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import ExportConfig, FreeCADConfig, ResultCacheConfig, SandboxConfig, WorkerPoolConfig
+from services.export_service import ExportService
+from services.freecad_service import FreeCADService
+from services.worker_pool import WorkerResult
+from utils import freecad_stub
+from utils.script_hash import script_hash
+
+
+MODEL_SCRIPT = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Model")
+doc.addObject("Part::Feature", "Box").Shape = Part.makeBox(10, 10, 10)
+'''
+
+
+class TestScriptHash(unittest.TestCase):
+    def test_layout_and_comments_are_ignored(self):
+        variant = '"""Generated model"""\n# comment\n\n' + MODEL_SCRIPT.replace('"Model"', "'Model'")
+        self.assertEqual(script_hash(MODEL_SCRIPT), script_hash(variant))
+
+    def test_code_and_options_change_the_hash(self):
+        self.assertNotEqual(script_hash(MODEL_SCRIPT), script_hash(MODEL_SCRIPT.replace("10, 10", "10, 20")))
+        self.assertNotEqual(script_hash(MODEL_SCRIPT, {"format": "stl"}), script_hash(MODEL_SCRIPT))
+
+    def test_unparsable_scripts_hash_by_text(self):
+        self.assertEqual(script_hash("def broken(:\n"), script_hash("def broken(:   \n\n"))
+
+
+class _RecordingRunner:
+    """Writes every requested export and remembers the requests"""
+
+    def __init__(self, status="ok"):
+        self.status = status
+        self.calls = []
+
+    def __call__(self, code, exports):
+        self.calls.append([export["format"] for export in exports])
+        self.paths = [export["path"] for export in exports]
+        if self.status == "ok":
+            for export in exports:
+                with open(export["path"], "w") as f:
+                    f.write(f"{export['format']} {export.get('linear_tolerance')}\n")
+        return WorkerResult(status=self.status, elapsed=0.5,
+                            error=None if self.status == "ok" else "NameError: x")
+
+
+class TestExportService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.runner = _RecordingRunner()
+        self.service = ExportService(ExportConfig(cache_directory=self.directory.name), self.runner)
+
+    def test_repeat_export_is_served_from_disk(self):
+        first = self.service.export(MODEL_SCRIPT)
+        second = self.service.export("# same model\n" + MODEL_SCRIPT)
+        self.assertEqual(len(self.runner.calls), 1)
+        self.assertEqual(first.cached, [])
+        self.assertEqual(sorted(second.cached), ["brep", "step", "stl"])
+        self.assertEqual(first.files, second.files)
+        for path in second.files.values():
+            self.assertTrue(os.path.isfile(path))
+
+    def test_only_missing_formats_are_exported(self):
+        self.service.export(MODEL_SCRIPT, ["step"])
+        self.service.export(MODEL_SCRIPT, ["step", "stl"])
+        self.assertEqual(self.runner.calls, [["step"], ["stl"]])
+
+    def test_tolerance_is_part_of_the_key(self):
+        coarse = self.service.export(MODEL_SCRIPT, ["stl"], linear_tolerance=1.0)
+        fine = self.service.export(MODEL_SCRIPT, ["stl"], linear_tolerance=0.01)
+        self.assertNotEqual(coarse.files["stl"], fine.files["stl"])
+        self.assertEqual(len(self.runner.calls), 2)
+
+    def test_failed_run_leaves_no_artifacts(self):
+        service = ExportService(ExportConfig(cache_directory=self.directory.name), _RecordingRunner("error"))
+        result = service.export(MODEL_SCRIPT)
+        self.assertFalse(result.success)
+        self.assertEqual(result.error, "NameError: x")
+        self.assertEqual([name for _, _, names in os.walk(self.directory.name) for name in names], [])
+
+    def test_staging_files_keep_the_extension(self):
+        self.service.export(MODEL_SCRIPT, ["step", "fcstd"])
+        self.assertEqual(sorted(os.path.splitext(path)[1] for path in self.runner.paths), [".FCStd", ".step"])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.service.export(MODEL_SCRIPT, ["obj"])
+
+
+class TestStubExport(unittest.TestCase):
+    """End to end through the sandboxed stub worker"""
+
+    def test_binary_stl_and_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config = FreeCADConfig(export=ExportConfig(cache_directory=directory),
+                                   result_cache=ResultCacheConfig(directory=os.path.join(directory, "results")),
+                                   sandbox=SandboxConfig(timeout=30),
+                                   worker_pool=WorkerPoolConfig(use_stub=True))
+            service = FreeCADService(config)
+            result = service.export_model(MODEL_SCRIPT)
+            self.assertTrue(result.success, result.error)
+            with open(result.files["stl"], "rb") as f:
+                header = f.read(84)
+            # The stub tessellates every shape into a tetrahedron
+            self.assertEqual(struct.unpack("<I", header[80:84])[0], 4)
+            self.assertEqual(sorted(service.export_model(MODEL_SCRIPT).cached), ["brep", "step", "stl"])
+
+    def test_stub_rejects_unknown_extensions(self):
+        """Like FreeCAD, the stub picks the writer from the extension"""
+        with tempfile.TemporaryDirectory() as directory:
+            part = freecad_stub._make_part_module()
+            with self.assertRaises(ValueError):
+                part.export([], os.path.join(directory, "model.step.partial"))
+            part.export([], os.path.join(directory, "model.partial.step"))
+
+
+if __name__ == "__main__":
+    unittest.main()
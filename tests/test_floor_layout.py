@@ -0,0 +1,121 @@
+"""
+Tests for the nBHK layout solver and its routing in the AI service
+"""
+import os
+import sys
+import time
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import AIConfig
+from services.ai_service import AIService
+from utils.exceptions import LayoutError
+from utils.floor_layout import (FEET, LayoutRequest, layout_scene, parse_layout_command, solve_layout)
+from utils.floor_plan import plan_from_report
+from utils.geometry_evaluator import evaluate_script
+from utils.interference import check_scene
+from utils.scene_compiler import compile_scene
+from utils.scene_graph import parse_scene
+
+
+def overlap(a, b):
+    ax0, ay0, ax1, ay1 = a.bounds
+    bx0, by0, bx1, by1 = b.bounds
+    return min(ax1, bx1) > max(ax0, bx0) and min(ay1, by1) > max(ay0, by0)
+
+
+class TestParseLayoutCommand(unittest.TestCase):
+    def test_room_program(self):
+        request = parse_layout_command("Design a 3BHK house with a study and 2 bathrooms")
+        self.assertEqual((request.bedrooms, request.bathrooms, request.extras), (3, 2, ["study"]))
+        self.assertEqual(parse_layout_command("four bedroom villa").bedrooms, 4)
+        self.assertTrue(parse_layout_command("2 bhk apartment").default)
+        self.assertIsNone(parse_layout_command("a 20 mm cube"))
+
+    def test_plot_units(self):
+        feet = parse_layout_command("3bhk on a 30x40 plot")
+        self.assertAlmostEqual(feet.plot_length, 30 * FEET)
+        metres = parse_layout_command("house on a 12 x 15 m plot")
+        self.assertEqual((metres.bedrooms, metres.plot_length, metres.plot_width), (2, 12000, 15000))
+        self.assertFalse(metres.default)
+
+
+class TestSolveLayout(unittest.TestCase):
+    def test_rooms_tile_the_plot_and_every_room_has_a_door(self):
+        for bedrooms in range(1, 7):
+            for extras in ([], ["study", "store"]):
+                layout = solve_layout(LayoutRequest(bedrooms=bedrooms, extras=extras))
+                inside = (layout.plot_length - 200) * (layout.plot_width - 200) / 1e6
+                self.assertAlmostEqual(sum(room.area for room in layout.rooms), inside)
+                for index, room in enumerate(layout.rooms):
+                    self.assertGreaterEqual(room.area, room.min_area)
+                    self.assertFalse(any(overlap(room, other) for other in layout.rooms[index + 1:]))
+                entered = {name for opening in layout.openings if opening.kind == "door" for name in opening.rooms}
+                self.assertEqual(entered, {room.name for room in layout.rooms})
+                self.assertEqual(sum(room.kind.endswith("bedroom") for room in layout.rooms), bedrooms)
+
+    def test_private_rooms_open_off_circulation(self):
+        for bedrooms in range(1, 7):
+            for extras in ([], ["study", "store"]):
+                layout = solve_layout(LayoutRequest(bedrooms=bedrooms, extras=extras))
+                kinds = {room.name: room.kind for room in layout.rooms}
+                through = {"living", "dining", "kitchen", "hall"}
+                for opening in layout.openings:
+                    if opening.kind != "door" or len(opening.rooms) < 2:
+                        continue
+                    pair = [kinds[name] for name in opening.rooms]
+                    if set(pair) & through:
+                        continue
+                    # Two private rooms: only a bathroom or store off a bedroom (or the store off the study)
+                    host, service = pair
+                    self.assertIn(service, ("bathroom", "store"), opening.rooms)
+                    self.assertTrue(host.endswith("bedroom") or (host, service) == ("study", "store"), opening.rooms)
+                self.assertFalse(any("has no door" in warning for warning in layout.warnings), layout.warnings)
+
+    def test_plot_size_is_kept(self):
+        layout = solve_layout(parse_layout_command("3bhk with study on a 40x60 ft plot"))
+        self.assertEqual((layout.plot_length, layout.plot_width), (12200, 18300))
+        self.assertIn("Study", [room.name for room in layout.rooms])
+
+    def test_errors(self):
+        with self.assertRaises(LayoutError):
+            solve_layout(LayoutRequest(bedrooms=7))
+        with self.assertRaises(LayoutError):
+            solve_layout(LayoutRequest(bedrooms=4, plot_length=6000, plot_width=6000))
+
+    def test_scene_compiles_without_interference(self):
+        scene = layout_scene(solve_layout(LayoutRequest(bedrooms=3)))
+        self.assertEqual(scene.name, "3BHK_House")
+        interference = check_scene(scene)
+        self.assertTrue(interference.clean, interference.issues())
+        report = evaluate_script(compile_scene(scene))
+        self.assertTrue(report.success, report.error)
+        labels = [region.label for region in plan_from_report(report).labelled()]
+        self.assertTrue(any(label.startswith("Master Bedroom (") for label in labels))
+
+    def test_labels_round_trip(self):
+        scene = layout_scene(solve_layout(LayoutRequest(bedrooms=1)))
+        data = scene.to_dict()
+        self.assertEqual(parse_scene(data).to_dict(), data)
+        self.assertIn("Label = 'Floor'", compile_scene(scene))
+
+
+class TestAIServiceRouting(unittest.TestCase):
+    def test_solver_needs_no_client(self):
+        service = AIService(AIConfig())
+        start = time.perf_counter()
+        code = service.generate_freecad_code("4BHK house with dining")
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn("Bedroom_4", code)
+        # Plain 2BHK requests keep the template; without a client nothing else is generated
+        self.assertIsNone(service._create_solved_layout("2bhk apartment", "professional"))
+        self.assertIsNone(service.generate_freecad_code("school with 8bhk staff housing"))
+
+        service.config.layout_solver = False
+        self.assertIsNone(service.generate_freecad_code("4BHK house with dining"))
+
+
+if __name__ == "__main__":
+    unittest.main()
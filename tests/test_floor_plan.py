@@ -0,0 +1,202 @@
+"""
+Tests for 2D floor plans (section, footprints, SVG and DXF writers) and the plan service
+"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig, PlanConfig, ResultCacheConfig
+from services.ai_service import AIService
+from services.freecad_service import FreeCADService
+from services.plan_service import PlanService
+from utils.floor_plan import mask_outline, mask_rectangles, plan_from_report, write_dxf, write_svg
+from utils.geometry_evaluator import evaluate_script
+from utils.scene_compiler import compile_scene
+from utils.scene_graph import parse_scene
+
+ROOM = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Room")
+wall = Part.makeBox(4000, 200, 3000)
+door = Part.makeBox(900, 400, 2100).translate(FreeCAD.Vector(500, -100, 0))
+window = Part.makeBox(1200, 400, 1200).translate(FreeCAD.Vector(2500, -100, 1000))
+obj = doc.addObject("Part::Feature", "Wall")
+obj.Shape = wall.cut(Part.makeCompound([door, window]))
+floor = doc.addObject("Part::Feature", "Bedroom")
+floor.Shape = Part.makeBox(1800, 3000, 50).translate(FreeCAD.Vector(0, 200, 0))
+floor.Label = "Bedroom & Study"
+floor.ViewObject.ShapeColor = (0.9, 0.7, 0.7)
+roof = doc.addObject("Part::Feature", "Roof")
+roof.Shape = Part.makeBox(4000, 3200, 200).translate(FreeCAD.Vector(0, 0, 3000))
+'''
+
+
+def dxf_entities(path):
+    """(type, {group code: [values]}) of every entity in an ASCII DXF file"""
+    with open(path, encoding="cp1252") as f:
+        lines = f.read().splitlines()
+    pairs = list(zip(lines[::2], lines[1::2]))
+    start = pairs.index(("2", "ENTITIES"))
+    entities = []
+    for code, value in pairs[start + 1:]:
+        if code == "0":
+            if value == "ENDSEC":
+                break
+            entities.append((value, {}))
+        else:
+            entities[-1][1].setdefault(code, []).append(value)
+    return pairs, entities
+
+
+class TestMasks(unittest.TestCase):
+    def setUp(self):
+        # An L of three cells on a non-uniform grid
+        self.xs, self.ys = np.array([0.0, 1.0, 3.0]), np.array([0.0, 2.0, 5.0])
+        self.mask = np.array([[True, True], [True, False]])
+
+    def test_rectangles_cover_the_cells(self):
+        rectangles = mask_rectangles(self.xs, self.ys, self.mask)
+        area = np.sum((rectangles[:, 2] - rectangles[:, 0]) * (rectangles[:, 3] - rectangles[:, 1]))
+        self.assertEqual(area, 1 * 5 + 2 * 2)
+        self.assertEqual(len(rectangles), 2)
+        # Equal runs in neighbouring columns join
+        self.assertEqual(mask_rectangles(self.xs, self.ys, np.ones((2, 2), bool)).tolist(), [[0, 0, 3, 5]])
+
+    def test_outline_is_the_perimeter_in_straight_segments(self):
+        outline = mask_outline(self.xs, self.ys, self.mask)
+        self.assertEqual(len(outline), 6)
+        self.assertAlmostEqual(float(np.linalg.norm(outline[:, 1] - outline[:, 0], axis=1).sum()), 16.0)
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        self.plan = plan_from_report(evaluate_script(ROOM), name="Room")
+        self.regions = {(region.name, region.kind): region for region in self.plan.regions}
+
+    def test_section_and_footprints(self):
+        self.assertEqual(set(self.regions), {("Wall", "cut"), ("Wall", "below"), ("Bedroom", "below")})
+        # The door and the window are gaps in the cut wall, the wall under the window sill is seen below
+        wall = self.regions["Wall", "cut"].rectangles
+        self.assertEqual(sorted(wall[:, 0].tolist()), [0, 1400, 3700])
+        self.assertEqual(self.regions["Wall", "below"].rectangles.tolist(), [[2500, 0, 3700, 200]])
+        self.assertEqual(self.plan.bounds, (0, 0, 4000, 3200))
+        self.assertEqual([region.label for region in self.plan.labelled()], ["Bedroom & Study"])
+        self.assertEqual(self.regions["Bedroom", "below"].color, (0.9, 0.7, 0.7))
+
+    def test_cut_plane_moves_into_low_models(self):
+        cube = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Cube")
+doc.addObject("Part::Feature", "Cube").Shape = Part.makeBox(100, 100, 100)
+'''
+        plan = plan_from_report(evaluate_script(cube))
+        self.assertEqual(plan.cut_height, 50)
+        self.assertEqual([region.kind for region in plan.regions], ["cut"])
+
+    def test_scene_graph_plan(self):
+        scene = parse_scene({"objects": [
+            {"type": "difference", "name": "Wall", "children": [
+                {"type": "box", "length": 5000, "width": 200, "height": 3000},
+                {"type": "box", "length": 1000, "width": 400, "height": 2100, "translate": [2000, -100, 0]}]},
+            {"type": "box", "name": "Slab", "length": 5000, "width": 4000, "height": 100, "translate": [0, 0, 3000]}]})
+        plan = plan_from_report(evaluate_script(compile_scene(scene)))
+        self.assertEqual([(region.name, region.kind) for region in plan.regions], [("Wall", "cut")])
+        self.assertEqual(len(plan.regions[0].rectangles), 2)
+
+
+class TestWriters(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.plan = plan_from_report(evaluate_script(AIService._create_simple_2bhk_model(None)))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_svg(self):
+        path = os.path.join(self.directory.name, "plan.svg")
+        self.assertEqual(write_svg(self.plan, path, scale=100), len(self.plan.regions))
+        root = ET.parse(path).getroot()
+        namespace = "{http://www.w3.org/2000/svg}"
+        # 12.4 m with a 4% margin on both sides at 1:100
+        self.assertEqual(root.get("width"), "133.92mm")
+        groups = root.findall(f"{namespace}g")
+        self.assertEqual(len({group.get("id") for group in groups}), len(self.plan.regions))
+        self.assertEqual([text.text for text in root.findall(f"{namespace}text")],
+                         [region.label for region in self.plan.labelled()])
+        self.assertIn("Kitchen (6.25 sq.m)", [text.text for text in root.findall(f"{namespace}text")])
+
+    def test_dxf(self):
+        path = os.path.join(self.directory.name, "plan.dxf")
+        count = write_dxf(self.plan, path)
+        pairs, entities = dxf_entities(path)
+        self.assertIn(("1", "AC1009"), pairs)
+        self.assertEqual(pairs[-1], ("0", "EOF"))
+        self.assertEqual(len(entities), count)
+        kinds = [kind for kind, _ in entities]
+        self.assertEqual(kinds.count("LINE"), self.plan.counts()["segments"])
+        self.assertEqual(kinds.count("SOLID"), sum(len(region.rectangles) for region in self.plan.regions
+                                                   if region.kind == "cut"))
+        self.assertEqual(kinds.count("TEXT"), 5)
+        layers = {groups["8"][0] for _, groups in entities}
+        self.assertEqual(layers, {"PLAN_CUT", "PLAN_POCHE", "PLAN_BELOW", "PLAN_TEXT"})
+        xs = [float(x) for kind, groups in entities if kind == "LINE" for x in groups["10"] + groups["11"]]
+        self.assertEqual((min(xs), max(xs)), (-200, 12200))
+
+
+class TestPlanService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = PlanConfig(directory=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_export_is_fast_and_cached(self):
+        service = PlanService(self.config)
+        code = AIService._create_school_model(None)
+        start = time.perf_counter()
+        first = service.export(code)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertTrue(first.success, first.error)
+        self.assertEqual(sorted(first.files), ["dxf", "svg"])
+        self.assertTrue(all(os.path.isfile(path) for path in first.files.values()))
+        second = service.export(code)
+        self.assertEqual(second.files, first.files)
+        self.assertEqual(sorted(second.cached), ["dxf", "svg"])
+        self.assertIsNone(second.plan)
+
+        # Another cut height is another drawing
+        self.config.cut_height = 300
+        self.assertNotEqual(service.export(code, ["svg"]).files["svg"], first.files["svg"])
+
+    def test_failures(self):
+        service = PlanService(self.config)
+        self.assertEqual(service.export("raise ValueError('boom')").status, "error")
+        self.config.memory_limit_mb = 512
+        self.assertIn("MemoryError", service.export("x = bytearray(2 * 1024 ** 3)\n").error)
+        empty = 'import FreeCAD\ndoc = FreeCAD.newDocument("Empty")\n'
+        self.assertEqual(service.export(empty).status, "empty")
+        with self.assertRaises(ValueError):
+            service.export(empty, ["pdf"])
+        self.config.enabled = False
+        self.assertEqual(service.export(ROOM).status, "disabled")
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_freecad_service_reuses_the_geometry_preview(self):
+        service = FreeCADService(FreeCADConfig(result_cache=ResultCacheConfig(enabled=False), plans=self.config))
+        report = service.preview_geometry(ROOM)
+        result = service.export_plan(ROOM, ["dxf"], report=report)
+        self.assertTrue(result.success, result.error)
+        self.assertEqual(len(result.plan.regions), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Tests for the cached FreeCAD discovery using a fake installation
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig
+from services.freecad_discovery import FreeCADDiscovery
+
+
+class TestFreeCADDiscovery(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.install = os.path.join(self.directory.name, "FreeCAD 0.21", "bin")
+        os.makedirs(self.install)
+        self.executable = os.path.join(self.install, "FreeCAD")
+        with open(self.executable, "w") as f:
+            f.write("#!/bin/sh\n")
+        with open(os.path.join(self.install, "FreeCAD.so"), "w") as f:
+            f.write("")
+        self.cache_file = os.path.join(self.directory.name, "discovery.json")
+        self.config = FreeCADConfig(installation_path=self.install, alternative_paths=[],
+                                    discovery_cache_file=self.cache_file)
+
+    def discovery(self, config=None):
+        discovery = FreeCADDiscovery(config or self.config)
+        discovery.candidate_executables = lambda: [self.executable]
+        return discovery
+
+    def test_first_resolve_writes_cache(self):
+        installation = self.discovery().resolve()
+        self.assertEqual(installation.executable, self.executable)
+        self.assertEqual(installation.module_path, self.install)
+        self.assertEqual(installation.version, "0.21")
+        with open(self.cache_file) as f:
+            record = json.load(f)
+        self.assertEqual(record["installation"]["executable"], self.executable)
+        self.assertEqual(record["configured_path"], self.install)
+
+    def test_cached_resolve_does_not_scan(self):
+        self.discovery().resolve()
+        discovery = self.discovery()
+        with mock.patch.object(discovery, "_find_executable") as scan:
+            installation = discovery.resolve()
+            discovery.resolve()
+        scan.assert_not_called()
+        self.assertEqual(installation.executable, self.executable)
+
+    def test_changed_executable_is_rediscovered(self):
+        first = self.discovery().resolve()
+        with open(self.executable, "a") as f:
+            f.write("# upgraded\n")
+        discovery = self.discovery()
+        with mock.patch.object(discovery, "_find_executable", wraps=discovery._find_executable) as scan:
+            second = discovery.resolve()
+        scan.assert_called_once()
+        self.assertNotEqual(first.size, second.size)
+
+    def test_changed_configured_path_ignores_cache(self):
+        self.discovery().resolve()
+        config = FreeCADConfig(installation_path=self.directory.name, alternative_paths=[],
+                               discovery_cache_file=self.cache_file)
+        discovery = self.discovery(config)
+        with mock.patch.object(discovery, "_find_executable", wraps=discovery._find_executable) as scan:
+            discovery.resolve()
+        scan.assert_called_once()
+
+    def test_missing_installation_is_not_rescanned_immediately(self):
+        discovery = self.discovery()
+        os.remove(self.executable)
+        with mock.patch.object(discovery, "_find_executable", return_value=None) as scan:
+            self.assertIsNone(discovery.resolve())
+            self.assertIsNone(discovery.resolve())
+        scan.assert_called_once()
+        self.assertFalse(os.path.exists(self.cache_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests for the involute gear generator and its routing in the AI service
+"""
+import math
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import AIConfig
+from services.ai_service import AIService
+from utils.gear_generator import GearSpec, gear_outline, gear_script, parse_gear_command
+from utils.geometry_evaluator import evaluate_script
+
+
+def polygon_area(points: np.ndarray) -> float:
+    x, y = points.T
+    return float(x @ np.roll(y, -1) - y @ np.roll(x, -1)) / 2
+
+
+class TestGearOutline(unittest.TestCase):
+    def test_teeth_span_root_to_tip(self):
+        spec = GearSpec(teeth=24, module=2.0)
+        outline = gear_outline(spec, flank_points=10)
+        radii = np.hypot(*outline.T)
+        self.assertAlmostEqual(radii.min(), spec.root_diameter / 2)
+        self.assertAlmostEqual(radii.max(), spec.outer_diameter / 2, places=6)
+        # Counter-clockwise, between the root and tip discs, with no repeated points
+        area = polygon_area(outline)
+        self.assertGreater(area, math.pi * (spec.root_diameter / 2) ** 2)
+        self.assertLess(area, math.pi * (spec.outer_diameter / 2) ** 2)
+        self.assertGreater(np.linalg.norm(np.diff(outline, axis=0), axis=1).min(), 1e-3)
+        # Every tooth is the first one rotated by the pitch angle
+        per_tooth = len(outline) // spec.teeth
+        turn = 2 * math.pi / spec.teeth * 5
+        rotation = np.array([[math.cos(turn), -math.sin(turn)], [math.sin(turn), math.cos(turn)]])
+        np.testing.assert_allclose(outline[:per_tooth] @ rotation.T, outline[5 * per_tooth:6 * per_tooth],
+                                   atol=1e-9)
+
+    def test_tooth_thickness_on_the_pitch_circle(self):
+        spec = GearSpec(teeth=30, module=3.0, pressure_angle=25.0)
+        outline = gear_outline(spec, flank_points=200)
+        radii, angles = np.hypot(*outline.T), np.arctan2(outline[:, 1], outline[:, 0])
+        pitch_radius = spec.pitch_diameter / 2
+        tooth = len(outline) // spec.teeth
+        rising = np.interp(pitch_radius, radii[1:tooth // 2], angles[1:tooth // 2])
+        # Half the circular pitch, as an arc
+        self.assertAlmostEqual(-2 * rising * pitch_radius, math.pi * spec.module / 2, places=3)
+
+    def test_root_outside_the_base_circle(self):
+        spec = GearSpec(teeth=80, module=1.0)
+        self.assertGreater(spec.root_diameter, spec.base_diameter)
+        self.assertEqual(len(gear_outline(spec, flank_points=6)), 80 * 12)
+
+    def test_invalid_gears(self):
+        for spec in (GearSpec(teeth=4), GearSpec(module=0), GearSpec(pressure_angle=45),
+                     GearSpec(teeth=12, module=1.0, bore=20)):
+            with self.assertRaises(ValueError):
+                gear_outline(spec)
+
+
+class TestGearScript(unittest.TestCase):
+    def test_script_is_one_extrusion(self):
+        spec = GearSpec(teeth=20, module=2.0, face_width=12.0, bore=8.0)
+        start = time.perf_counter()
+        code = gear_script(spec)
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(code.count("makePolygon"), 1)
+        self.assertEqual(code.count(".extrude("), 1)
+        self.assertEqual(code.count(".cut("), 1)
+        self.assertNotIn("fuse", code)
+
+        report = evaluate_script(code)
+        self.assertTrue(report.success, report.error)
+        self.assertEqual(report.unsupported, [])
+        gear = report.objects[0]
+        self.assertEqual(gear["name"], "Gear")
+        self.assertAlmostEqual(gear["bound_box"][5], 12.0)
+        # The tips are flat, so the bounding box stays just inside the tip circle
+        self.assertAlmostEqual(gear["bound_box"][3], spec.outer_diameter / 2, delta=0.05)
+        area = polygon_area(gear_outline(spec)) - math.pi * 4.0 ** 2
+        self.assertAlmostEqual(gear["volume"] / (area * 12.0), 1.0, delta=0.05)
+
+
+class TestParseGearCommand(unittest.TestCase):
+    def test_parameters(self):
+        spec = parse_gear_command("Spur gear with 24 teeth, module 2.5, 8 mm bore and face width 15")
+        self.assertEqual((spec.teeth, spec.module, spec.bore, spec.face_width), (24, 2.5, 8.0, 15.0))
+        spec = parse_gear_command("gear 30 teeth 12 dp 14.5 degree pressure angle")
+        self.assertAlmostEqual(spec.module, 25.4 / 12)
+        self.assertEqual(spec.pressure_angle, 14.5)
+        self.assertAlmostEqual(parse_gear_command("pinion with circular pitch 6.2832 mm").module, 2.0, places=4)
+
+    def test_defaults_and_other_commands(self):
+        spec = parse_gear_command("Make a mechanical gear")
+        self.assertEqual((spec.teeth, spec.module, spec.pressure_angle), (20, 2.0, 20.0))
+        self.assertGreater(spec.bore, 0)
+        self.assertIsNone(parse_gear_command("design a gearbox housing"))
+        self.assertIsNone(parse_gear_command("a 20 mm cube"))
+
+
+class TestAIServiceRouting(unittest.TestCase):
+    def test_gear_needs_no_client(self):
+        service = AIService(AIConfig())
+        code = service.generate_freecad_code("make a mechanical gear")
+        self.assertIn("Part.Face(profile).extrude", code)
+        draft = service.generate_freecad_code("make a mechanical gear", quality_level="draft")
+        self.assertLess(len(draft), len(code))
+        # Parameters the generator rejects go on to the model, and there is none here
+        self.assertIsNone(service.generate_freecad_code("gear with 3 teeth"))
+        service.config.parts_library = False
+        self.assertIsNone(service.generate_freecad_code("make a mechanical gear"))
+
+
+if __name__ == "__main__":
+    unittest.main()
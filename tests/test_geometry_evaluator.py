@@ -0,0 +1,190 @@
+"""
+Tests for the in-process NumPy geometry evaluator
+"""
+import math
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig, ResultCacheConfig
+from services.ai_service import AIService
+from services.freecad_service import FreeCADService
+from utils.geometry_evaluator import evaluate_isolated, evaluate_script
+
+HEADER = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Test")
+'''
+
+
+def evaluate(body: str, **kwargs):
+    return evaluate_script(HEADER + body, **kwargs)
+
+
+class TestShapes(unittest.TestCase):
+    def test_box_with_hole_is_exact(self):
+        report = evaluate('''
+slab = Part.makeBox(10, 10, 10).cut(Part.makeBox(2, 2, 20, FreeCAD.Vector(4, 4, -5)))
+obj = doc.addObject("Part::Feature", "Slab")
+obj.Shape = slab
+''')
+        self.assertTrue(report.success, report.error)
+        self.assertEqual(report.objects[0]["bound_box"], [0, 0, 0, 10, 10, 10])
+        self.assertAlmostEqual(report.volume, 1000 - 40)
+        self.assertFalse(report.approximate)
+
+    def test_fuse_and_common_of_overlapping_boxes(self):
+        report = evaluate('''
+a = Part.makeBox(10, 10, 10)
+b = Part.makeBox(10, 10, 10)
+b.translate(FreeCAD.Vector(5, 0, 0))
+doc.addObject("Part::Feature", "Union").Shape = a.fuse(b)
+doc.addObject("Part::Feature", "Common").Shape = a.common(b)
+doc.addObject("Part::Feature", "Walls").Shape = Part.makeCompound([a, b.translated(FreeCAD.Vector(0, 20, 0))])
+''')
+        volumes = {obj["name"]: obj["volume"] for obj in report.objects}
+        self.assertAlmostEqual(volumes["Union"], 1500)
+        self.assertAlmostEqual(volumes["Common"], 500)
+        self.assertAlmostEqual(volumes["Walls"], 2000)
+        self.assertEqual(report.bound_box, [0, 0, 0, 15, 30, 10])
+
+    def test_cylinder_volume_is_approximate(self):
+        report = evaluate('''
+obj = doc.addObject("Part::Feature", "Column")
+obj.Shape = Part.makeCylinder(5, 10)
+''')
+        self.assertAlmostEqual(report.volume, math.pi * 250)
+        self.assertEqual(report.bound_box, [-5, -5, 0, 5, 5, 10])
+        self.assertTrue(report.approximate)
+
+    def test_extruded_polygon(self):
+        report = evaluate('''
+points = [FreeCAD.Vector(0, 0, 0), FreeCAD.Vector(10, 0, 0), FreeCAD.Vector(0, 10, 0)]
+face = Part.Face(Part.makePolygon(points, True))
+doc.addObject("Part::Feature", "Wedge").Shape = face.extrude(FreeCAD.Vector(0, 0, 4))
+''')
+        self.assertEqual(report.unsupported, [])
+        wedge = report.objects[0]
+        self.assertAlmostEqual(wedge["volume"], 200.0)
+        self.assertEqual(wedge["bound_box"], [0, 0, 0, 10, 10, 4])
+        self.assertTrue(wedge["approximate"])
+        self.assertIn("OCCError", evaluate("Part.Face(Part.makePolygon([FreeCAD.Vector(), FreeCAD.Vector(1, 0, 0)]))\n").error)
+
+    def test_placements(self):
+        report = evaluate('''
+box = Part.makeBox(10, 20, 30)
+box.translate(FreeCAD.Vector(100, 0, 0))
+moved = doc.addObject("Part::Feature", "Moved")
+moved.Shape = box
+placed = doc.addObject("Part::Feature", "Placed")
+placed.Shape = box
+placed.Placement = FreeCAD.Placement(FreeCAD.Vector(0, 0, 5), FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1), 90))
+tilted = doc.addObject("Part::Feature", "Tilted")
+tilted.Shape = Part.makeBox(10, 10, 10)
+tilted.Placement = FreeCAD.Placement(FreeCAD.Vector(), FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1), 45))
+''')
+        boxes = {obj["name"]: obj["bound_box"] for obj in report.objects}
+        # Assigning a shape takes over its placement; setting the object Placement replaces it
+        self.assertEqual(boxes["Moved"], [100, 0, 0, 110, 20, 30])
+        self.assertTrue(all(math.isclose(a, b, abs_tol=1e-9) for a, b in zip(boxes["Placed"], [-20, 0, 5, 0, 10, 35])))
+        self.assertAlmostEqual(boxes["Tilted"][4], 10 * math.sqrt(2))
+        self.assertFalse(report.objects[1]["approximate"])
+        self.assertTrue(report.objects[2]["approximate"])
+
+    def test_parametric_box_and_links(self):
+        report = evaluate('''
+box = doc.addObject("Part::Box", "Box")
+box.Length = 20
+base = doc.addObject("Part::Feature", "Base")
+base.Shape = Part.makeBox(1, 1, 1)
+base.Visibility = False
+link = doc.addObject("App::Link", "Link")
+link.LinkedObject = base
+link.Placement = FreeCAD.Placement(FreeCAD.Vector(50, 0, 0), FreeCAD.Rotation())
+''')
+        self.assertEqual(report.objects[0]["bound_box"], [0, 0, 0, 20, 10, 10])
+        self.assertEqual(report.objects[2]["bound_box"], [50, 0, 0, 51, 1, 1])
+        self.assertAlmostEqual(report.volume, 2001)
+
+
+class TestScripts(unittest.TestCase):
+    def test_templates(self):
+        for template in (AIService._create_simple_2bhk_model, AIService._create_school_model):
+            report = evaluate_script(template(None))
+            self.assertTrue(report.success, report.error)
+            self.assertGreater(report.object_count, 15)
+            self.assertEqual(report.issues, [])
+            self.assertLess(max(report.size), 100000)
+            self.assertIn("Creating Structured", report.stdout)
+
+    def test_draft_has_less_solid(self):
+        full = evaluate_script(AIService._create_school_model(None))
+        draft = evaluate_script(AIService._create_school_model(None, "draft"))
+        self.assertLess(draft.object_count, full.object_count)
+
+    def test_issues(self):
+        report = evaluate('''
+doc.addObject("Part::Feature", "Gone").Shape = Part.makeBox(1, 1, 1).cut(Part.makeBox(2, 2, 2))
+doc.addObject("Part::Feature", "Road").Shape = Part.makeBox(5e6, 10, 10)
+''')
+        self.assertTrue(any("Gone has no volume" in issue for issue in report.issues))
+        self.assertTrue(any("FreeCAD lengths are in mm" in issue for issue in report.issues))
+
+    def test_unsupported_calls_are_listed(self):
+        report = evaluate('''
+import Draft
+Draft.makeWire([FreeCAD.Vector(), FreeCAD.Vector(1, 0, 0)])
+helix = Part.makeHelix(1, 10, 5)
+doc.addObject("Part::Feature", "Spring").Shape = helix.revolve(FreeCAD.Vector(), FreeCAD.Vector(0, 0, 1))
+''')
+        self.assertTrue(report.success, report.error)
+        self.assertEqual(report.unsupported, ["Draft.makeWire", "Part.makeHelix", "Shape.revolve"])
+        self.assertEqual(report.issues, [])
+
+    def test_failures(self):
+        self.assertIn("ImportError", evaluate_script("import os\n").error)
+        self.assertIn("NameError", evaluate_script("open('model.txt')\n").error)
+        self.assertIn("OCCError", evaluate("Part.makeBox(0, 1, 1)\n").error)
+        report = evaluate_script("while True:\n    pass\n", timeout=0.2)
+        self.assertEqual(report.status, "timeout")
+        self.assertEqual(report.objects, [])
+
+    def test_escapes_are_rejected(self):
+        for code in ("().__class__.__base__.__subclasses__()\n",
+                     "frame = (x for x in ()).gi_frame\n",
+                     "getattr((), '__class__')\n",
+                     "import typing\ntyping.sys.modules\n",
+                     "from collections import _sys\n"):
+            report = evaluate_script(code)
+            self.assertEqual(report.status, "error", code)
+
+    def test_isolated_evaluation(self):
+        report = evaluate_isolated(AIService._create_school_model(None, "draft"))
+        expected = evaluate_script(AIService._create_school_model(None, "draft"))
+        self.assertTrue(report.success, report.error)
+        self.assertEqual(report.objects, expected.objects)
+        name = expected.objects[0]["name"]
+        self.assertAlmostEqual(report.shapes[name].Volume, expected.shapes[name].Volume)
+        # One long C-level operation never returns to the trace function; the child is killed
+        with mock.patch("utils.geometry_evaluator.ISOLATION_GRACE", 1.0):
+            report = evaluate_isolated("x = 7 ** (7 ** 9)\n", timeout=0.5)
+        self.assertEqual(report.status, "timeout")
+
+
+class TestFreeCADServicePreview(unittest.TestCase):
+    def test_analysis_includes_geometry(self):
+        service = FreeCADService(FreeCADConfig(result_cache=ResultCacheConfig(enabled=False)))
+        analysis = service.analyze_generated_code(AIService._create_school_model(None))
+        self.assertEqual(analysis["geometry"]["status"], "ok")
+        self.assertEqual(analysis["geometry"]["object_count"], service.last_geometry_report.object_count)
+
+        service.config.geometry_preview = False
+        self.assertIsNone(service.preview_geometry("import FreeCAD\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Tests for the running-GUI loader protocol using a local stand-in listener
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig, GuiBridgeConfig
+from services.freecad_service import FreeCADService
+from services.gui_bridge import FreeCADGuiBridge
+from services.gui_loader_macro import FreeCADLoader, LoaderServer
+from utils import freecad_stub
+
+
+MODEL_SCRIPT = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Model")
+doc.addObject("Part::Feature", "Box").Shape = Part.makeBox(1, 1, 1)
+'''
+
+
+class _BridgeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.handshake = os.path.join(self.directory.name, "gui_bridge.json")
+        self.config = GuiBridgeConfig(handshake_file=self.handshake, load_timeout=10)
+        self.bridge = FreeCADGuiBridge(self.config)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def start_listener(self, handler, **kwargs):
+        server = LoaderServer(handler, handshake_file=self.handshake,
+                              info={"freecad_version": "0.21.0"}, **kwargs).start()
+        self.addCleanup(server.stop)
+        return server
+
+
+class TestLoaderProtocol(_BridgeTestCase):
+    """Client and listener agree on the protocol"""
+
+    def test_no_listener_means_unavailable(self):
+        self.assertFalse(self.bridge.is_available())
+        self.assertIsNone(self.bridge.load_script("model.py"))
+
+    def test_ping(self):
+        self.start_listener(lambda request: {"status": "ok"})
+        self.assertTrue(self.bridge.is_available())
+        self.assertEqual(self.bridge.ping()["freecad_version"], "0.21.0")
+
+    def test_load_request_fields(self):
+        requests = []
+        self.start_listener(lambda request: requests.append(request) or {"status": "ok", "object_count": 3})
+        response = self.bridge.load_script("model.py", mode="new")
+        self.assertEqual(response["object_count"], 3)
+        self.assertEqual(requests[0]["script_path"], os.path.abspath("model.py"))
+        self.assertEqual(requests[0]["slot"], "VoiceToCAD")
+        self.assertEqual(requests[0]["mode"], "new")
+
+    def test_wrong_token_is_rejected(self):
+        server = self.start_listener(lambda request: {"status": "ok"})
+        with open(self.handshake, "w") as f:
+            json.dump({"host": "127.0.0.1", "port": server.port, "token": "guess"}, f)
+        self.assertFalse(self.bridge.is_available())
+        self.assertEqual(self.bridge.load_script("model.py")["error"], "Invalid token")
+
+    def test_stale_handshake_file(self):
+        server = self.start_listener(lambda request: {"status": "ok"})
+        server.stop()
+        with open(self.handshake, "w") as f:
+            json.dump({"host": "127.0.0.1", "port": server.port, "token": server.token}, f)
+        self.assertIsNone(self.bridge.load_script("model.py"))
+
+    def test_stop_removes_handshake(self):
+        server = self.start_listener(lambda request: {"status": "ok"})
+        self.assertTrue(os.path.exists(self.handshake))
+        server.stop()
+        self.assertFalse(os.path.exists(self.handshake))
+
+    def test_handler_errors_are_reported(self):
+        def failing(request):
+            raise RuntimeError("document locked")
+        self.start_listener(failing)
+        self.assertEqual(self.bridge.load_script("model.py")["error"], "RuntimeError: document locked")
+
+
+class TestFreeCADLoader(_BridgeTestCase):
+    """The real loader against the FreeCAD stub"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict(sys.modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.freecad = freecad_stub.install()
+        self.script = os.path.join(self.directory.name, "model.py")
+        with open(self.script, "w") as f:
+            f.write(MODEL_SCRIPT)
+        self.start_listener(FreeCADLoader())
+
+    def test_replace_mode_closes_previous_model(self):
+        for _ in range(3):
+            response = self.bridge.load_script(self.script, mode="replace")
+            self.assertEqual(response["status"], "ok")
+            self.assertEqual(response["object_count"], 1)
+        self.assertEqual(len(self.freecad.listDocuments()), 1)
+
+    def test_new_mode_keeps_previous_model(self):
+        self.bridge.load_script(self.script, mode="new")
+        self.bridge.load_script(self.script, mode="new")
+        self.assertEqual(len(self.freecad.listDocuments()), 2)
+
+    def test_saved_document_is_opened(self):
+        document = os.path.join(self.directory.name, "model.FCStd")
+        freecad_stub._write_placeholder(document, "FCStd", [freecad_stub.Shape("makeBox")] * 2)
+        response = self.bridge.load_document(document)
+        self.assertEqual(response["status"], "ok")
+        self.assertEqual(response["documents"], ["model"])
+        self.assertEqual(response["object_count"], 2)
+
+    def test_script_errors(self):
+        with open(self.script, "w") as f:
+            f.write("undefined_name\n")
+        response = self.bridge.load_script(self.script)
+        self.assertEqual(response["status"], "error")
+        self.assertIn("NameError", response["error"])
+
+
+class TestServiceReusesGui(_BridgeTestCase):
+    """execute_code_and_open_freecad prefers a running FreeCAD"""
+
+    def test_loaded_without_launch(self):
+        self.start_listener(lambda request: {"status": "ok", "object_count": 5})
+        service = FreeCADService(FreeCADConfig(gui_bridge=self.config))
+        with mock.patch.object(service, "_launch_freecad_with_script") as launch:
+            result = service.execute_code_and_open_freecad(
+                "x = 1\n", os.path.join(self.directory.name, "model.py"))
+        launch.assert_not_called()
+        self.assertTrue(result["reused_gui"])
+        self.assertTrue(result["executed"])
+        self.assertIn("5 objects", result["message"])
+
+    def test_falls_back_to_launch(self):
+        service = FreeCADService(FreeCADConfig(gui_bridge=self.config))
+        with mock.patch.object(service, "_launch_freecad_with_script", return_value=True) as launch:
+            result = service.execute_code_and_open_freecad(
+                "x = 1\n", os.path.join(self.directory.name, "model.py"))
+        launch.assert_called_once()
+        self.assertNotIn("reused_gui", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
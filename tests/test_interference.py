@@ -0,0 +1,161 @@
+"""
+Tests for bounding-box interference checks
+"""
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig, InterferenceConfig, ResultCacheConfig
+from services.ai_service import AIService
+from services.freecad_service import FreeCADService
+from utils.floor_layout import LayoutRequest, layout_scene, solve_layout
+from utils.geometry_evaluator import evaluate_script
+from utils.interference import candidate_pairs, check_interference, check_scene
+from utils.scene_graph import parse_scene
+
+
+def box(label, lower, upper, **extra):
+    return {"name": label.replace(" ", "_"), "label": label, "bound_box": list(lower) + list(upper), **extra}
+
+
+# A 10 m x 8 m slab on a foundation, walls 200 mm thick and 3 m high
+FOUNDATION = box("Foundation", (-200, -200, -500), (10200, 8200, 0))
+FRONT = box("Front Wall", (0, 0, 0), (10000, 200, 3000))
+LEFT = box("Left Wall", (0, 0, 0), (200, 8000, 3000))  # corner joint with the front wall
+
+
+class TestCandidatePairs(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        lower = rng.uniform(0, 20000, (800, 3))
+        boxes = np.hstack([lower, lower + rng.uniform(10, 1500, (800, 3))])
+        for reach in (-5.0, 0.0, 40.0):
+            i, j, _ = candidate_pairs(boxes, reach)
+            separation = (np.maximum(boxes[:, None, :3], boxes[None, :, :3])
+                          - np.minimum(boxes[:, None, 3:], boxes[None, :, 3:]))
+            expected = {(a, b) for a, b in zip(*np.nonzero(np.all(separation <= reach, axis=2))) if a < b}
+            self.assertEqual(set(zip(i.tolist(), j.tolist())), expected)
+
+    def test_thousands_of_objects(self):
+        rng = np.random.default_rng(3)
+        lower = rng.uniform(0, 200000, (5000, 3))
+        objects = [{"name": f"Box{k}", "bound_box": list(b)}
+                   for k, b in enumerate(np.hstack([lower, lower + rng.uniform(10, 2000, (5000, 3))]))]
+        start = time.perf_counter()
+        report = check_interference(objects)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(report.object_count, 5000)
+
+    def test_degenerate_input(self):
+        self.assertEqual(len(candidate_pairs(np.zeros((0, 6)))[0]), 0)
+        self.assertTrue(check_interference([FRONT, {"name": "Group", "bound_box": None}]).clean)
+
+
+class TestCheckInterference(unittest.TestCase):
+    def test_corner_joints_are_not_collisions(self):
+        report = check_interference([FOUNDATION, FRONT, LEFT])
+        self.assertTrue(report.clean, report.issues())
+        self.assertEqual(report.joints, 1)
+        self.assertEqual(report.boundary, "Foundation")
+
+    def test_duplicate_wall_collides(self):
+        copy = box("Front Wall Copy", (5000, 0, 0), (10000, 200, 3000))
+        report = check_interference([FOUNDATION, FRONT, LEFT, copy])
+        self.assertEqual(len(report.collisions), 1)
+        collision = report.collisions[0]
+        self.assertEqual({collision.first, collision.second}, {"Front Wall", "Front Wall Copy"})
+        self.assertAlmostEqual(collision.fraction, 1.0)
+        self.assertEqual(collision.overlap, [5000, 0, 0, 10000, 200, 3000])
+
+    def test_gap(self):
+        partition = box("Partition", (5000, 230, 0), (5200, 8000, 3000))  # stops 30 mm short of the front wall
+        floating = box("Marker", (1000, 1000, 3001), (2000, 2000, 3051))  # deliberate 1 mm offset
+        report = check_interference([FRONT, partition, floating])
+        self.assertEqual([(g.first, g.second, g.axis, g.distance) for g in report.gaps],
+                         [("Front Wall", "Partition", "y", 30.0)])
+
+    def test_filled_gap_is_not_a_gap(self):
+        # A floor pad stops at the wall face, 50 mm short of the next wall across it
+        pad = box("Pad", (200, 200, 0), (5000, 4000, 50))
+        wall = box("Back Wall", (0, 4050, 0), (10000, 4250, 3000))
+        spacer = box("Skirting", (0, 4000, 0), (10000, 4050, 100))
+        self.assertEqual(len(check_interference([pad, wall]).gaps), 1)
+        self.assertTrue(check_interference([pad, wall, spacer]).clean)
+
+    def test_out_of_bounds(self):
+        room = box("Garage", (9000, 7000, 0), (11000, 9000, 50))
+        canopy = box("Canopy", (4000, -1500, 3000), (6000, 0, 3150))  # elevated, may overhang
+        report = check_interference([FOUNDATION, FRONT, room, canopy])
+        self.assertEqual([(o.name, o.overhang) for o in report.out_of_bounds], [("Garage", 800.0)])
+
+        report = check_interference([FRONT, room], bounds=[0, 0, -100, 12000, 12000, 0])
+        self.assertTrue(report.clean)
+        self.assertEqual(report.boundary, "the site bounds")
+
+    def test_hidden_objects_are_skipped(self):
+        hidden = dict(FRONT, label="Link Base", visible=False)
+        self.assertEqual(check_interference([FRONT, hidden]).object_count, 1)
+
+    def test_thresholds_come_from_config(self):
+        config = InterferenceConfig(joint_fraction=0.0)
+        self.assertEqual(len(check_interference([FRONT, LEFT], config).collisions), 1)
+
+
+class TestSolidRefinement(unittest.TestCase):
+    SCRIPT = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Walls")
+wall = Part.makeBox(4000, 200, 3000).cut(Part.makeBox(1000, 200, 2000, FreeCAD.Vector(1500, 0, 0)))
+doc.addObject("Part::Feature", "Wall").Shape = wall
+door = Part.makeBox(1000, 100, 2000)
+door.translate(FreeCAD.Vector(1500, 50, 0))
+doc.addObject("Part::Feature", "Door").Shape = door
+'''
+
+    def test_objects_in_openings_do_not_collide(self):
+        geometry = evaluate_script(self.SCRIPT)
+        self.assertEqual(len(check_interference(geometry.objects).collisions), 1)
+        self.assertTrue(check_interference(geometry.objects, shapes=geometry.shapes).clean)
+
+    def test_templates_report_overlapping_rooms(self):
+        geometry = evaluate_script(AIService._create_school_model(None))
+        report = check_interference(geometry.objects, shapes=geometry.shapes)
+        pairs = {(c.first, c.second) for c in report.collisions}
+        self.assertIn(("Principal Office (30 sq.m)", "Class 1A (84 sq.m)"), pairs)
+        self.assertFalse(report.gaps)
+        self.assertFalse(report.out_of_bounds)
+
+    def test_scene_graph(self):
+        scene = parse_scene({"objects": [
+            {"type": "box", "name": "Slab", "length": 5000, "width": 5000, "height": 200},
+            {"type": "box", "name": "Shed", "length": 1000, "width": 1000, "height": 200,
+             "translate": [4500, 0, 0]},
+        ]})
+        report = check_scene(scene)
+        self.assertEqual([(c.first, c.second) for c in report.collisions], [("Slab", "Shed")])
+
+    def test_solved_layouts_have_no_gaps(self):
+        for request in (LayoutRequest(bedrooms=2), LayoutRequest(bedrooms=3), LayoutRequest(bedrooms=4, extras=["study"])):
+            report = check_scene(layout_scene(solve_layout(request)))
+            self.assertEqual(report.gaps, [], request)
+
+
+class TestFreeCADServiceInterference(unittest.TestCase):
+    def test_preview_runs_the_checks(self):
+        service = FreeCADService(FreeCADConfig(result_cache=ResultCacheConfig(enabled=False)))
+        analysis = service.analyze_generated_code(AIService._create_simple_2bhk_model(None))
+        self.assertTrue(analysis["interference"]["issues"])
+        self.assertIs(service.check_interference([FRONT, LEFT]), service.last_interference_report)
+
+        service.config.interference.enabled = False
+        self.assertIsNone(service.check_interference([FRONT, LEFT]))
+
+
+if __name__ == "__main__":
+    unittest.main()
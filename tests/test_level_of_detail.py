@@ -0,0 +1,72 @@
+"""
+Tests for quality level driven level of detail
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig, SandboxConfig, WorkerPoolConfig
+from services.ai_service import AIService
+from services.freecad_service import FreeCADService
+from services.sandbox import ScriptSandbox
+from utils.level_of_detail import LEVELS_OF_DETAIL, apply_detail_sections, level_of_detail, prompt_guidance
+
+TEMPLATE = '''wall = make_wall()
+    # [detail:openings]
+wall = wall.cut(door)
+# [detail:small_features]
+frame = make_frame()
+# [/detail]
+# [/detail]
+room = make_room()
+'''
+
+
+class TestDetailSections(unittest.TestCase):
+    def test_sections_follow_the_level(self):
+        self.assertEqual(apply_detail_sections(TEMPLATE, LEVELS_OF_DETAIL["draft"]),
+                         "wall = make_wall()\nroom = make_room()\n")
+        self.assertEqual(apply_detail_sections(TEMPLATE, LEVELS_OF_DETAIL["standard"]),
+                         "wall = make_wall()\nwall = wall.cut(door)\nroom = make_room()\n")
+        self.assertNotIn("[detail", apply_detail_sections(TEMPLATE, LEVELS_OF_DETAIL["professional"]))
+
+    def test_unknown_quality_builds_full_detail(self):
+        self.assertTrue(level_of_detail("ultra").full)
+        self.assertTrue(level_of_detail(None).full)
+        self.assertIs(level_of_detail("Draft"), LEVELS_OF_DETAIL["draft"])
+
+    def test_prompt_guidance(self):
+        self.assertIn("do not create door or window openings", prompt_guidance(LEVELS_OF_DETAIL["draft"]))
+        self.assertNotIn("openings", prompt_guidance(LEVELS_OF_DETAIL["standard"]))
+
+
+class TestTemplateDetail(unittest.TestCase):
+    """Lower quality templates build fewer objects and no booleans"""
+
+    def test_school_objects_per_level(self):
+        sandbox = ScriptSandbox(SandboxConfig(timeout=30), WorkerPoolConfig(use_stub=True, shape_cache_directory=None))
+        counts = {}
+        for quality in ("draft", "standard", "professional"):
+            code = AIService._create_school_model(None, quality)
+            result = sandbox.run(code)
+            self.assertEqual(result.status, "ok", result.error)
+            counts[quality] = result.object_count
+            self.assertEqual(".cut(" in code, quality != "draft")
+        self.assertLess(counts["draft"], counts["standard"])
+        self.assertLess(counts["standard"], counts["professional"])
+
+    def test_draft_export_is_coarse(self):
+        service = FreeCADService(FreeCADConfig(worker_pool=WorkerPoolConfig(use_stub=True)))
+        with mock.patch.object(service.exporter, "export") as export:
+            service.export_model("code", ["stl"], quality_level="draft")
+            service.export_model("code", ["stl"], quality_level="professional")
+        self.assertEqual(export.call_args_list[0].args[2:], (5.0, 1.0))
+        self.assertEqual(export.call_args_list[1].args[2:], (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
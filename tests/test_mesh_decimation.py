@@ -0,0 +1,106 @@
+"""
+Tests for preview mesh decimation and the compact payload
+"""
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig, ResultCacheConfig
+from services.ai_service import AIService
+from services.freecad_service import FreeCADService
+from services.mesh_writer import _synthetic_mesh
+from utils.geometry_evaluator import evaluate_script
+from utils.mesh_decimation import build_preview, cluster_vertices, decode_payload
+from utils.rasterizer import Mesh, mesh_from_shapes
+
+BOXES = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Boxes")
+doc.addObject("Part::Feature", "Block").Shape = Part.makeBox(4000, 2000, 1000)
+doc.addObject("Part::Feature", "Sheet").Shape = Part.makeBox(4000, 2000, 5, FreeCAD.Vector(0, 0, 2000))
+'''
+
+
+def surface(triangles: int) -> Mesh:
+    points, facets = _synthetic_mesh(triangles)
+    return Mesh(points[facets], np.tile([0.2, 0.4, 0.6], (len(facets), 1)))
+
+
+class TestClustering(unittest.TestCase):
+    def setUp(self):
+        self.mesh = mesh_from_shapes(evaluate_script(BOXES).shapes)
+
+    def test_welding_keeps_every_triangle(self):
+        payload = build_preview(self.mesh)
+        self.assertFalse(payload.decimated)
+        self.assertEqual((payload.vertices, payload.triangles), (16, 24))
+        points, facets, colors = decode_payload(payload.data)
+        step = (points.max(axis=0) - points.min(axis=0)) / 65535
+        self.assertTrue(np.all(np.abs(points[facets] - self.mesh.triangles) <= step + 1e-3))
+        np.testing.assert_allclose(colors, self.mesh.colors, atol=1 / 255)
+
+    def test_thin_parts_collapse_without_duplicates(self):
+        corners = self.mesh.triangles.reshape(-1, 3)
+        points, facets, kept = cluster_vertices(corners, np.arange(len(corners)).reshape(-1, 3),
+                                                corners.min(axis=0), 100.0)
+        # The 5 mm sheet's top and bottom faces fall into one layer of cells and merge
+        self.assertEqual(len(np.unique(np.sort(facets, axis=1), axis=0)), len(facets))
+        self.assertLess(len(facets), len(self.mesh))
+        self.assertEqual(len(kept), len(facets))
+        self.assertTrue(np.all(np.isin(np.arange(len(points)), facets)))
+
+
+class TestBuildPreview(unittest.TestCase):
+    def test_large_meshes_are_decimated_under_the_cap(self):
+        mesh = surface(200_000)
+        payload = build_preview(mesh, max_bytes=100_000)
+        self.assertTrue(payload.decimated)
+        self.assertLessEqual(len(payload.data), 100_000)
+        self.assertGreater(payload.triangles, 1000)
+        self.assertEqual(payload.original_triangles, len(mesh))
+        points, _, colors = decode_payload(payload.data)
+        corners = mesh.triangles.reshape(-1, 3)
+        # Clustering averages cells, so the bounds shrink by less than a cell
+        cell = 100000 / payload.resolution
+        np.testing.assert_allclose(points.min(axis=0), corners.min(axis=0), atol=cell)
+        np.testing.assert_allclose(points.max(axis=0), corners.max(axis=0), atol=cell)
+        np.testing.assert_allclose(colors, [[0.2, 0.4, 0.6]] * len(colors), atol=1 / 255)
+
+    def test_triangle_limit(self):
+        payload = build_preview(surface(20_000), max_triangles=2_000)
+        self.assertLessEqual(payload.triangles, 2_000)
+
+    def test_empty_mesh(self):
+        self.assertIsNone(build_preview(Mesh()))
+
+    def test_school_template_is_fast(self):
+        code = AIService._create_school_model(None)
+        start = time.perf_counter()
+        payload = build_preview(mesh_from_shapes(evaluate_script(code).shapes))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertFalse(payload.decimated)
+        self.assertLess(len(payload.data), 100_000)
+
+
+class TestFreeCADServicePreview(unittest.TestCase):
+    def test_build_mesh_preview(self):
+        service = FreeCADService(FreeCADConfig(result_cache=ResultCacheConfig(enabled=False)))
+        code = AIService._create_simple_2bhk_model(None)
+        payload = service.build_mesh_preview(code)
+        self.assertIs(payload, service.last_mesh_preview)
+        self.assertGreater(payload.triangles, 100)
+
+        service.config.mesh_preview.max_bytes = 6_000
+        self.assertLessEqual(len(service.build_mesh_preview(code).data), 6_000)
+        service.config.mesh_preview.enabled = False
+        self.assertIsNone(service.build_mesh_preview(code))
+
+
+if __name__ == "__main__":
+    unittest.main()
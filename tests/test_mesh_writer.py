@@ -0,0 +1,151 @@
+"""
+Tests for the streaming STL and quantized GLB mesh writers
+"""
+import json
+import os
+import struct
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import ExportConfig, FreeCADConfig, ResultCacheConfig, SandboxConfig, WorkerPoolConfig
+from services.freecad_service import FreeCADService
+from services.freecad_worker import _write_binary_stl
+from services.mesh_writer import (GLB_VERTEX, STL_RECORD, StlWriter, _synthetic_mesh, benchmark,
+                                  write_glb, write_stl)
+from utils.freecad_stub import Vector
+
+
+def read_glb(path):
+    """JSON document and dequantized (n, 3, 3) triangles and (n, 3) normals"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, length = struct.unpack_from("<4sII", data)
+    assert (magic, version, length) == (b"glTF", 2, len(data))
+    json_length = struct.unpack_from("<I", data, 12)[0]
+    document = json.loads(data[20:20 + json_length])
+    if not document.get("meshes"):
+        return document, np.zeros((0, 3, 3)), np.zeros((0, 3))
+    offset = 20 + json_length
+    assert data[offset + 4:offset + 8] == b"BIN\0"
+    vertices = np.frombuffer(data, GLB_VERTEX, offset=offset + 8)
+    node = document["nodes"][0]
+    positions = vertices["position"] * np.array(node["scale"]) + np.array(node["translation"])
+    return document, positions.reshape(-1, 3, 3), vertices["normal"][::3] / 127.0
+
+
+class TestStl(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.points, self.facets = _synthetic_mesh(5000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_matches_the_per_facet_writer(self):
+        count = write_stl(self.path("fast.stl"), self.points, self.facets, chunk_size=1000)
+        _write_binary_stl(self.path("slow.stl"), [Vector(*p) for p in self.points.tolist()],
+                          [tuple(f) for f in self.facets.tolist()])
+        self.assertEqual(count, len(self.facets))
+        fast = np.fromfile(self.path("fast.stl"), STL_RECORD, offset=84)
+        slow = np.fromfile(self.path("slow.stl"), STL_RECORD, offset=84)
+        np.testing.assert_array_equal(fast["vertices"], slow["vertices"])
+        np.testing.assert_allclose(fast["normal"], slow["normal"], atol=1e-6)
+        with open(self.path("fast.stl"), "rb") as f:
+            self.assertEqual(struct.unpack("<I", f.read(84)[80:])[0], count)
+
+    def test_streamed_chunks_patch_the_count(self):
+        triangles = self.points[self.facets]
+        with StlWriter(self.path("stream.stl")) as writer:
+            for start in range(0, len(triangles), 777):
+                writer.write(triangles[start:start + 777])
+        records = np.fromfile(self.path("stream.stl"), STL_RECORD, offset=84)
+        self.assertEqual(len(records), len(triangles))
+        with open(self.path("stream.stl"), "rb") as f:
+            self.assertEqual(struct.unpack("<I", f.read(84)[80:])[0], len(triangles))
+
+    def test_peak_memory_is_bounded_by_the_chunk(self):
+        points, facets = _synthetic_mesh(400_000)
+        tracemalloc.start()
+        write_stl(self.path("large.stl"), points, facets, chunk_size=4096)
+        write_glb(self.path("large.glb"), points, facets, chunk_size=4096)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # Materializing the records alone would take 20 MB (STL) and 14 MB (GLB)
+        self.assertLess(peak, 4 * 2 ** 20)
+
+
+class TestGlb(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "model.glb")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_quantized_round_trip(self):
+        points, facets = _synthetic_mesh(20000)
+        self.assertEqual(write_glb(self.path, points, facets, chunk_size=3000), len(facets))
+        document, triangles, normals = read_glb(self.path)
+        self.assertEqual(document["extensionsRequired"], ["KHR_mesh_quantization"])
+        self.assertEqual(document["accessors"][0]["count"], 3 * len(facets))
+        step = np.array(document["nodes"][0]["scale"])
+        self.assertTrue(np.all(np.abs(triangles - points[facets]) <= step / 2 + 1e-6))
+        expected = np.cross(points[facets][:, 1] - points[facets][:, 0], points[facets][:, 2] - points[facets][:, 0])
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+        np.testing.assert_allclose(normals, expected, atol=1 / 127)
+        # 12 bytes per vertex against 50 bytes per STL triangle
+        self.assertLess(os.path.getsize(self.path), 37 * len(facets) + 2048)
+
+    def test_flat_and_empty_meshes(self):
+        points = np.array([[0, 0, 5], [10, 0, 5], [0, 20, 5], [10, 20, 5], [99, 99, 99]], dtype=float)
+        write_glb(self.path, points, [(0, 1, 2), (1, 3, 2)])
+        document, triangles, _ = read_glb(self.path)
+        # The unused point does not widen the range, the flat z axis keeps its offset
+        self.assertEqual(document["accessors"][0]["max"], [65535, 65535, 0])
+        np.testing.assert_allclose(triangles, points[[[0, 1, 2], [1, 3, 2]]])
+
+        self.assertEqual(write_glb(self.path, points, np.zeros((0, 3), dtype=int)), 0)
+        document, triangles, _ = read_glb(self.path)
+        self.assertEqual(document["scenes"], [{"nodes": []}])
+        self.assertEqual(len(triangles), 0)
+
+    def test_benchmark_reports_both_writers(self):
+        report = benchmark(2000, self.directory.name)
+        self.assertEqual(sorted(report), ["glb", "stl"])
+        self.assertEqual(report["stl"]["bytes_per_triangle"], 50 + 84 / report["stl"]["triangles"])
+        self.assertGreater(report["glb"]["triangles_per_second"], 0)
+
+
+class TestStubGlbExport(unittest.TestCase):
+    def test_export_model_writes_glb(self):
+        script = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Model")
+doc.addObject("Part::Feature", "Box").Shape = Part.makeBox(10, 10, 10)
+'''
+        with tempfile.TemporaryDirectory() as directory:
+            config = FreeCADConfig(export=ExportConfig(cache_directory=directory),
+                                   result_cache=ResultCacheConfig(directory=os.path.join(directory, "results")),
+                                   sandbox=SandboxConfig(timeout=30),
+                                   worker_pool=WorkerPoolConfig(use_stub=True))
+            result = FreeCADService(config).export_model(script, ["glb", "stl"])
+            self.assertTrue(result.success, result.error)
+            self.assertTrue(result.files["glb"].endswith(".glb"))
+            # The stub tessellates every shape into a unit tetrahedron
+            _, triangles, _ = read_glb(result.files["glb"])
+            self.assertEqual(len(triangles), 4)
+            self.assertAlmostEqual(float(triangles.max()), 1.0, places=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
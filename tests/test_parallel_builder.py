@@ -0,0 +1,129 @@
+"""
+Tests for script partitioning and parallel subassembly builds (stub workers)
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import SandboxConfig, WorkerPoolConfig
+from services.ai_service import AIService
+from services.parallel_builder import ParallelBuilder, scaling_report
+from services.sandbox import ScriptSandbox
+from services.worker_pool import FreeCADWorkerPool
+from utils.script_partition import Subassembly, ScriptPartition, partition_script
+
+HOUSE_SCRIPT = AIService._create_simple_2bhk_model(None)
+SCHOOL_SCRIPT = AIService._create_school_model(None)
+
+TWO_BLOCKS = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Blocks")
+SIZE = 10
+a = Part.makeBox(SIZE, SIZE, SIZE)
+a_obj = doc.addObject("Part::Feature", "A")
+a_obj.Shape = a
+a_obj.ViewObject.ShapeColor = (1.0, 0.0, 0.0)
+b = Part.makeCylinder(SIZE, SIZE).cut(Part.makeBox(1, 1, 1))
+b_obj = doc.addObject("Part::Feature", "B")
+b_obj.Shape = b
+doc.recompute()
+'''
+
+
+class TestPartitionScript(unittest.TestCase):
+    def test_independent_blocks(self):
+        partition = partition_script(TWO_BLOCKS)
+        self.assertEqual(partition.document, "doc")
+        self.assertEqual(len(partition.subassemblies), 2)
+        self.assertIn("SIZE = 10", partition.prelude)
+        self.assertEqual(partition.tail, ["doc.recompute()"])
+        first = partition.subassemblies[0]
+        self.assertNotIn("a_obj.ViewObject.ShapeColor = (1.0, 0.0, 0.0)", first.statements)
+        self.assertEqual(first.presentation[0][:2], ("A", "a_obj"))
+        self.assertGreater(partition.subassemblies[1].cost, first.cost)
+
+    def test_house_template_splits_per_element(self):
+        partition = partition_script(HOUSE_SCRIPT)
+        self.assertGreaterEqual(len(partition.subassemblies), 15)
+        self.assertIn("doc.recompute()", partition.tail)
+        for sub in partition.subassemblies:
+            self.assertFalse(any("ViewObject" in statement for statement in sub.statements))
+
+    def test_dependent_script_is_not_split(self):
+        code = TWO_BLOCKS.replace("b = Part.makeCylinder(SIZE, SIZE)", "b = a.fuse(Part.makeCylinder(SIZE, SIZE))")
+        self.assertIsNone(partition_script(code))
+
+    def test_document_links_keep_objects_together(self):
+        code = TWO_BLOCKS.replace("doc.recompute()\n", (
+            'cut = doc.addObject("Part::Cut", "Cut")\n'
+            'cut.Base = doc.A\n'
+            'cut.Tool = doc.getObject("B")\n'
+            'c = Part.makeBox(1, 1, 1)\n'
+            'c_obj = doc.addObject("Part::Feature", "C")\n'
+            'c_obj.Shape = c\n'
+            'doc.recompute()\n'))
+        partition = partition_script(code)
+        self.assertEqual(len(partition.subassemblies), 2)
+        self.assertIn('cut.Tool = doc.getObject("B")', partition.subassemblies[0].statements)
+        self.assertIn('b_obj.Shape = b', partition.subassemblies[0].statements)
+        for unresolved in ('doc.getObject(name)', 'doc.Objects[0]', 'doc.Missing'):
+            self.assertIsNone(partition_script(code.replace('doc.A', unresolved)), unresolved)
+
+    def test_mutated_constant_is_not_split(self):
+        code = TWO_BLOCKS.replace("SIZE = 10\n", "SIZE = 10\nSIZES = [1]\n").replace(
+            "b_obj.Shape = b\n", "b_obj.Shape = b\nSIZES.append(2)\n")
+        self.assertIsNone(partition_script(code))
+
+    def test_batches_balance_cost(self):
+        partition = ScriptPartition(prelude=[], document="doc", subassemblies=[
+            Subassembly(index, cost=cost) for index, cost in enumerate([5, 1, 1, 1, 1, 1])])
+        batches = partition.batches(2)
+        self.assertEqual([[sub.index for sub in batch] for batch in batches], [[0], [1, 2, 3, 4, 5]])
+        self.assertEqual(len(partition.batches(10)), 6)
+
+
+class TestParallelBuilder(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.config = WorkerPoolConfig(use_stub=True, size=2, shape_cache_directory=None,
+                                       startup_timeout=20, run_timeout=30)
+
+    def test_school_is_built_in_parts_and_reassembled(self):
+        sandbox = ScriptSandbox(SandboxConfig(timeout=30), self.config)
+        sequential = sandbox.run(SCHOOL_SCRIPT)
+        with FreeCADWorkerPool(self.config) as pool:
+            build = ParallelBuilder(pool, self.directory.name).build(SCHOOL_SCRIPT)
+        self.assertTrue(build.success, build.error)
+        self.assertEqual(len(build.parts), 2)
+        self.assertEqual(sum(part.object_count for part in build.parts), sequential.object_count)
+
+        with open(build.assembly_path) as f:
+            assembly = f.read()
+        result = sandbox.run(assembly)
+        self.assertEqual(result.status, "ok", result.error)
+        self.assertEqual(sorted(obj["label"] for obj in result.objects),
+                         sorted(obj["label"] for obj in sequential.objects))
+        self.assertIn("Creating Structured School", result.stdout)
+
+    def test_failed_part_fails_the_build(self):
+        with FreeCADWorkerPool(self.config) as pool:
+            build = ParallelBuilder(pool, self.directory.name).build(
+                TWO_BLOCKS.replace("b = Part.makeCylinder", "b = undefined_helper"))
+        self.assertEqual(build.status, "error")
+        self.assertIn("NameError", build.error)
+        self.assertIsNone(build.assembly_path)
+
+    def test_scaling_report(self):
+        rows = scaling_report(TWO_BLOCKS, self.config, self.directory.name, worker_counts=[1, 2])
+        self.assertEqual([row["workers"] for row in rows], [1, 2])
+        self.assertEqual([row["parts"] for row in rows], [1, 2])
+        self.assertEqual(rows[0]["speedup"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
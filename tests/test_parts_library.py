@@ -0,0 +1,153 @@
+"""
+Tests for the parametric parts library and its routing in the AI service
+"""
+import math
+import os
+import sys
+import time
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import AIConfig, FreeCADConfig
+from services.ai_service import AIService
+from services.freecad_service import FreeCADService
+from utils.geometry_evaluator import evaluate_script
+from utils.level_of_detail import level_of_detail
+from utils.parts_library import (PARTS, BoltSpec, FlangeSpec, PartType, match_part, parse_length, parse_metric,
+                                 part_script, register_part)
+from utils.scene_compiler import compile_scene
+from utils.scene_graph import parse_scene, validate_scene
+
+PROFESSIONAL = level_of_detail("professional")
+
+
+def build(command: str, quality_level: str = "professional"):
+    part, spec = match_part(command)
+    return part, spec, evaluate_script(part_script(part, spec, level_of_detail(quality_level)))
+
+
+class TestDimensions(unittest.TestCase):
+    def test_lengths_and_units(self):
+        self.assertEqual(parse_length("shaft 300 mm long", "length", "long"), 300)
+        self.assertEqual(parse_length("length: 4 cm", "length"), 40)
+        self.assertEqual(parse_length("diameter 1 inch", "diameter"), 25.4)
+        self.assertIsNone(parse_length("width 50", "length"))
+        self.assertEqual(parse_metric("an m8x40 bolt"), (8.0, 40.0))
+        self.assertEqual(parse_metric("m12 nut"), (12.0, None))
+
+
+class TestMatching(unittest.TestCase):
+    def test_routing(self):
+        cases = {"M8x40 hex bolt": "bolt", "nut for an M8 bolt": "nut", "M10 washer": "washer",
+                 "DN80 flange with 8 bolt holes": "flange", "keyed shaft 25 mm diameter": "shaft",
+                 "L bracket 6 mm thick": "bracket", "6204 bearing": "bearing", "spur gear 30 teeth": "gear"}
+        for command, name in cases.items():
+            self.assertEqual(match_part(command)[0].name, name, command)
+        for command in ("load bearing wall", "gearbox housing", "3bhk house", "a simple cube",
+                        "2BHK apartment with a washer and dryer area", "2bhk house with shaft for lift",
+                        "house with wall brackets for shelves", "car with gear shift", "bolt of lightning sculpture"):
+            self.assertIsNone(match_part(command), command)
+        # A size or designation makes the part the request wherever it stands
+        self.assertEqual(match_part("spare parts kit with an M8x40 bolt")[0].name, "bolt")
+
+    def test_standard_sizes(self):
+        _, bolt = match_part("M12 bolt")
+        self.assertEqual((bolt.diameter, bolt.length), (12, 60))
+        _, bearing = match_part("ball bearing for a 17 mm shaft")
+        self.assertEqual(bearing.designation, "6203")
+        _, flange = match_part("dn100 flange, 25 mm thick")
+        size = flange.resolved()
+        self.assertEqual((size.outer_diameter, size.thickness, size.holes), (220, 25, 8))
+
+
+class TestParts(unittest.TestCase):
+    def test_every_part_builds_quickly(self):
+        for command in ("M8x40 bolt", "M8 nut", "M8 washer", "DN50 flange", "shaft with keyway",
+                        "L bracket", "6204 bearing", "gear"):
+            start = time.perf_counter()
+            part, _, report = build(command)
+            self.assertLess(time.perf_counter() - start, 1.0, command)
+            self.assertTrue(report.success, report.error)
+            self.assertEqual(report.issues, [], command)
+            self.assertEqual(report.unsupported, [], command)
+
+    def test_bolt_and_nut_sizes(self):
+        _, _, bolt = build("M8x40 bolt")
+        box = bolt.objects[0]["bound_box"]
+        # 13 mm across flats, 5.3 mm head on a 40 mm shank
+        self.assertAlmostEqual(box[4] - box[1], 13.0)
+        self.assertAlmostEqual(box[5], 45.3)
+        _, _, nut = build("M8 nut")
+        hexagon = 3 * math.sqrt(3) / 2 * (13 / math.sqrt(3)) ** 2
+        # Cuts of round shapes are approximate in the evaluator
+        self.assertAlmostEqual(nut.objects[0]["volume"] / ((hexagon - math.pi * 4 ** 2) * 6.8), 1.0, delta=0.15)
+
+    def test_flange_holes_and_bearing_detail(self):
+        _, _, flange = build("DN50 flange")
+        plate = (math.pi / 4) * (165 ** 2 - 61.1 ** 2 - 4 * 18 ** 2) * 18
+        self.assertAlmostEqual(flange.objects[0]["volume"] / plate, 1.0, delta=0.06)
+        _, _, full = build("6204 bearing")
+        _, _, draft = build("6204 bearing", "draft")
+        self.assertIn("Ball_1", [obj["name"] for obj in full.objects])
+        self.assertNotIn("Ball_1", [obj["name"] for obj in draft.objects])
+
+    def test_invalid_specs(self):
+        with self.assertRaises(ValueError):
+            part_script(PARTS["bolt"], BoltSpec(diameter=7), PROFESSIONAL)
+        with self.assertRaises(ValueError):
+            part_script(PARTS["bolt"], BoltSpec(length=300), PROFESSIONAL)
+        with self.assertRaises(ValueError):
+            part_script(PARTS["flange"], FlangeSpec(bolt_circle=300), PROFESSIONAL)
+
+    def test_register_part(self):
+        plate = PartType("plate", r"\bplate\b", lambda text: {}, lambda spec: parse_scene(
+            {"objects": [{"type": "box", "name": "Plate", "length": 100, "width": 50, "height": 5}]}))
+        register_part(plate)
+        try:
+            part, spec = match_part("a mounting plate")
+            self.assertIn('"Plate"', part_script(part, spec, PROFESSIONAL))
+        finally:
+            del PARTS["plate"]
+        with self.assertRaises(ValueError):
+            register_part(PartType("broken", r"\bbroken\b", lambda text: {}))
+
+
+class TestPrism(unittest.TestCase):
+    def test_prism_primitive(self):
+        scene = parse_scene({"objects": [{"type": "prism", "name": "Hex", "sides": 6, "radius": 10, "height": 5}]})
+        report = evaluate_script(compile_scene(scene))
+        self.assertAlmostEqual(report.objects[0]["volume"], 3 * math.sqrt(3) / 2 * 100 * 5, places=3)
+        self.assertEqual(report.objects[0]["bound_box"][:2], [-10, -8.660254])
+        errors = validate_scene({"objects": [{"type": "prism", "sides": 2, "radius": 10, "height": 5}]})
+        self.assertEqual(len(errors), 1)
+
+
+class TestAIServiceRouting(unittest.TestCase):
+    def test_parts_need_no_client(self):
+        service = AIService(AIConfig())
+        code = service.generate_freecad_code("Create an M10x50 hex bolt")
+        self.assertIn('"Bolt_M10x50"', code)
+        # Sizes outside the tables go on to the model, and there is none here
+        self.assertIsNone(service.generate_freecad_code("M7 bolt"))
+        # Buildings go to the layout solver or the templates, never to the library
+        self.assertIsNone(service.generate_freecad_code("2BHK apartment with an M10 washer"))
+        self.assertNotIn('"Washer', service.generate_freecad_code("3BHK house with a washer area"))
+        service.config.parts_library = False
+        self.assertIsNone(service.generate_freecad_code("Create an M10x50 hex bolt"))
+
+    def test_draft_parts_keep_their_holes(self):
+        ai = AIService(AIConfig())
+        for optimize in (False, True):
+            service = FreeCADService(FreeCADConfig(optimize_generated_code=optimize, geometry_preview=False,
+                                                   auto_draft_seconds=0.001))
+            for command in ("M10 nut", "DN50 flange"):
+                code = service.generate_model(command, quality_level="standard", ai_service=ai)
+                self.assertIn(".cut(", code, command)
+                code = service.generate_model(command, quality_level="draft", ai_service=ai)
+                self.assertIn(".cut(", code, command)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Tests for the FreeCAD process supervisor
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import SupervisorConfig
+from services.process_supervisor import ProcessSupervisor
+from utils.exceptions import ProcessLimitError
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met in time")
+        time.sleep(0.05)
+
+
+class TestProcessSupervisor(unittest.TestCase):
+    """Test output draining, reaping and the per-user cap"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.supervisor = ProcessSupervisor(SupervisorConfig(
+            max_live_per_user=2, log_directory=self.directory.name, tail_lines=5))
+
+    def tearDown(self):
+        self.supervisor.shutdown()
+        self.directory.cleanup()
+
+    def test_chatty_process_is_drained_and_reaped(self):
+        """Output larger than a pipe buffer does not block the child"""
+        code = "import sys\nfor i in range(20000):\n    print('line', i)\nsys.exit(3)\n"
+        entry = self.supervisor.spawn([sys.executable, "-c", code], owner="alice", label="chatty")
+        wait_until(lambda: not entry.running)
+
+        self.assertEqual(entry.exit_code, 3)
+        self.assertIsNotNone(entry.process.returncode)
+        with open(entry.log_path) as log:
+            content = log.read()
+        self.assertIn("line 19999", content)
+        self.assertIn("[exit code 3]", content)
+        self.assertEqual(self.supervisor.tail(entry.pid).splitlines()[-1], "line 19999")
+
+    def test_per_user_cap(self):
+        """Each user may only have a limited number of live processes"""
+        sleeper = [sys.executable, "-c", "import time; time.sleep(30)"]
+        first = self.supervisor.spawn(sleeper, owner="alice")
+        self.supervisor.spawn(sleeper, owner="alice")
+        self.assertFalse(self.supervisor.can_spawn("alice"))
+        with self.assertRaises(ProcessLimitError):
+            self.supervisor.spawn(sleeper, owner="alice")
+
+        self.assertTrue(self.supervisor.can_spawn("bob"))
+        self.assertFalse(self.supervisor.terminate(first.pid, owner="bob"))
+        self.assertTrue(self.supervisor.terminate(first.pid, owner="alice"))
+        wait_until(lambda: self.supervisor.can_spawn("alice"))
+
+    def test_status(self):
+        """Status lists live and finished processes per owner"""
+        entry = self.supervisor.spawn([sys.executable, "-c", "print('hi')"], owner="alice", label="quick")
+        wait_until(lambda: not entry.running)
+        self.supervisor.spawn([sys.executable, "-c", "import time; time.sleep(30)"], owner="bob")
+
+        alice = self.supervisor.status(owner="alice")
+        self.assertEqual(len(alice), 1)
+        self.assertEqual(alice[0]["label"], "quick")
+        self.assertFalse(alice[0]["running"])
+        self.assertEqual(alice[0]["exit_code"], 0)
+        self.assertEqual(len(self.supervisor.status()), 2)
+
+    def test_failed_setup_leaves_no_process(self):
+        """A log directory that cannot be created starts nothing"""
+        blocker = os.path.join(self.directory.name, "file")
+        open(blocker, "w").close()
+        supervisor = ProcessSupervisor(SupervisorConfig(log_directory=os.path.join(blocker, "logs")))
+        with mock.patch("subprocess.Popen") as popen, self.assertRaises(OSError):
+            supervisor.spawn([sys.executable, "-c", "pass"], owner="alice")
+        popen.assert_not_called()
+
+    def test_failed_watcher_kills_the_process(self):
+        """A process the supervisor cannot watch is killed, not leaked"""
+        started = []
+        popen = subprocess.Popen
+
+        def record(*args, **kwargs):
+            started.append(popen(*args, **kwargs))
+            return started[-1]
+
+        sleeper = [sys.executable, "-c", "import time; time.sleep(30)"]
+        with mock.patch("subprocess.Popen", side_effect=record), \
+                mock.patch("threading.Thread.start", side_effect=RuntimeError("can't start new thread")):
+            with self.assertRaises(RuntimeError):
+                self.supervisor.spawn(sleeper, owner="alice")
+        self.assertLess(started[0].returncode, 0)
+        self.assertEqual(self.supervisor.live_count("alice"), 0)
+
+if __name__ == "__main__":
+    unittest.main()
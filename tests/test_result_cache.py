@@ -0,0 +1,123 @@
+"""
+Tests for the execution-result cache (against the FreeCAD stub)
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import ExportConfig, FreeCADConfig, ResultCacheConfig, SandboxConfig, WorkerPoolConfig
+from services.freecad_service import FreeCADService
+from services.result_cache import ExecutionResultCache
+from services.sandbox import SandboxResult, ScriptSandbox
+from services.worker_pool import WorkerResult
+
+
+MODEL_SCRIPT = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Model")
+box = Part.makeBox(10, 20, 30)
+box.translate(FreeCAD.Vector(5, 0, 0))
+doc.addObject("Part::Feature", "Box").Shape = box
+doc.addObject("Part::Feature", "Base").Shape = Part.makeBox(100, 100, 1)
+'''
+
+BROKEN_SCRIPT = "import FreeCAD\nundefined_helper()\n"
+
+
+class TestExecutionResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = ExecutionResultCache(ResultCacheConfig(directory=self.directory.name, max_entries=2))
+
+    def test_record_is_keyed_by_script_and_version(self):
+        self.cache.record(MODEL_SCRIPT, "0.21.2", WorkerResult(status="ok", elapsed=1.5, object_count=2))
+        record = self.cache.get("# same script\n" + MODEL_SCRIPT, "0.21.2")
+        self.assertEqual((record.status, record.elapsed, record.object_count), ("ok", 1.5, 2))
+        self.assertIsNone(self.cache.get(MODEL_SCRIPT, "1.0.0"))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_machine_dependent_outcomes_are_not_recorded(self):
+        for status in ("timeout", "memory_limit", "crashed", "unavailable"):
+            self.assertIsNone(self.cache.record(MODEL_SCRIPT, "0.21.2", WorkerResult(status=status)))
+        self.assertIsNone(self.cache.get(MODEL_SCRIPT, "0.21.2"))
+        for error in ("ImportError: No module named 'Draft'", "AttributeError: module 'FreeCAD' has no attribute 'Gui'"):
+            self.assertIsNone(self.cache.record(MODEL_SCRIPT, "0.21.2", WorkerResult(status="error", error=error)))
+        self.assertIsNotNone(self.cache.record(MODEL_SCRIPT, "0.21.2", WorkerResult(
+            status="error", error="NameError: name 'undefined_helper' is not defined")))
+
+    def test_artifacts_that_were_deleted_are_dropped(self):
+        self.cache.record(MODEL_SCRIPT, "0.21.2", WorkerResult(status="ok"))
+        kept = os.path.join(self.directory.name, "model.step")
+        open(kept, "w").close()
+        self.cache.add_artifacts(MODEL_SCRIPT, "0.21.2", {"step": kept, "stl": kept + ".missing"})
+        self.assertEqual(self.cache.get(MODEL_SCRIPT, "0.21.2").artifacts, {"step": kept})
+
+    def test_oldest_records_are_pruned(self):
+        for size in range(4):
+            self.cache.record(MODEL_SCRIPT.replace("10, 20", f"{size}, 20"), "0.21.2", WorkerResult(status="ok"))
+        records = [name for _, _, names in os.walk(self.directory.name) for name in names]
+        self.assertEqual(len(records), 2)
+
+
+class TestServiceResultCache(unittest.TestCase):
+    """Repeated runs through FreeCADService skip the sandbox"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.service = FreeCADService(FreeCADConfig(
+            sandbox=SandboxConfig(timeout=30),
+            worker_pool=WorkerPoolConfig(use_stub=True, shape_cache_directory=None),
+            export=ExportConfig(cache_directory=os.path.join(self.directory.name, "exports")),
+            result_cache=ResultCacheConfig(directory=os.path.join(self.directory.name, "results"))))
+
+    def test_repeat_run_is_answered_from_the_record(self):
+        first = self.service.run_sandboxed(MODEL_SCRIPT)
+        self.assertEqual(first.status, "ok", first.error)
+        self.assertFalse(first.cached)
+        self.assertEqual(first.objects[0]["bound_box"], [5.0, 0.0, 0.0, 15.0, 20.0, 30.0])
+
+        with mock.patch.object(ScriptSandbox, "run") as run:
+            second = self.service.run_sandboxed(MODEL_SCRIPT)
+        run.assert_not_called()
+        self.assertIsInstance(second, SandboxResult)
+        self.assertTrue(second.cached)
+        self.assertEqual(second.objects, first.objects)
+        record = self.service.results.get(MODEL_SCRIPT, self.service.freecad_version())
+        self.assertEqual(record.bound_box, [0.0, 0.0, 0.0, 100.0, 100.0, 30.0])
+
+    def test_known_failure_is_rejected_without_a_run(self):
+        self.assertEqual(self.service.run_sandboxed(BROKEN_SCRIPT).status, "error")
+        with mock.patch.object(ScriptSandbox, "run") as run:
+            self.assertEqual(self.service.run_sandboxed(BROKEN_SCRIPT).status, "error")
+        run.assert_not_called()
+        exported = self.service.export_model(BROKEN_SCRIPT)
+        self.assertEqual(exported.status, "error")
+
+    def test_headless_failures_do_not_block_the_gui(self):
+        gui_script = MODEL_SCRIPT + 'FreeCAD.Gui.SendMsgToActiveView("ViewFit")\n'
+        first = self.service.run_sandboxed(gui_script)
+        self.assertEqual(first.status, "error")
+        self.assertIsNone(self.service.results.get(gui_script, self.service.freecad_version()))
+        self.service.run_sandboxed(BROKEN_SCRIPT)
+        with mock.patch.object(self.service, "_launch_freecad_with_script", return_value=True) as launch:
+            result = self.service.execute_code_and_open_freecad(
+                BROKEN_SCRIPT, os.path.join(self.directory.name, "broken.py"))
+        launch.assert_called_once()
+        self.assertTrue(result["gui_opened"])
+
+    def test_exports_are_recorded(self):
+        exported = self.service.export_model(MODEL_SCRIPT, ["step"])
+        self.assertTrue(exported.success, exported.error)
+        record = self.service.results.get(MODEL_SCRIPT, self.service.freecad_version())
+        self.assertEqual(record.artifacts, exported.files)
+
+
+if __name__ == "__main__":
+    unittest.main()
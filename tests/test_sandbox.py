@@ -0,0 +1,82 @@
+"""
+Tests for sandboxed script execution (using the stub worker)
+"""
+import os
+import sys
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig, ResultCacheConfig, SandboxConfig, WorkerPoolConfig
+from services.freecad_service import FreeCADService
+from services.sandbox import ScriptSandbox
+
+POSIX = os.name == "posix"
+
+
+class TestScriptSandbox(unittest.TestCase):
+    """Test limits and structured results of sandboxed runs"""
+
+    def setUp(self):
+        self.sandbox = ScriptSandbox(
+            SandboxConfig(timeout=10, cpu_time_limit=2, memory_limit_mb=512, max_output_chars=200),
+            WorkerPoolConfig(use_stub=True))
+
+    def test_successful_run(self):
+        code = "import FreeCAD\ndoc = FreeCAD.newDocument('M')\ndoc.addObject('Part::Feature', 'Box')\nprint('done')\n"
+        result = self.sandbox.run(code)
+        self.assertEqual(result.status, "ok")
+        self.assertEqual(result.object_count, 1)
+        self.assertEqual(result.stdout, "done\n")
+        self.assertEqual(result.returncode, 0)
+
+    def test_script_exception(self):
+        result = self.sandbox.run("raise RuntimeError('boom')")
+        self.assertEqual(result.status, "error")
+        self.assertIn("RuntimeError: boom", result.error)
+
+    def test_wall_clock_timeout(self):
+        result = self.sandbox.run("import time\ntime.sleep(60)\n", timeout=1)
+        self.assertEqual(result.status, "timeout")
+
+    @unittest.skipUnless(POSIX, "resource limits are POSIX only")
+    def test_cpu_limit(self):
+        result = self.sandbox.run("while True:\n    pass\n")
+        self.assertEqual(result.status, "cpu_limit")
+
+    @unittest.skipUnless(POSIX, "resource limits are POSIX only")
+    def test_memory_limit(self):
+        result = self.sandbox.run("blob = bytearray(2 * 1024 ** 3)\n")
+        self.assertEqual(result.status, "memory_limit")
+
+    def test_output_is_bounded(self):
+        result = self.sandbox.run("print('x' * 10000)\nimport sys\nsys.__stderr__.write('y' * 10000)\n")
+        self.assertEqual(result.status, "ok")
+        self.assertLess(len(result.stdout), 300)
+        self.assertLessEqual(len(result.stderr), 200)
+
+    def test_process_exit_is_reported(self):
+        result = self.sandbox.run("import os\nos._exit(5)\n")
+        self.assertEqual(result.status, "crashed")
+        self.assertEqual(result.returncode, 5)
+
+    def test_unavailable_without_freecad(self):
+        sandbox = ScriptSandbox(SandboxConfig(), WorkerPoolConfig(command=["/nonexistent/FreeCADCmd"]))
+        result = sandbox.run("x = 1")
+        self.assertEqual(result.status, "unavailable")
+
+
+class TestServiceSandbox(unittest.TestCase):
+    """The service runs fallback executions through the sandbox"""
+
+    def test_run_sandboxed(self):
+        config = FreeCADConfig(worker_pool=WorkerPoolConfig(use_stub=True),
+                               result_cache=ResultCacheConfig(enabled=False))
+        result = FreeCADService(config).run_sandboxed("print('hello')")
+        self.assertTrue(result.success)
+        self.assertEqual(result.stdout, "hello\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Tests for the scene-graph IR, its validator and the FreeCAD compiler (stub sandbox)
+"""
+import ast
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import AIConfig, SandboxConfig, WorkerPoolConfig
+from services.ai_service import AIService
+from services.sandbox import ScriptSandbox
+from utils.exceptions import SceneGraphError
+from utils.level_of_detail import LEVELS_OF_DETAIL
+from utils.scene_compiler import compile_scene
+from utils.scene_graph import parse_scene, validate_scene
+
+PAVILION = {
+    "name": "Pavilion",
+    "materials": {"concrete": {"color": [0.8, 0.8, 0.75]}, "glass": {"color": [0.6, 0.8, 1.0], "transparency": 60}},
+    "definitions": {"column": {"type": "cylinder", "radius": 150, "height": 3000, "fillet": 10}},
+    "objects": [
+        {"type": "difference", "name": "Slab", "material": "concrete", "children": [
+            {"type": "box", "length": 6000, "width": 4000, "height": 200},
+            {"type": "cylinder", "radius": 300, "height": 200, "translate": [3000, 2000, 0], "detail": "openings"}]},
+        {"type": "group", "name": "Columns", "translate": [0, 0, 200], "children": [
+            {"type": "instance", "ref": "column", "name": "Column_1"},
+            {"type": "instance", "ref": "column", "name": "Column_2", "translate": [6000, 0, 0]}]},
+        {"type": "box", "name": "Bench", "length": 1500, "width": 400, "height": 450,
+         "translate": [1000, 1000, 200], "detail": "furniture"},
+        {"type": "box", "name": "Pane_1", "length": 2000, "width": 20, "height": 2000, "material": "glass"},
+        {"type": "box", "name": "Pane_2", "length": 2000, "width": 20, "height": 2000, "material": "glass",
+         "translate": [2000, 0, 0], "rotate": {"axis": [0, 0, 1], "angle": 90}},
+    ],
+}
+
+
+class TestSceneGraph(unittest.TestCase):
+    def test_round_trip(self):
+        scene = parse_scene(json.dumps(PAVILION))
+        self.assertEqual(len(scene.objects), 5)
+        self.assertEqual(scene.objects[1].children[1].transform.translate, (6000.0, 0.0, 0.0))
+        self.assertEqual(parse_scene(scene.to_json()), scene)
+
+    def test_validation_collects_every_problem(self):
+        errors = validate_scene({"objects": [
+            {"type": "box", "length": 1, "width": 1},
+            {"type": "sphere", "radius": -1, "name": "Ball"},
+            {"type": "instance", "ref": "missing", "name": "Ball"},
+            {"type": "union", "children": [], "material": "gold"},
+        ]})
+        self.assertEqual(len(errors), 6, errors)
+        self.assertTrue(any("height" in error for error in errors))
+        self.assertTrue(any("missing" in error for error in errors))
+        self.assertTrue(any("Ball" in error for error in errors))
+
+    def test_cyclic_definitions_are_rejected(self):
+        scene = {"definitions": {"a": {"type": "instance", "ref": "b"}, "b": {"type": "instance", "ref": "a"}},
+                 "objects": [{"type": "instance", "ref": "a"}]}
+        with self.assertRaises(SceneGraphError) as context:
+            parse_scene(scene)
+        self.assertTrue(context.exception.errors)
+
+    def test_invalid_json(self):
+        with self.assertRaises(SceneGraphError):
+            parse_scene("{not json")
+
+
+class TestSceneCompiler(unittest.TestCase):
+    def setUp(self):
+        self.sandbox = ScriptSandbox(SandboxConfig(timeout=30), WorkerPoolConfig(use_stub=True))
+
+    def test_compiled_script_runs(self):
+        code = compile_scene(parse_scene(PAVILION))
+        self.assertEqual(code.count("Part.makeBox(2000, 20, 2000)"), 1)  # identical panes share a shape
+        self.assertEqual(code.count("Part.makeCylinder(150, 3000)"), 1)  # instances share the definition
+        self.assertIn("slab_shape = slab_shape_part.cut(slab_shape_part_2)", code)
+        self.assertIn("makeFillet", code)
+        self.assertIn(".multiply(", code)
+
+        result = self.sandbox.run(code)
+        self.assertEqual(result.status, "ok", result.error)
+        labels = sorted(obj["label"] for obj in result.objects)
+        self.assertEqual(labels, ["Bench", "Column_1", "Column_2", "Columns", "Pane_1", "Pane_2", "Slab"])
+
+    def test_keyword_names_make_valid_variables(self):
+        scene = parse_scene({"objects": [
+            {"type": "group", "name": name, "children": [{"type": "box", "length": 1, "width": 1, "height": 1}]}
+            for name in ("Class", "Import", "Pass", "Match", "Doc", "Print")]})
+        code = compile_scene(scene)
+        ast.parse(code)
+        self.assertIn("class_", code)
+        self.assertNotIn("\ndoc =", code.split('doc = FreeCAD.newDocument')[1])
+
+    def test_draft_leaves_out_detail(self):
+        code = compile_scene(parse_scene(PAVILION), LEVELS_OF_DETAIL["draft"])
+        self.assertNotIn("Bench", code)
+        self.assertNotIn("makeFillet", code)
+        self.assertNotIn(".cut(", code)
+        result = self.sandbox.run(code)
+        self.assertEqual(result.status, "ok", result.error)
+        self.assertEqual(result.object_count, 6)
+
+
+class TestAIServiceSceneGraph(unittest.TestCase):
+    def _service(self, content):
+        service = AIService(AIConfig(output_format="scene_graph"))
+        service.client = mock.Mock()
+        service.client.chat.completions.create.return_value = mock.Mock(
+            choices=[mock.Mock(message=mock.Mock(content=content))])
+        return service
+
+    def test_scene_graph_is_compiled(self):
+        service = self._service("```json\n" + json.dumps(PAVILION) + "\n```")
+        code = service.generate_freecad_code("an open pavilion", quality_level="draft")
+        self.assertIn("# Compiled from a scene graph", code)
+        self.assertNotIn("Bench", code)
+        kwargs = service.client.chat.completions.create.call_args.kwargs
+        self.assertEqual(kwargs["response_format"], {"type": "json_object"})
+
+    def test_unparsable_compiled_script_falls_back_to_code(self):
+        service = self._service(json.dumps(PAVILION))
+        with mock.patch("services.ai_service.compile_scene", return_value="class = 1\n"):
+            code = service.generate_freecad_code("an open pavilion")
+        self.assertNotEqual(code, "class = 1\n")
+        self.assertEqual(service.client.chat.completions.create.call_count, 2)
+
+    def test_invalid_scene_graph_falls_back_to_code(self):
+        service = self._service('{"objects": [{"type": "pyramid"}]}')
+        self.assertIsNone(service.generate_scene_graph("a pyramid"))
+        code = service.generate_freecad_code("a pyramid")
+        self.assertEqual(service.client.chat.completions.create.call_count, 3)
+        self.assertNotIn("# Compiled from a scene graph", code or "")
+
+
+if __name__ == "__main__":
+    unittest.main()
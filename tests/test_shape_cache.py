@@ -0,0 +1,135 @@
+"""
+Tests for the cross-run BRep shape cache (against the FreeCAD stub)
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import SandboxConfig, WorkerPoolConfig
+from services import shape_cache
+from services.sandbox import ScriptSandbox
+from utils import freecad_stub
+
+
+WALL_SCRIPT = '''import FreeCAD
+import Part
+try:
+    from shape_cache import memoize_shape
+except ImportError:
+    def memoize_shape(function):
+        return function
+
+@memoize_shape
+def wall(length, openings):
+    return Part.makeBox(length, 200, 3000).cut(Part.makeCompound([Part.makeBox(*o) for o in openings]))
+
+doc = FreeCAD.newDocument("House")
+doc.addObject("Part::Feature", "Front").Shape = wall(12000, [(900, 300, 2100)])
+doc.addObject("Part::Feature", "Back").Shape = wall(LENGTH, [(1200, 300, 1200)])
+'''
+
+
+class TestShapeCache(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(sys.modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        freecad_stub.install()
+        import Part
+        self.part = Part
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.builds = 0
+
+    def cache(self, max_bytes=10 ** 6):
+        return shape_cache.ShapeCache(self.directory.name, max_bytes, namespace="0.21.2")
+
+    def build(self):
+        def build():
+            self.builds += 1
+            return self.part.makeBox(1, 2, 3).cut(self.part.makeBox(1, 1, 1))
+        return build
+
+    def test_second_worker_reads_from_disk(self):
+        first = self.cache().get_or_build("wall", (12000, [{"x": 1}]), None, self.build())
+        cache = self.cache()
+        second = cache.get_or_build("wall", (12000.0, [{"x": 1.0}]), None, self.build())
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 0})
+        self.assertEqual(second.operation, first.operation)
+
+    def test_results_are_copies(self):
+        cache = self.cache()
+        shape = cache.get_or_build("wall", (1,), None, self.build())
+        shape.translate(freecad_stub.Vector(5, 0, 0))
+        again = cache.get_or_build("wall", (1,), None, self.build())
+        self.assertEqual(tuple(again.Placement.Base), (0.0, 0.0, 0.0))
+
+    def test_changed_arguments_miss(self):
+        cache = self.cache()
+        cache.get_or_build("wall", (1,), None, self.build())
+        cache.get_or_build("wall", (2,), None, self.build())
+        cache.get_or_build("wall", (1,), {"openings": None}, self.build())
+        self.assertEqual(self.builds, 3)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.cache(max_bytes=120)
+        for length in range(4):
+            cache.get_or_build("wall", (length,), None, self.build())
+        files = [name for _, _, names in os.walk(self.directory.name) for name in names]
+        self.assertLess(len(files), 4)
+        self.assertTrue(os.path.isfile(cache._path(cache.key("wall", (3,)))))
+
+    def test_uncacheable_arguments_are_built(self):
+        cache = self.cache()
+        for _ in range(2):
+            cache.get_or_build("wall", (object(),), None, self.build())
+        self.assertEqual(self.builds, 2)
+
+    def test_operation_tracks_function_code(self):
+        def wall(length):
+            return length * 2
+        same = wall
+
+        def wall(length):  # noqa: F811 - edited helper with the same name
+            return length * 3
+        self.assertEqual(shape_cache.operation_name(same), shape_cache.operation_name(same))
+        self.assertNotEqual(shape_cache.operation_name(same), shape_cache.operation_name(wall))
+
+    def test_operation_tracks_called_functions_and_globals(self):
+        namespace = {"Part": self.part, "HEIGHT": 3000}
+        exec("def post(r, h):\n    return Part.makeCylinder(r, h)\n", namespace)
+        cylinder = shape_cache.operation_name(namespace["post"])
+        exec("def post(r, h):\n    return Part.makeCone(r, h)\n", namespace)
+        self.assertNotEqual(shape_cache.operation_name(namespace["post"]), cylinder)
+
+        exec("def wall(length):\n    return Part.makeBox(length, 200, HEIGHT)\n", namespace)
+        before = shape_cache.operation_name(namespace["wall"])
+        namespace["HEIGHT"] = 2800
+        self.assertNotEqual(shape_cache.operation_name(namespace["wall"]), before)
+        namespace["HEIGHT"] = object()
+        with self.assertRaises(shape_cache.Uncacheable):
+            shape_cache.operation_name(namespace["wall"])
+
+
+class TestWorkerShapeCache(unittest.TestCase):
+    """A second sandboxed run reuses the unchanged wall"""
+
+    def test_changed_wall_is_the_only_rebuild(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sandbox = ScriptSandbox(SandboxConfig(timeout=30),
+                                    WorkerPoolConfig(use_stub=True, shape_cache_directory=directory))
+            first = sandbox.run("LENGTH = 9000\n" + WALL_SCRIPT)
+            second = sandbox.run("LENGTH = 8000\n" + WALL_SCRIPT)
+        self.assertEqual(first.status, "ok", first.error)
+        self.assertEqual(first.shape_cache, {"hits": 0, "misses": 2})
+        self.assertEqual(second.shape_cache, {"hits": 1, "misses": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+"""
+Tests for the NumPy rasterizer and cached model thumbnails
+"""
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import FreeCADConfig, ResultCacheConfig, ThumbnailConfig
+from services.ai_service import AIService
+from services.freecad_service import FreeCADService
+from services.thumbnail_service import ThumbnailService, get_thumbnail_service
+from utils.geometry_evaluator import evaluate_script
+from utils.rasterizer import BACKGROUND, Mesh, encode_png, mesh_from_shapes, read_stl, render
+
+SCRIPT = '''import FreeCAD
+import Part
+doc = FreeCAD.newDocument("Thumb")
+slab = Part.makeBox(1000, 1000, 100).cut(Part.makeBox(200, 200, 100, FreeCAD.Vector(400, 400, 0)))
+doc.addObject("Part::Feature", "Slab").Shape = slab
+tower = Part.makeBox(200, 200, 800)
+tower.translate(FreeCAD.Vector(0, 0, 100))
+doc.addObject("Part::Feature", "Tower").Shape = tower
+'''
+
+
+def decode_png(data: bytes) -> np.ndarray:
+    """Minimal reader for the unfiltered RGB PNGs encode_png writes"""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    width, height = struct.unpack('>II', data[16:24])
+    idat = data.index(b'IDAT')
+    length = struct.unpack('>I', data[idat - 4:idat])[0]
+    rows = np.frombuffer(zlib.decompress(data[idat + 4:idat + 4 + length]), dtype=np.uint8)
+    return rows.reshape(height, width * 3 + 1)[:, 1:].reshape(height, width, 3)
+
+
+def covered(image: np.ndarray) -> np.ndarray:
+    return np.any(image != np.array(BACKGROUND, dtype=np.uint8), axis=2)
+
+
+class TestRasterizer(unittest.TestCase):
+    def setUp(self):
+        self.mesh = mesh_from_shapes(evaluate_script(SCRIPT).shapes)
+
+    def test_mesh_is_the_closed_cell_boundary(self):
+        # 8 slab cells around the hole and one tower cell: every exposed cell face is two triangles
+        self.assertEqual(len(self.mesh) % 2, 0)
+        edges = np.concatenate([self.mesh.triangles[:, [0, 1]], self.mesh.triangles[:, [1, 2]],
+                                self.mesh.triangles[:, [2, 0]]]).round(6)
+        # Closed surfaces use each directed edge once in each direction
+        forward = {tuple(edge.ravel()) for edge in edges}
+        backward = {tuple(edge[::-1].ravel()) for edge in edges}
+        self.assertEqual(forward, backward)
+        self.assertEqual(len(set(map(tuple, self.mesh.colors))), 2)
+
+    def test_top_view_shows_the_hole_and_footprint(self):
+        image = render(self.mesh, 'top', 100)
+        mask = covered(image)
+        self.assertFalse(mask[50, 50])  # the hole in the middle of the slab
+        self.assertTrue(mask[20, 80])
+        # The tower at the origin (bottom left) hides the slab below it
+        self.assertFalse(np.array_equal(image[90, 10], image[90, 30]))
+        rows, cols = np.nonzero(mask)
+        self.assertLessEqual(cols.max() - cols.min() - (rows.max() - rows.min()), 1)  # square footprint
+
+    def test_isometric_view_is_fitted_to_the_frame(self):
+        mask = covered(render(self.mesh, 'isometric', 80))
+        rows, cols = np.nonzero(mask)
+        # The larger extent fills the frame less the margins, the other one is centred
+        self.assertGreaterEqual(max(rows.max() - rows.min(), cols.max() - cols.min()), 68)
+        self.assertLessEqual(abs(rows.min() + rows.max() - 79), 2)
+        self.assertLessEqual(abs(cols.min() + cols.max() - 79), 2)
+        self.assertFalse(mask[0].any() or mask[-1].any())
+
+    def test_matches_a_per_pixel_reference(self):
+        # One triangle in the top view: coverage equals the point-in-triangle test at pixel centres
+        triangle = np.array([[[0.0, 0.0, 0.0], [10.0, 2.0, 0.0], [3.0, 9.0, 0.0]]])
+        image = render(Mesh(triangle, np.ones((1, 3))), 'top', 40)
+        scale = 40 * (1 - 2 * 0.06) / 10
+        xs = (np.arange(40) + 0.5 - 20) / scale + 5
+        ys = (20 - np.arange(40) - 0.5) / scale + 4.5
+        x, y = np.meshgrid(xs, ys)
+        (ax, ay), (bx, by), (cx, cy) = triangle[0, :, :2]
+        sides = [(bx - ax) * (y - ay) - (by - ay) * (x - ax), (cx - bx) * (y - by) - (cy - by) * (x - bx),
+                 (ax - cx) * (y - cy) - (ay - cy) * (x - cx)]
+        expected = np.all([side >= 0 for side in sides], axis=0)
+        self.assertLessEqual(np.count_nonzero(covered(image) != expected), 2)  # edge pixels may round either way
+
+    def test_empty_mesh_and_unknown_view(self):
+        self.assertTrue(np.all(render(Mesh(), 'top', 8) == np.array(BACKGROUND, dtype=np.uint8)))
+        with self.assertRaises(ValueError):
+            render(self.mesh, 'side')
+
+    def test_png_and_stl_round_trip(self):
+        image = render(self.mesh, 'isometric', 32)
+        np.testing.assert_array_equal(decode_png(encode_png(image)), image)
+
+        binary = (b'\0' * 80 + struct.pack('<I', len(self.mesh))
+                  + b''.join(struct.pack('<12fH', 0, 0, 0, *triangle.ravel(), 0) for triangle in self.mesh.triangles))
+        np.testing.assert_allclose(read_stl(binary).triangles, self.mesh.triangles)
+        ascii_stl = b'solid t\n' + b''.join(
+            b'facet normal 0 0 0\nouter loop\n'
+            + b''.join(b'vertex %g %g %g\n' % tuple(vertex) for vertex in triangle)
+            + b'endloop\nendfacet\n' for triangle in self.mesh.triangles[:4]) + b'endsolid t\n'
+        np.testing.assert_allclose(read_stl(ascii_stl).triangles, self.mesh.triangles[:4])
+
+
+class TestThumbnailService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = ThumbnailConfig(directory=self.directory.name, size=48)
+        self.service = ThumbnailService(self.config)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_thumbnails_are_cached_by_model_hash(self):
+        paths = self.service.thumbnails(SCRIPT)
+        self.assertEqual(sorted(paths), ["isometric", "top"])
+        self.assertEqual(decode_png(paths["top"].read_bytes()).shape, (48, 48, 3))
+        # Comments and formatting do not change the model hash
+        self.assertEqual(self.service.thumbnail("# same model\n" + SCRIPT, "top"), paths["top"])
+        self.assertEqual(self.service.stats(), {"hits": 1, "misses": 2})
+
+    def test_failed_scripts_are_not_retried(self):
+        self.assertIsNone(self.service.thumbnail("import FreeCAD\nraise RuntimeError('broken')\n"))
+        self.assertIsNone(self.service.thumbnail("import FreeCAD\nraise RuntimeError('broken')\n",
+                                                 shapes=evaluate_script(SCRIPT).shapes))
+
+    def test_timeouts_are_retried(self):
+        self.config.evaluation_timeout = 0.2
+        slow = "import FreeCAD\nwhile True:\n    pass\n"
+        self.assertIsNone(self.service.thumbnail(slow))
+        self.assertFalse(self.service.failed(slow))
+        # Running out of memory under the limit is not held against the script either
+        self.config.memory_limit_mb = 512
+        hungry = "x = bytearray(2 * 1024 ** 3)\n"
+        self.assertIsNone(self.service.thumbnail(hungry))
+        self.assertFalse(self.service.failed(hungry))
+        self.service.thumbnail("import FreeCAD\nraise RuntimeError('broken')\n")
+        self.assertTrue(self.service.failed("import FreeCAD\nraise RuntimeError('broken')\n"))
+
+    def test_gallery_renders_in_the_background(self):
+        service = get_thumbnail_service(self.config)
+        self.assertIs(get_thumbnail_service(ThumbnailConfig(directory=self.directory.name)), service)
+        self.assertIsNone(service.cached(SCRIPT))
+        self.assertTrue(service.render_later(SCRIPT))
+        self.assertFalse(service.render_later(SCRIPT))
+        for future in list(service._pending.values()):
+            future.result(timeout=30)
+        self.assertTrue(service.cached(SCRIPT).is_file())
+
+    def test_stl_and_preview_shapes_skip_evaluation(self):
+        mesh = mesh_from_shapes(evaluate_script(SCRIPT).shapes)
+        stl = os.path.join(self.directory.name, "model.stl")
+        with open(stl, "wb") as f:
+            f.write(b'\0' * 80 + struct.pack('<I', len(mesh)) + b''.join(
+                struct.pack('<12fH', 0, 0, 0, *triangle.ravel(), 0) for triangle in mesh.triangles))
+        # Neither script can be evaluated, the mesh comes from elsewhere
+        self.assertIsNotNone(self.service.thumbnail("import os\n", stl_path=stl))
+        self.assertIsNotNone(self.service.thumbnail("import sys\n", shapes=evaluate_script(SCRIPT).shapes))
+
+    def test_freecad_service_renders_templates(self):
+        config = FreeCADConfig(result_cache=ResultCacheConfig(enabled=False), thumbnails=self.config)
+        service = FreeCADService(config)
+        code = AIService._create_simple_2bhk_model(None)
+        report = service.preview_geometry(code)
+        paths = service.render_thumbnails(code, report.shapes)
+        self.assertEqual(len(paths), 2)
+        self.assertGreater(covered(decode_png(paths["isometric"].read_bytes())).mean(), 0.2)
+
+        config.thumbnails.enabled = False
+        self.assertEqual(service.render_thumbnails(code), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
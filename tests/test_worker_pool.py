@@ -0,0 +1,161 @@
+"""
+Tests for the headless FreeCAD worker pool (using the stub worker)
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest import mock
+
+from config.settings import FreeCADConfig, GuiBridgeConfig, ResultCacheConfig, SandboxConfig, WorkerPoolConfig
+from services.freecad_service import FreeCADService
+from services.worker_pool import FreeCADWorkerPool, WORKER_SCRIPT, REPOSITORY_ROOT
+
+
+MODEL_SCRIPT = '''import FreeCAD
+import Part
+
+doc = FreeCAD.newDocument("Model")
+for i in range(3):
+    box = Part.makeBox(10, 10, 10)
+    box.translate(FreeCAD.Vector(20 * i, 0, 0))
+    doc.addObject("Part::Feature", f"Box{i}").Shape = box
+print("built")
+doc.recompute()
+'''
+
+
+class TestWorkerProtocol(unittest.TestCase):
+    """Talk to a stub worker directly over its pipes"""
+
+    def test_ready_run_and_shutdown(self):
+        """The worker announces itself, answers requests in order and exits"""
+        env = dict(os.environ, FREECAD_WORKER_STUB="1", FREECAD_WORKER_ROOT=str(REPOSITORY_ROOT))
+        requests = [{"type": "run", "id": "a", "code": MODEL_SCRIPT},
+                    {"type": "ping", "id": "b"},
+                    {"type": "shutdown", "id": "c"}]
+        completed = subprocess.run([sys.executable, str(WORKER_SCRIPT)], env=env, text=True,
+                                   input="".join(json.dumps(r) + "\n" for r in requests),
+                                   capture_output=True, timeout=30)
+        messages = [json.loads(line) for line in completed.stdout.splitlines()]
+
+        self.assertEqual([m["type"] for m in messages], ["ready", "result", "pong", "bye"])
+        self.assertTrue(messages[0]["stub"])
+        self.assertEqual(messages[1]["id"], "a")
+        self.assertEqual(messages[1]["object_count"], 3)
+        self.assertEqual(messages[1]["stdout"], "built\n")
+        self.assertEqual(completed.returncode, 0)
+
+
+class TestWorkerPool(unittest.TestCase):
+    """Test script execution through the pool"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = FreeCADWorkerPool(WorkerPoolConfig(use_stub=True, size=2, max_runs_per_worker=3))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def test_run_reports_objects_and_artifacts(self):
+        """Successful runs return object counts and export paths"""
+        with tempfile.TemporaryDirectory() as directory:
+            step_path = os.path.join(directory, "model.step")
+            result = self.pool.run(MODEL_SCRIPT, exports=[{"format": "step", "path": step_path}])
+            self.assertTrue(result.success)
+            self.assertEqual(result.object_count, 3)
+            self.assertEqual([o["name"] for o in result.objects], ["Box0", "Box1", "Box2"])
+            self.assertEqual(result.artifacts, [step_path])
+            self.assertTrue(os.path.exists(step_path))
+
+    def test_each_run_gets_a_fresh_document(self):
+        """Documents from earlier runs do not leak into later ones"""
+        script = "import FreeCAD\nFreeCAD.ActiveDocument.addObject('Part::Feature', 'Only')\n"
+        for _ in range(3):
+            self.assertEqual(self.pool.run(script).object_count, 1)
+
+    def test_script_errors_are_reported(self):
+        """Exceptions come back as structured errors and the worker survives"""
+        result = self.pool.run("raise ValueError('bad wall')")
+        self.assertEqual(result.status, "error")
+        self.assertIn("ValueError: bad wall", result.error)
+        self.assertIn("Traceback", result.traceback)
+        self.assertTrue(self.pool.run("x = 1").success)
+
+    def test_timeout_replaces_worker(self):
+        """A runaway script is killed and the pool keeps working"""
+        result = self.pool.run("while True:\n    pass\n", timeout=1)
+        self.assertEqual(result.status, "timeout")
+        self.assertTrue(self.pool.run("x = 1").success)
+
+    def test_crash_is_reported(self):
+        """A worker that dies mid-run is reported and replaced"""
+        result = self.pool.run("import os\nos._exit(3)\n")
+        self.assertEqual(result.status, "crashed")
+        self.assertIn("code 3", result.error)
+        self.assertTrue(self.pool.run("x = 1").success)
+
+    def test_submit_runs_concurrently(self):
+        """Queued scripts are spread over the workers"""
+        futures = [self.pool.submit(f"print({i})") for i in range(6)]
+        results = [future.result(timeout=30) for future in futures]
+        self.assertEqual([r.stdout for r in results], [f"{i}\n" for i in range(6)])
+        self.assertLessEqual(len({r.worker_pid for r in results}), 4)
+
+    def test_status_lists_workers(self):
+        self.pool.run("x = 1")
+        status = self.pool.status()
+        self.assertTrue(status)
+        self.assertTrue(all(worker["stub"] for worker in status))
+        self.assertLessEqual(len(status), 2)
+
+    def test_cpu_limit_applies_to_each_run(self):
+        """Pool workers run under the sandbox's CPU limit, counted per run"""
+        with FreeCADWorkerPool(WorkerPoolConfig(use_stub=True, size=1),
+                               limits=SandboxConfig(cpu_time_limit=1, memory_limit_mb=None)) as pool:
+            for _ in range(3):
+                self.assertTrue(pool.run("total = sum(range(2000000))").success)
+            spin = pool.run("while True:\n    pass\n", timeout=20)
+            self.assertEqual(spin.status, "cpu_limit")
+
+
+class TestServiceHeadlessExecution(unittest.TestCase):
+    """Test FreeCADService integration"""
+
+    def test_run_headless_uses_pool(self):
+        config = FreeCADConfig(worker_pool=WorkerPoolConfig(enabled=True, use_stub=True, size=1),
+                               result_cache=ResultCacheConfig(enabled=False))
+        result = FreeCADService(config).run_headless(MODEL_SCRIPT)
+        self.assertTrue(result.success)
+        self.assertEqual(result.object_count, 3)
+
+    def test_gui_opens_the_headless_document(self):
+        """A successful headless run is opened, not rebuilt, by the GUI"""
+        config = FreeCADConfig(worker_pool=WorkerPoolConfig(enabled=True, use_stub=True, size=1),
+                               result_cache=ResultCacheConfig(enabled=False),
+                               gui_bridge=GuiBridgeConfig(enabled=False))
+        service = FreeCADService(config)
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(service, "_launch_freecad_with_script", return_value=True) as launch:
+            result = service.execute_code_and_open_freecad(MODEL_SCRIPT, os.path.join(directory, "model.py"))
+            document = os.path.join(os.path.realpath(directory), "model.FCStd")
+            self.assertTrue(os.path.exists(document))
+        self.assertEqual(result["document"], document)
+        self.assertEqual(launch.call_args.args[2], document)
+
+    def test_missing_freecad_returns_none(self):
+        config = FreeCADConfig(worker_pool=WorkerPoolConfig(
+            enabled=True, freecadcmd_path="/nonexistent/FreeCADCmd"),
+            result_cache=ResultCacheConfig(enabled=False))
+        self.assertIsNone(FreeCADService(config).run_headless("x = 1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
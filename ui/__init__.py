@@ -5,8 +5,10 @@ Professional Streamlit UI components and styling
 
 from .components import UIComponents
 from .styling import apply_professional_styling
+from .preview_component import render_mesh_preview
 
 __all__ = [
     'UIComponents',
-    'apply_professional_styling'
+    'apply_professional_styling',
+    'render_mesh_preview'
 ]
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+3D Preview Component
+Embedded WebGL viewer for the compact mesh payload of utils.mesh_decimation
+"""
+
+import base64
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+# Self-contained: no external scripts, the payload is inlined as base64
+PREVIEW_TEMPLATE = """
+<div style="position: relative; font-family: sans-serif;">
+  <canvas id="preview" style="width: 100%; height: __HEIGHT__px; display: block; border-radius: 8px;
+          background: #f5f6f8; cursor: grab;"></canvas>
+  <div style="position: absolute; left: 10px; bottom: 8px; font-size: 12px; color: #6c757d;">
+    Drag to orbit, scroll to zoom, double-click to reset
+  </div>
+</div>
+<script>
+(function () {
+  const canvas = document.getElementById("preview");
+  const gl = canvas.getContext("webgl", {antialias: true});
+  if (!gl) {
+    canvas.outerHTML = "<p>WebGL is not available in this browser.</p>";
+    return;
+  }
+
+  // Payload: magic, counts, bounds, uint16 positions, uint16/uint32 indices, rgb per triangle
+  const bytes = Uint8Array.from(atob("__PAYLOAD__"), c => c.charCodeAt(0));
+  const data = new DataView(bytes.buffer);
+  const vertexCount = data.getUint32(4, true), triangleCount = data.getUint32(8, true);
+  const lower = [0, 1, 2].map(i => data.getFloat32(12 + 4 * i, true));
+  const step = [0, 1, 2].map(i => data.getFloat32(24 + 4 * i, true));
+  let offset = __HEADER_SIZE__;
+  const quantized = new Uint16Array(bytes.buffer, offset, vertexCount * 3);
+  offset += Math.ceil(vertexCount * 6 / 4) * 4;
+  const indices = vertexCount <= 65535 ? new Uint16Array(bytes.buffer, offset, triangleCount * 3)
+                                       : new Uint32Array(bytes.buffer, offset, triangleCount * 3);
+  offset += Math.ceil(triangleCount * 3 * indices.BYTES_PER_ELEMENT / 4) * 4;
+  const rgb = new Uint8Array(bytes.buffer, offset, triangleCount * 3);
+
+  // Flat shading needs one normal per triangle, so the mesh is unindexed here
+  const positions = new Float32Array(triangleCount * 9);
+  const normals = new Float32Array(triangleCount * 9);
+  const colors = new Float32Array(triangleCount * 9);
+  for (let t = 0; t < triangleCount; t++) {
+    const corners = [];
+    for (let k = 0; k < 3; k++) {
+      const v = indices[3 * t + k];
+      corners.push([0, 1, 2].map(a => lower[a] + quantized[3 * v + a] * step[a]));
+    }
+    const u = [0, 1, 2].map(a => corners[1][a] - corners[0][a]);
+    const w = [0, 1, 2].map(a => corners[2][a] - corners[0][a]);
+    const n = [u[1] * w[2] - u[2] * w[1], u[2] * w[0] - u[0] * w[2], u[0] * w[1] - u[1] * w[0]];
+    const length = Math.hypot(n[0], n[1], n[2]) || 1;
+    for (let k = 0; k < 3; k++) {
+      for (let a = 0; a < 3; a++) {
+        positions[9 * t + 3 * k + a] = corners[k][a];
+        normals[9 * t + 3 * k + a] = n[a] / length;
+        colors[9 * t + 3 * k + a] = rgb[3 * t + a] / 255;
+      }
+    }
+  }
+
+  const vertexSource = `
+    attribute vec3 position; attribute vec3 normal; attribute vec3 color;
+    uniform mat4 transform; uniform mat3 rotation; varying vec3 shade;
+    void main() {
+      gl_Position = transform * vec4(position, 1.0);
+      float lambert = abs(dot(normalize(rotation * normal), normalize(vec3(-0.35, 0.55, 0.75))));
+      shade = color * (0.35 + 0.65 * lambert);
+    }`;
+  const fragmentSource = `
+    precision mediump float; varying vec3 shade;
+    void main() { gl_FragColor = vec4(shade, 1.0); }`;
+  function compile(type, source) {
+    const shader = gl.createShader(type);
+    gl.shaderSource(shader, source);
+    gl.compileShader(shader);
+    return shader;
+  }
+  const program = gl.createProgram();
+  gl.attachShader(program, compile(gl.VERTEX_SHADER, vertexSource));
+  gl.attachShader(program, compile(gl.FRAGMENT_SHADER, fragmentSource));
+  gl.linkProgram(program);
+  gl.useProgram(program);
+  for (const [name, values] of [["position", positions], ["normal", normals], ["color", colors]]) {
+    gl.bindBuffer(gl.ARRAY_BUFFER, gl.createBuffer());
+    gl.bufferData(gl.ARRAY_BUFFER, values, gl.STATIC_DRAW);
+    const location = gl.getAttribLocation(program, name);
+    gl.enableVertexAttribArray(location);
+    gl.vertexAttribPointer(location, 3, gl.FLOAT, false, 0, 0);
+  }
+  gl.enable(gl.DEPTH_TEST);
+
+  const centre = [0, 1, 2].map(a => lower[a] + step[a] * 65535 / 2);
+  const radius = Math.max(Math.hypot(...step.map(s => s * 65535)) / 2, 1e-6);
+  const initial = {azimuth: -Math.PI / 4, elevation: Math.asin(1 / Math.sqrt(3)), zoom: 1};
+  let camera = Object.assign({}, initial);
+
+  function draw() {
+    const width = canvas.clientWidth, height = canvas.clientHeight, ratio = window.devicePixelRatio || 1;
+    canvas.width = width * ratio;
+    canvas.height = height * ratio;
+    gl.viewport(0, 0, canvas.width, canvas.height);
+    gl.clearColor(0.961, 0.965, 0.973, 1);
+    gl.clear(gl.COLOR_BUFFER_BIT | gl.DEPTH_BUFFER_BIT);
+
+    // Screen right, screen up and the direction towards the viewer, z up as in FreeCAD
+    const ce = Math.cos(camera.elevation), se = Math.sin(camera.elevation);
+    const toward = [ce * Math.cos(camera.azimuth), ce * Math.sin(camera.azimuth), se];
+    const right = [-Math.sin(camera.azimuth), Math.cos(camera.azimuth), 0];
+    const up = [toward[1] * right[2] - toward[2] * right[1], toward[2] * right[0] - toward[0] * right[2],
+                toward[0] * right[1] - toward[1] * right[0]];
+    const scale = camera.zoom / (radius * 1.05);
+    const sx = scale * Math.min(1, height / width), sy = scale * Math.min(1, width / height), sz = -0.5 / radius;
+    const dot = (a, b) => a[0] * b[0] + a[1] * b[1] + a[2] * b[2];
+    const transform = [];
+    for (let a = 0; a < 3; a++) transform.push(sx * right[a], sy * up[a], sz * toward[a], 0);
+    transform.push(-sx * dot(right, centre), -sy * dot(up, centre), -sz * dot(toward, centre), 1);
+    const rotation = [];
+    for (let a = 0; a < 3; a++) rotation.push(right[a], up[a], toward[a]);
+    gl.uniformMatrix4fv(gl.getUniformLocation(program, "transform"), false, new Float32Array(transform));
+    gl.uniformMatrix3fv(gl.getUniformLocation(program, "rotation"), false, new Float32Array(rotation));
+    gl.drawArrays(gl.TRIANGLES, 0, triangleCount * 3);
+  }
+
+  let dragging = null;
+  canvas.addEventListener("mousedown", e => { dragging = [e.clientX, e.clientY]; canvas.style.cursor = "grabbing"; });
+  window.addEventListener("mouseup", () => { dragging = null; canvas.style.cursor = "grab"; });
+  window.addEventListener("mousemove", e => {
+    if (!dragging) return;
+    camera.azimuth -= (e.clientX - dragging[0]) * 0.01;
+    camera.elevation = Math.max(-1.55, Math.min(1.55, camera.elevation + (e.clientY - dragging[1]) * 0.01));
+    dragging = [e.clientX, e.clientY];
+    requestAnimationFrame(draw);
+  });
+  canvas.addEventListener("wheel", e => {
+    e.preventDefault();
+    camera.zoom = Math.max(0.2, Math.min(50, camera.zoom * Math.exp(-e.deltaY * 0.001)));
+    requestAnimationFrame(draw);
+  }, {passive: false});
+  canvas.addEventListener("dblclick", () => { camera = Object.assign({}, initial); requestAnimationFrame(draw); });
+  window.addEventListener("resize", () => requestAnimationFrame(draw));
+  draw();
+})();
+</script>
+"""
+
+
+def mesh_preview_html(payload: bytes, height: int = 480) -> str:
+    """Standalone HTML page that renders a mesh payload with WebGL"""
+    from utils.mesh_decimation import HEADER_SIZE
+
+    return (PREVIEW_TEMPLATE
+            .replace("__PAYLOAD__", base64.b64encode(payload).decode("ascii"))
+            .replace("__HEADER_SIZE__", str(HEADER_SIZE))
+            .replace("__HEIGHT__", str(height)))
+
+
+def render_mesh_preview(payload: bytes, height: int = 480) -> None:
+    """Embed an orbitable 3D view of a mesh payload"""
+    if not payload:
+        st.info("No geometry to preview")
+        return
+    components.html(mesh_preview_html(payload, height), height=height + 10)
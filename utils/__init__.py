@@ -5,7 +5,11 @@ from .logging_config import get_logger
 from .exceptions import (
     VoiceToCADError,
     AIGenerationError, 
+    SceneGraphError,
+    LayoutError,
     FreeCADLaunchError,
+    WorkerPoolError,
+    ProcessLimitError,
     AudioProcessingError,
     CodeCleaningError,
     ExceptionContext,
@@ -18,7 +22,11 @@ __all__ = [
     'get_logger',
     'VoiceToCADError',
     'AIGenerationError',
+    'SceneGraphError',
+    'LayoutError',
     'FreeCADLaunchError', 
+    'WorkerPoolError',
+    'ProcessLimitError',
     'AudioProcessingError',
     'CodeCleaningError',
     'ExceptionContext',
@@ -0,0 +1,1203 @@
+"""
+AST optimization passes for AI generated FreeCAD scripts
+
+Generated code tends to build geometry the slow way: shapes are fused one
+at a time inside Python loops, so every iteration runs a full OCC boolean
+on an ever growing shape. The passes in this module rewrite those patterns
+into cheaper equivalents while leaving the rest of the script (including
+its comments) untouched.
+"""
+import ast
+import difflib
+from collections import Counter
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.level_of_detail import LevelOfDetail, detail_lines
+from utils.logging_config import get_logger
+
+# Shape methods that run an OCC boolean operation
+BOOLEAN_METHODS = ('fuse', 'cut', 'common', 'multiFuse')
+
+# Shape methods that modify the shape in place (and return it)
+IN_PLACE_METHODS = ('translate', 'rotate', 'scale', 'transformShape', 'reverse')
+
+# Shape methods that only round edges; left out below full detail
+ROUNDING_METHODS = ('makeFillet', 'makeChamfer')
+
+# Trip count assumed for loops whose iterable cannot be resolved statically
+DEFAULT_LOOP_TRIPS = 10
+
+FUSE_STRATEGIES = ('multifuse', 'compound')
+
+INSTANCING_MODES = ('link', 'placement')
+
+# Calls known to be free of side effects; only these are hoisted out of loops
+SHAPE_CONSTRUCTORS = frozenset(f'Part.{name}' for name in (
+    'makeBox', 'makeCylinder', 'makeCone', 'makeSphere', 'makeTorus', 'makeWedge',
+    'makePlane', 'makeCircle', 'makeLine', 'makePolygon', 'makeHelix',
+    'Face', 'Wire', 'Edge',
+))
+PURE_FUNCTIONS = SHAPE_CONSTRUCTORS | frozenset(
+    [f'{module}.{name}' for module in ('FreeCAD', 'App') for name in ('Vector', 'Rotation', 'Placement')]
+    + [f'math.{name}' for name in ('sin', 'cos', 'tan', 'radians', 'degrees', 'sqrt', 'atan2', 'hypot')]
+    + ['abs', 'min', 'max', 'float', 'int', 'round']
+)
+
+# Shape methods that return a new shape and leave the receiver untouched
+PURE_METHODS = ('copy', 'translated', 'rotated', 'scaled', 'transformed', 'extrude', 'revolve',
+                'fuse', 'cut', 'common', 'multiFuse', 'section', 'makeFillet', 'makeChamfer')
+
+# Pure shape methods that run an OCC algorithm; hoisting these pays even when
+# every iteration then needs its own copy()
+COSTLY_METHODS = ('extrude', 'revolve', 'fuse', 'cut', 'common', 'multiFuse', 'section',
+                  'makeFillet', 'makeChamfer')
+
+# In-place transform -> equivalent method returning a moved copy
+TRANSFORM_COPIES = {'translate': 'translated', 'rotate': 'rotated'}
+
+# Part primitives that can be shared between placed instances
+INSTANCEABLE_CONSTRUCTORS = ('makeBox', 'makeCylinder', 'makeCone', 'makeSphere',
+                             'makeTorus', 'makeWedge')
+
+
+@dataclass
+class OptimizationReport:
+    """Summary of what the optimizer changed in a script"""
+    applied: Dict[str, int] = field(default_factory=dict)
+    boolean_ops_before: int = 0
+    boolean_ops_after: int = 0
+    execution_time_before: Optional[float] = None
+    execution_time_after: Optional[float] = None
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return any(self.applied.values())
+
+    @property
+    def speedup(self) -> Optional[float]:
+        if self.execution_time_before and self.execution_time_after:
+            return self.execution_time_before / self.execution_time_after
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result['changed'] = self.changed
+        result['speedup'] = self.speedup
+        return result
+
+
+def _names_in(node: ast.AST) -> List[str]:
+    """All variable names referenced anywhere inside a node"""
+    return [n.id for n in ast.walk(node) if isinstance(n, ast.Name)]
+
+
+def _match_accumulate(stmt: ast.stmt, method: str) -> Optional[Tuple[str, ast.expr]]:
+    """Match ``acc = acc.<method>(arg)`` and return ``(acc, arg)``"""
+    if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1):
+        return None
+    target = stmt.targets[0]
+    call = stmt.value
+    if not (isinstance(target, ast.Name) and isinstance(call, ast.Call)):
+        return None
+    func = call.func
+    if not (isinstance(func, ast.Attribute) and func.attr == method
+            and isinstance(func.value, ast.Name) and func.value.id == target.id):
+        return None
+    if len(call.args) != 1 or call.keywords:
+        return None
+    arg = call.args[0]
+    if isinstance(arg, (ast.List, ast.Tuple, ast.Starred)) or target.id in _names_in(arg):
+        return None
+    return target.id, arg
+
+
+def _is_fresh_shape(name: str, statements: List[ast.stmt]) -> bool:
+    """Check that ``name`` is bound to a newly built shape in ``statements``
+
+    Collecting shapes in a list is only safe when every iteration produces a
+    distinct object; aliases and in-place transforms of an outer shape would
+    otherwise end up in the list several times.
+    """
+    fresh = False
+    for stmt in statements:
+        if not isinstance(stmt, ast.Assign):
+            continue
+        if not any(isinstance(t, ast.Name) and t.id == name for t in stmt.targets):
+            continue
+        value = stmt.value
+        if isinstance(value, ast.Call):
+            func = value.func
+            if isinstance(func, ast.Attribute) and func.attr in IN_PLACE_METHODS:
+                receiver = func.value
+                fresh = fresh and isinstance(receiver, ast.Name) and receiver.id == name
+            else:
+                fresh = True
+        else:
+            fresh = False
+    return fresh
+
+
+def _first_access(name: str, stmt: ast.stmt) -> Optional[str]:
+    """How ``stmt`` first touches ``name``: 'read', 'write' or None
+
+    Compound statements are treated as writes when their body rebinds the
+    name before reading it; anything that cannot be decided is a read.
+    """
+    if name not in _names_in(stmt):
+        return None
+    if isinstance(stmt, ast.Assign):
+        if name in _names_in(stmt.value):
+            return 'read'
+        if any(isinstance(t, ast.Name) and t.id == name for t in stmt.targets):
+            return 'write'
+        return 'read'
+    if isinstance(stmt, (ast.For, ast.While)):
+        header = stmt.iter if isinstance(stmt, ast.For) else stmt.test
+        if name in _names_in(header):
+            return 'read'
+        if isinstance(stmt, ast.For) and name in _names_in(stmt.target):
+            return 'write'
+        for inner in stmt.body:
+            access = _first_access(name, inner)
+            if access:
+                return access
+    return 'read'
+
+
+def _assigned_names(statements: List[ast.stmt]) -> set:
+    """Names bound anywhere in ``statements``"""
+    return {n.id for stmt in statements for n in ast.walk(stmt)
+            if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+
+
+class OptimizationPass(ast.NodeTransformer):
+    """Base class for optimizer passes"""
+
+    name = "base"
+
+    def __init__(self):
+        self.rewrites = 0
+        self._counter = 0
+        self._imports = set()
+        self._taken = set()
+        self._parents = {}
+
+    def _temp_name(self, prefix: str) -> str:
+        while True:
+            self._counter += 1
+            name = f"_{prefix}_{self._counter}"
+            if name not in self._taken:
+                self._taken.add(name)
+                return name
+
+    def run(self, tree: ast.Module, source: str = '') -> ast.Module:
+        """Transform ``tree``, parsed from ``source`` (for passes reading comments)"""
+        self._imports = {alias.asname or alias.name
+                         for node in ast.walk(tree) if isinstance(node, ast.Import)
+                         for alias in node.names}
+        self._taken = set(_names_in(tree))
+        self._parents = {}
+        for parent in ast.walk(tree):
+            for field_name in ('body', 'orelse', 'finalbody'):
+                statements = getattr(parent, field_name, None)
+                if isinstance(statements, list):
+                    for stmt in statements:
+                        self._parents[id(stmt)] = (parent, statements)
+        tree = self.visit(tree)
+        return ast.fix_missing_locations(tree)
+
+    def _read_later(self, name: str, stmt: ast.stmt) -> bool:
+        """Whether ``name`` may be read after ``stmt`` before being rebound"""
+        while id(stmt) in self._parents:
+            parent, statements = self._parents[id(stmt)]
+            for following in statements[statements.index(stmt) + 1:]:
+                access = _first_access(name, following)
+                if access:
+                    return access == 'read'
+            if isinstance(parent, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef)):
+                return False
+            stmt = parent
+        return False
+
+
+def _part_call(function: str, args: List[ast.expr]) -> ast.Call:
+    """Build ``Part.<function>(*args)``"""
+    return ast.Call(func=ast.Attribute(value=ast.Name(id='Part', ctx=ast.Load()),
+                                       attr=function, ctx=ast.Load()),
+                    args=args, keywords=[])
+
+
+def _method_call(receiver: ast.expr, method: str, args: List[ast.expr]) -> ast.Call:
+    """Build ``receiver.<method>(*args)``"""
+    return ast.Call(func=ast.Attribute(value=receiver, attr=method, ctx=ast.Load()),
+                    args=args, keywords=[])
+
+
+class BooleanBatchingPass(OptimizationPass):
+    """Collect the tools of repeated ``acc = acc.<method>(tool)`` booleans
+
+    Subclasses decide how the collected tools are applied in one go. Both
+    loops and straight-line runs of statements are handled; statements in
+    between are allowed as long as they never look at the accumulator and
+    never touch a tool after it was collected.
+    """
+
+    method = ""
+
+    def _combine(self, acc: str, tools: ast.expr) -> ast.stmt:
+        raise NotImplementedError
+
+    def _applicable(self) -> bool:
+        return True
+
+    def visit_Module(self, node: ast.Module) -> ast.Module:
+        if not self._applicable():
+            return node
+        return self.generic_visit(node)
+
+    def visit_For(self, node: ast.For):
+        # Visit nested statements first but merge this loop's own chains
+        # only afterwards, so every boolean in the body can be collected
+        ast.NodeTransformer.generic_visit(self, node)
+        matches: Dict[str, List[int]] = {}
+        for index, stmt in enumerate(node.body):
+            match = _match_accumulate(stmt, self.method)
+            if match:
+                matches.setdefault(match[0], []).append(index)
+
+        prologue, epilogue = [], []
+        for acc, indices in matches.items():
+            if acc in _names_in(node.target) or any(acc in _names_in(s) for s in node.orelse):
+                continue
+            # The accumulator may only be touched by the boolean statements
+            uses = sum(1 for s in node.body for n in _names_in(s) if n == acc)
+            if uses != 2 * len(indices):
+                continue
+            tools = self._temp_name(f"{self.method}_tools")
+            for index in indices:
+                arg = node.body[index].value.args[0]
+                item = arg
+                if not (isinstance(arg, ast.Call)
+                        or (isinstance(arg, ast.Name)
+                            and _is_fresh_shape(arg.id, node.body[:index])
+                            and not any(arg.id in _names_in(s) for s in node.body[index + 1:]))):
+                    item = _method_call(arg, 'copy', [])
+                node.body[index] = ast.Expr(value=_method_call(
+                    ast.Name(id=tools, ctx=ast.Load()), 'append', [item]))
+            prologue.append(ast.Assign(targets=[ast.Name(id=tools, ctx=ast.Store())],
+                                       value=ast.List(elts=[], ctx=ast.Load())))
+            epilogue.append(ast.If(test=ast.Name(id=tools, ctx=ast.Load()),
+                                   body=[self._combine(acc, ast.Name(id=tools, ctx=ast.Load()))],
+                                   orelse=[]))
+            self.rewrites += 1
+        node.body = self._merge_chains(node.body)
+        if node.orelse:
+            node.orelse = self._merge_chains(node.orelse)
+        if not prologue:
+            return node
+        return prologue + [node] + epilogue
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        super().generic_visit(node)
+        for field_name in ('body', 'orelse', 'finalbody'):
+            statements = getattr(node, field_name, None)
+            if isinstance(statements, list) and statements and isinstance(statements[0], ast.stmt):
+                setattr(node, field_name, self._merge_chains(statements))
+        return node
+
+    def _chain_members(self, statements: List[ast.stmt], start: int, acc: str) -> List[int]:
+        """Indices of the booleans on ``acc`` that can be batched from ``start``"""
+        members = [start]
+        for index in range(start + 1, len(statements)):
+            match = _match_accumulate(statements[index], self.method)
+            if match and match[0] == acc:
+                members.append(index)
+            elif acc in _names_in(statements[index]):
+                break
+
+        # A collected tool must not be used (e.g. moved in place) before the
+        # batched boolean runs, unless its name has been rebound first
+        for position, member in enumerate(members[:-1]):
+            tool = statements[member].value.args[0]
+            if isinstance(tool, ast.Call):
+                continue
+            if not isinstance(tool, ast.Name):
+                return members[:position]
+            for later in statements[member + 1:members[-1] + 1]:
+                later_match = _match_accumulate(later, self.method)
+                if later_match and later_match[0] == acc and isinstance(later_match[1], ast.Name):
+                    continue
+                reads = later.value if isinstance(later, ast.Assign) else later
+                if tool.id in _names_in(reads):
+                    return members[:position + 1]
+                if isinstance(later, ast.Assign) and any(
+                        isinstance(t, ast.Name) and t.id == tool.id for t in later.targets):
+                    break
+        return members
+
+    def _merge_chains(self, statements: List[ast.stmt]) -> List[ast.stmt]:
+        """Merge runs of ``a = a.<method>(x)`` statements into one boolean"""
+        merged = []
+        index = 0
+        while index < len(statements):
+            match = _match_accumulate(statements[index], self.method)
+            members = self._chain_members(statements, index, match[0]) if match else []
+            if len(members) < 2:
+                merged.append(statements[index])
+                index += 1
+                continue
+
+            acc = match[0]
+            tools = [statements[member].value.args[0] for member in members]
+            if members[-1] - members[0] == len(members) - 1:
+                merged.append(self._combine(acc, ast.List(elts=tools, ctx=ast.Load())))
+            else:
+                collected = self._temp_name(f"{self.method}_tools")
+                for position in range(members[0], members[-1] + 1):
+                    if position not in members:
+                        merged.append(statements[position])
+                    elif position == members[0]:
+                        merged.append(ast.Assign(
+                            targets=[ast.Name(id=collected, ctx=ast.Store())],
+                            value=ast.List(elts=[tools[0]], ctx=ast.Load())))
+                    else:
+                        merged.append(ast.Expr(value=_method_call(
+                            ast.Name(id=collected, ctx=ast.Load()), 'append',
+                            [statements[position].value.args[0]])))
+                merged.append(self._combine(acc, ast.Name(id=collected, ctx=ast.Load())))
+            self.rewrites += 1
+            index = members[-1] + 1
+        return merged
+
+
+class FuseBatchingPass(BooleanBatchingPass):
+    """Collapse accumulate-by-fuse loops and chains into a single boolean
+
+    Rewrites::
+
+        for i in range(n):
+            tooth = Part.makeBox(...)
+            gear = gear.fuse(tooth)
+
+    into::
+
+        _fuse_tools_1 = []
+        for i in range(n):
+            tooth = Part.makeBox(...)
+            _fuse_tools_1.append(tooth)
+        if _fuse_tools_1:
+            gear = gear.multiFuse(_fuse_tools_1)
+
+    Consecutive ``a = a.fuse(x)`` statements and ``a.fuse(b).fuse(c)``
+    expression chains are merged the same way.
+    """
+
+    name = "fuse_batching"
+    method = "fuse"
+
+    def __init__(self, strategy: str = "multifuse"):
+        super().__init__()
+        if strategy not in FUSE_STRATEGIES:
+            raise ValueError(f"Unknown fuse strategy: {strategy}")
+        self.strategy = strategy
+
+    def _applicable(self) -> bool:
+        return self.strategy != "compound" or 'Part' in self._imports
+
+    def _combine(self, acc: str, tools: ast.expr) -> ast.stmt:
+        """Build ``acc = <fuse acc with tools>`` for the configured strategy"""
+        if self.strategy == "compound":
+            value = _part_call('makeCompound', [ast.BinOp(
+                left=ast.List(elts=[ast.Name(id=acc, ctx=ast.Load())], ctx=ast.Load()),
+                op=ast.Add(), right=tools)])
+        else:
+            value = _method_call(ast.Name(id=acc, ctx=ast.Load()), 'multiFuse', [tools])
+        return ast.Assign(targets=[ast.Name(id=acc, ctx=ast.Store())], value=value)
+
+    def visit_Call(self, node: ast.Call) -> ast.expr:
+        self.generic_visit(node)
+        # a.fuse(b).fuse(c) -> a.multiFuse([b, c])
+        func = node.func
+        if not (isinstance(func, ast.Attribute) and func.attr in ('fuse', 'multiFuse')
+                and len(node.args) == 1 and not node.keywords):
+            return node
+        inner = func.value
+        if not (isinstance(inner, ast.Call) and isinstance(inner.func, ast.Attribute)
+                and inner.func.attr in ('fuse', 'multiFuse')
+                and len(inner.args) == 1 and not inner.keywords):
+            return node
+        tools = []
+        for call in (inner, node):
+            arg = call.args[0]
+            if call.func.attr == 'multiFuse':
+                if not isinstance(arg, ast.List):
+                    return node
+                tools.extend(arg.elts)
+            elif isinstance(arg, (ast.List, ast.Tuple, ast.Starred)):
+                return node
+            else:
+                tools.append(arg)
+        self.rewrites += 1
+        return _method_call(inner.func.value, 'multiFuse', [ast.List(elts=tools, ctx=ast.Load())])
+
+
+class CutBatchingPass(BooleanBatchingPass):
+    """Cut all openings of a solid with one compound tool
+
+    ``wall = wall.cut(opening)`` repeated per door or window becomes a
+    single ``wall = wall.cut(Part.makeCompound(openings))``, so each wall
+    runs one boolean no matter how many openings it has.
+    """
+
+    name = "cut_batching"
+    method = "cut"
+
+    def _applicable(self) -> bool:
+        return 'Part' in self._imports
+
+    def _combine(self, acc: str, tools: ast.expr) -> ast.stmt:
+        value = _method_call(ast.Name(id=acc, ctx=ast.Load()), 'cut',
+                             [_part_call('makeCompound', [tools])])
+        return ast.Assign(targets=[ast.Name(id=acc, ctx=ast.Store())], value=value)
+
+
+@dataclass
+class _InstanceBlock:
+    """``shape = Part.makeX(...)``, optional translate, ``addObject`` and ``.Shape =``"""
+    indices: List[int]
+    shape: str
+    constructor: ast.Call
+    offset: Optional[ast.expr]
+    obj: str
+    add_call: ast.Call
+
+
+def _match_instance_block(statements: List[ast.stmt], start: int) -> Optional[_InstanceBlock]:
+    """Match an instanceable object definition starting at ``start``"""
+    first = statements[start]
+    if not (isinstance(first, ast.Assign) and len(first.targets) == 1
+            and isinstance(first.targets[0], ast.Name) and isinstance(first.value, ast.Call)):
+        return None
+    func = first.value.func
+    if not (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+            and func.value.id == 'Part' and func.attr in INSTANCEABLE_CONSTRUCTORS):
+        return None
+    shape = first.targets[0].id
+    indices = [start]
+    offset = None
+    index = start + 1
+
+    if index < len(statements):
+        stmt = statements[index]
+        call = stmt.value if isinstance(stmt, (ast.Assign, ast.Expr)) else None
+        if (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                and call.func.attr == 'translate' and isinstance(call.func.value, ast.Name)
+                and call.func.value.id == shape and len(call.args) == 1
+                and (isinstance(stmt, ast.Expr) or (len(stmt.targets) == 1
+                                                    and isinstance(stmt.targets[0], ast.Name)
+                                                    and stmt.targets[0].id == shape))
+                and shape not in _names_in(call.args[0])):
+            offset = call.args[0]
+            indices.append(index)
+            index += 1
+
+    if index + 1 >= len(statements):
+        return None
+    add, assign = statements[index], statements[index + 1]
+    if not (isinstance(add, ast.Assign) and len(add.targets) == 1
+            and isinstance(add.targets[0], ast.Name) and isinstance(add.value, ast.Call)
+            and isinstance(add.value.func, ast.Attribute) and add.value.func.attr == 'addObject'
+            and len(add.value.args) == 2 and not add.value.keywords
+            and isinstance(add.value.args[0], ast.Constant)
+            and add.value.args[0].value == 'Part::Feature'):
+        return None
+    obj = add.targets[0].id
+    if not (isinstance(assign, ast.Assign) and len(assign.targets) == 1
+            and isinstance(assign.targets[0], ast.Attribute)
+            and assign.targets[0].attr == 'Shape'
+            and isinstance(assign.targets[0].value, ast.Name)
+            and assign.targets[0].value.id == obj
+            and isinstance(assign.value, ast.Name) and assign.value.id == shape):
+        return None
+    indices.extend([index, index + 1])
+    return _InstanceBlock(indices, shape, first.value, offset, obj, add.value)
+
+
+class InstancingPass(OptimizationPass):
+    """Share one base shape between objects that differ only in placement
+
+    Loops such as::
+
+        for i, pos in enumerate(positions):
+            divider = Part.makeBox(250, 12000, 3500)
+            divider = divider.translate(FreeCAD.Vector(pos, 0, 0))
+            divider_obj = doc.addObject("Part::Feature", f"Divider_{i}")
+            divider_obj.Shape = divider
+
+    build the base shape once before the loop and turn every iteration into
+    a lightweight instance. In ``link`` mode the instances are App::Link
+    objects pointing at a hidden base feature (so the document stores the
+    geometry once); in ``placement`` mode every feature gets the shared
+    shape plus its own Placement. Loops that colour each instance
+    differently fall back to placement mode. Identical primitives defined
+    one after another outside loops are shared in placement mode.
+    """
+
+    name = "instancing"
+
+    def __init__(self, mode: str = "link"):
+        super().__init__()
+        if mode not in INSTANCING_MODES:
+            raise ValueError(f"Unknown instancing mode: {mode}")
+        self.mode = mode
+
+    def visit_Module(self, node: ast.Module) -> ast.Module:
+        if 'FreeCAD' not in self._imports or 'Part' not in self._imports:
+            return node
+        self.generic_visit(node)
+        node.body = self._share_straight_line(node.body)
+        return node
+
+    def _placement(self, offset: ast.expr) -> ast.Call:
+        freecad = ast.Name(id='FreeCAD', ctx=ast.Load())
+        return ast.Call(
+            func=ast.Attribute(value=freecad, attr='Placement', ctx=ast.Load()),
+            args=[offset, ast.Call(func=ast.Attribute(value=ast.Name(id='FreeCAD', ctx=ast.Load()),
+                                                      attr='Rotation', ctx=ast.Load()),
+                                   args=[], keywords=[])],
+            keywords=[])
+
+    def _set(self, obj: str, attr: str, value: ast.expr) -> ast.stmt:
+        return ast.Assign(targets=[ast.Attribute(value=ast.Name(id=obj, ctx=ast.Load()),
+                                                 attr=attr, ctx=ast.Store())],
+                          value=value)
+
+    def visit_For(self, node: ast.For):
+        self.generic_visit(node)
+        for start in range(len(node.body)):
+            block = _match_instance_block(node.body, start)
+            if block:
+                break
+        else:
+            return node
+
+        varying = _assigned_names([ast.Expr(value=node.target)]) | _assigned_names(node.body)
+        if varying & set(_names_in(block.constructor)):
+            return node
+        if varying & set(_names_in(block.add_call.func)):
+            return node
+        # The per-iteration shape must not be needed anywhere but in the block
+        block_nodes = [node.body[i] for i in block.indices]
+        shape_uses = sum(1 for s in node.body for n in _names_in(s) if n == block.shape)
+        block_uses = sum(1 for s in block_nodes for n in _names_in(s) if n == block.shape)
+        if shape_uses != block_uses or any(block.shape in _names_in(s) for s in node.orelse):
+            return node
+        if self._read_later(block.shape, node):
+            return node
+
+        other = [s for i, s in enumerate(node.body) if i not in block.indices]
+        view_settings = self._link_view_settings(block.obj, other, varying, node)
+        if self.mode == "link" and view_settings is not None:
+            prologue, body = self._link_loop(node, block, view_settings)
+        else:
+            prologue, body = self._placement_loop(node, block)
+        node.body = body
+        self.rewrites += 1
+        return prologue + [node]
+
+    def _link_view_settings(self, obj: str, other: List[ast.stmt], varying: set,
+                            loop: ast.For) -> Optional[List[ast.stmt]]:
+        """Loop-invariant ``obj.ViewObject.X = value`` statements, or None
+
+        Links cannot carry their own shape colour, so link mode is only used
+        when every remaining use of the object is a label or an invariant
+        view setting that can move to the shared base.
+        """
+        if self._read_later(obj, loop):
+            return None
+        settings = []
+        for stmt in other:
+            if obj not in _names_in(stmt):
+                continue
+            if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1
+                    and isinstance(stmt.targets[0], ast.Attribute)):
+                return None
+            target = stmt.targets[0]
+            if isinstance(target.value, ast.Name) and target.value.id == obj and target.attr == 'Label':
+                continue
+            view = target.value
+            if (isinstance(view, ast.Attribute) and view.attr == 'ViewObject'
+                    and isinstance(view.value, ast.Name) and view.value.id == obj
+                    and not (varying & set(_names_in(stmt.value)))
+                    and obj not in _names_in(stmt.value)):
+                settings.append(stmt)
+                continue
+            return None
+        return settings
+
+    def _link_loop(self, loop: ast.For, block: _InstanceBlock,
+                   view_settings: List[ast.stmt]) -> Tuple[List[ast.stmt], List[ast.stmt]]:
+        base = self._temp_name("instance_base")
+        doc = block.add_call.func.value
+        prologue = [
+            ast.Assign(targets=[ast.Name(id=base, ctx=ast.Store())],
+                       value=_method_call(doc, 'addObject', [
+                           ast.Constant(value='Part::Feature'),
+                           ast.Constant(value=f"{block.obj}_base")])),
+            self._set(base, 'Shape', block.constructor),
+            self._set(base, 'Visibility', ast.Constant(value=False)),
+        ]
+        for stmt in view_settings:
+            view = stmt.targets[0]
+            prologue.append(ast.Assign(
+                targets=[ast.Attribute(value=ast.Attribute(value=ast.Name(id=base, ctx=ast.Load()),
+                                                           attr='ViewObject', ctx=ast.Load()),
+                                       attr=view.attr, ctx=ast.Store())],
+                value=stmt.value))
+
+        body = []
+        for index, stmt in enumerate(loop.body):
+            if stmt in view_settings:
+                continue
+            if index == block.indices[-2]:
+                body.append(ast.Assign(
+                    targets=[ast.Name(id=block.obj, ctx=ast.Store())],
+                    value=_method_call(doc, 'addObject', [ast.Constant(value='App::Link'),
+                                                          block.add_call.args[1]])))
+                body.append(self._set(block.obj, 'LinkedObject', ast.Name(id=base, ctx=ast.Load())))
+                if block.offset is not None:
+                    body.append(self._set(block.obj, 'Placement', self._placement(block.offset)))
+            elif index not in block.indices:
+                body.append(stmt)
+        return prologue, body
+
+    def _placement_loop(self, loop: ast.For, block: _InstanceBlock) -> Tuple[List[ast.stmt], List[ast.stmt]]:
+        shared = self._temp_name("instance_shape")
+        prologue = [ast.Assign(targets=[ast.Name(id=shared, ctx=ast.Store())], value=block.constructor)]
+        body = []
+        for index, stmt in enumerate(loop.body):
+            if index == block.indices[-1]:
+                body.append(self._set(block.obj, 'Shape', ast.Name(id=shared, ctx=ast.Load())))
+                if block.offset is not None:
+                    body.append(self._set(block.obj, 'Placement', self._placement(block.offset)))
+            elif index == block.indices[-2] or index not in block.indices:
+                body.append(stmt)
+        return prologue, body
+
+    def _share_straight_line(self, statements: List[ast.stmt]) -> List[ast.stmt]:
+        """Share identical primitives defined one after another"""
+        blocks = []
+        for start in range(len(statements)):
+            block = _match_instance_block(statements, start)
+            if block and not self._read_later(block.shape, statements[block.indices[-1]]):
+                blocks.append(block)
+
+        groups: Dict[str, List[_InstanceBlock]] = {}
+        for block in blocks:
+            groups.setdefault(ast.dump(block.constructor), []).append(block)
+
+        replacements: Dict[int, List[ast.stmt]] = {}
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            span = statements[group[0].indices[0]:group[-1].indices[-1] + 1]
+            if _assigned_names(span) & set(_names_in(group[0].constructor)):
+                continue
+            shared = self._temp_name("instance_shape")
+            for position, block in enumerate(group):
+                new_statements = []
+                if position == 0:
+                    new_statements.append(ast.Assign(targets=[ast.Name(id=shared, ctx=ast.Store())],
+                                                      value=block.constructor))
+                new_statements.append(statements[block.indices[-2]])
+                new_statements.append(self._set(block.obj, 'Shape', ast.Name(id=shared, ctx=ast.Load())))
+                if block.offset is not None:
+                    new_statements.append(self._set(block.obj, 'Placement', self._placement(block.offset)))
+                replacements[block.indices[0]] = new_statements
+                for index in block.indices[1:]:
+                    replacements[index] = []
+            self.rewrites += 1
+
+        if not replacements:
+            return statements
+        result = []
+        for index, stmt in enumerate(statements):
+            result.extend(replacements.get(index, [stmt]))
+        return result
+
+
+def _dotted_name(node: ast.expr) -> Optional[str]:
+    """``Part.makeBox`` for an Attribute/Name chain, otherwise None"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+
+def _is_pure(node: ast.expr) -> bool:
+    """Whether evaluating ``node`` is free of side effects"""
+    if isinstance(node, (ast.Constant, ast.Name)):
+        return True
+    if isinstance(node, ast.Attribute):
+        return _dotted_name(node) is not None
+    if isinstance(node, ast.BinOp):
+        return _is_pure(node.left) and _is_pure(node.right)
+    if isinstance(node, ast.UnaryOp):
+        return _is_pure(node.operand)
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return all(_is_pure(e) for e in node.elts)
+    if isinstance(node, ast.Subscript):
+        return _is_pure(node.value) and _is_pure(node.slice)
+    if isinstance(node, ast.Call):
+        return (_dotted_name(node.func) in PURE_FUNCTIONS
+                and all(_is_pure(a) for a in node.args)
+                and all(_is_pure(k.value) for k in node.keywords))
+    return False
+
+
+class _Substitute(ast.NodeTransformer):
+    """Replace variable reads according to a name mapping"""
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = mapping
+
+    def visit_Name(self, node: ast.Name) -> ast.Name:
+        if isinstance(node.ctx, ast.Load) and node.id in self.mapping:
+            return ast.Name(id=self.mapping[node.id], ctx=ast.Load())
+        return node
+
+
+class LoopInvariantHoistingPass(OptimizationPass):
+    """Build loop-invariant shapes once, before the loop
+
+    A statement ``x = Part.makeCircle(r + 2, ...)`` inside a loop whose
+    arguments never change between iterations is moved in front of the
+    loop, and so are extrusions, revolutions and booleans of invariant
+    shapes (``Part.Face(wire).extrude(v)``). Inside the loop ``x`` then
+    refers to the hoisted shape directly when it is only read, becomes a
+    cheap ``translated``/``rotated`` copy when the loop moves it once, and
+    a ``copy()`` otherwise. A deep copy costs about as much as building a
+    primitive, so plain constructors are only hoisted when no copy is
+    needed. Only calls in ``PURE_FUNCTIONS`` are ever hoisted.
+    """
+
+    name = "loop_invariant_hoisting"
+
+    def visit_For(self, node: ast.For):
+        self.generic_visit(node)
+        varying = _assigned_names([ast.Expr(value=node.target)]) | _assigned_names(node.body)
+        assignments = Counter(n.id for stmt in node.body for n in ast.walk(stmt)
+                              if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store))
+        aliases: Dict[str, str] = {}
+        prologue = []
+        body = list(node.body)
+        index = 0
+        while index < len(body):
+            stmt = body[index]
+            hoisted = self._hoistable(stmt, varying - set(aliases), assignments, aliases)
+            if not hoisted:
+                index += 1
+                continue
+            name, call = hoisted
+            rest = body[index + 1:]
+            in_place = [n for s in rest for n in ast.walk(s)
+                        if isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute)
+                        and n.func.attr in IN_PLACE_METHODS
+                        and isinstance(n.func.value, ast.Name) and n.func.value.id == name]
+            transform = self._moved_by(name, rest, in_place)
+            read_only = transform is None and not in_place and self._only_read(name, rest)
+            if transform is None and not read_only and not self._costly(call):
+                index += 1
+                continue
+            shared = self._temp_name("hoisted")
+            prologue.append(ast.Assign(targets=[ast.Name(id=shared, ctx=ast.Store())],
+                                       value=_Substitute(aliases).visit(call)))
+            if transform is not None:
+                body[index:index + 2] = [ast.Assign(
+                    targets=[ast.Name(id=name, ctx=ast.Store())],
+                    value=_method_call(ast.Name(id=shared, ctx=ast.Load()),
+                                       TRANSFORM_COPIES[transform.func.attr], transform.args))]
+            elif read_only:
+                # Read-only: later statements use the hoisted shape directly
+                aliases[name] = shared
+                body[index + 1:] = [_Substitute({name: shared}).visit(s) for s in rest]
+                if self._read_later(name, node):
+                    body[index] = ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())],
+                                             value=ast.Name(id=shared, ctx=ast.Load()))
+                else:
+                    del body[index]
+                    index -= 1
+            else:
+                body[index] = ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())],
+                                         value=_method_call(ast.Name(id=shared, ctx=ast.Load()),
+                                                            'copy', []))
+            self.rewrites += 1
+            index += 1
+        if not prologue:
+            return node
+        node.body = body
+        return prologue + [node]
+
+    def _hoistable(self, stmt: ast.stmt, varying: set, assignments: Counter,
+                   aliases: Dict[str, str]) -> Optional[Tuple[str, ast.Call]]:
+        """``(name, call)`` when ``stmt`` binds an invariant pure shape
+
+        Besides whitelisted constructors this accepts non-mutating methods
+        called on a shape that has already been hoisted, e.g.
+        ``face.extrude(v)`` after ``face`` itself was hoisted, or on a
+        whitelisted constructor, e.g. ``Part.Face(wire).extrude(v)``.
+        """
+        if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1
+                and isinstance(stmt.targets[0], ast.Name) and isinstance(stmt.value, ast.Call)):
+            return None
+        name = stmt.targets[0].id
+        call = stmt.value
+        func = call.func
+        derived = (isinstance(func, ast.Attribute) and func.attr in PURE_METHODS
+                   and ((isinstance(func.value, ast.Name) and func.value.id in set(aliases.values()))
+                        or (isinstance(func.value, ast.Call) and _is_pure(func.value))))
+        if not (derived or _dotted_name(func) in SHAPE_CONSTRUCTORS):
+            return None
+        if not (all(_is_pure(a) for a in call.args) and all(_is_pure(k.value) for k in call.keywords)):
+            return None
+        if assignments[name] != 1 or varying & set(_names_in(call)):
+            return None
+        return name, call
+
+    @staticmethod
+    def _costly(call: ast.Call) -> bool:
+        """Whether building ``call`` costs clearly more than copying its result"""
+        return any(isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute)
+                   and n.func.attr in COSTLY_METHODS for n in ast.walk(call))
+
+    def _moved_by(self, name: str, rest: List[ast.stmt], in_place: List[ast.Call]) -> Optional[ast.Call]:
+        """The transform call when the loop only moves the shape, right after creating it"""
+        if len(in_place) != 1 or not rest:
+            return None
+        following = rest[0]
+        call = following.value if isinstance(following, (ast.Expr, ast.Assign)) else None
+        if call is not in_place[0] or call.func.attr not in TRANSFORM_COPIES:
+            return None
+        if isinstance(following, ast.Assign) and not (
+                len(following.targets) == 1 and isinstance(following.targets[0], ast.Name)
+                and following.targets[0].id == name):
+            return None
+        return call
+
+    def _only_read(self, name: str, statements: List[ast.stmt]) -> bool:
+        """Whether every use of ``name`` leaves the shared shape untouched
+
+        Allowed uses are arguments of pure constructors, receivers of
+        non-mutating shape methods and assignment to a feature's Shape
+        (FreeCAD copies the shape on assignment).
+        """
+        allowed = set()
+        for node in (n for s in statements for n in ast.walk(s)):
+            if isinstance(node, ast.Call):
+                if _dotted_name(node.func) in PURE_FUNCTIONS:
+                    allowed.update(id(a) for a in node.args if isinstance(a, ast.Name))
+                elif isinstance(node.func, ast.Attribute) and node.func.attr in PURE_METHODS \
+                        and isinstance(node.func.value, ast.Name):
+                    allowed.add(id(node.func.value))
+            elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) \
+                    and isinstance(node.ctx, ast.Load):
+                allowed.add(id(node.value))
+            elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Name) \
+                    and any(isinstance(t, ast.Attribute) and t.attr == 'Shape' for t in node.targets):
+                allowed.add(id(node.value))
+        return all(id(n) in allowed for s in statements for n in ast.walk(s)
+                   if isinstance(n, ast.Name) and n.id == name and isinstance(n.ctx, ast.Load))
+
+
+class LevelOfDetailPass(OptimizationPass):
+    """Leave out the features a quality level does not build
+
+    Below full detail ``shape.makeFillet(r, edges)`` and ``makeChamfer``
+    calls become plain ``shape``. Without openings ``wall.cut(tool)``
+    becomes ``wall`` (a bare ``wall = wall`` is dropped), but only for cuts
+    tagged as openings: inside a ``# [detail:openings]`` block, or with a
+    tool bound only inside one. Other cuts (bores, bolt holes) are part of
+    the mass. When the level coarsens tessellation, a statement setting
+    every object's ``ViewObject.Deviation`` is appended for the GUI.
+    """
+
+    name = "level_of_detail"
+
+    def __init__(self, level: LevelOfDetail):
+        super().__init__()
+        self.level = level
+        self._opening_lines = set()
+        self._opening_names = set()
+
+    def run(self, tree: ast.Module, source: str = '') -> ast.Module:
+        # Comments are not in the AST, so the markers come from the source lines
+        self._opening_lines = detail_lines(source).get('openings', set())
+        bound = [(n.id, n.lineno in self._opening_lines) for n in ast.walk(tree)
+                 if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)]
+        self._opening_names = {name for name, inside in bound if inside} - {
+            name for name, inside in bound if not inside}
+        return super().run(tree, source)
+
+    def _opening(self, node: ast.Call) -> bool:
+        return getattr(node, 'lineno', None) in self._opening_lines or bool(node.args) and all(
+            isinstance(arg, ast.Name) and arg.id in self._opening_names for arg in node.args)
+
+    def visit_Module(self, node: ast.Module) -> ast.Module:
+        self.generic_visit(node)
+        for parent in ast.walk(node):
+            if isinstance(getattr(parent, 'body', None), list) and not parent.body:
+                parent.body = [ast.Pass()]
+        if self.level.view_deviation is not None and 'FreeCAD' in self._imports:
+            var = self._temp_name("lod_obj")
+            node.body.extend(ast.parse(
+                "if FreeCAD.GuiUp and FreeCAD.ActiveDocument:\n"
+                f"    for {var} in FreeCAD.ActiveDocument.Objects:\n"
+                f"        if hasattr({var}.ViewObject, 'Deviation'):\n"
+                f"            {var}.ViewObject.Deviation = {self.level.view_deviation!r}\n").body)
+            self.rewrites += 1
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.expr:
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Attribute) and (
+                (node.func.attr in ROUNDING_METHODS and not self.level.fillets)
+                or (node.func.attr == 'cut' and not self.level.openings and self._opening(node))):
+            self.rewrites += 1
+            return node.func.value
+        return node
+
+    def visit_Assign(self, node: ast.Assign) -> Optional[ast.Assign]:
+        self.generic_visit(node)
+        if (len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Name) and node.value.id == node.targets[0].id):
+            return None
+        return node
+
+
+class LoopTripVisitor(ast.NodeVisitor):
+    """Node visitor that tracks how often the current statement runs
+
+    ``multiplier`` is the product of the (statically estimated) trip counts
+    of all enclosing ``for`` loops.
+    """
+
+    def __init__(self, module: ast.Module):
+        self.multiplier = 1
+        self._literal_lengths = {}
+        # Module-level integer constants such as ``num_teeth = 24``, bound only once
+        self._constants: Dict[str, int] = {}
+        bindings = Counter(n.id for n in ast.walk(module)
+                           if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store))
+        for stmt in module.body:
+            if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1
+                    and isinstance(stmt.targets[0], ast.Name)):
+                continue
+            target = stmt.targets[0].id
+            if isinstance(stmt.value, (ast.List, ast.Tuple)):
+                self._literal_lengths[target] = len(stmt.value.elts)
+            elif bindings[target] == 1:
+                value = self._integer(stmt.value)
+                if value is not None:
+                    self._constants[target] = value
+
+    def _integer(self, node: ast.expr) -> Optional[int]:
+        """Value of an integer expression over literals and module constants"""
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return node.value
+        if isinstance(node, ast.Name):
+            return self._constants.get(node.id)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = self._integer(node.operand)
+            return -operand if operand is not None else None
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.FloorDiv)):
+            left, right = self._integer(node.left), self._integer(node.right)
+            if left is None or right is None or (isinstance(node.op, ast.FloorDiv) and right == 0):
+                return None
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Sub):
+                return left - right
+            if isinstance(node.op, ast.Mult):
+                return left * right
+            return left // right
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'int'
+                and len(node.args) == 1):
+            return self._integer(node.args[0])
+        return None
+
+    def trip_count(self, iterable: ast.expr) -> int:
+        if isinstance(iterable, (ast.List, ast.Tuple)):
+            return len(iterable.elts)
+        if isinstance(iterable, ast.Name):
+            return self._literal_lengths.get(iterable.id, DEFAULT_LOOP_TRIPS)
+        if isinstance(iterable, ast.Call) and iterable.args:
+            func = iterable.func
+            func_name = func.id if isinstance(func, ast.Name) else None
+            if func_name == 'range':
+                bounds = [self._integer(a) for a in iterable.args]
+                if None in bounds or len(bounds) > 3 or (len(bounds) == 3 and bounds[2] == 0):
+                    return DEFAULT_LOOP_TRIPS
+                return max(0, len(range(*bounds)))
+            if func_name in ('enumerate', 'zip', 'reversed', 'list'):
+                return min(self.trip_count(a) for a in iterable.args)
+        return DEFAULT_LOOP_TRIPS
+
+    def enter_loop(self, trips: int) -> None:
+        """Hook called with the resolved trip count of every loop"""
+
+    def visit_For(self, node: ast.For) -> None:
+        self.visit(node.iter)
+        outer = self.multiplier
+        trips = self.trip_count(node.iter)
+        self.enter_loop(trips)
+        self.multiplier = outer * trips
+        for stmt in node.body:
+            self.visit(stmt)
+        self.multiplier = outer
+        for stmt in node.orelse:
+            self.visit(stmt)
+
+
+class _BooleanCounter(LoopTripVisitor):
+    """Estimate how many boolean operations a script runs"""
+
+    def __init__(self, module: ast.Module):
+        super().__init__(module)
+        self.total = 0
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if isinstance(node.func, ast.Attribute) and node.func.attr in BOOLEAN_METHODS:
+            self.total += self.multiplier
+        self.generic_visit(node)
+
+
+def count_boolean_operations(tree: ast.Module) -> int:
+    """Estimate the number of boolean operations executed by a script"""
+    counter = _BooleanCounter(tree)
+    counter.visit(tree)
+    return counter.total
+
+
+def _statement_span(stmt: ast.stmt) -> Tuple[int, int]:
+    """First and last source line of a statement (1-based, decorators included)"""
+    start = stmt.lineno
+    for decorator in getattr(stmt, 'decorator_list', []):
+        start = min(start, decorator.lineno)
+    return start, stmt.end_lineno
+
+
+def render_module(source: str, original: ast.Module, optimized: ast.Module) -> str:
+    """Render an optimized module while keeping untouched statements verbatim
+
+    ``ast.unparse`` drops comments, so only the top-level statements that a
+    pass actually changed are regenerated; everything else (including the
+    comment and blank lines around it) is copied from the original source.
+    """
+    lines = source.splitlines(keepends=True)
+    spans = [_statement_span(stmt) for stmt in original.body]
+    if any(spans[i][0] <= spans[i - 1][1] for i in range(1, len(spans))):
+        # Several statements share a line; fall back to a full rewrite
+        return ast.unparse(optimized) + '\n'
+
+    def code(i: int) -> str:
+        start, end = spans[i]
+        return ''.join(lines[start - 1:end])
+
+    def lead(i: int) -> str:
+        # Blank and comment lines in front of a statement belong to it
+        previous_end = spans[i - 1][1] if i > 0 else 0
+        return ''.join(lines[previous_end:spans[i][0] - 1])
+
+    output = []
+    matcher = difflib.SequenceMatcher(
+        a=[ast.dump(stmt) for stmt in original.body],
+        b=[ast.dump(stmt) for stmt in optimized.body],
+        autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for i in range(i1, i2):
+                output.append(lead(i) + code(i))
+            continue
+        # Regenerated statements inherit the comments of the original
+        # statement of the same kind they replace, together with anything
+        # inserted in front of it
+        pending, lead_emitted = i1, False
+        for stmt in optimized.body[j1:j2]:
+            if pending < i2 and not lead_emitted:
+                output.append(lead(pending))
+                lead_emitted = True
+            output.append(ast.unparse(stmt) + '\n')
+            if pending < i2 and type(stmt) is type(original.body[pending]):
+                pending, lead_emitted = pending + 1, False
+        for i in range(pending, i2):
+            if not (i == pending and lead_emitted):
+                output.append(lead(i))
+    output.append(''.join(lines[spans[-1][1]:]) if spans else source)
+    return ''.join(output)
+
+
+def build_passes(fuse_strategy: str = "multifuse",
+                 instancing_mode: Optional[str] = "link",
+                 level: Optional[LevelOfDetail] = None) -> List[OptimizationPass]:
+    """Create the default pass pipeline
+
+    ``instancing_mode`` of None disables the instancing pass. A ``level``
+    below full detail first strips the features it leaves out, so the
+    batching passes never see them.
+    """
+    passes = [FuseBatchingPass(strategy=fuse_strategy), CutBatchingPass()]
+    if level is not None and not level.full:
+        passes.insert(0, LevelOfDetailPass(level))
+    if instancing_mode:
+        passes.append(InstancingPass(mode=instancing_mode))
+    # Runs after instancing, which handles whole placed objects more cheaply
+    passes.append(LoopInvariantHoistingPass())
+    return passes
+
+
+def optimize_code(code: str, passes: Optional[List[OptimizationPass]] = None) -> Tuple[str, OptimizationReport]:
+    """Run optimizer passes over a generated FreeCAD script
+
+    Returns the optimized source and a report. The original code is returned
+    unchanged when it cannot be parsed or when no pass applies.
+    """
+    logger = get_logger("ai")
+    report = OptimizationReport()
+
+    if not hasattr(ast, 'unparse'):
+        report.errors.append("AST optimization requires Python 3.9+")
+        return code, report
+
+    try:
+        original = ast.parse(code)
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        report.errors.append(f"Cannot optimize code with syntax errors: {e}")
+        return code, report
+
+    report.boolean_ops_before = count_boolean_operations(original)
+
+    for optimization_pass in passes if passes is not None else build_passes():
+        try:
+            tree = optimization_pass.run(tree, code)
+            report.applied[optimization_pass.name] = optimization_pass.rewrites
+        except Exception as e:
+            logger.error(f"Optimizer pass {optimization_pass.name} failed: {e}")
+            report.errors.append(f"{optimization_pass.name}: {e}")
+            return code, report
+
+    if not report.changed:
+        report.boolean_ops_after = report.boolean_ops_before
+        return code, report
+
+    optimized = render_module(code, original, tree)
+    report.boolean_ops_after = count_boolean_operations(ast.parse(optimized))
+    logger.info(f"Optimized script: {report.applied}, boolean ops "
+                f"{report.boolean_ops_before} -> {report.boolean_ops_after}")
+    return optimized, report
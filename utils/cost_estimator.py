@@ -0,0 +1,220 @@
+"""
+Static execution-cost estimation for generated FreeCAD scripts
+
+Launching FreeCAD to find out that a script needs five minutes is too late
+to do anything about it. This module walks the script's AST, counts the
+operations that dominate run time (OCC booleans, fillets, primitives and
+document objects), multiplies them by estimated loop trip counts and maps
+the result to a predicted execution time with a linear cost model.
+
+The default weights are rough figures for a desktop machine;
+``calibrate_weights`` refits them from timed runs of real scripts.
+"""
+import ast
+from dataclasses import dataclass, field, asdict, fields
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+from utils.code_optimizer import BOOLEAN_METHODS, DEFAULT_LOOP_TRIPS, LoopTripVisitor
+from utils.logging_config import get_logger
+
+# Cost levels reported to the UI, with the upper bound of each in seconds
+COST_LEVELS = (('light', 5.0), ('moderate', 60.0), ('heavy', float('inf')))
+
+# Shape methods that run a fillet/chamfer; these are far slower than booleans
+FILLET_METHODS = ('makeFillet', 'makeChamfer', 'makeThickness', 'makeOffsetShape')
+
+# Calls that combine shapes without running a boolean
+COMPOUND_FUNCTIONS = ('Part.makeCompound', 'Part.Compound')
+
+T = TypeVar('T')
+
+
+@dataclass
+class CostWeights:
+    """Seconds contributed by each counted operation"""
+    startup: float = 1.5
+    boolean: float = 0.04
+    boolean_operand: float = 0.02
+    fillet: float = 0.25
+    primitive: float = 0.002
+    document_object: float = 0.01
+    recompute: float = 0.05
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, float]) -> 'CostWeights':
+        """Build weights from a (possibly partial) mapping, ignoring unknown keys"""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: float(v) for k, v in values.items() if k in known})
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+@dataclass
+class CostEstimate:
+    """Operation counts and predicted run time of a script"""
+    boolean_ops: int = 0
+    boolean_operands: int = 0
+    fillets: int = 0
+    primitives: int = 0
+    document_objects: int = 0
+    recomputes: int = 0
+    loop_trips: List[int] = field(default_factory=list)
+    predicted_seconds: float = 0.0
+
+    @property
+    def level(self) -> str:
+        for name, limit in COST_LEVELS:
+            if self.predicted_seconds < limit:
+                return name
+        return COST_LEVELS[-1][0]
+
+    @property
+    def loop_iterations(self) -> int:
+        return sum(self.loop_trips)
+
+    def features(self) -> List[float]:
+        """Counts in the order of the ``CostWeights`` fields (startup first)"""
+        return [1.0, self.boolean_ops, self.boolean_operands, self.fillets,
+                self.primitives, self.document_objects, self.recomputes]
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result['loop_iterations'] = self.loop_iterations
+        result['level'] = self.level
+        return result
+
+
+def _dotted(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f'{base}.{node.attr}' if base else None
+    return None
+
+
+class _CostCounter(LoopTripVisitor):
+    """Count expensive operations, weighting each by how often it runs
+
+    Calls to functions defined at module level are followed so the cost of
+    a helper like ``create_wall(...)`` is charged once per call site.
+    """
+
+    def __init__(self, module: ast.Module):
+        super().__init__(module)
+        self.estimate = CostEstimate()
+        self._functions = {stmt.name: stmt for stmt in module.body
+                           if isinstance(stmt, ast.FunctionDef)}
+        self._active: List[str] = []
+        # Estimated lengths of lists that are filled with .append()
+        self._list_sizes: Dict[str, int] = {}
+
+    def enter_loop(self, trips: int) -> None:
+        if self.multiplier == 1 and not self._active:
+            self.estimate.loop_trips.append(trips)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        # Bodies are charged at their call sites
+        if node.name not in self._functions:
+            self.generic_visit(node)
+
+    def _operands(self, arg: ast.expr) -> int:
+        """Number of shapes in a list argument of multiFuse/makeCompound"""
+        if isinstance(arg, (ast.List, ast.Tuple)):
+            return len(arg.elts)
+        if isinstance(arg, ast.BinOp):
+            return self._operands(arg.left) + self._operands(arg.right)
+        if isinstance(arg, ast.Name):
+            return self._list_sizes.get(arg.id, DEFAULT_LOOP_TRIPS)
+        return 1
+
+    def visit_Call(self, node: ast.Call) -> None:
+        name = _dotted(node.func)
+        method = node.func.attr if isinstance(node.func, ast.Attribute) else None
+        estimate = self.estimate
+
+        if method in BOOLEAN_METHODS:
+            estimate.boolean_ops += self.multiplier
+            operands = 1
+            if node.args:
+                tool = node.args[0]
+                if method == 'multiFuse':
+                    operands = self._operands(tool)
+                elif isinstance(tool, ast.Call) and _dotted(tool.func) in COMPOUND_FUNCTIONS and tool.args:
+                    operands = self._operands(tool.args[0])
+            estimate.boolean_operands += self.multiplier * operands
+        elif method in FILLET_METHODS:
+            estimate.fillets += self.multiplier
+        elif method == 'addObject':
+            estimate.document_objects += self.multiplier
+        elif method == 'recompute':
+            estimate.recomputes += self.multiplier
+        elif method == 'append' and isinstance(node.func.value, ast.Name):
+            target = node.func.value.id
+            self._list_sizes[target] = self._list_sizes.get(target, 0) + self.multiplier
+        elif name and name.startswith('Part.make') and name not in COMPOUND_FUNCTIONS:
+            estimate.primitives += self.multiplier
+
+        self.generic_visit(node)
+
+        if isinstance(node.func, ast.Name) and name in self._functions and name not in self._active:
+            self._active.append(name)
+            for stmt in self._functions[name].body:
+                self.visit(stmt)
+            self._active.pop()
+
+
+def count_operations(tree: ast.Module) -> CostEstimate:
+    """Count the expensive operations in a parsed script"""
+    counter = _CostCounter(tree)
+    counter.visit(tree)
+    return counter.estimate
+
+
+def predict_seconds(estimate: CostEstimate, weights: Optional[CostWeights] = None) -> float:
+    weights = weights or CostWeights()
+    return float(np.dot(estimate.features(), list(weights.to_dict().values())))
+
+
+def estimate_cost(code: str, weights: Optional[CostWeights] = None) -> CostEstimate:
+    """Estimate operation counts and run time of a script without running it
+
+    Raises ``SyntaxError`` when the script cannot be parsed.
+    """
+    estimate = count_operations(ast.parse(code))
+    estimate.predicted_seconds = predict_seconds(estimate, weights)
+    return estimate
+
+
+def calibrate_weights(samples: Iterable[Tuple[str, float]]) -> CostWeights:
+    """Fit cost weights to ``(script, measured_seconds)`` samples
+
+    Uses least squares on the operation counts; weights that come out
+    negative (usually from too few samples) are clamped to zero.
+    """
+    rows, times = [], []
+    for code, seconds in samples:
+        rows.append(count_operations(ast.parse(code)).features())
+        times.append(seconds)
+    if not rows:
+        raise ValueError("At least one timed sample is required for calibration")
+
+    solution, *_ = np.linalg.lstsq(np.array(rows, dtype=float), np.array(times, dtype=float), rcond=None)
+    names = [f.name for f in fields(CostWeights)]
+    weights = CostWeights(**dict(zip(names, np.clip(solution, 0.0, None).tolist())))
+    get_logger("ai").info(f"Calibrated cost weights from {len(rows)} samples: {weights.to_dict()}")
+    return weights
+
+
+def order_by_cost(jobs: Sequence[T], code_of: Callable[[T], str] = lambda job: job,
+                  weights: Optional[CostWeights] = None) -> List[T]:
+    """Order jobs cheapest first; scripts that fail to parse go last"""
+    def predicted(job: T) -> float:
+        try:
+            return estimate_cost(code_of(job), weights).predicted_seconds
+        except SyntaxError:
+            return float('inf')
+    return sorted(jobs, key=predicted)
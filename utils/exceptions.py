@@ -14,10 +14,28 @@ class AIGenerationError(VoiceToCADError):
     """Error during AI code generation"""
     pass
 
+class SceneGraphError(AIGenerationError):
+    """Scene graph produced by the model is malformed"""
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("Invalid scene graph: " + "; ".join(self.errors))
+
+class LayoutError(AIGenerationError):
+    """Room program cannot be laid out on the plot"""
+    pass
+
 class FreeCADLaunchError(VoiceToCADError):
     """Error launching FreeCAD"""
     pass
 
+class WorkerPoolError(FreeCADLaunchError):
+    """Error starting or talking to a headless FreeCAD worker"""
+    pass
+
+class ProcessLimitError(FreeCADLaunchError):
+    """Too many live FreeCAD processes for one user"""
+    pass
+
 class AudioProcessingError(VoiceToCADError):
     """Error processing audio input"""
     pass
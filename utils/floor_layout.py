@@ -0,0 +1,599 @@
+"""
+Parametric floor-plan layouts for "nBHK" commands
+
+``parse_layout_command`` reads a room program from a command ("3BHK
+with study on a 40x60 ft plot": three bedrooms, a study, the plot size)
+and ``solve_layout`` lays it out deterministically in milliseconds, so
+the most common architectural requests need no language model.
+
+Rooms are placed in bands. The plot interior is split into a public
+band along the front (living, dining, kitchen, entered from y = 0), a
+corridor along its back and a private band behind that (bedrooms,
+bathrooms, study), each as deep as its share of the program. The public
+band is cut recursively along its longer side into two runs of the room
+list with balanced area. The private rooms form one row along the
+corridor: bedrooms and the study take the full depth of the row,
+bathrooms and stores are stacked into columns wide enough for a door,
+each column next to the bedroom it follows in the program. Every room
+gets its minimum area scaled up to fill the plot, rooms tile the
+interior without overlap, and the variant (bands across the depth or
+across the width) that gives every room a door, then the squarest rooms,
+wins.
+
+Walls run along the room boundaries: exterior walls around the plot,
+interior walls centred on shared edges, merged into maximal straight
+segments. Doors lead from the living room through public rooms and the
+corridor only: a bedroom, bathroom, study or store is entered from one
+of them, except a bathroom or store behind another room in its column,
+which opens off the bedroom beside it (en-suite). Rooms that cannot be
+entered that way are reported. Habitable rooms get a window in their
+longest exterior edge. ``layout_scene`` turns a ``Layout`` into a
+scene graph (``utils.scene_graph``) with openings and room areas tagged
+as detail, which ``utils.scene_compiler`` compiles to FreeCAD code.
+
+Areas are in m² measured to wall centre lines, lengths in mm.
+"""
+import math
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.exceptions import LayoutError
+from utils.scene_graph import Material, Node, Scene, Transform
+
+EXTERIOR_WALL = 200.0
+INTERIOR_WALL = 100.0
+WALL_HEIGHT = 3000.0
+SLAB_THICKNESS = 150.0
+DOOR_WIDTH = 900.0
+DOOR_HEIGHT = 2100.0
+DOOR_CLEARANCE = 150.0  # from the ends of a shared edge
+WINDOW_WIDTH = 1200.0
+WINDOW_SILL = 900.0
+WINDOW_HEIGHT = 1200.0
+BATHROOM_WINDOW = (600.0, 1500.0, 600.0)  # width, sill, height
+CORRIDOR_WIDTH = 1200.0  # to the wall centre lines, room for a door with its clearances
+SERVICE_WIDTH = 1500.0  # narrowest column of stacked bathrooms and stores
+GRID = 50.0  # room edges snap to this (mm)
+MAX_BEDROOMS = 6
+MAX_ASPECT = 3.0  # rooms more elongated than this are reported
+
+FEET = 304.8
+
+
+@dataclass(frozen=True)
+class RoomType:
+    title: str  # object name, numbered when there are several
+    min_area: float  # m²
+    zone: str  # "public", "private" or "circulation"
+    color: Tuple[float, float, float]
+    habitable: bool = True  # gets a full-size window
+
+
+ROOM_TYPES: Dict[str, RoomType] = {
+    'living': RoomType('Living_Room', 16.0, 'public', (0.9, 0.9, 0.7)),
+    'dining': RoomType('Dining', 9.0, 'public', (0.9, 0.8, 0.7)),
+    'kitchen': RoomType('Kitchen', 7.0, 'public', (0.7, 0.9, 0.7)),
+    'utility': RoomType('Utility', 3.0, 'public', (0.8, 0.8, 0.8), habitable=False),
+    'master_bedroom': RoomType('Master_Bedroom', 12.0, 'private', (0.9, 0.7, 0.7)),
+    'bedroom': RoomType('Bedroom', 10.0, 'private', (0.7, 0.7, 0.9)),
+    'bathroom': RoomType('Bathroom', 3.5, 'private', (0.7, 0.9, 0.9), habitable=False),
+    'study': RoomType('Study', 7.5, 'private', (0.8, 0.7, 0.9)),
+    'store': RoomType('Store', 3.0, 'private', (0.8, 0.8, 0.8), habitable=False),
+    'hall': RoomType('Corridor', 0.0, 'circulation', (0.85, 0.85, 0.8), habitable=False),
+}
+
+# Rooms doors may lead through; every other room is only entered
+THROUGH_ZONES = ('public', 'circulation')
+# Rooms stacked in columns along the corridor, and the rooms they may open off
+SERVICE_HOSTS = {'bathroom': ('master_bedroom', 'bedroom'), 'store': ('master_bedroom', 'bedroom', 'study')}
+
+# Optional rooms named in commands
+EXTRAS = {'study': 'study', 'office': 'study', 'dining': 'dining', 'store': 'store', 'storage': 'store',
+          'utility': 'utility', 'laundry': 'utility'}
+
+_NUMBERS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'single': 1, 'double': 2}
+_COUNT = r'(\d+|' + '|'.join(_NUMBERS) + r')'
+_BHK = re.compile(_COUNT + r'\s*-?\s*bhk\b')
+_BEDROOMS = re.compile(_COUNT + r'\s*-?\s*(?:bed(?:room)?s?|br)\b')
+_BATHROOMS = re.compile(_COUNT + r'\s*-?\s*(?:bath(?:room)?s?|toilets?|washrooms?)\b')
+_UNIT = r'\s*(m|meters?|metres?|ft|feet|foot|\')?'
+_PLOT = re.compile(r'(\d+(?:\.\d+)?)' + _UNIT + r'\s*(?:x|by|\*|×)\s*(\d+(?:\.\d+)?)' + _UNIT)
+_RESIDENTIAL = re.compile(r'\b(?:house|home|apartment|flat|villa|bungalow|residence|floor\s*plan|layout|plot)\b')
+
+
+def _count(text: str) -> int:
+    return int(text) if text.isdigit() else _NUMBERS[text]
+
+
+@dataclass
+class RoomSpec:
+    name: str
+    kind: str
+    min_area: float  # m²
+
+
+@dataclass
+class LayoutRequest:
+    """Room program and plot of one command"""
+    bedrooms: int = 2
+    bathrooms: Optional[int] = None  # default: one per two bedrooms, plus one
+    extras: List[str] = field(default_factory=list)  # room kinds from EXTRAS
+    plot_length: Optional[float] = None  # mm along the front (x)
+    plot_width: Optional[float] = None  # mm front to back (y)
+
+    @property
+    def default(self) -> bool:
+        """Plain 2BHK, which the hand-drawn template covers"""
+        return (self.bedrooms == 2 and self.bathrooms is None and not self.extras
+                and self.plot_length is None)
+
+    def rooms(self) -> List[RoomSpec]:
+        """The program in layout order: public rooms, then bedrooms each followed by a bathroom"""
+        kinds = ['living'] + [kind for kind in ('dining', 'kitchen', 'utility')
+                              if kind == 'kitchen' or kind in self.extras]
+        if self.bedrooms >= 3 and 'dining' not in kinds:
+            kinds.insert(1, 'dining')
+        bathrooms = self.bathrooms if self.bathrooms is not None else self.bedrooms // 2 + 1
+        for index in range(max(self.bedrooms, bathrooms)):
+            if index < self.bedrooms:
+                kinds.append('master_bedroom' if index == 0 else 'bedroom')
+            if index < bathrooms:
+                kinds.append('bathroom')
+        kinds += [kind for kind in ('study', 'store') if kind in self.extras]
+
+        seen: Dict[str, int] = {}
+        rooms = []
+        for kind in kinds:
+            seen[kind] = seen.get(kind, 0) + 1
+            name = ROOM_TYPES[kind].title
+            if kind == 'bedroom':
+                name = f"{name}_{seen[kind] + 1}"  # the master bedroom is the first
+            elif kinds.count(kind) > 1:
+                name = f"{name}_{seen[kind]}"
+            rooms.append(RoomSpec(name, kind, ROOM_TYPES[kind].min_area))
+        return rooms
+
+
+def parse_layout_command(command: str) -> Optional[LayoutRequest]:
+    """Room program of a residential command, or ``None`` when it does not ask for one"""
+    text = command.lower()
+    bhk = _BHK.search(text) or _BEDROOMS.search(text)
+    plot = _PLOT.search(text)
+    if not bhk and not (plot and _RESIDENTIAL.search(text)):
+        return None
+
+    request = LayoutRequest(bedrooms=_count(bhk.group(1)) if bhk else 2)
+    bathrooms = _BATHROOMS.search(text)
+    if bathrooms:
+        request.bathrooms = _count(bathrooms.group(1))
+    request.extras = sorted({kind for word, kind in EXTRAS.items() if re.search(rf'\b{word}\b', text)})
+    if plot:
+        length, length_unit, width, width_unit = plot.groups()
+        unit = length_unit or width_unit
+        if unit is None:
+            # Plot sizes without a unit are feet when large ("30x40"), metres otherwise
+            unit = 'ft' if min(float(length), float(width)) > 25 else 'm'
+        scale = 1000.0 if unit.startswith('m') else FEET
+        request.plot_length, request.plot_width = float(length) * scale, float(width) * scale
+    return request
+
+
+@dataclass
+class Room:
+    name: str
+    kind: str
+    x: float  # mm, wall centre lines
+    y: float
+    length: float
+    width: float
+    min_area: float
+
+    @property
+    def area(self) -> float:
+        """m² to the wall centre lines"""
+        return self.length * self.width / 1e6
+
+    @property
+    def aspect(self) -> float:
+        return max(self.length, self.width) / max(min(self.length, self.width), 1e-9)
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        return self.x, self.y, self.x + self.length, self.y + self.width
+
+    @property
+    def label(self) -> str:
+        return f"{self.name.replace('_', ' ')} ({self.area:.1f} sq.m)"
+
+
+@dataclass
+class Wall:
+    """Straight wall along the segment (x0, y0)-(x1, y1), axis-aligned"""
+    name: str
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    thickness: float
+
+    @property
+    def horizontal(self) -> bool:
+        return self.y0 == self.y1
+
+    @property
+    def length(self) -> float:
+        return abs(self.x1 - self.x0) + abs(self.y1 - self.y0)
+
+
+@dataclass
+class Opening:
+    """Door or window in ``wall``, ``offset`` mm from its start"""
+    wall: str
+    kind: str  # "door" or "window"
+    offset: float
+    width: float
+    sill: float
+    height: float
+    rooms: Tuple[str, ...] = ()
+
+
+@dataclass
+class Layout:
+    request: LayoutRequest
+    plot_length: float
+    plot_width: float
+    rooms: List[Room] = field(default_factory=list)
+    walls: List[Wall] = field(default_factory=list)
+    openings: List[Opening] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    def room(self, name: str) -> Room:
+        return next(room for room in self.rooms if room.name == name)
+
+
+def _snap(value: float) -> float:
+    return round(value / GRID) * GRID
+
+
+def _slice(rooms: Sequence[Tuple[RoomSpec, float]], x: float, y: float, length: float, width: float,
+           placed: List[Room]) -> None:
+    """Cut the rectangle into ``rooms`` (spec, area in mm²) in order, along its longer side"""
+    if len(rooms) == 1:
+        spec = rooms[0][0]
+        placed.append(Room(spec.name, spec.kind, x, y, length, width, spec.min_area))
+        return
+    total = sum(area for _, area in rooms)
+    running, best, split = 0.0, math.inf, 1
+    for index in range(1, len(rooms)):
+        running += rooms[index - 1][1]
+        if abs(running - total / 2) < best:
+            best, split = abs(running - total / 2), index
+    share = sum(area for _, area in rooms[:split]) / total
+    if length >= width:
+        cut = _snap(length * share)
+        _slice(rooms[:split], x, y, cut, width, placed)
+        _slice(rooms[split:], x + cut, y, length - cut, width, placed)
+    else:
+        cut = _snap(width * share)
+        _slice(rooms[:split], x, y, length, cut, placed)
+        _slice(rooms[split:], x, y + cut, length, width - cut, placed)
+
+
+def _row_units(private: List[RoomSpec], scale: float, depth: float) -> List[List[Tuple[RoomSpec, float]]]:
+    """Private rooms (spec, area in mm²) as units side by side along the corridor
+
+    A unit is one bedroom or study, or a column of bathrooms and stores,
+    closed once it is ``SERVICE_WIDTH`` wide or holds two rooms (one off
+    the corridor, one en-suite) and placed after the latest bedroom.
+    """
+    minimum = SERVICE_WIDTH * depth
+    units: List[List[Tuple[RoomSpec, float]]] = []
+    column: List[Tuple[RoomSpec, float]] = []
+    after = 0  # where the next column goes: right after the latest bedroom
+
+    def close(column: List[Tuple[RoomSpec, float]]) -> None:
+        nonlocal after
+        units.insert(after, column)
+        after += 1
+
+    for spec in private:
+        area = spec.min_area * 1e6 * scale
+        if spec.kind not in SERVICE_HOSTS:
+            units.append([(spec, area)])
+            if spec.kind.endswith('bedroom'):
+                after = len(units)
+            continue
+        column.append((spec, area))
+        if len(column) == 2 or sum(a for _, a in column) >= minimum:
+            close(column)
+            column = []
+    if column:
+        # Too narrow on its own: join the last column when there is one
+        columns = [unit for unit in units if unit[0][0].kind in SERVICE_HOSTS]
+        if columns:
+            columns[-1].extend(column)
+        else:
+            close(column)
+    return units
+
+
+def _place(program: List[RoomSpec], x: float, y: float, length: float, width: float,
+           across_width: bool) -> List[Room]:
+    """Public band at the front (or left), the corridor, then a row of private rooms"""
+    along, depth = (width, length) if across_width else (length, width)
+
+    def rect(u: float, v: float, du: float, dv: float) -> Tuple[float, float, float, float]:
+        """Band coordinates (u along the corridor, v away from the front) as x, y, length, width"""
+        return (x + v, y + u, dv, du) if across_width else (x + u, y + v, du, dv)
+
+    scale = along * (depth - CORRIDOR_WIDTH) / (sum(spec.min_area for spec in program) * 1e6)
+    public = [(spec, spec.min_area * 1e6 * scale) for spec in program if ROOM_TYPES[spec.kind].zone == 'public']
+    private = [spec for spec in program if ROOM_TYPES[spec.kind].zone == 'private']
+    public_depth = _snap(sum(area for _, area in public) / along)
+    placed: List[Room] = []
+    _slice(public, *rect(0, 0, along, public_depth), placed)
+    placed.append(Room(ROOM_TYPES['hall'].title, 'hall', *rect(0, public_depth, along, CORRIDOR_WIDTH), 0.0))
+
+    row = public_depth + CORRIDOR_WIDTH
+    units = _row_units(private, scale, depth - row)
+    u = 0.0
+    for index, unit in enumerate(units):
+        unit_area = sum(area for _, area in unit)
+        du = along - u if index == len(units) - 1 else _snap(unit_area / (depth - row))
+        # The first room of a column is on the corridor side
+        v = row
+        for position, (spec, area) in enumerate(unit):
+            dv = depth - v if position == len(unit) - 1 else _snap((depth - row) * area / unit_area)
+            placed.append(Room(spec.name, spec.kind, *rect(u, v, du, dv), spec.min_area))
+            v += dv
+        u += du
+    return placed
+
+
+def _intervals(spans: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    merged: List[Tuple[float, float]] = []
+    for start, stop in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def _walls(rooms: List[Room], x0: float, y0: float, x1: float, y1: float,
+           plot_length: float, plot_width: float) -> List[Wall]:
+    """Exterior walls around the plot and merged interior walls on shared room edges"""
+    half = EXTERIOR_WALL / 2
+    walls = [Wall('Front_Wall', 0, half, plot_length, half, EXTERIOR_WALL),
+             Wall('Back_Wall', 0, plot_width - half, plot_length, plot_width - half, EXTERIOR_WALL),
+             Wall('Left_Wall', half, EXTERIOR_WALL, half, plot_width - EXTERIOR_WALL, EXTERIOR_WALL),
+             Wall('Right_Wall', plot_length - half, EXTERIOR_WALL, plot_length - half,
+                  plot_width - EXTERIOR_WALL, EXTERIOR_WALL)]
+    horizontal: Dict[float, List[Tuple[float, float]]] = {}
+    vertical: Dict[float, List[Tuple[float, float]]] = {}
+    for room in rooms:
+        rx0, ry0, rx1, ry1 = room.bounds
+        for y in (ry0, ry1):
+            if y0 < y < y1:
+                horizontal.setdefault(y, []).append((rx0, rx1))
+        for x in (rx0, rx1):
+            if x0 < x < x1:
+                vertical.setdefault(x, []).append((ry0, ry1))
+    # Interior walls reaching the exterior stop at its inner face
+    count = 0
+    for y in sorted(horizontal):
+        for start, stop in _intervals(horizontal[y]):
+            count += 1
+            walls.append(Wall(f'Wall_{count}', EXTERIOR_WALL if start == x0 else start, y,
+                              plot_length - EXTERIOR_WALL if stop == x1 else stop, y, INTERIOR_WALL))
+    for x in sorted(vertical):
+        for start, stop in _intervals(vertical[x]):
+            count += 1
+            walls.append(Wall(f'Wall_{count}', x, EXTERIOR_WALL if start == y0 else start,
+                              x, plot_width - EXTERIOR_WALL if stop == y1 else stop, INTERIOR_WALL))
+    return walls
+
+
+def _shared_edge(a: Room, b: Room) -> Optional[Tuple[float, float, float, bool]]:
+    """(fixed coordinate, start, stop, horizontal) of the edge two rooms share"""
+    ax0, ay0, ax1, ay1 = a.bounds
+    bx0, by0, bx1, by1 = b.bounds
+    if ay1 == by0 or ay0 == by1:
+        fixed, start, stop, horizontal = (ay1 if ay1 == by0 else ay0), max(ax0, bx0), min(ax1, bx1), True
+    elif ax1 == bx0 or ax0 == bx1:
+        fixed, start, stop, horizontal = (ax1 if ax1 == bx0 else ax0), max(ay0, by0), min(ay1, by1), False
+    else:
+        return None
+    return (fixed, start, stop, horizontal) if stop > start else None
+
+
+def _wall_at(walls: List[Wall], fixed: float, start: float, stop: float, horizontal: bool) -> Optional[Wall]:
+    """The wall on ``fixed`` that holds the span start-stop"""
+    for wall in walls:
+        if wall.horizontal != horizontal:
+            continue
+        if horizontal and wall.y0 == fixed and min(wall.x0, wall.x1) <= start and stop <= max(wall.x0, wall.x1):
+            return wall
+        if not horizontal and wall.x0 == fixed and min(wall.y0, wall.y1) <= start and stop <= max(wall.y0, wall.y1):
+            return wall
+    return None
+
+
+def _offset(wall: Wall, position: float) -> float:
+    return position - (min(wall.x0, wall.x1) if wall.horizontal else min(wall.y0, wall.y1))
+
+
+def _openings(rooms: List[Room], walls: List[Wall], x0: float, y0: float, x1: float, y1: float,
+              warnings: List[str]) -> List[Opening]:
+    openings: List[Opening] = []
+    living = rooms[0]
+    # Entrance in the front wall, centred on the living room
+    front = walls[0]
+    openings.append(Opening(front.name, 'door', _offset(front, living.x + living.length / 2) - DOOR_WIDTH / 2,
+                            DOOR_WIDTH, 0.0, DOOR_HEIGHT, (living.name,)))
+
+    needed = DOOR_WIDTH + 2 * DOOR_CLEARANCE
+
+    def door(room: Room, other: Room) -> bool:
+        edge = _shared_edge(room, other)
+        if edge is None or edge[2] - edge[1] < needed:
+            return False
+        fixed, start, stop, horizontal = edge
+        middle = (start + stop) / 2
+        wall = _wall_at(walls, fixed, middle - DOOR_WIDTH / 2, middle + DOOR_WIDTH / 2, horizontal)
+        if wall is None:
+            return False
+        openings.append(Opening(wall.name, 'door', _offset(wall, middle) - DOOR_WIDTH / 2,
+                                DOOR_WIDTH, 0.0, DOOR_HEIGHT, (room.name, other.name)))
+        return True
+
+    # Breadth-first from the living room through public rooms and the corridor;
+    # bedrooms, bathrooms, the study and the store are only entered
+    reached, queue = {living.name}, deque([living])
+    while queue:
+        room = queue.popleft()
+        for other in rooms:
+            if other.name in reached or not door(room, other):
+                continue
+            reached.add(other.name)
+            if ROOM_TYPES[other.kind].zone in THROUGH_ZONES:
+                queue.append(other)
+    # Bathrooms and stores behind another room of their column open off the bedroom beside them
+    for room in rooms:
+        if room.name in reached or room.kind not in SERVICE_HOSTS:
+            continue
+        if any(other.name in reached and other.kind in SERVICE_HOSTS[room.kind] and door(other, room)
+               for other in rooms):
+            reached.add(room.name)
+    for room in rooms:
+        if room.name not in reached:
+            warnings.append(f"{room.name.replace('_', ' ')} has no door: it does not share a long enough wall "
+                            f"with the corridor or a living area")
+
+    # One window in each room's longest exterior edge
+    for room in rooms:
+        rx0, ry0, rx1, ry1 = room.bounds
+        edges = [(walls[0], rx0, rx1) if ry0 == y0 else None, (walls[1], rx0, rx1) if ry1 == y1 else None,
+                 (walls[2], ry0, ry1) if rx0 == x0 else None, (walls[3], ry0, ry1) if rx1 == x1 else None]
+        edges = [edge for edge in edges if edge]
+        if not edges:
+            continue
+        wall, start, stop = max(edges, key=lambda edge: edge[2] - edge[1])
+        if ROOM_TYPES[room.kind].habitable:
+            width, sill, height = min(WINDOW_WIDTH, stop - start - 2 * DOOR_CLEARANCE), WINDOW_SILL, WINDOW_HEIGHT
+        else:
+            width, sill, height = BATHROOM_WINDOW
+        middle = (start + stop) / 2
+        if wall is walls[0] and room is living:
+            middle = (start + middle) / 2  # beside the entrance
+        clash = any(o.wall == wall.name and o.kind == 'door' and abs(o.offset + o.width / 2 - _offset(wall, middle))
+                    < (o.width + width) / 2 for o in openings)
+        if width >= 400 and not clash:
+            openings.append(Opening(wall.name, 'window', _offset(wall, middle) - width / 2, width, sill, height,
+                                    (room.name,)))
+    return openings
+
+
+def solve_layout(request: LayoutRequest) -> Layout:
+    """Non-overlapping rooms, walls, doors and windows for ``request``
+
+    Raises ``LayoutError`` when the program cannot be laid out (too many
+    bedrooms, or a plot smaller than the rooms' minimum areas).
+    """
+    if not 1 <= request.bedrooms <= MAX_BEDROOMS:
+        raise LayoutError(f"Layouts have 1 to {MAX_BEDROOMS} bedrooms, not {request.bedrooms}")
+    program = request.rooms()
+    minimum = sum(spec.min_area for spec in program)
+    if request.plot_length and request.plot_width:
+        plot_length, plot_width = _snap(request.plot_length), _snap(request.plot_width)
+    else:
+        # 25% over the minimum plus the corridor, 4:3 with the long side at the front
+        interior = minimum * 1.25 * 1e6
+        plot_length = math.ceil(math.sqrt(interior * 4 / 3) / 500) * 500 + 2 * EXTERIOR_WALL
+        inside = plot_length - 2 * EXTERIOR_WALL
+        plot_width = math.ceil((interior / inside + CORRIDOR_WIDTH) / 500) * 500 + 2 * EXTERIOR_WALL
+
+    # Room rectangles tile the area inside the exterior walls' centre lines
+    half = EXTERIOR_WALL / 2
+    x0, y0, x1, y1 = half, half, plot_length - half, plot_width - half
+    # At best the corridor runs along the shorter side
+    available = ((x1 - x0) * (y1 - y0) - CORRIDOR_WIDTH * min(x1 - x0, y1 - y0)) / 1e6
+    if available < minimum:
+        raise LayoutError(f"A {plot_length / 1000:.1f} x {plot_width / 1000:.1f} m plot has {available:.1f} sq.m "
+                          f"beside the corridor, the rooms need at least {minimum:.1f} sq.m")
+
+    best = None
+    for across in (False, True):
+        rooms = _place(program, x0, y0, x1 - x0, y1 - y0, across)
+        walls = _walls(rooms, x0, y0, x1, y1, plot_length, plot_width)
+        doors: List[str] = []
+        openings = _openings(rooms, walls, x0, y0, x1, y1, doors)
+        score = (len(doors), max(room.aspect for room in rooms if room.kind != 'hall'),
+                 sum(room.area < room.min_area for room in rooms))
+        if best is None or score < best[0]:
+            best = (score, rooms, walls, openings, doors)
+    _, rooms, walls, openings, doors = best
+
+    layout = Layout(request, plot_length, plot_width, rooms, walls, openings)
+    for room in rooms:
+        if room.area < room.min_area - 1e-6:
+            layout.warnings.append(f"{room.name.replace('_', ' ')} is {room.area:.1f} sq.m, "
+                                   f"below {room.min_area:.1f} sq.m after rounding")
+        if room.kind != 'hall' and room.aspect > MAX_ASPECT:
+            layout.warnings.append(f"{room.name.replace('_', ' ')} is {room.aspect:.1f} times longer than wide")
+    layout.warnings.extend(doors)
+    return layout
+
+
+def _box(length: float, width: float, height: float, translate=(0.0, 0.0, 0.0), **extra) -> Node:
+    return Node('box', params={'length': length, 'width': width, 'height': height},
+                transform=Transform(translate=tuple(float(v) for v in translate)), **extra)
+
+
+def layout_scene(layout: Layout, name: Optional[str] = None) -> Scene:
+    """Scene graph of a layout: slab, walls with openings, room areas and roof"""
+    request = layout.request
+    name = name or f"{request.bedrooms}BHK_House"
+    materials = {'slab': Material((0.8, 0.75, 0.7)), 'wall': Material((0.9, 0.85, 0.8)),
+                 'roof': Material((0.6, 0.4, 0.3))}
+    materials.update({kind: Material(room_type.color) for kind, room_type in ROOM_TYPES.items()})
+    objects = [_box(layout.plot_length, layout.plot_width, SLAB_THICKNESS, name='Floor_Slab', material='slab',
+                    label='Floor')]
+
+    for wall in layout.walls:
+        half = wall.thickness / 2
+        if wall.horizontal:
+            start = min(wall.x0, wall.x1)
+            base = _box(wall.length, wall.thickness, WALL_HEIGHT, (start, wall.y0 - half, SLAB_THICKNESS))
+        else:
+            start = min(wall.y0, wall.y1)
+            base = _box(wall.thickness, wall.length, WALL_HEIGHT, (wall.x0 - half, start, SLAB_THICKNESS))
+        tools = []
+        for opening in layout.openings:
+            if opening.wall != wall.name:
+                continue
+            z = SLAB_THICKNESS + opening.sill
+            translate = ((start + opening.offset, wall.y0 - half - 50, z) if wall.horizontal
+                         else (wall.x0 - half - 50, start + opening.offset, z))
+            size = ((opening.width, wall.thickness + 100) if wall.horizontal
+                    else (wall.thickness + 100, opening.width))
+            tools.append(_box(*size, opening.height, translate, detail='openings'))
+        node = Node('difference', children=[base] + tools) if tools else base
+        node.name, node.material = wall.name, 'wall'
+        objects.append(node)
+
+    for room in layout.rooms:
+        # Room areas fill the clear space between the wall faces
+        inset = [EXTERIOR_WALL / 2 if edge else INTERIOR_WALL / 2 for edge in (
+            room.x == EXTERIOR_WALL / 2, room.y == EXTERIOR_WALL / 2,
+            room.x + room.length == layout.plot_length - EXTERIOR_WALL / 2,
+            room.y + room.width == layout.plot_width - EXTERIOR_WALL / 2)]
+        objects.append(_box(room.length - inset[0] - inset[2], room.width - inset[1] - inset[3], 50,
+                            (room.x + inset[0], room.y + inset[1], SLAB_THICKNESS + 1),
+                            name=room.name, label=room.label, material=room.kind, detail='furniture'))
+
+    objects.append(_box(layout.plot_length, layout.plot_width, SLAB_THICKNESS,
+                        (0, 0, SLAB_THICKNESS + WALL_HEIGHT), name='Roof_Slab', material='roof', label='Roof Slab'))
+    return Scene(name=name, materials=materials, objects=objects)
@@ -0,0 +1,316 @@
+"""
+2D floor plans from the geometry evaluator, written as SVG and ASCII DXF
+
+A plan is a horizontal section through the model at ``cut_height`` seen
+from above, the way architectural drawings show a storey:
+
+* objects the section plane passes through are cut: their section is
+  drawn as a solid fill (poché) with its outline, so walls show their
+  door and window openings;
+* whatever lies entirely below the plane (floor slabs, room areas, the
+  wall under a window sill) is drawn as its footprint in the object's
+  colour, lowest first;
+* objects above the plane (roofs, canopies) are left out.
+
+The evaluator's shapes are grids of axis-aligned cells, exact for the
+box-and-cut geometry of the templates and of compiled scene graphs, so
+both steps are 2D array operations: a shape's section is one layer of
+its fill grid and its footprint an ``any`` over the layers below the
+plane. Filled cells are merged into rectangles (runs along y, joined
+across equal runs in neighbouring columns) and outlines into maximal
+straight segments, so a wall is a handful of primitives however it was
+built.
+
+``write_svg`` and ``write_dxf`` stream those arrays to disk, formatting
+a chunk of rectangles or segments with one ``%`` per chunk instead of
+per-primitive string building. DXF output is AutoCAD R12 (AC1009) in
+millimetres with the layers ``PLAN_CUT`` (section outlines), ``PLAN_POCHE``
+(section fill as ``SOLID``), ``PLAN_BELOW`` (footprints) and ``PLAN_TEXT``
+(room labels).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+from utils.geometry_evaluator import GeometryReport, Shape
+from utils.rasterizer import PALETTE
+
+DEFAULT_CUT_HEIGHT = 1200.0  # mm, the usual section height of a floor plan
+CUT_COLOR = (0.15, 0.15, 0.15)
+BELOW_OPACITY = 0.45
+LABEL_AREA_FRACTION = 0.5  # footprints covering more of the plan (slabs) get no label
+MARGIN = 0.04  # of the plan size on every side of the SVG
+CHUNK = 4096  # rectangles or segments formatted at once
+
+DXF_LAYERS = {'PLAN_CUT': 7, 'PLAN_POCHE': 8, 'PLAN_BELOW': 8, 'PLAN_TEXT': 7}  # name -> ACI colour
+
+_SOLID_FRACTION = 0.5  # cells at least this full count as solid, as in the rasterizer
+
+
+@dataclass
+class PlanRegion:
+    """One object's section or footprint"""
+    name: str
+    label: str
+    kind: str  # "cut" or "below"
+    color: Tuple[float, float, float]
+    rectangles: np.ndarray  # (k, 4) xmin, ymin, xmax, ymax
+    outline: np.ndarray  # (m, 2, 2) segment end points
+    top: float = 0.0  # mm, footprints are drawn lowest first
+
+    @property
+    def area(self) -> float:
+        return float(np.sum((self.rectangles[:, 2] - self.rectangles[:, 0])
+                            * (self.rectangles[:, 3] - self.rectangles[:, 1])))
+
+    def label_point(self) -> Tuple[float, float]:
+        """Centre of the region's largest rectangle, which is always inside it"""
+        sizes = (self.rectangles[:, 2] - self.rectangles[:, 0]) * (self.rectangles[:, 3] - self.rectangles[:, 1])
+        x0, y0, x1, y1 = self.rectangles[int(np.argmax(sizes))]
+        return (x0 + x1) / 2, (y0 + y1) / 2
+
+
+@dataclass
+class Plan:
+    name: str = "Plan"
+    cut_height: float = DEFAULT_CUT_HEIGHT
+    regions: List[PlanRegion] = field(default_factory=list)  # footprints lowest first, then sections
+
+    @property
+    def empty(self) -> bool:
+        return not self.regions
+
+    @property
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """(xmin, ymin, xmax, ymax) around all regions"""
+        if self.empty:
+            return None
+        rectangles = np.concatenate([region.rectangles for region in self.regions])
+        return (float(rectangles[:, 0].min()), float(rectangles[:, 1].min()),
+                float(rectangles[:, 2].max()), float(rectangles[:, 3].max()))
+
+    def labelled(self) -> List[PlanRegion]:
+        """Footprints small enough to be rooms, which get their label written in
+
+        Parts of cut objects below the plane (the wall under a window) and
+        slabs spanning the plan are not labelled.
+        """
+        if self.empty:
+            return []
+        xmin, ymin, xmax, ymax = self.bounds
+        limit = LABEL_AREA_FRACTION * (xmax - xmin) * (ymax - ymin)
+        cut = {region.name for region in self.regions if region.kind == 'cut'}
+        return [region for region in self.regions
+                if region.kind == 'below' and region.name not in cut and region.area < limit]
+
+    def counts(self) -> Dict[str, int]:
+        return {'cut': sum(region.kind == 'cut' for region in self.regions),
+                'below': sum(region.kind == 'below' for region in self.regions),
+                'rectangles': sum(len(region.rectangles) for region in self.regions),
+                'segments': sum(len(region.outline) for region in self.regions)}
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(line, start, stop)`` of the runs of True along axis 1 (``stop`` exclusive)"""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    change = np.diff(padded, axis=1)
+    line, start = np.nonzero(change == 1)
+    stop = np.nonzero(change == -1)[1]
+    return line, start, stop
+
+
+def mask_rectangles(xs: np.ndarray, ys: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """(k, 4) rectangles covering the True cells of a (len(xs)-1, len(ys)-1) grid"""
+    column, start, stop = _runs(mask)
+    if not len(column):
+        return np.zeros((0, 4))
+    # Runs with the same span in neighbouring columns join into one rectangle
+    order = np.lexsort((column, stop, start))
+    column, start, stop = column[order], start[order], stop[order]
+    new = np.ones(len(column), dtype=bool)
+    new[1:] = (start[1:] != start[:-1]) | (stop[1:] != stop[:-1]) | (column[1:] != column[:-1] + 1)
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(column)) - 1
+    return np.stack([xs[column[first]], ys[start[first]], xs[column[last] + 1], ys[stop[first]]], axis=1)
+
+
+def mask_outline(xs: np.ndarray, ys: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """(m, 2, 2) straight segments along the boundary of the True cells"""
+    padded = np.pad(mask, 1)
+    # Boundaries at y = ys[j] between cells (i, j - 1) and (i, j), run along x
+    row, start, stop = _runs((padded[1:-1, 1:] != padded[1:-1, :-1]).T)
+    horizontal = np.stack([np.stack([xs[start], ys[row]], axis=1), np.stack([xs[stop], ys[row]], axis=1)], axis=1)
+    # Boundaries at x = xs[i] between cells (i - 1, j) and (i, j), run along y
+    column, start, stop = _runs(padded[1:, 1:-1] != padded[:-1, 1:-1])
+    vertical = np.stack([np.stack([xs[column], ys[start]], axis=1), np.stack([xs[column], ys[stop]], axis=1)], axis=1)
+    return np.concatenate([horizontal, vertical]).reshape(-1, 2, 2)
+
+
+def _region(name: str, label: str, kind: str, color, xs, ys, mask, top: float) -> Optional[PlanRegion]:
+    if not mask.any():
+        return None
+    return PlanRegion(name, label, kind, tuple(float(c) for c in color), mask_rectangles(xs, ys, mask),
+                      mask_outline(xs, ys, mask), top)
+
+
+def _cut_height(worlds: Sequence[Tuple[List[np.ndarray], np.ndarray]], cut_height: float) -> float:
+    """``cut_height`` if it passes through the model, otherwise the model's mid-height"""
+    spans = []
+    for edges, solid in worlds:
+        layers = np.flatnonzero(solid.any(axis=(0, 1)))
+        if len(layers):
+            spans.append((edges[2][layers[0]], edges[2][layers[-1] + 1]))
+    if not spans or any(low <= cut_height < high for low, high in spans):
+        return cut_height
+    return float((min(low for low, _ in spans) + max(high for _, high in spans)) / 2)
+
+
+def plan_from_shapes(shapes: Dict[str, Shape], cut_height: float = DEFAULT_CUT_HEIGHT,
+                     labels: Optional[Dict[str, str]] = None,
+                     colors: Optional[Dict[str, Sequence[float]]] = None, name: str = "Plan") -> Plan:
+    """Section at ``cut_height`` (mm) and footprints below it of evaluator shapes
+
+    When the plane misses the model (a part lying lower than a storey) it
+    is moved to the model's mid-height.
+    """
+    labels, colors = labels or {}, colors or {}
+    worlds = {}
+    for key, shape in shapes.items():
+        edges, fill, _ = shape.world()
+        if fill.size:
+            solid = fill >= _SOLID_FRACTION
+            worlds[key] = (edges, solid if solid.any() else fill > 0)
+    cut_height = _cut_height(list(worlds.values()), cut_height)
+
+    below, cut = [], []
+    for index, (key, (edges, solid)) in enumerate(worlds.items()):
+        xs, ys, zs = edges
+        color = colors.get(key)
+        color = PALETTE[index % len(PALETTE)] if color is None else color
+        label = labels.get(key, key)
+        layer = np.searchsorted(zs, cut_height, side='right') - 1
+        section = solid[:, :, layer] if 0 <= layer < solid.shape[2] else np.zeros(solid.shape[:2], dtype=bool)
+        lower = solid[:, :, zs[1:] <= cut_height]
+        footprint = lower.any(axis=2) & ~section
+        if footprint.any():
+            top = float(zs[np.flatnonzero(lower.any(axis=(0, 1)))[-1] + 1])
+            below.append(_region(key, label, 'below', color, xs, ys, footprint, top))
+        region = _region(key, label, 'cut', color, xs, ys, section, cut_height)
+        if region:
+            cut.append(region)
+    below.sort(key=lambda region: region.top)
+    return Plan(name, float(cut_height), below + cut)
+
+
+def plan_from_report(report: GeometryReport, cut_height: float = DEFAULT_CUT_HEIGHT, name: str = "Plan") -> Plan:
+    """Plan of the visible objects of an evaluated script, with their labels and colours"""
+    visible = [obj for obj in report.objects if obj["visible"] and obj["name"] in report.shapes]
+    return plan_from_shapes({obj["name"]: report.shapes[obj["name"]] for obj in visible}, cut_height,
+                            labels={obj["name"]: obj["label"] for obj in visible},
+                            colors={obj["name"]: obj["color"] for obj in visible if obj.get("color")},
+                            name=name)
+
+
+def _rows(template: str, values: np.ndarray) -> Iterator[str]:
+    """``template`` filled with each row of ``values``, ``CHUNK`` rows per string"""
+    values = np.asarray(values, dtype=float).reshape(len(values), -1)
+    for start in range(0, len(values), CHUNK):
+        block = values[start:start + CHUNK]
+        yield (template * len(block)) % tuple(block.ravel())
+
+
+def _hex(color: Sequence[float]) -> str:
+    return '#' + ''.join(f'{int(round(min(max(c, 0.0), 1.0) * 255)):02x}' for c in color[:3])
+
+
+def write_svg(plan: Plan, path: str, scale: float = 100.0) -> int:
+    """SVG drawing of ``plan`` at 1:``scale``; returns the number of regions drawn"""
+    xmin, ymin, xmax, ymax = plan.bounds or (0.0, 0.0, 1.0, 1.0)
+    margin = MARGIN * max(xmax - xmin, ymax - ymin, 1e-9)
+    left, top = xmin - margin, ymax + margin
+    width, height = xmax - xmin + 2 * margin, ymax - ymin + 2 * margin
+    stroke = max(width, height) / 1000  # about 0.25 mm on an A4 sheet
+    flip = np.array([-left, top])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width:.10g} {height:.10g}" '
+                f'width="{width / scale:.10g}mm" height="{height / scale:.10g}mm">\n'
+                f'<title>{escape(plan.name)}</title>\n'
+                f'<rect width="100%" height="100%" fill="#ffffff"/>\n')
+        for region in plan.regions:
+            # Drawing coordinates: x from the left margin, y downwards from the top
+            rectangles = np.column_stack([region.rectangles[:, 0] - left, top - region.rectangles[:, 3],
+                                          region.rectangles[:, 2] - region.rectangles[:, 0],
+                                          region.rectangles[:, 3] - region.rectangles[:, 1]])
+            segments = (region.outline * [1, -1] + flip).reshape(-1, 4)
+            if region.kind == 'cut':
+                fill, opacity, line, weight = _hex(CUT_COLOR), 1.0, '#000000', 2 * stroke
+            else:
+                fill, opacity, line, weight = _hex(region.color), BELOW_OPACITY, '#6c757d', stroke
+            f.write(f'<g id={quoteattr(f"{region.name}_{region.kind}")} class="{region.kind}">\n'
+                    f'<path fill="{fill}" fill-opacity="{opacity:g}" stroke="none" d="')
+            for chunk in _rows('M%.10g %.10gh%.10gv%.10gH%.10gz', np.column_stack([rectangles, rectangles[:, 0]])):
+                f.write(chunk)
+            f.write(f'"/>\n<path fill="none" stroke="{line}" stroke-width="{weight:.10g}" '
+                    f'stroke-linecap="square" d="')
+            for chunk in _rows('M%.10g %.10gL%.10g %.10g', segments):
+                f.write(chunk)
+            f.write('"/>\n</g>\n')
+        font = max(width, height) / 60
+        for region in plan.labelled():
+            x, y = region.label_point()
+            f.write(f'<text x="{x - left:.10g}" y="{top - y:.10g}" font-family="sans-serif" '
+                    f'font-size="{font:.10g}" text-anchor="middle" dominant-baseline="middle" '
+                    f'fill="#212529">{escape(region.label)}</text>\n')
+        f.write('</svg>\n')
+    return len(plan.regions)
+
+
+def _dxf_pairs(*pairs: Any) -> str:
+    return ''.join(f'{code}\n{value}\n' for code, value in zip(pairs[::2], pairs[1::2]))
+
+
+def write_dxf(plan: Plan, path: str) -> int:
+    """ASCII DXF (R12, millimetres) of ``plan``; returns the number of entities written"""
+    xmin, ymin, xmax, ymax = plan.bounds or (0.0, 0.0, 0.0, 0.0)
+    text_height = max(xmax - xmin, ymax - ymin) / 60 or 1.0
+    count = 0
+    with open(path, 'w', encoding='cp1252', errors='replace', newline='\r\n') as f:
+        f.write(_dxf_pairs(0, 'SECTION', 2, 'HEADER', 9, '$ACADVER', 1, 'AC1009',
+                           9, '$EXTMIN', 10, f'{xmin:.10g}', 20, f'{ymin:.10g}', 30, 0,
+                           9, '$EXTMAX', 10, f'{xmax:.10g}', 20, f'{ymax:.10g}', 30, 0, 0, 'ENDSEC'))
+        f.write(_dxf_pairs(0, 'SECTION', 2, 'TABLES', 0, 'TABLE', 2, 'LAYER', 70, len(DXF_LAYERS)))
+        for layer, color in DXF_LAYERS.items():
+            f.write(_dxf_pairs(0, 'LAYER', 2, layer, 70, 0, 62, color, 6, 'CONTINUOUS'))
+        f.write(_dxf_pairs(0, 'ENDTAB', 0, 'ENDSEC', 0, 'SECTION', 2, 'ENTITIES'))
+
+        for region in plan.regions:
+            if region.kind == 'cut':
+                # SOLID corners go first, second, fourth, third around the quadrilateral
+                x0, y0, x1, y1 = region.rectangles.T
+                corners = np.column_stack([x0, y0, x1, y0, x0, y1, x1, y1])
+                for chunk in _rows('0\nSOLID\n8\nPLAN_POCHE\n10\n%.10g\n20\n%.10g\n30\n0\n11\n%.10g\n21\n%.10g\n31\n0\n'
+                                   '12\n%.10g\n22\n%.10g\n32\n0\n13\n%.10g\n23\n%.10g\n33\n0\n', corners):
+                    f.write(chunk)
+                count += len(corners)
+            layer = 'PLAN_CUT' if region.kind == 'cut' else 'PLAN_BELOW'
+            for chunk in _rows(f'0\nLINE\n8\n{layer}\n10\n%.10g\n20\n%.10g\n30\n0\n11\n%.10g\n21\n%.10g\n31\n0\n',
+                               region.outline.reshape(-1, 4)):
+                f.write(chunk)
+            count += len(region.outline)
+        for region in plan.labelled():
+            x, y = region.label_point()
+            # Centred text: horizontal justification 1, vertical 2, aligned at the 11/21 point
+            label = ' '.join(region.label.split())
+            f.write(_dxf_pairs(0, 'TEXT', 8, 'PLAN_TEXT', 10, f'{x:.10g}', 20, f'{y:.10g}', 30, 0,
+                               40, f'{text_height:.10g}', 1, label, 72, 1, 11, f'{x:.10g}', 21, f'{y:.10g}',
+                               31, 0, 73, 2))
+            count += 1
+        f.write(_dxf_pairs(0, 'ENDSEC', 0, 'EOF'))
+    return count
+
+
+WRITERS = {'svg': write_svg, 'dxf': write_dxf}
@@ -0,0 +1,317 @@
+"""
+Pure-Python stand-in for the FreeCAD and Part modules
+
+Used by the headless worker (and tests) on machines without FreeCAD. It
+does not compute geometry: shapes only record the operation that created
+them so scripts run to completion, documents track their objects and the
+export functions write small placeholder files, which ``openDocument``
+reads back. ``install()`` registers the modules in ``sys.modules`` so
+``import FreeCAD`` picks them up.
+"""
+import os
+import sys
+import types
+from typing import Any, Dict, List, Optional
+
+STUB_VERSION = ['0', '21', '0', 'stub']
+
+
+class Vector:
+    """Minimal FreeCAD.Vector"""
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        if isinstance(x, (tuple, list)):
+            x, y, z = x
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, other: 'Vector') -> 'Vector':
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other: 'Vector') -> 'Vector':
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, factor: float) -> 'Vector':
+        return Vector(self.x * factor, self.y * factor, self.z * factor)
+
+    __rmul__ = __mul__
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Vector) and tuple(self) == tuple(other)
+
+    def __repr__(self) -> str:
+        return f"Vector ({self.x}, {self.y}, {self.z})"
+
+
+class Rotation:
+    def __init__(self, *args):
+        self.args = args
+
+
+class Placement:
+    def __init__(self, base: Optional[Vector] = None, rotation: Optional[Rotation] = None, *args):
+        self.Base = base if isinstance(base, Vector) else Vector()
+        self.Rotation = rotation if isinstance(rotation, Rotation) else Rotation()
+
+    def multiply(self, other: 'Placement') -> 'Placement':
+        # rotations are not tracked, so composing only adds the offsets
+        return Placement(self.Base + other.Base, self.Rotation)
+
+
+class _Attributes:
+    """Object that accepts any attribute, e.g. a ViewObject"""
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = _Attributes()
+        setattr(self, name, value)
+        return value
+
+    def __call__(self, *args, **kwargs) -> '_Attributes':
+        return _Attributes()
+
+
+class BoundBox:
+    """Minimal FreeCAD.BoundBox"""
+
+    def __init__(self, xmin=0.0, ymin=0.0, zmin=0.0, xmax=0.0, ymax=0.0, zmax=0.0):
+        self.XMin, self.YMin, self.ZMin = xmin, ymin, zmin
+        self.XMax, self.YMax, self.ZMax = xmax, ymax, zmax
+
+
+class Shape:
+    """Records the call that created it; every shape method returns a new shape"""
+
+    # Methods that change the shape in place (and return it)
+    IN_PLACE = ('translate', 'rotate', 'scale', 'transformShape', 'reverse')
+
+    def __init__(self, operation: str = 'Shape', args: tuple = ()):
+        self.operation = operation
+        self.args = args
+        self.Placement = Placement()
+
+    def copy(self) -> 'Shape':
+        shape = Shape(self.operation, self.args)
+        shape.Placement = Placement(Vector(*self.Placement.Base), self.Placement.Rotation)
+        return shape
+
+    def translate(self, vector: Vector) -> 'Shape':
+        self.Placement.Base = self.Placement.Base + vector
+        return self
+
+    def translated(self, vector: Vector) -> 'Shape':
+        return self.copy().translate(vector)
+
+    def isNull(self) -> bool:
+        return False
+
+    @property
+    def BoundBox(self) -> BoundBox:
+        """Exact for boxes; any other shape is a point at its placement"""
+        base = self.Placement.Base
+        size = [0.0, 0.0, 0.0]
+        if self.operation == 'makeBox' and all(isinstance(a, (int, float)) for a in self.args[:3]):
+            size = [float(a) for a in self.args[:3]]
+        return BoundBox(base.x, base.y, base.z, base.x + size[0], base.y + size[1], base.z + size[2])
+
+    def isValid(self) -> bool:
+        return True
+
+    def exportStep(self, path: str) -> None:
+        _write_placeholder(path, 'STEP', [self])
+
+    def exportBrep(self, path: str) -> None:
+        _write_placeholder(path, 'BREP', [self])
+
+    def importBrep(self, path: str) -> None:
+        """Read back the operation written by ``exportBrep``"""
+        with open(path, encoding='utf-8') as f:
+            self.operation = f.read().splitlines()[1].split(' ', 1)[0]
+
+    def exportBrepToString(self) -> str:
+        """Same layout as ``exportBrep`` so ``importBrep`` can read it back"""
+        return (f"BREP placeholder written by the FreeCAD stub\n"
+                f"{self.operation} {tuple(self.Placement.Base)} {self.args!r}\n")
+
+    def exportStl(self, path: str) -> None:
+        _write_placeholder(path, 'STL', [self])
+
+    def tessellate(self, tolerance: float) -> tuple:
+        """A unit tetrahedron at the shape's position"""
+        base = self.Placement.Base
+        points = [base, base + Vector(1, 0, 0), base + Vector(0, 1, 0), base + Vector(0, 0, 1)]
+        return points, [(0, 2, 1), (0, 1, 3), (0, 3, 2), (1, 2, 3)]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name in self.IN_PLACE:
+            return lambda *args, **kwargs: self
+        return lambda *args, **kwargs: Shape(name, args)
+
+
+class DocumentObject:
+    def __init__(self, document: 'Document', type_id: str, name: str):
+        self.Document = document
+        self.TypeId = type_id
+        self.Name = name
+        self.Label = name
+        self.Shape = Shape()
+        self.Placement = Placement()
+        self.ViewObject = _Attributes()
+        self.Visibility = True
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = _Attributes()
+        setattr(self, name, value)
+        return value
+
+
+class Document:
+    def __init__(self, name: str):
+        self.Name = name
+        self.Label = name
+        self.Objects: List[DocumentObject] = []
+        self.FileName = ''
+
+    def addObject(self, type_id: str, name: str = 'Object') -> DocumentObject:
+        existing = {obj.Name for obj in self.Objects}
+        unique, counter = name, 1
+        while unique in existing:
+            unique, counter = f"{name}{counter:03d}", counter + 1
+        obj = DocumentObject(self, type_id, unique)
+        self.Objects.append(obj)
+        return obj
+
+    def getObject(self, name: str) -> Optional[DocumentObject]:
+        return next((obj for obj in self.Objects if obj.Name == name), None)
+
+    def removeObject(self, name: str) -> None:
+        self.Objects = [obj for obj in self.Objects if obj.Name != name]
+
+    def recompute(self) -> int:
+        return len(self.Objects)
+
+    def saveAs(self, path: str) -> None:
+        self.FileName = path
+        _write_placeholder(path, 'FCStd', [obj.Shape for obj in self.Objects])
+
+    def save(self) -> None:
+        self.saveAs(self.FileName)
+
+
+class _Console:
+    @staticmethod
+    def PrintMessage(text: str) -> None:
+        sys.stdout.write(text)
+
+    @staticmethod
+    def PrintWarning(text: str) -> None:
+        sys.stderr.write(text)
+
+    PrintError = PrintWarning
+    PrintLog = PrintMessage
+
+
+# File extensions each writer accepts; FreeCAD picks the format from the extension
+PLACEHOLDER_EXTENSIONS = {
+    'STEP': ('.step', '.stp'),
+    'BREP': ('.brep', '.brp'),
+    'STL': ('.stl',),
+    'FCStd': ('.fcstd',),
+    'Part': ('.step', '.stp', '.iges', '.igs', '.brep', '.brp'),
+}
+
+
+def _write_placeholder(path: str, kind: str, shapes: List[Shape]) -> None:
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in PLACEHOLDER_EXTENSIONS[kind]:
+        raise ValueError(f"Unknown file extension for {kind} export: {path}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{kind} placeholder written by the FreeCAD stub\n")
+        for shape in shapes:
+            f.write(f"{shape.operation} {tuple(shape.Placement.Base)}\n")
+
+
+def _make_freecad_module() -> types.ModuleType:
+    module = types.ModuleType('FreeCAD')
+    documents: Dict[str, Document] = {}
+    state = {'active': None}
+
+    def newDocument(name: str = 'Unnamed', *args) -> Document:
+        unique, counter = name, 1
+        while unique in documents:
+            unique, counter = f"{name}{counter}", counter + 1
+        documents[unique] = Document(unique)
+        state['active'] = documents[unique]
+        return documents[unique]
+
+    def closeDocument(name: str) -> None:
+        document = documents.pop(name)
+        if state['active'] is document:
+            state['active'] = next(iter(documents.values()), None)
+
+    def setActiveDocument(name: str) -> None:
+        state['active'] = documents[name]
+
+    def openDocument(path: str) -> Document:
+        """A document with one feature per shape listed in a placeholder file"""
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()[1:]
+        document = newDocument(os.path.splitext(os.path.basename(path))[0])
+        document.FileName = path
+        for line in lines:
+            document.addObject('Part::Feature', 'Shape').Shape = Shape(line.split(' ', 1)[0])
+        return document
+
+    module.Vector = Vector
+    module.BoundBox = BoundBox
+    module.Rotation = Rotation
+    module.Placement = Placement
+    module.Console = _Console()
+    module.newDocument = newDocument
+    module.closeDocument = closeDocument
+    module.setActiveDocument = setActiveDocument
+    module.openDocument = openDocument
+    module.getDocument = lambda name: documents[name]
+    module.listDocuments = lambda: dict(documents)
+    module.Version = lambda: list(STUB_VERSION)
+    module.GuiUp = 0
+    module.IS_STUB = True
+
+    def active_document(name: str) -> Any:
+        if name == 'ActiveDocument':
+            return state['active']
+        raise AttributeError(f"module 'FreeCAD' has no attribute '{name}'")
+    module.__getattr__ = active_document
+    return module
+
+
+def _make_part_module() -> types.ModuleType:
+    module = types.ModuleType('Part')
+    module.Shape = Shape
+    module.Vector = Vector
+    module.export = lambda objects, path: _write_placeholder(path, 'Part', [obj.Shape for obj in objects])
+    module.makeCompound = lambda shapes: Shape('makeCompound', (list(shapes),))
+    module.getShape = lambda obj: obj.Shape.copy()
+
+    def factory(name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: Shape(name, args)
+    module.__getattr__ = factory
+    return module
+
+
+def install() -> types.ModuleType:
+    """Register the stub ``FreeCAD``/``App``/``Part`` modules and return FreeCAD"""
+    freecad = _make_freecad_module()
+    sys.modules['FreeCAD'] = freecad
+    sys.modules['App'] = freecad
+    sys.modules['Part'] = _make_part_module()
+    return freecad
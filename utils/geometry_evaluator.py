@@ -0,0 +1,984 @@
+"""
+In-process geometry evaluation without FreeCAD
+
+The app servers have no FreeCAD, so ``evaluate_script`` runs a generated
+script against a small NumPy model of the part of the FreeCAD/Part API the
+templates use: the primitives (``makeBox``, ``makeCylinder``, ...),
+``translate``/``rotate``, shape and object Placements, ``cut``/``fuse``/
+``common``, ``makeCompound`` and faces of ``makePolygon`` outlines
+extruded along a vector. It reports every object's bounding box
+and approximate volume in milliseconds, and ``GeometryReport.issues``
+lists what looks wrong: no solids, objects cut away completely, a model
+kilometres across.
+
+A shape is a grid of axis-aligned cells (one edge array per axis) holding
+the fraction of each cell the solid fills. Booleans merge the edge arrays
+of both grids and combine the fractions element-wise, so cuts and fuses of
+axis-aligned boxes are exact. Round primitives and extruded polygons fill
+their bounding box with the right volume, and rotations other than quarter turns about an
+axis collapse a shape into its rotated bounding box; such shapes are
+marked approximate. Calls outside the model (Draft, sketches, extrusions)
+do nothing and are listed in ``GeometryReport.unsupported``.
+
+Scripts run with only the modelled modules and the public, non-module
+names of a few standard ones importable, no ``open``/``exec``, no access to
+underscore or frame attributes, and a time budget. That keeps mistakes
+contained but is not a security boundary on its own, and the budget cannot
+interrupt one long C-level operation such as ``7 ** 7 ** 9``. Untrusted
+scripts go through ``evaluate_isolated``, which runs the evaluator in a
+child process with a memory limit and kills it at the deadline; scripts
+are only run for real in ``services.sandbox``.
+"""
+import ast
+import builtins
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import types
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from utils.freecad_stub import STUB_VERSION, BoundBox, Vector, _Attributes
+from utils.logging_config import get_logger
+
+logger = get_logger("ai")
+
+# Standard modules scripts may import besides the modelled FreeCAD ones
+ALLOWED_MODULES = ('math', 'random', 'itertools', 'functools', 'collections', 'typing')
+
+# FreeCAD modules that import fine but whose calls are not modelled
+UNSUPPORTED_MODULES = ('Draft', 'Arch', 'Sketcher', 'PartDesign', 'Mesh', 'MeshPart',
+                       'BOPTools', 'Import', 'Spreadsheet')
+
+BLOCKED_BUILTINS = ('open', 'exec', 'eval', 'compile', 'input', 'breakpoint', 'exit', 'quit', 'help',
+                    'vars', 'globals', 'locals')
+
+# Attributes leading from a generator, coroutine or traceback to interpreter frames
+FRAME_ATTRIBUTES = frozenset(('gi_frame', 'gi_code', 'gi_yieldfrom', 'cr_frame', 'cr_code', 'cr_await',
+                              'ag_frame', 'ag_code', 'ag_await', 'f_back', 'f_builtins', 'f_code',
+                              'f_globals', 'f_locals', 'tb_frame', 'tb_next', 'mro'))
+
+# Seconds an isolated evaluation may take beyond its budget to start up before it is killed
+ISOLATION_GRACE = 5.0
+
+# Parametric Part objects that are modelled, with FreeCAD's default properties
+PARAMETRIC_DEFAULTS = {
+    'Part::Box': {'Length': 10.0, 'Width': 10.0, 'Height': 10.0},
+    'Part::Cylinder': {'Radius': 2.0, 'Height': 10.0},
+    'Part::Sphere': {'Radius': 5.0},
+}
+
+# Merged grids above this many cells fall back to a bounding box of the right volume
+MAX_CELLS = 2_000_000
+
+# A model larger than this (mm) is probably drawn in the wrong unit
+MAX_MODEL_EXTENT = 1_000_000.0
+
+SCRIPT_FILENAME = '<generated>'
+
+_DECIMALS = 6  # edge coordinates are merged at a micrometre resolution
+_NO_EDGES = np.zeros(0)
+_NO_CELLS = np.zeros((0, 0, 0))
+
+
+class OCCError(RuntimeError):
+    """Part.OCCError: raised for degenerate primitives, as FreeCAD does"""
+
+
+class _Timeout(BaseException):
+    """Raised into the script once its time budget is spent (not catchable as Exception)"""
+
+
+def _blocked_attribute(name: str) -> bool:
+    return name.startswith('_') or name in FRAME_ATTRIBUTES
+
+
+def _check_script(tree: ast.Module) -> None:
+    """Reject scripts reaching for the interpreter (``().__class__.__base__``...)"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and _blocked_attribute(node.attr):
+            raise PermissionError(f"line {node.lineno}: attribute {node.attr} is not available")
+        if isinstance(node, ast.Name) and node.id.startswith('__') and node.id != '__name__':
+            raise PermissionError(f"line {node.lineno}: name {node.id} is not available")
+        if isinstance(node, ast.alias) and _blocked_attribute(node.name.split('.')[-1]):
+            raise PermissionError(f"import of {node.name} is not available")
+
+
+def _axis_angle(axis: np.ndarray, angle: float) -> np.ndarray:
+    """Rotation matrix for ``angle`` radians about the unit vector ``axis``"""
+    x, y, z = axis
+    k = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    return np.eye(3) + math.sin(angle) * k + (1.0 - math.cos(angle)) * (k @ k)
+
+
+class Rotation:
+    """FreeCAD.Rotation as a matrix: from an axis and degrees, or yaw/pitch/roll"""
+
+    def __init__(self, *args):
+        self.matrix = np.eye(3)
+        if len(args) == 1 and isinstance(args[0], Rotation):
+            self.matrix = args[0].matrix.copy()
+        elif len(args) == 2 and not isinstance(args[1], Vector):
+            axis = np.array(tuple(args[0]), dtype=float)
+            norm = np.linalg.norm(axis)
+            if norm:
+                self.matrix = _axis_angle(axis / norm, math.radians(float(args[1])))
+        elif len(args) == 2:
+            self.matrix = _rotation_between(args[0], args[1])
+        elif len(args) == 3 and all(isinstance(a, (int, float)) for a in args):
+            yaw, pitch, roll = (math.radians(float(a)) for a in args)
+            self.matrix = (_axis_angle(np.array([0.0, 0.0, 1.0]), yaw) @ _axis_angle(np.array([0.0, 1.0, 0.0]), pitch)
+                           @ _axis_angle(np.array([1.0, 0.0, 0.0]), roll))
+
+    def multiply(self, other: 'Rotation') -> 'Rotation':
+        rotation = Rotation()
+        rotation.matrix = self.matrix @ other.matrix
+        return rotation
+
+    def multVec(self, vector: Vector) -> Vector:
+        return Vector(*(self.matrix @ np.array(tuple(vector), dtype=float)))
+
+    def isIdentity(self) -> bool:
+        return bool(np.allclose(self.matrix, np.eye(3)))
+
+
+def _rotation_between(start, end) -> np.ndarray:
+    """Matrix turning direction ``start`` onto direction ``end``"""
+    a = np.array(tuple(start), dtype=float)
+    b = np.array(tuple(end), dtype=float)
+    a, b = a / np.linalg.norm(a), b / np.linalg.norm(b)
+    axis = np.cross(a, b)
+    sine, cosine = np.linalg.norm(axis), float(np.dot(a, b))
+    if sine < 1e-12:
+        return np.eye(3) if cosine > 0 else _axis_angle(np.array([1.0, 0.0, 0.0]) if abs(a[0]) < 0.9
+                                                         else np.array([0.0, 1.0, 0.0]), math.pi)
+    return _axis_angle(axis / sine, math.atan2(sine, cosine))
+
+
+class Placement:
+    """FreeCAD.Placement: rotation, then translation by ``Base``"""
+
+    def __init__(self, base=None, rotation=None, *args):
+        self.Base = Vector(*base) if base is not None else Vector()
+        if isinstance(rotation, Rotation):
+            self.Rotation = Rotation(rotation)
+            if args:  # Placement(base, rotation, center) rotates about center
+                center = np.array(tuple(args[0]), dtype=float)
+                self.Base = self.Base + Vector(*(center - self.Rotation.matrix @ center))
+        elif rotation is not None and args:  # Placement(base, axis, angle)
+            self.Rotation = Rotation(rotation, args[0])
+        else:
+            self.Rotation = Rotation()
+
+    def copy(self) -> 'Placement':
+        return Placement(self.Base, self.Rotation)
+
+    def multiply(self, other: 'Placement') -> 'Placement':
+        base = self.Rotation.matrix @ np.array(tuple(other.Base)) + np.array(tuple(self.Base))
+        return Placement(Vector(*base), self.Rotation.multiply(other.Rotation))
+
+    def move(self, vector: Vector) -> None:
+        self.Base = self.Base + Vector(*vector)
+
+    def isIdentity(self) -> bool:
+        return not any(self.Base) and self.Rotation.isIdentity()
+
+
+def _shapes(value) -> List['Shape']:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _occupied_box(edges: Sequence[np.ndarray], fill: np.ndarray) -> Optional[np.ndarray]:
+    """[xmin, ymin, zmin, xmax, ymax, zmax] of the filled cells, None when empty"""
+    occupied = fill > 0
+    if not occupied.any():
+        return None
+    lower, upper = [], []
+    for axis in range(3):
+        filled = np.flatnonzero(occupied.any(axis=tuple(a for a in range(3) if a != axis)))
+        lower.append(edges[axis][filled[0]])
+        upper.append(edges[axis][filled[-1] + 1])
+    return np.array(lower + upper, dtype=float)
+
+
+def _compact(edges: List[np.ndarray], fill: np.ndarray):
+    """Trim empty border cells and merge neighbouring slabs that are filled alike"""
+    if not (fill > 0).any():
+        return [_NO_EDGES] * 3, _NO_CELLS
+    edges = list(edges)
+    for axis in range(3):
+        others = tuple(a for a in range(3) if a != axis)
+        filled = np.flatnonzero((fill > 0).any(axis=others))
+        fill = np.take(fill, np.arange(filled[0], filled[-1] + 1), axis=axis)
+        edges[axis] = edges[axis][filled[0]:filled[-1] + 2]
+        changed = (np.diff(fill, axis=axis) != 0).any(axis=others)
+        edges[axis] = edges[axis][np.concatenate(([True], changed, [True]))]
+        fill = np.compress(np.concatenate(([True], changed)), fill, axis=axis)
+    return edges, fill
+
+
+def _resample(shape: 'Shape', edges: Sequence[np.ndarray]) -> np.ndarray:
+    """Fill fractions of a world-space shape on a finer grid containing all its edges"""
+    result = np.zeros(tuple(max(len(e) - 1, 0) for e in edges))
+    if shape.isNull():
+        return result
+    indices, inside = [], []
+    for axis in range(3):
+        centers = (edges[axis][:-1] + edges[axis][1:]) / 2
+        source = shape.edges[axis]
+        index = np.searchsorted(source, centers, side='right') - 1
+        inside.append((index >= 0) & (index < len(source) - 1))
+        indices.append(np.clip(index, 0, len(source) - 2))
+    mask = inside[0][:, None, None] & inside[1][None, :, None] & inside[2][None, None, :]
+    return np.where(mask, shape.fill[np.ix_(*indices)], 0.0)
+
+
+class Shape:
+    """Solid as a grid of axis-aligned cells holding the fraction each cell is filled
+
+    ``edges`` and ``fill`` are in local coordinates and never modified in
+    place; ``Placement`` moves the shape like a FreeCAD shape's placement.
+    """
+
+    def __init__(self, edges: Optional[List[np.ndarray]] = None, fill: Optional[np.ndarray] = None,
+                 approximate: bool = False, unsupported: Set[str] = frozenset()):
+        self.edges = edges if edges is not None else [_NO_EDGES] * 3
+        self.fill = fill if fill is not None else _NO_CELLS
+        self.approximate = approximate
+        self.unsupported = frozenset(unsupported)
+        self.Placement = Placement()
+
+    def copy(self) -> 'Shape':
+        shape = Shape(self.edges, self.fill, self.approximate, self.unsupported)
+        shape.Placement = self.Placement.copy()
+        return shape
+
+    def translate(self, vector) -> 'Shape':
+        self.Placement.move(vector)
+        return self
+
+    def translated(self, vector) -> 'Shape':
+        return self.copy().translate(vector)
+
+    def rotate(self, center, axis, angle: float) -> 'Shape':
+        rotation = Rotation(Vector(*axis), angle).matrix
+        pivot = np.array(tuple(center), dtype=float)
+        base = rotation @ (np.array(tuple(self.Placement.Base)) - pivot) + pivot
+        self.Placement.Rotation.matrix = rotation @ self.Placement.Rotation.matrix
+        self.Placement.Base = Vector(*base)
+        return self
+
+    def rotated(self, center, axis, angle: float) -> 'Shape':
+        return self.copy().rotate(center, axis, angle)
+
+    def isNull(self) -> bool:
+        return not (self.fill > 0).any()
+
+    def isValid(self) -> bool:
+        return True
+
+    @property
+    def Volume(self) -> float:
+        if self.isNull():
+            return 0.0
+        dx, dy, dz = (np.diff(edges) for edges in self.edges)
+        return float(np.einsum('i,j,k,ijk->', dx, dy, dz, self.fill))
+
+    @property
+    def BoundBox(self) -> BoundBox:
+        box = _occupied_box(*self.world()[:2])
+        return BoundBox(*box) if box is not None else BoundBox()
+
+    @property
+    def Solids(self) -> List['Shape']:
+        return [] if self.isNull() else [self]
+
+    Edges = Faces = Vertexes = property(lambda self: [])
+    ShapeType = 'Solid'
+
+    def world(self):
+        """``(edges, fill, approximate)`` with the Placement applied"""
+        rotation = self.Placement.Rotation.matrix
+        base = np.array(tuple(self.Placement.Base))
+        if self.isNull():
+            return [_NO_EDGES] * 3, _NO_CELLS, self.approximate
+        if np.allclose(rotation, np.eye(3)):
+            return [self.edges[axis] + base[axis] for axis in range(3)], self.fill, self.approximate
+
+        rounded = np.round(rotation)
+        if np.allclose(rotation, rounded, atol=1e-9) and np.all(np.abs(rounded).sum(axis=1) == 1):
+            # Quarter turns only permute and mirror the axes, which keeps the grid exact
+            sources = [int(np.argmax(np.abs(rounded[axis]))) for axis in range(3)]
+            fill = np.transpose(self.fill, sources)
+            edges = []
+            for axis, source in enumerate(sources):
+                if rounded[axis, source] < 0:
+                    edges.append(-self.edges[source][::-1] + base[axis])
+                    fill = np.flip(fill, axis=axis)
+                else:
+                    edges.append(self.edges[source] + base[axis])
+            return edges, fill, self.approximate
+
+        # Any other rotation: the rotated bounding box of the filled cells, at the same volume
+        cells = np.nonzero(self.fill > 0)
+        lower = np.stack([self.edges[axis][cells[axis]] for axis in range(3)], axis=1)
+        upper = np.stack([self.edges[axis][cells[axis] + 1] for axis in range(3)], axis=1)
+        corners = np.concatenate([np.where(np.array(mask), upper, lower)
+                                  for mask in np.ndindex(2, 2, 2)]) @ rotation.T + base
+        shape = _primitive(corners.min(axis=0), corners.max(axis=0), self.Volume, approximate=True)
+        return shape.edges, shape.fill, True
+
+    def _boolean(self, operation: str, others) -> 'Shape':
+        shapes = [self] + _shapes(others)
+        worlds = [shape.world() for shape in shapes]
+        approximate = any(world[2] for world in worlds)
+        unsupported = frozenset().union(*(shape.unsupported for shape in shapes))
+        edges = [np.unique(np.round(np.concatenate([world[0][axis] for world in worlds]), _DECIMALS))
+                 for axis in range(3)]
+        if math.prod(max(len(e) - 1, 0) for e in edges) > MAX_CELLS:
+            result = _bounding(operation, shapes, worlds)
+            result.unsupported = unsupported
+            return result
+
+        fills = [_resample(Shape(world[0], world[1]), edges) for world in worlds]
+        fill = fills[0]
+        for other in fills[1:]:
+            if operation == 'fuse':
+                fill = fill + other - fill * other
+            elif operation == 'cut':
+                fill = fill * (1.0 - other)
+            else:
+                fill = fill * other
+        edges, fill = _compact(edges, fill)
+        return Shape(edges, fill, approximate, unsupported)
+
+    def cut(self, tools, *args) -> 'Shape':
+        return self._boolean('cut', tools)
+
+    def fuse(self, others, *args) -> 'Shape':
+        return self._boolean('fuse', others)
+
+    def multiFuse(self, others, *args) -> 'Shape':
+        return self._boolean('fuse', others)
+
+    def common(self, others, *args) -> 'Shape':
+        return self._boolean('common', others)
+
+    def makeFillet(self, *args) -> 'Shape':
+        # Rounding removes a little material; the volume is no longer exact
+        shape = self.copy()
+        shape.approximate = True
+        return shape
+
+    makeChamfer = makeFillet
+
+    def removeSplitter(self) -> 'Shape':
+        return self.copy()
+
+    refine = removeSplitter
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: Shape(approximate=True, unsupported=self.unsupported | {f"Shape.{name}"})
+
+
+def _primitive(lower, upper, volume: float, pnt=None, direction=None, approximate: bool = False) -> Shape:
+    """Bounding box ``lower``..``upper`` filled to ``volume``, placed at ``pnt`` along ``direction``"""
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    box_volume = float(np.prod(upper - lower))
+    if box_volume <= 0:
+        return Shape(approximate=approximate)
+    shape = Shape([np.array([lower[axis], upper[axis]]) for axis in range(3)],
+                  np.full((1, 1, 1), min(1.0, volume / box_volume)), approximate)
+    if pnt is None and direction is None:
+        return shape
+    shape.Placement = Placement(pnt, Rotation(Vector(0, 0, 1), Vector(*direction)) if direction is not None else None)
+    edges, fill, approximate = shape.world()
+    return Shape(edges, fill, approximate)
+
+
+def _bounding(operation: str, shapes: List[Shape], worlds) -> Shape:
+    """Bounding-box result for booleans whose merged grid would be too large"""
+    boxes = [_occupied_box(world[0], world[1]) for world in worlds]
+    volumes = [shape.Volume for shape in shapes]
+    if operation == 'fuse':
+        present = [box for box in boxes if box is not None]
+        if not present:
+            return Shape(approximate=True)
+        box = np.concatenate([np.min(present, axis=0)[:3], np.max(present, axis=0)[3:]])
+        volume = sum(volumes)
+    elif operation == 'cut':
+        box, volume = boxes[0], volumes[0]
+    else:
+        if any(b is None for b in boxes):
+            return Shape(approximate=True)
+        box = np.concatenate([np.max(boxes, axis=0)[:3], np.min(boxes, axis=0)[3:]])
+        volume = min(volumes)
+    if box is None or np.any(box[3:] <= box[:3]):
+        return Shape(approximate=True)
+    return _primitive(box[:3], box[3:], volume, approximate=True)
+
+
+def _dimensions(function: str, *values, allow_zero: int = 0) -> List[float]:
+    """Positive float dimensions; ``allow_zero`` of them may also be zero (cone radii)"""
+    values = [float(value) for value in values]
+    zeros = sum(1 for value in values if value == 0)
+    if any(value < 0 for value in values) or zeros > allow_zero:
+        raise OCCError(f"{function}: dimensions must be positive, got {values}")
+    return values
+
+
+def _make_box(length, width, height, pnt=None, dir=None) -> Shape:
+    length, width, height = _dimensions('makeBox', length, width, height)
+    return _primitive((0, 0, 0), (length, width, height), length * width * height, pnt, dir)
+
+
+def _make_cylinder(radius, height, pnt=None, dir=None, angle=360.0) -> Shape:
+    radius, height = _dimensions('makeCylinder', radius, height)
+    return _primitive((-radius, -radius, 0), (radius, radius, height),
+                      math.pi * radius ** 2 * height * float(angle) / 360.0, pnt, dir, approximate=True)
+
+
+def _make_cone(radius1, radius2, height, pnt=None, dir=None, angle=360.0) -> Shape:
+    radius1, radius2, height = _dimensions('makeCone', radius1, radius2, height, allow_zero=1)
+    if height == 0:
+        raise OCCError(f"makeCone: height must be positive, got {height}")
+    radius = max(radius1, radius2)
+    volume = math.pi * height * (radius1 ** 2 + radius1 * radius2 + radius2 ** 2) / 3.0
+    return _primitive((-radius, -radius, 0), (radius, radius, height),
+                      volume * float(angle) / 360.0, pnt, dir, approximate=True)
+
+
+def _make_sphere(radius, pnt=None, dir=None, *args) -> Shape:
+    radius, = _dimensions('makeSphere', radius)
+    return _primitive((-radius,) * 3, (radius,) * 3, 4.0 / 3.0 * math.pi * radius ** 3, pnt, dir, approximate=True)
+
+
+def _make_torus(radius1, radius2, pnt=None, dir=None, *args) -> Shape:
+    radius1, radius2 = _dimensions('makeTorus', radius1, radius2)
+    outer = radius1 + radius2
+    return _primitive((-outer, -outer, -radius2), (outer, outer, radius2),
+                      2.0 * math.pi ** 2 * radius1 * radius2 ** 2, pnt, dir, approximate=True)
+
+
+def _make_compound(shapes) -> Shape:
+    shapes = list(shapes)
+    return shapes[0]._boolean('fuse', shapes[1:]) if shapes else Shape()
+
+
+class Wire(Shape):
+    """Polyline through ``points``; it has no volume until a face of it is extruded"""
+    ShapeType = 'Wire'
+
+    def __init__(self, points: Optional[np.ndarray] = None):
+        super().__init__()
+        self.points = np.zeros((0, 3)) if points is None else np.asarray(points, dtype=float).reshape(-1, 3)
+
+    def copy(self) -> 'Wire':
+        wire = type(self)(self.points)
+        wire.Placement = self.Placement.copy()
+        return wire
+
+    def isClosed(self) -> bool:
+        return len(self.points) > 3 and np.allclose(self.points[0], self.points[-1])
+
+    def _world_points(self) -> np.ndarray:
+        return self.points @ self.Placement.Rotation.matrix.T + np.array(tuple(self.Placement.Base))
+
+
+class Face(Wire):
+    """Plane face bounded by a closed polyline"""
+    ShapeType = 'Face'
+
+    @property
+    def Area(self) -> float:
+        return float(np.linalg.norm(self._normal()))
+
+    def _normal(self) -> np.ndarray:
+        """Normal scaled by the enclosed area (half the sum of the edge cross products)"""
+        return np.cross(self.points[:-1], self.points[1:]).sum(axis=0) @ self.Placement.Rotation.matrix.T / 2
+
+    def extrude(self, vector) -> Shape:
+        direction = np.array(tuple(vector), dtype=float)
+        points = self._world_points()
+        swept = np.concatenate([points, points + direction])
+        return _primitive(swept.min(axis=0), swept.max(axis=0), abs(float(self._normal() @ direction)),
+                          approximate=True)
+
+
+def _make_polygon(points, closed: bool = False) -> Wire:
+    points = [tuple(point) for point in points]
+    if len(points) < 2:
+        raise OCCError(f"makePolygon: needs at least two points, got {len(points)}")
+    if closed and points[0] != points[-1]:
+        points.append(points[0])
+    return Wire(points)
+
+
+def _make_face(wire, *args) -> Face:
+    wire = _shapes(wire)[0]
+    if not isinstance(wire, Wire) or not wire.isClosed():
+        raise OCCError("Part.Face: the wire is not closed")
+    face = Face(wire.points)
+    face.Placement = wire.Placement.copy()
+    return face
+
+
+class DocumentObject:
+    def __init__(self, document: 'Document', type_id: str, name: str):
+        self.Document = document
+        self.TypeId = type_id
+        self.Name = name
+        self.Label = name
+        self.Placement = Placement()
+        self.ViewObject = _Attributes()
+        self.Visibility = True
+        self.Group: List['DocumentObject'] = []
+        self.LinkedObject: Optional['DocumentObject'] = None
+        self._shape = Shape()
+        for prop, value in PARAMETRIC_DEFAULTS.get(type_id, {}).items():
+            setattr(self, prop, value)
+
+    @property
+    def Shape(self) -> Shape:
+        """The object's shape at the object's Placement"""
+        if self.TypeId == 'Part::Box':
+            shape = _make_box(self.Length, self.Width, self.Height)
+        elif self.TypeId == 'Part::Cylinder':
+            shape = _make_cylinder(self.Radius, self.Height)
+        elif self.TypeId == 'Part::Sphere':
+            shape = _make_sphere(self.Radius)
+        elif self.TypeId == 'App::Link' and self.LinkedObject is not None:
+            shape = self.LinkedObject.Shape
+        else:
+            shape = self._shape.copy()
+        shape.Placement = self.Placement.copy()
+        return shape
+
+    @Shape.setter
+    def Shape(self, shape: Shape) -> None:
+        # As in FreeCAD, assigning a shape also takes over its placement
+        self._shape = shape.copy()
+        self.Placement = shape.Placement.copy()
+
+    def addObject(self, obj: 'DocumentObject') -> None:
+        self.Group.append(obj)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        value = _Attributes()
+        setattr(self, name, value)
+        return value
+
+
+class Document:
+    def __init__(self, name: str, session: '_Session'):
+        self.Name = name
+        self.Label = name
+        self.Objects: List[DocumentObject] = []
+        self.FileName = ''
+        self._session = session
+
+    def addObject(self, type_id: str, name: str = 'Object') -> DocumentObject:
+        existing = {obj.Name for obj in self.Objects}
+        unique, counter = name, 1
+        while unique in existing:
+            unique, counter = f"{name}{counter:03d}", counter + 1
+        if not (type_id in PARAMETRIC_DEFAULTS or type_id in ('Part::Feature', 'App::Link')
+                or type_id.startswith('App::')):
+            self._session.unsupported.add(type_id)
+        obj = DocumentObject(self, type_id, unique)
+        self.Objects.append(obj)
+        return obj
+
+    def getObject(self, name: str) -> Optional[DocumentObject]:
+        return next((obj for obj in self.Objects if obj.Name == name), None)
+
+    def getObjectsByLabel(self, label: str) -> List[DocumentObject]:
+        return [obj for obj in self.Objects if obj.Label == label]
+
+    def removeObject(self, name: str) -> None:
+        self.Objects = [obj for obj in self.Objects if obj.Name != name]
+
+    def recompute(self) -> int:
+        return len(self.Objects)
+
+    def saveAs(self, path: str) -> None:
+        self._session.unsupported.add('Document.saveAs')
+
+    save = saveAs
+
+
+class _Session:
+    """Documents, output and unmodelled calls of one evaluation"""
+
+    def __init__(self):
+        self.documents: Dict[str, Document] = {}
+        self.active: Optional[Document] = None
+        self.output: List[str] = []
+        self.unsupported: Set[str] = set()
+
+    def new_document(self, name: str = 'Unnamed', *args) -> Document:
+        unique, counter = name, 1
+        while unique in self.documents:
+            unique, counter = f"{name}{counter}", counter + 1
+        self.documents[unique] = self.active = Document(unique, self)
+        return self.active
+
+    def print(self, *args, sep: str = ' ', end: str = '\n', **kwargs) -> None:
+        self.output.append(sep.join(str(arg) for arg in args) + end)
+
+
+def _unsupported_module(name: str, session: _Session) -> types.ModuleType:
+    module = types.ModuleType(name)
+
+    def attribute(attr: str) -> Any:
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+
+        def call(*args, **kwargs):
+            session.unsupported.add(f"{name}.{attr}")
+            return _Attributes()
+        return call
+    module.__getattr__ = attribute
+    return module
+
+
+def _make_freecad_module(session: _Session) -> types.ModuleType:
+    module = types.ModuleType('FreeCAD')
+    console = types.SimpleNamespace(PrintMessage=lambda text: session.output.append(str(text)))
+    console.PrintWarning = console.PrintError = console.PrintLog = console.PrintMessage
+
+    def closeDocument(name: str) -> None:
+        document = session.documents.pop(name)
+        if session.active is document:
+            session.active = next(iter(session.documents.values()), None)
+
+    def setActiveDocument(name: str) -> None:
+        session.active = session.documents[name]
+
+    module.Vector = Vector
+    module.BoundBox = BoundBox
+    module.Rotation = Rotation
+    module.Placement = Placement
+    module.Console = console
+    module.newDocument = session.new_document
+    module.closeDocument = closeDocument
+    module.setActiveDocument = setActiveDocument
+    module.getDocument = lambda name: session.documents[name]
+    module.listDocuments = lambda: dict(session.documents)
+    module.Version = lambda: list(STUB_VERSION)
+    module.GuiUp = 0
+
+    def attribute(name: str) -> Any:
+        if name == 'ActiveDocument':
+            return session.active
+        if name.startswith('_') or name == 'Gui':
+            raise AttributeError(f"module 'FreeCAD' has no attribute '{name}'")
+        session.unsupported.add(f"FreeCAD.{name}")
+        return _Attributes()
+    module.__getattr__ = attribute
+    return module
+
+
+def _make_part_module(session: _Session) -> types.ModuleType:
+    module = types.ModuleType('Part')
+    module.Shape = Shape
+    module.Vector = Vector
+    module.OCCError = OCCError
+    module.makeBox = _make_box
+    module.makeCylinder = _make_cylinder
+    module.makeCone = _make_cone
+    module.makeSphere = _make_sphere
+    module.makeTorus = _make_torus
+    module.makeCompound = module.Compound = _make_compound
+    module.makePolygon = _make_polygon
+    module.Face = _make_face
+    module.Wire = Wire
+    module.getShape = lambda obj, *args, **kwargs: obj.Shape
+
+    def show(shape: Shape, name: str = 'Shape') -> DocumentObject:
+        document = session.active or session.new_document()
+        obj = document.addObject('Part::Feature', name)
+        obj.Shape = shape
+        return obj
+    module.show = show
+
+    def factory(name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def unsupported(*args, **kwargs) -> Shape:
+            session.unsupported.add(f"Part.{name}")
+            return Shape(approximate=True, unsupported={f"Part.{name}"})
+        return unsupported
+    module.__getattr__ = factory
+    return module
+
+
+_PUBLIC_MODULES: Dict[str, types.ModuleType] = {}
+
+
+def _public_module(name: str) -> types.ModuleType:
+    """An allowed standard module without the modules it imports (``typing.sys``)"""
+    if name not in _PUBLIC_MODULES:
+        real = builtins.__import__(name)
+        public = types.ModuleType(name)
+        public.__dict__.update({attr: value for attr, value in vars(real).items()
+                                if not attr.startswith('_') and not isinstance(value, types.ModuleType)})
+        _PUBLIC_MODULES[name] = public
+    return _PUBLIC_MODULES[name]
+
+
+def _script_builtins(session: _Session) -> Dict[str, Any]:
+    freecad = _make_freecad_module(session)
+    modules = {'FreeCAD': freecad, 'App': freecad, 'Part': _make_part_module(session),
+               'FreeCADGui': _Attributes(), 'Gui': _Attributes()}
+    modules.update({name: _unsupported_module(name, session) for name in UNSUPPORTED_MODULES})
+
+    def importer(name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name in modules:
+            return modules[name]
+        if level == 0 and name in ALLOWED_MODULES:
+            return _public_module(name)
+        raise ImportError(f"No module named '{name}' in the geometry evaluator")
+
+    def guarded(function):
+        def attribute(obj, name, *args):
+            if isinstance(name, str) and _blocked_attribute(name):
+                raise AttributeError(f"attribute {name} is not available")
+            return function(obj, name, *args)
+        return attribute
+
+    allowed = {name: value for name, value in vars(builtins).items() if name not in BLOCKED_BUILTINS}
+    allowed['__import__'] = importer
+    for name in ('getattr', 'setattr', 'delattr'):
+        allowed[name] = guarded(getattr(builtins, name))
+    allowed['print'] = session.print
+    return allowed
+
+
+def _time_limit(deadline: float):
+    """Trace function raising ``_Timeout`` in the script once ``deadline`` passes"""
+    def trace(frame, event, arg):
+        if time.perf_counter() > deadline:
+            raise _Timeout()
+        return trace if frame.f_code.co_filename == SCRIPT_FILENAME else None
+    return trace
+
+
+@dataclass
+class GeometryReport:
+    """Objects, bounding boxes and volumes of one evaluated script"""
+    status: str  # "ok", "error", "timeout" or, for isolated runs, "crashed"
+    elapsed: float = 0.0
+    objects: List[Dict[str, Any]] = field(default_factory=list)  # name, type, label, visible, bound_box, volume, approximate, color
+    unsupported: List[str] = field(default_factory=list)
+    issues: List[str] = field(default_factory=list)
+    stdout: str = ""
+    error: Optional[str] = None
+    shapes: Dict[str, Shape] = field(default_factory=dict, repr=False)  # object name -> placed shape
+
+    @property
+    def success(self) -> bool:
+        return self.status == "ok"
+
+    @property
+    def object_count(self) -> int:
+        return len(self.objects)
+
+    def _visible(self) -> List[Dict[str, Any]]:
+        return [obj for obj in self.objects if obj["visible"] and obj["bound_box"]]
+
+    @property
+    def bound_box(self) -> Optional[List[float]]:
+        """[xmin, ymin, zmin, xmax, ymax, zmax] around all visible objects"""
+        boxes = np.array([obj["bound_box"] for obj in self._visible()])
+        if not len(boxes):
+            return None
+        return boxes[:, :3].min(axis=0).tolist() + boxes[:, 3:].max(axis=0).tolist()
+
+    @property
+    def size(self) -> Optional[List[float]]:
+        box = self.bound_box
+        return [box[axis + 3] - box[axis] for axis in range(3)] if box else None
+
+    @property
+    def volume(self) -> float:
+        """Volume of the visible objects in mm³ (overlaps between objects count twice)"""
+        return float(sum(obj["volume"] for obj in self._visible()))
+
+    @property
+    def approximate(self) -> bool:
+        return bool(self.unsupported) or any(obj["approximate"] for obj in self._visible())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"status": self.status, "elapsed": self.elapsed, "object_count": self.object_count,
+                "bound_box": self.bound_box, "volume": self.volume, "approximate": self.approximate,
+                "objects": self.objects, "unsupported": self.unsupported, "issues": self.issues,
+                "error": self.error}
+
+
+def _has_geometry(obj: DocumentObject) -> bool:
+    return obj.TypeId.startswith('Part::') or obj.TypeId == 'App::Link'
+
+
+def _shape_color(obj: DocumentObject) -> Optional[List[float]]:
+    """``ViewObject.ShapeColor`` as RGB (0..1) if the script set one"""
+    color = vars(obj.ViewObject).get('ShapeColor')
+    if isinstance(color, (tuple, list)) and len(color) >= 3 \
+            and all(isinstance(c, (int, float)) for c in color[:3]):
+        return [float(c) for c in color[:3]]
+    return None
+
+
+def _issues(report: GeometryReport) -> List[str]:
+    """Signs that the model is not what was asked for"""
+    issues = []
+    solids = [obj for obj in report.objects if obj["visible"] and obj["volume"]]
+    if not solids and not report.unsupported:
+        issues.append("The model has no solid geometry")
+    for obj in report.objects:
+        shape = report.shapes.get(obj["name"])
+        if (obj["visible"] and not obj["volume"] and shape is not None and not shape.unsupported
+                and obj["type"] in ('Part::Feature', 'App::Link')):
+            issues.append(f"{obj['label']} has no volume (cut away completely or never assigned a shape)")
+    size = report.size
+    if size and max(size) > MAX_MODEL_EXTENT:
+        issues.append(f"The model is {max(size) / 1000:,.0f} m across; FreeCAD lengths are in mm")
+    return issues
+
+
+def evaluate_script(code: str, timeout: float = 5.0) -> GeometryReport:
+    """Run ``code`` against the NumPy model of the Part API and report its geometry"""
+    session = _Session()
+    namespace = {'__name__': '__main__', '__builtins__': _script_builtins(session)}
+    start = time.perf_counter()
+    report = GeometryReport(status="ok")
+    previous = sys.gettrace()
+    try:
+        tree = ast.parse(code, SCRIPT_FILENAME)
+        _check_script(tree)
+        compiled = compile(tree, SCRIPT_FILENAME, 'exec')
+        sys.settrace(_time_limit(start + timeout))
+        try:
+            exec(compiled, namespace)
+        finally:
+            sys.settrace(previous)
+        for document in session.documents.values():
+            for obj in document.Objects:
+                shape = obj.Shape if _has_geometry(obj) else None
+                edges, fill, approximate = shape.world() if shape is not None else (None, _NO_CELLS, False)
+                box = _occupied_box(edges, fill) if shape is not None else None
+                report.objects.append({
+                    "name": obj.Name, "type": obj.TypeId, "label": obj.Label,
+                    "visible": bool(obj.Visibility),
+                    "bound_box": box.tolist() if box is not None else None,
+                    "volume": shape.Volume if shape is not None else 0.0,
+                    "approximate": approximate,
+                    "color": _shape_color(obj),
+                })
+                if shape is not None:
+                    report.shapes[obj.Name] = shape
+                    session.unsupported.update(shape.unsupported)
+        report.unsupported = sorted(session.unsupported)
+        report.issues = _issues(report)
+    except _Timeout:
+        report.status, report.error = "timeout", f"Script ran longer than {timeout:.1f}s"
+    except Exception as e:
+        report.status, report.error = "error", f"{type(e).__name__}: {e}"
+    report.elapsed = time.perf_counter() - start
+    report.stdout = ''.join(session.output)
+    if not report.success:
+        report.objects, report.shapes = [], {}
+    logger.debug(f"Evaluated script geometry in {report.elapsed * 1000:.1f} ms: {report.status}, "
+                 f"{report.object_count} objects")
+    return report
+
+
+def _write_report(report: GeometryReport, stream) -> None:
+    """``report`` as an ``.npz`` archive: plain arrays and one JSON record, nothing pickled"""
+    names = list(report.shapes)
+    record = {key: value for key, value in report.to_dict().items()
+              if key in ('status', 'objects', 'unsupported', 'issues', 'error')}
+    record['stdout'] = report.stdout
+    record['shapes'] = []
+    arrays = {}
+    for index, name in enumerate(names):
+        edges, fill, approximate = report.shapes[name].world()
+        record['shapes'].append({'name': name, 'approximate': approximate,
+                                 'unsupported': sorted(report.shapes[name].unsupported)})
+        arrays.update({f'edges_{index}_{axis}': edges[axis] for axis in range(3)})
+        arrays[f'fill_{index}'] = fill
+    np.savez(stream, record=np.array(json.dumps(record)), **arrays)
+
+
+def _read_report(data: bytes) -> GeometryReport:
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        record = json.loads(str(archive['record']))
+        shapes = {}
+        for index, item in enumerate(record.pop('shapes')):
+            edges = [archive[f'edges_{index}_{axis}'] for axis in range(3)]
+            shapes[item['name']] = Shape(edges, archive[f'fill_{index}'], item['approximate'],
+                                         frozenset(item['unsupported']))
+    return GeometryReport(shapes=shapes, **record)
+
+
+def evaluate_isolated(code: str, timeout: float = 5.0, memory_limit_mb: Optional[int] = None) -> GeometryReport:
+    """``evaluate_script`` in a child process that is killed at the deadline
+
+    For scripts from the model or from users: whatever the script does, it
+    can only take the child down. The report comes back as arrays and JSON,
+    so even a compromised child cannot make this process unpickle anything.
+    """
+    command = [sys.executable, '-m', 'utils.geometry_evaluator', str(timeout), str(memory_limit_mb or 0)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL, cwd=root)
+    except OSError as e:
+        return GeometryReport(status="crashed", error=f"Could not start the geometry evaluator: {e}")
+    try:
+        output, _ = process.communicate(code.encode('utf-8'), timeout=timeout + ISOLATION_GRACE)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        report = GeometryReport(status="timeout", error=f"Script ran longer than {timeout:.1f}s")
+    else:
+        try:
+            report = _read_report(output)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            reason = "ran out of memory or crashed" if process.returncode else f"returned no report ({e})"
+            report = GeometryReport(status="crashed", error=f"Geometry evaluator {reason}")
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _main() -> None:
+    """Child side of ``evaluate_isolated``: script on stdin, report on stdout"""
+    timeout, memory_limit_mb = float(sys.argv[1]), int(sys.argv[2])
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):  # Windows: only the parent's deadline applies
+            pass
+    code = sys.stdin.buffer.read().decode('utf-8')
+    output = io.BytesIO()
+    _write_report(evaluate_script(code, timeout), output)
+    sys.stdout.buffer.write(output.getvalue())
+    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    _main()
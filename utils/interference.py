@@ -0,0 +1,216 @@
+"""
+Interference checks on object bounding boxes
+
+Generated buildings often have walls that overlap, partitions that stop
+just short of a wall and rooms that stick out of the foundation.
+``check_interference`` takes the per-object bounding boxes a run reports
+(``WorkerResult.objects`` or ``GeometryReport.objects``; ``check_scene``
+for a scene graph) and finds
+
+* collisions: pairs whose boxes interpenetrate by more than
+  ``min_overlap`` on every axis. Wall joints at corners and T-junctions
+  overlap by a small part of the smaller object and are only counted.
+  With the evaluator's shapes the overlap is measured on the solids, so
+  frames sitting in wall openings do not collide with the wall,
+* gaps: pairs that overlap on two axes and are ``min_gap``..``max_gap``
+  apart on the third, i.e. meant to meet but do not, unless a third
+  object spans the space between them,
+* out-of-bounds objects: ground-level objects whose footprint extends past
+  the foundation (the largest object named like one, or explicit bounds).
+
+Candidate pairs come from a vectorized sweep and prune: boxes are sorted
+along the axis with the largest spread, ``searchsorted`` gives the run of
+boxes each one can reach along it, and the remaining axes are tested for
+all candidate pairs at once. Thousands of objects take milliseconds.
+"""
+import re
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import InterferenceConfig
+from utils.geometry_evaluator import Shape, evaluate_script
+from utils.level_of_detail import LevelOfDetail
+from utils.scene_compiler import compile_scene
+from utils.scene_graph import Scene
+
+AXES = 'xyz'
+
+# Objects whose footprint bounds the rest of the model
+BOUNDARY_PATTERN = re.compile(r'foundation|plinth|site|plot', re.IGNORECASE)
+
+
+@dataclass
+class Collision:
+    first: str
+    second: str
+    overlap: List[float]  # bounding box of the overlapping region
+    volume: float
+    fraction: float  # overlap volume / volume of the smaller object
+
+
+@dataclass
+class Gap:
+    first: str
+    second: str
+    axis: str
+    distance: float
+
+
+@dataclass
+class OutOfBounds:
+    name: str
+    boundary: str
+    overhang: float  # furthest distance past the boundary footprint
+
+
+@dataclass
+class InterferenceReport:
+    """Collisions, gaps and out-of-bounds objects among a model's bounding boxes"""
+    object_count: int = 0
+    boundary: Optional[str] = None
+    collisions: List[Collision] = field(default_factory=list)  # largest overlap first
+    joints: int = 0  # overlaps too small to be collisions
+    gaps: List[Gap] = field(default_factory=list)
+    out_of_bounds: List[OutOfBounds] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def clean(self) -> bool:
+        return not (self.collisions or self.gaps or self.out_of_bounds)
+
+    def issues(self) -> List[str]:
+        return ([f"{c.first} and {c.second} overlap ({c.fraction:.0%} of the smaller one)" for c in self.collisions]
+                + [f"{g.first} and {g.second} are {g.distance:.0f} mm apart along {g.axis}" for g in self.gaps]
+                + [f"{o.name} extends {o.overhang:.0f} mm past {o.boundary}" for o in self.out_of_bounds])
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["issues"] = self.issues()
+        return result
+
+
+def candidate_pairs(boxes: np.ndarray, reach: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Index pairs ``i < j`` whose boxes are at most ``reach`` apart on every axis
+
+    ``boxes`` is an (n, 6) array of [xmin, ymin, zmin, xmax, ymax, zmax];
+    a negative ``reach`` asks for overlaps at least that deep. Returns both
+    index arrays and the (m, 3) per-axis separations (negative = overlap).
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 6)
+    count = len(boxes)
+    if count < 2:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros((0, 3))
+    lower, upper = boxes[:, :3], boxes[:, 3:]
+    axis = int(np.argmax(np.ptp(lower + upper, axis=0)))
+    order = np.argsort(lower[:, axis], kind='stable')
+    starts, ends = lower[order, axis], upper[order, axis]
+
+    # Boxes after position k in sweep order start no earlier; they are candidates
+    # until one starts more than ``reach`` past the end of box k
+    stops = np.searchsorted(starts, ends + reach, side='right')
+    counts = np.maximum(stops - np.arange(1, count + 1), 0)
+    first = np.repeat(np.arange(count), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    i, j = order[first], order[second]
+    separation = np.maximum(lower[i], lower[j]) - np.minimum(upper[i], upper[j])
+    keep = np.all(separation <= reach, axis=1)
+    swap = i[keep] > j[keep]
+    i, j = np.where(swap, j[keep], i[keep]), np.where(swap, i[keep], j[keep])
+    return i, j, separation[keep]
+
+
+def _boundary(names: List[str], boxes: np.ndarray) -> Optional[int]:
+    """The largest-footprint object named like a foundation"""
+    matches = [index for index, name in enumerate(names) if BOUNDARY_PATTERN.search(name)]
+    if not matches:
+        return None
+    footprints = np.prod(boxes[matches, 3:5] - boxes[matches, 0:2], axis=1)
+    return matches[int(np.argmax(footprints))]
+
+
+def _filled(boxes: np.ndarray, a: int, b: int, axis: int) -> bool:
+    """Whether a third box spans the gap between boxes ``a`` and ``b`` along ``axis``"""
+    low, high = np.maximum(boxes[a, :3], boxes[b, :3]), np.minimum(boxes[a, 3:], boxes[b, 3:])
+    # On the gap axis the region runs from the nearer face of one box to the other
+    low[axis], high[axis] = high[axis], low[axis]
+    others = np.ones(len(boxes), dtype=bool)
+    others[[a, b]] = False
+    spans = (boxes[:, axis] <= low[axis] + 1e-6) & (boxes[:, axis + 3] >= high[axis] - 1e-6)
+    rest = [k for k in range(3) if k != axis]
+    touches = np.all((boxes[:, rest] < high[rest]) & (boxes[:, [k + 3 for k in rest]] > low[rest]), axis=1)
+    return bool(np.any(others & spans & touches))
+
+
+def check_interference(objects: Sequence[Dict[str, Any]], config: Optional[InterferenceConfig] = None,
+                       bounds: Optional[Sequence[float]] = None,
+                       shapes: Optional[Dict[str, Shape]] = None) -> InterferenceReport:
+    """Collisions, gaps and out-of-bounds objects among ``objects``' bounding boxes
+
+    Objects are dicts with ``bound_box`` and ``label``/``name``, as run
+    results report them; those without a box or with ``visible`` False are
+    skipped. ``bounds`` overrides the foundation as the footprint boundary;
+    ``shapes`` (``GeometryReport.shapes``) refines box overlaps to solid ones.
+    """
+    config = config or InterferenceConfig()
+    start = time.perf_counter()
+    solids = [obj for obj in objects if obj.get("bound_box") and obj.get("visible", True)]
+    names = [obj.get("label") or obj.get("name") or f"Object {index}" for index, obj in enumerate(solids)]
+    boxes = np.array([obj["bound_box"] for obj in solids], dtype=float).reshape(-1, 6)
+    volumes = np.prod(boxes[:, 3:] - boxes[:, :3], axis=1)
+    report = InterferenceReport(object_count=len(solids))
+
+    i, j, separation = candidate_pairs(boxes, config.max_gap)
+
+    colliding = np.all(separation < -config.min_overlap, axis=1)
+    ci, cj = i[colliding], j[colliding]
+    overlap = np.prod(-separation[colliding], axis=1)
+    if shapes:
+        # Boxes only preselect; openings and round shapes need the solids
+        solid = [shapes.get(obj.get("name")) for obj in solids]
+        volumes = np.array([shape.Volume if shape is not None else volume for shape, volume in zip(solid, volumes)])
+        overlap = np.array([solid[a].common(solid[b]).Volume if solid[a] is not None and solid[b] is not None
+                            else box_overlap for a, b, box_overlap in zip(ci, cj, overlap)], dtype=float)
+    fraction = overlap / np.maximum(np.minimum(volumes[ci], volumes[cj]), 1e-12)
+    joint = fraction < config.joint_fraction
+    report.joints = int(joint.sum())
+    for k in np.flatnonzero(~joint)[np.argsort(-fraction[~joint], kind='stable')]:
+        region = np.concatenate([np.maximum(boxes[ci[k], :3], boxes[cj[k], :3]),
+                                 np.minimum(boxes[ci[k], 3:], boxes[cj[k], 3:])])
+        report.collisions.append(Collision(names[ci[k]], names[cj[k]], region.tolist(),
+                                           float(overlap[k]), float(min(fraction[k], 1.0))))
+
+    # Separated along exactly one axis while overlapping on the other two
+    distance = separation.max(axis=1)
+    gapped = ((distance > config.min_gap) & (distance <= config.max_gap)
+              & (np.sort(separation, axis=1)[:, 1] < 0))
+    axes = np.argmax(separation, axis=1)
+    for k in np.flatnonzero(gapped):
+        if _filled(boxes, i[k], j[k], axes[k]):
+            continue
+        report.gaps.append(Gap(names[i[k]], names[j[k]], AXES[axes[k]], float(distance[k])))
+
+    index = _boundary(names, boxes) if bounds is None else None
+    if bounds is not None or index is not None:
+        boundary = np.asarray(bounds, dtype=float) if bounds is not None else boxes[index]
+        report.boundary = names[index] if index is not None else "the site bounds"
+        others = np.array([k for k in range(len(boxes)) if k != index], dtype=int)
+        grounded = others[boxes[others, 2] <= boundary[5] + config.overhang_height]
+        overhang = np.max(np.concatenate([boundary[None, 0:2] - boxes[grounded, 0:2],
+                                          boxes[grounded, 3:5] - boundary[None, 3:5]], axis=1), axis=1,
+                          initial=0.0)
+        for k in np.flatnonzero(overhang > config.min_overlap):
+            report.out_of_bounds.append(OutOfBounds(names[grounded[k]], report.boundary, float(overhang[k])))
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def check_scene(scene: Scene, level: Optional[LevelOfDetail] = None,
+                config: Optional[InterferenceConfig] = None) -> InterferenceReport:
+    """``check_interference`` for a scene graph, through its compiled script"""
+    geometry = evaluate_script(compile_scene(scene, level))
+    return check_interference(geometry.objects, config, shapes=geometry.shapes)
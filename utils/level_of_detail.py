@@ -0,0 +1,118 @@
+"""
+Geometric level of detail behind the quality selector
+
+The "professional", "standard" and "draft" quality levels decide which
+features of a model are built at all, not just how the script is dressed:
+
+* draft builds plain masses for a fast preview: no door/window openings,
+  fillets, furniture or small features, and coarse tessellation for both
+  the GUI and STL export,
+* standard keeps openings and furniture but drops fillets/chamfers and
+  small decorative features (frames, canopies, sign boards),
+* professional builds everything.
+
+Templates mark optional blocks with ``# [detail:<feature>]`` ...
+``# [/detail]`` comment lines and pass through ``apply_detail_sections``;
+LLM generated code is simplified by ``LevelOfDetailPass`` in
+``utils.code_optimizer`` and guided by ``prompt_guidance``.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+# Features a level of detail can leave out
+DETAIL_FEATURES = ('openings', 'fillets', 'furniture', 'small_features')
+
+_FEATURE_DESCRIPTIONS = {
+    'openings': 'door or window openings',
+    'fillets': 'fillets or chamfers',
+    'furniture': 'furniture or room area indicators',
+    'small_features': 'small decorative features such as frames, canopies and signs',
+}
+
+_MARKER = re.compile(r'^\s*# \[(?:detail:(\w+)|/detail)\]\s*$')
+
+
+@dataclass(frozen=True)
+class LevelOfDetail:
+    """Which features to build and how finely to tessellate them"""
+    name: str
+    openings: bool = True
+    fillets: bool = True
+    furniture: bool = True
+    small_features: bool = True
+    # STL export tessellation in mm / radians; None keeps the export settings
+    linear_tolerance: Optional[float] = None
+    angular_tolerance: Optional[float] = None
+    # GUI tessellation (ViewObject.Deviation, in %); None keeps FreeCAD's default
+    view_deviation: Optional[float] = None
+
+    def builds(self, feature: str) -> bool:
+        if feature not in DETAIL_FEATURES:
+            raise ValueError(f"Unknown detail feature: {feature}")
+        return getattr(self, feature)
+
+    @property
+    def full(self) -> bool:
+        """Whether nothing is left out or coarsened"""
+        return (all(self.builds(feature) for feature in DETAIL_FEATURES) and self.view_deviation is None
+                and self.linear_tolerance is None and self.angular_tolerance is None)
+
+
+LEVELS_OF_DETAIL = {
+    'draft': LevelOfDetail('draft', openings=False, fillets=False, furniture=False, small_features=False,
+                           linear_tolerance=5.0, angular_tolerance=1.0, view_deviation=2.0),
+    'standard': LevelOfDetail('standard', fillets=False, small_features=False,
+                              linear_tolerance=0.5, view_deviation=1.0),
+    'professional': LevelOfDetail('professional'),
+}
+
+
+def level_of_detail(quality_level: Optional[str]) -> LevelOfDetail:
+    """Level of detail for a quality level; unknown levels build full detail"""
+    return LEVELS_OF_DETAIL.get((quality_level or '').lower(), LEVELS_OF_DETAIL['professional'])
+
+
+def apply_detail_sections(code: str, lod: LevelOfDetail) -> str:
+    """Keep or drop the ``# [detail:<feature>]`` blocks of a template
+
+    Marker lines are always removed, so the result reads like a hand
+    written script for that level. Blocks may nest.
+    """
+    output, keep = [], []
+    for line in code.splitlines(keepends=True):
+        match = _MARKER.match(line)
+        if match:
+            if match.group(1):
+                keep.append(lod.builds(match.group(1)))
+            elif keep:
+                keep.pop()
+            continue
+        if all(keep):
+            output.append(line)
+    return ''.join(output)
+
+
+def detail_lines(code: str) -> Dict[str, Set[int]]:
+    """Line numbers (1-based) inside each feature's ``# [detail:<feature>]`` blocks"""
+    lines: Dict[str, Set[int]] = {}
+    open_features = []
+    for number, line in enumerate(code.splitlines(), 1):
+        match = _MARKER.match(line)
+        if match:
+            if match.group(1):
+                open_features.append(match.group(1))
+            elif open_features:
+                open_features.pop()
+            continue
+        for feature in open_features:
+            lines.setdefault(feature, set()).add(number)
+    return lines
+
+
+def prompt_guidance(lod: LevelOfDetail) -> str:
+    """Instruction telling the model which features to leave out"""
+    omitted = [_FEATURE_DESCRIPTIONS[feature] for feature in DETAIL_FEATURES if not lod.builds(feature)]
+    if not omitted:
+        return "Build full detail, including openings, fillets, furniture and architectural details."
+    return f"This is a {lod.name} model: do not create {', '.join(omitted)}."
@@ -0,0 +1,146 @@
+"""
+Vertex-clustering decimation and the compact mesh payload for the 3D preview
+
+The browser preview (``ui.preview_component``) receives one binary blob
+per model. ``build_preview`` turns a triangle soup (``utils.rasterizer.Mesh``
+from the evaluator's shapes or an exported STL) into that blob:
+
+1. Vertices are clustered on a cubic grid over the model bounds: all
+   vertices in a cell merge into their mean, triangles with two corners
+   in one cell disappear, and duplicates (the two faces of a wall thinner
+   than a cell) are dropped. At the payload's own 16-bit quantization this
+   only welds the soup into an indexed mesh; coarser grids decimate.
+2. The grid is coarsened until the mesh fits ``max_triangles`` and its
+   encoding fits ``max_bytes``.
+
+Payload layout (little endian)::
+
+    b'VCM1'  uint32 vertices  uint32 triangles
+    float32 lower[3]  float32 step[3]          position = lower + q * step
+    uint16  q[vertices][3]                     padded to 4 bytes
+    uint16 or uint32 indices[triangles][3]     uint16 below 65536 vertices, padded to 4 bytes
+    uint8   rgb[triangles][3]
+"""
+import struct
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.rasterizer import Mesh
+
+PAYLOAD_MAGIC = b'VCM1'
+POSITION_STEPS = 65535
+MIN_RESOLUTION = 8  # grid cells along the longest side at the coarsest
+DEFAULT_MAX_BYTES = 1_000_000
+HEADER_SIZE = 4 + struct.calcsize('<II6f')
+
+
+@dataclass
+class PreviewPayload:
+    """Encoded preview mesh and what decimation did to it"""
+    data: bytes
+    vertices: int
+    triangles: int
+    original_triangles: int
+    resolution: int  # grid cells along the longest side
+    elapsed: float = 0.0
+
+    @property
+    def decimated(self) -> bool:
+        return self.resolution < POSITION_STEPS
+
+
+def cluster_vertices(points: np.ndarray, facets: np.ndarray, lower: np.ndarray, cell: float
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(points, facets, kept)`` of an indexed mesh clustered on a grid of ``cell`` mm
+
+    ``kept`` indexes the input facets that survive, so per-triangle
+    attributes can follow them.
+    """
+    cells = np.floor((points - lower) / cell).astype(np.int64)
+    span = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * span[1] + cells[:, 1]) * span[2] + cells[:, 2]
+    _, cluster = np.unique(keys, return_inverse=True)
+    cluster = cluster.reshape(-1)
+    counts = np.bincount(cluster)
+    merged = np.stack([np.bincount(cluster, points[:, axis]) for axis in range(3)], axis=1) / counts[:, None]
+
+    facets = cluster[facets]
+    kept = np.flatnonzero((facets[:, 0] != facets[:, 1]) & (facets[:, 1] != facets[:, 2])
+                          & (facets[:, 0] != facets[:, 2]))
+    corners = np.sort(facets[kept], axis=1)
+    if len(merged) < 1 << 21:
+        # One int64 key per corner triple
+        _, first = np.unique((corners[:, 0] * len(merged) + corners[:, 1]) * len(merged) + corners[:, 2],
+                             return_index=True)
+    else:
+        _, first = np.unique(corners, axis=0, return_index=True)
+    kept = kept[np.sort(first)]
+
+    # Renumber the vertices the remaining triangles use
+    used, facets = np.unique(facets[kept], return_inverse=True)
+    return merged[used], facets.reshape(-1, 3), kept
+
+
+def encode_payload(points: np.ndarray, facets: np.ndarray, colors: np.ndarray) -> bytes:
+    """Binary payload of an indexed mesh with per-triangle colours (0..1)"""
+    lower = points.min(axis=0) if len(points) else np.zeros(3)
+    step = ((points.max(axis=0) - lower) / POSITION_STEPS) if len(points) else np.zeros(3)
+    scale = np.divide(1.0, step, out=np.zeros(3), where=step > 0)
+    quantized = np.rint((points - lower) * scale).astype('<u2')
+    index_type = '<u2' if len(points) <= 0xFFFF else '<u4'
+
+    def padded(array: np.ndarray) -> bytes:
+        data = array.tobytes()
+        return data + b'\0' * (-len(data) % 4)
+
+    return (PAYLOAD_MAGIC + struct.pack('<II6f', len(points), len(facets), *lower, *step)
+            + padded(quantized) + padded(facets.astype(index_type))
+            + np.clip(np.rint(colors * 255), 0, 255).astype(np.uint8).tobytes())
+
+
+def decode_payload(data: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(points, facets, colors)`` of a payload, as the browser reads it"""
+    if data[:4] != PAYLOAD_MAGIC:
+        raise ValueError("Not a preview mesh payload")
+    vertices, triangles, *bounds = struct.unpack_from('<II6f', data, 4)
+    lower, step = np.array(bounds[:3]), np.array(bounds[3:])
+    offset = HEADER_SIZE
+    quantized = np.frombuffer(data, '<u2', vertices * 3, offset).reshape(-1, 3)
+    offset += (vertices * 6 + 3) // 4 * 4
+    index_type = np.dtype('<u2' if vertices <= 0xFFFF else '<u4')
+    facets = np.frombuffer(data, index_type, triangles * 3, offset).reshape(-1, 3)
+    offset += (triangles * 3 * index_type.itemsize + 3) // 4 * 4
+    colors = np.frombuffer(data, np.uint8, triangles * 3, offset).reshape(-1, 3) / 255.0
+    return lower + quantized * step, facets.astype(np.int64), colors
+
+
+def build_preview(mesh: Mesh, max_triangles: Optional[int] = None,
+                  max_bytes: int = DEFAULT_MAX_BYTES) -> Optional[PreviewPayload]:
+    """Welded, and if needed decimated, payload of ``mesh`` within ``max_bytes``"""
+    if not len(mesh):
+        return None
+    start = time.perf_counter()
+    triangles = np.asarray(mesh.triangles, dtype=float)
+    lower = triangles.reshape(-1, 3).min(axis=0)
+    extent = max(float(np.max(triangles.reshape(-1, 3).max(axis=0) - lower)), 1e-9)
+    # Indexed meshes need about 18 bytes per triangle (half as many vertices as triangles)
+    limit = min(max_triangles or len(triangles), max_bytes // 18)
+
+    # At the payload's quantization clustering only welds the soup. A surface on an
+    # R x R grid keeps on the order of R^2 triangles, so large meshes start from a
+    # grid of 2 sqrt(limit) cells; each further pass coarsens the previous result.
+    points, facets, colors = triangles.reshape(-1, 3), np.arange(3 * len(triangles)).reshape(-1, 3), mesh.colors
+    resolution = POSITION_STEPS if len(triangles) <= limit else max(MIN_RESOLUTION, int(2 * np.sqrt(limit)))
+    while True:
+        points, facets, kept = cluster_vertices(points, facets, lower, extent / resolution)
+        colors = colors[kept]
+        data = encode_payload(points, facets, colors)
+        if (len(facets) <= limit and len(data) <= max_bytes) or resolution <= MIN_RESOLUTION:
+            break
+        target = min(limit, max_bytes / len(data) * len(facets))
+        resolution = max(MIN_RESOLUTION, min(resolution - 1, int(0.95 * resolution * np.sqrt(target / len(facets)))))
+    return PreviewPayload(data, len(points), len(facets), len(triangles), resolution,
+                          time.perf_counter() - start)
@@ -0,0 +1,576 @@
+"""
+Parametric mechanical parts without a language model
+
+Bolts, nuts, washers, flanges, shafts, brackets, bearings and gears are
+the mechanical requests users make most. Each part type in ``PARTS`` has
+a typed spec (a dataclass with standard defaults and a ``validate``
+method), a parser reading the spec from a command and a builder writing
+the FreeCAD script. ``match_part`` picks the part a command asks for and
+``part_script`` builds it, so the AI service answers these requests in
+milliseconds. Further part types are added with ``register_part``.
+
+Sizes come from the standard tables below: ISO metric coarse threads
+with their hex heads, nuts and washers (ISO 4017, 4032, 7089), EN 1092-1
+PN16 plate flanges, DIN 6885 keyways and 60/62 series deep groove ball
+bearings. Threads are drawn at their nominal diameter.
+
+The builders emit scene graphs (``utils.scene_graph``), compiled by
+``utils.scene_compiler`` at the requested level of detail; gears come
+from ``utils.gear_generator``. Every script is checked with the geometry
+evaluator before it is returned.
+
+Lengths are in mm.
+"""
+import math
+import re
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from utils.gear_generator import DRAFT_FLANK_POINTS, FLANK_POINTS, GearSpec, gear_script, parse_gear_command
+from utils.geometry_evaluator import evaluate_script
+from utils.level_of_detail import LevelOfDetail
+from utils.scene_compiler import compile_scene
+from utils.scene_graph import Material, Node, Scene, Transform, validate_scene
+
+# Evaluation budget for checking a generated script (seconds)
+CHECK_TIMEOUT = 2.0
+
+
+class MetricSize(NamedTuple):
+    """ISO coarse thread with its hex head, nut and washer"""
+    pitch: float
+    across_flats: float
+    head_height: float
+    nut_height: float
+    washer_inner: float
+    washer_outer: float
+    washer_thickness: float
+
+
+METRIC_SIZES: Dict[float, MetricSize] = {
+    3: MetricSize(0.5, 5.5, 2.0, 2.4, 3.2, 7.0, 0.5),
+    4: MetricSize(0.7, 7.0, 2.8, 3.2, 4.3, 9.0, 0.8),
+    5: MetricSize(0.8, 8.0, 3.5, 4.7, 5.3, 10.0, 1.0),
+    6: MetricSize(1.0, 10.0, 4.0, 5.2, 6.4, 12.0, 1.6),
+    8: MetricSize(1.25, 13.0, 5.3, 6.8, 8.4, 16.0, 1.6),
+    10: MetricSize(1.5, 16.0, 6.4, 8.4, 10.5, 20.0, 2.0),
+    12: MetricSize(1.75, 18.0, 7.5, 10.8, 13.0, 24.0, 2.5),
+    16: MetricSize(2.0, 24.0, 10.0, 14.8, 17.0, 30.0, 3.0),
+    20: MetricSize(2.5, 30.0, 12.5, 18.0, 21.0, 37.0, 3.0),
+    24: MetricSize(3.0, 36.0, 15.0, 21.5, 25.0, 44.0, 4.0),
+}
+
+# Preferred bolt lengths (ISO 4017)
+BOLT_LENGTHS = (6, 8, 10, 12, 16, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 80, 90, 100, 110, 120,
+                130, 140, 150, 160, 180, 200)
+
+
+class FlangeSize(NamedTuple):
+    """EN 1092-1 PN16 plate flange"""
+    outer_diameter: float
+    thickness: float
+    bolt_circle: float
+    holes: int
+    hole_diameter: float
+    bore: float  # pipe outside diameter
+
+
+FLANGE_SIZES: Dict[int, FlangeSize] = {
+    15: FlangeSize(95, 14, 65, 4, 14, 22.0),
+    20: FlangeSize(105, 16, 75, 4, 14, 27.6),
+    25: FlangeSize(115, 16, 85, 4, 14, 34.4),
+    32: FlangeSize(140, 18, 100, 4, 18, 43.1),
+    40: FlangeSize(150, 18, 110, 4, 18, 49.0),
+    50: FlangeSize(165, 18, 125, 4, 18, 61.1),
+    65: FlangeSize(185, 18, 145, 8, 18, 77.1),
+    80: FlangeSize(200, 20, 160, 8, 18, 90.3),
+    100: FlangeSize(220, 20, 180, 8, 18, 115.9),
+    125: FlangeSize(250, 22, 210, 8, 18, 141.6),
+    150: FlangeSize(285, 22, 240, 8, 22, 170.5),
+    200: FlangeSize(340, 24, 295, 12, 22, 221.8),
+}
+
+# DIN 6885 keyways: (largest shaft diameter, key width, shaft groove depth)
+KEYWAYS: Tuple[Tuple[float, float, float], ...] = (
+    (8, 2, 1.2), (10, 3, 1.8), (12, 4, 2.5), (17, 5, 3.0), (22, 6, 3.5), (30, 8, 4.0), (38, 10, 5.0),
+    (44, 12, 5.0), (50, 14, 5.5), (58, 16, 6.0), (65, 18, 7.0), (75, 20, 7.5), (85, 22, 9.0),
+)
+
+
+class BearingSize(NamedTuple):
+    """Deep groove ball bearing: bore, outside diameter, width"""
+    bore: float
+    outer_diameter: float
+    width: float
+
+
+BEARING_SIZES: Dict[str, BearingSize] = {
+    '608': BearingSize(8, 22, 7),
+    '6000': BearingSize(10, 26, 8), '6001': BearingSize(12, 28, 8), '6002': BearingSize(15, 32, 9),
+    '6003': BearingSize(17, 35, 10), '6004': BearingSize(20, 42, 12), '6005': BearingSize(25, 47, 12),
+    '6006': BearingSize(30, 55, 13), '6200': BearingSize(10, 30, 9), '6201': BearingSize(12, 32, 10),
+    '6202': BearingSize(15, 35, 11), '6203': BearingSize(17, 40, 12), '6204': BearingSize(20, 47, 14),
+    '6205': BearingSize(25, 52, 15), '6206': BearingSize(30, 62, 16), '6207': BearingSize(35, 72, 17),
+    '6208': BearingSize(40, 80, 18),
+}
+
+STEEL = Material((0.7, 0.7, 0.75))
+BRIGHT_STEEL = Material((0.85, 0.85, 0.88))
+ZINC = Material((0.8, 0.8, 0.7))
+
+
+# ---- Dimensions in commands --------------------------------------------------------------------
+
+_UNITS = {'mm': 1.0, 'cm': 10.0, 'm': 1000.0, 'in': 25.4, 'inch': 25.4, 'inches': 25.4, '"': 25.4}
+_NUMBER = r'(\d+(?:\.\d+)?)'
+_UNIT = r'\s*(mm|cm|m|inch(?:es)?|in|")?'
+_METRIC = re.compile(r'\bm(\d+(?:\.\d+)?)(?:\s*[x×]\s*(\d+(?:\.\d+)?))?\b')
+
+
+def parse_length(text: str, *names: str) -> Optional[float]:
+    """Length in mm given for any of ``names`` ("length 40", "40 mm long", "length: 4 cm")"""
+    words = '|'.join(re.escape(name) for name in names)
+    pattern = (rf'\b(?:{words})\s*(?:of|=|:|is)?\s*{_NUMBER}{_UNIT}(?![\w.])'
+               rf'|{_NUMBER}{_UNIT}\s*(?:{words})\b')
+    match = re.search(pattern, text)
+    if match is None:
+        return None
+    value, unit = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+    return float(value) * _UNITS[unit or 'mm']
+
+
+def parse_metric(text: str) -> Tuple[Optional[float], Optional[float]]:
+    """(nominal diameter, length) of a metric designation such as "M8" or "M8x40" """
+    match = _METRIC.search(text)
+    if match is None:
+        return None, None
+    return float(match.group(1)), float(match.group(2)) if match.group(2) else None
+
+
+def _metric(diameter: float) -> MetricSize:
+    if diameter not in METRIC_SIZES:
+        sizes = ', '.join(f"M{size:g}" for size in METRIC_SIZES)
+        raise ValueError(f"M{diameter:g} is not in the metric size table ({sizes})")
+    return METRIC_SIZES[diameter]
+
+
+def _size(text: str) -> Optional[float]:
+    """Nominal metric diameter: "M8", or "8 mm" / "diameter 8" when it is a table size"""
+    diameter, _ = parse_metric(text)
+    if diameter is None:
+        diameter = parse_length(text, 'diameter', 'dia', 'size', 'thread')
+    if diameter is None:
+        match = re.search(_NUMBER + r'\s*mm\b', text)
+        diameter = float(match.group(1)) if match and float(match.group(1)) in METRIC_SIZES else None
+    return diameter
+
+
+# ---- Part specs ------------------------------------------------------------------------------------
+
+@dataclass
+class BoltSpec:
+    """Hex head bolt (ISO 4017); ``length`` is under the head"""
+    diameter: float = 8.0
+    length: float = 40.0
+
+    def validate(self) -> None:
+        _metric(self.diameter)
+        if not self.diameter <= self.length <= 20 * self.diameter:
+            raise ValueError(f"An M{self.diameter:g} bolt is {self.diameter:g} to {20 * self.diameter:g} mm long, "
+                             f"not {self.length:g} mm")
+
+
+@dataclass
+class NutSpec:
+    """Hex nut (ISO 4032)"""
+    diameter: float = 8.0
+
+    def validate(self) -> None:
+        _metric(self.diameter)
+
+
+@dataclass
+class WasherSpec:
+    """Plain washer (ISO 7089)"""
+    diameter: float = 8.0
+
+    def validate(self) -> None:
+        _metric(self.diameter)
+
+
+@dataclass
+class FlangeSpec:
+    """Plate flange; unspecified dimensions come from the PN16 table for ``nominal_size``"""
+    nominal_size: int = 50  # DN
+    outer_diameter: Optional[float] = None
+    thickness: Optional[float] = None
+    bore: Optional[float] = None
+    bolt_circle: Optional[float] = None
+    holes: Optional[int] = None
+    hole_diameter: Optional[float] = None
+
+    def resolved(self) -> FlangeSize:
+        if self.nominal_size not in FLANGE_SIZES:
+            sizes = ', '.join(f"DN{size}" for size in FLANGE_SIZES)
+            raise ValueError(f"DN{self.nominal_size} is not in the flange table ({sizes})")
+        table = FLANGE_SIZES[self.nominal_size]
+        return FlangeSize(*(table[index] if getattr(self, name) is None else getattr(self, name)
+                            for index, name in enumerate(FlangeSize._fields)))
+
+    def validate(self) -> None:
+        size = self.resolved()
+        if min(size.outer_diameter, size.thickness, size.hole_diameter) <= 0 or size.holes < 0:
+            raise ValueError("Flange dimensions must be positive")
+        if not size.bore + size.hole_diameter < size.bolt_circle < size.outer_diameter - size.hole_diameter:
+            raise ValueError(f"A {size.bolt_circle:g} mm bolt circle does not fit between the "
+                             f"{size.bore:g} mm bore and the {size.outer_diameter:g} mm rim")
+
+
+@dataclass
+class ShaftSpec:
+    """Round shaft, optionally with a DIN 6885 keyway at one end"""
+    diameter: float = 20.0
+    length: float = 200.0
+    keyway: bool = False
+
+    def validate(self) -> None:
+        if self.diameter <= 0 or self.length <= 0:
+            raise ValueError("Shaft diameter and length must be positive")
+        if self.keyway and self.diameter > KEYWAYS[-1][0]:
+            raise ValueError(f"Keyways are tabulated up to {KEYWAYS[-1][0]:g} mm shafts")
+        if self.keyway and self.diameter <= 6:
+            raise ValueError("Shafts of 6 mm or less take no keyway")
+
+
+@dataclass
+class BracketSpec:
+    """L bracket with two legs of clearance holes"""
+    width: float = 40.0
+    leg: float = 60.0  # both legs, outside
+    thickness: float = 5.0
+    hole_diameter: float = 6.6  # M6 clearance
+    holes: int = 2  # per leg
+
+    def validate(self) -> None:
+        if min(self.width, self.leg, self.thickness) <= 0 or self.holes < 0:
+            raise ValueError("Bracket dimensions must be positive")
+        if self.leg <= self.thickness + self.hole_diameter * 1.5 or self.width < self.hole_diameter * 2:
+            raise ValueError(f"{self.hole_diameter:g} mm holes do not fit a {self.width:g} x {self.leg:g} mm leg")
+
+
+@dataclass
+class BearingSpec:
+    """Deep groove ball bearing"""
+    designation: str = '6204'
+
+    def resolved(self) -> BearingSize:
+        if self.designation not in BEARING_SIZES:
+            raise ValueError(f"Bearing {self.designation} is not in the table "
+                             f"({', '.join(BEARING_SIZES)})")
+        return BEARING_SIZES[self.designation]
+
+    def validate(self) -> None:
+        self.resolved()
+
+
+# ---- Parsers -----------------------------------------------------------------------------------------
+
+def _parse_bolt(text: str) -> BoltSpec:
+    spec = BoltSpec()
+    spec.diameter = _size(text) or spec.diameter
+    _, length = parse_metric(text)
+    length = length or parse_length(text, 'length', 'long')
+    if length is None:
+        # The preferred length nearest to five diameters
+        length = float(min(BOLT_LENGTHS, key=lambda value: abs(value - 5 * spec.diameter)))
+    spec.length = length
+    return spec
+
+
+def _parse_nut(text: str) -> NutSpec:
+    return NutSpec(_size(text) or NutSpec.diameter)
+
+
+def _parse_washer(text: str) -> WasherSpec:
+    return WasherSpec(_size(text) or WasherSpec.diameter)
+
+
+def _parse_flange(text: str) -> FlangeSpec:
+    spec = FlangeSpec()
+    nominal = re.search(r'\bdn\s*(\d+)', text)
+    if nominal:
+        spec.nominal_size = int(nominal.group(1))
+    spec.outer_diameter = parse_length(text, 'outer diameter', 'outside diameter', 'od')
+    spec.thickness = parse_length(text, 'thickness', 'thick')
+    spec.bore = parse_length(text, 'bore', 'inner diameter', 'id')
+    spec.bolt_circle = parse_length(text, 'bolt circle', 'pcd', 'pitch circle')
+    holes = re.search(r'(\d+)\s*(?:bolt\s*)?holes\b', text)
+    if holes:
+        spec.holes = int(holes.group(1))
+    return spec
+
+
+def _parse_shaft(text: str) -> ShaftSpec:
+    spec = ShaftSpec()
+    spec.diameter = parse_length(text, 'diameter', 'dia', 'ø') or spec.diameter
+    spec.length = parse_length(text, 'length', 'long') or spec.length
+    spec.keyway = bool(re.search(r'\bkey(?:way|ed|seat)?\b', text))
+    return spec
+
+
+def _parse_bracket(text: str) -> BracketSpec:
+    spec = BracketSpec()
+    spec.width = parse_length(text, 'width', 'wide') or spec.width
+    spec.leg = parse_length(text, 'leg', 'legs', 'length', 'long', 'size') or spec.leg
+    spec.thickness = parse_length(text, 'thickness', 'thick') or spec.thickness
+    bolt, _ = parse_metric(text)
+    if bolt in METRIC_SIZES:
+        spec.hole_diameter = METRIC_SIZES[bolt].washer_inner
+    spec.hole_diameter = parse_length(text, 'hole', 'holes', 'hole diameter') or spec.hole_diameter
+    holes = re.search(r'(\d+)\s*holes?\s*(?:per|in each|on each)\s*leg', text)
+    if holes:
+        spec.holes = int(holes.group(1))
+    return spec
+
+
+def _parse_bearing(text: str) -> BearingSpec:
+    spec = BearingSpec()
+    designation = re.search(r'\b(6[02]\d{2}|608)\b', text)
+    if designation:
+        spec.designation = designation.group(1)
+        return spec
+    bore = parse_length(text, 'bore', 'shaft', 'inner diameter', 'id')
+    if bore is not None:
+        matches = [name for name, size in BEARING_SIZES.items() if size.bore == bore]
+        spec.designation = matches[-1] if matches else f"bore {bore:g} mm"
+    return spec
+
+
+# ---- Builders --------------------------------------------------------------------------------------
+
+def _cylinder(radius: float, height: float, translate=(0.0, 0.0, 0.0), **extra) -> Node:
+    return Node('cylinder', params={'radius': radius, 'height': height},
+                transform=Transform(translate=tuple(float(v) for v in translate)), **extra)
+
+
+def _ring(outer: float, inner: float, height: float, z: float = 0.0, **extra) -> Node:
+    """Tube between two diameters"""
+    return Node('difference', children=[_cylinder(outer / 2, height, (0, 0, z)),
+                                        _cylinder(inner / 2, height, (0, 0, z))], **extra)
+
+
+def _hexagon(across_flats: float, height: float, z: float = 0.0) -> Node:
+    # Prism corners start on the x axis, which puts two flats parallel to it
+    return Node('prism', params={'sides': 6, 'radius': across_flats / math.sqrt(3), 'height': height},
+                transform=Transform(translate=(0.0, 0.0, z)))
+
+
+def _build_bolt(spec: BoltSpec) -> Scene:
+    size = METRIC_SIZES[spec.diameter]
+    name = f"Bolt_M{spec.diameter:g}x{spec.length:g}"
+    head = _hexagon(size.across_flats, size.head_height, spec.length)
+    shank = _cylinder(spec.diameter / 2, spec.length)
+    return Scene(name=name, materials={'steel': ZINC},
+                 objects=[Node('union', name=name, children=[shank, head], material='steel')])
+
+
+def _build_nut(spec: NutSpec) -> Scene:
+    size = METRIC_SIZES[spec.diameter]
+    name = f"Nut_M{spec.diameter:g}"
+    body = Node('difference', name=name, material='steel', children=[
+        _hexagon(size.across_flats, size.nut_height), _cylinder(spec.diameter / 2, size.nut_height)])
+    return Scene(name=name, materials={'steel': ZINC}, objects=[body])
+
+
+def _build_washer(spec: WasherSpec) -> Scene:
+    size = METRIC_SIZES[spec.diameter]
+    name = f"Washer_M{spec.diameter:g}"
+    return Scene(name=name, materials={'steel': ZINC},
+                 objects=[_ring(size.washer_outer, size.washer_inner, size.washer_thickness,
+                                name=name, material='steel')])
+
+
+def _build_flange(spec: FlangeSpec) -> Scene:
+    size = spec.resolved()
+    name = f"Flange_DN{spec.nominal_size}"
+    holes = []
+    for index in range(size.holes):
+        # Holes straddle the centre lines, as the standard draws them
+        angle = 2 * math.pi * (index + 0.5) / size.holes
+        holes.append(_cylinder(size.hole_diameter / 2, size.thickness,
+                               (size.bolt_circle / 2 * math.cos(angle), size.bolt_circle / 2 * math.sin(angle), 0)))
+    plate = Node('difference', name=name, material='steel', children=[
+        _cylinder(size.outer_diameter / 2, size.thickness), _cylinder(size.bore / 2, size.thickness)] + holes)
+    return Scene(name=name, materials={'steel': STEEL}, objects=[plate])
+
+
+def _build_shaft(spec: ShaftSpec) -> Scene:
+    name = f"Shaft_D{spec.diameter:g}x{spec.length:g}"
+    body = _cylinder(spec.diameter / 2, spec.length)
+    if spec.keyway:
+        _, width, depth = next(row for row in KEYWAYS if spec.diameter <= row[0])
+        length = min(spec.length / 2, 1.5 * spec.diameter)
+        key = Node('box', params={'length': depth + 1, 'width': width, 'height': length + 1},
+                   transform=Transform(translate=(spec.diameter / 2 - depth, -width / 2, spec.length - length)))
+        body = Node('difference', children=[body, key])
+    body.name, body.material = name, 'steel'
+    return Scene(name=name, materials={'steel': BRIGHT_STEEL}, objects=[body])
+
+
+def _build_bracket(spec: BracketSpec) -> Scene:
+    t, leg, width = spec.thickness, spec.leg, spec.width
+    base = Node('box', params={'length': leg, 'width': width, 'height': t})
+    upright = Node('box', params={'length': t, 'width': width, 'height': leg})
+    holes = []
+    for index in range(spec.holes):
+        y = width * (index + 1) / (spec.holes + 1)
+        position = t + (leg - t) / 2
+        holes.append(_cylinder(spec.hole_diameter / 2, t, (position, y, 0)))
+        # Cylinders run along z; a quarter turn about y lays them along x through the upright
+        holes.append(Node('cylinder', params={'radius': spec.hole_diameter / 2, 'height': t},
+                          transform=Transform(translate=(0.0, y, position), axis=(0.0, 1.0, 0.0), angle=90.0)))
+    body = Node('union', children=[base, upright])
+    bracket = Node('difference', name='Bracket', material='steel', children=[body] + holes) if holes else body
+    bracket.name, bracket.material = 'Bracket', 'steel'
+    return Scene(name=f"L_Bracket_{leg:g}x{width:g}", materials={'steel': STEEL}, objects=[bracket])
+
+
+def _build_bearing(spec: BearingSpec) -> Scene:
+    size = spec.resolved()
+    section = (size.outer_diameter - size.bore) / 2
+    ball = section / 2
+    pitch = (size.outer_diameter + size.bore) / 2  # ball centre circle diameter
+    width = size.width
+    count = max(6, int(math.pi * pitch / (ball * 1.6)))
+    balls = []
+    for index in range(count):
+        angle = 2 * math.pi * index / count
+        balls.append(Node('instance', ref='ball', name=f"Ball_{index + 1}", detail='small_features',
+                          transform=Transform(translate=(pitch / 2 * math.cos(angle), pitch / 2 * math.sin(angle),
+                                                         width / 2))))
+    objects = [_ring(pitch - ball, size.bore, width, name='Inner_Ring', material='steel'),
+               _ring(size.outer_diameter, pitch + ball, width, name='Outer_Ring', material='steel'),
+               Node('group', name='Balls', children=balls)]
+    return Scene(name=f"Bearing_{spec.designation}", materials={'steel': BRIGHT_STEEL},
+                 definitions={'ball': Node('sphere', params={'radius': ball / 2}, material='steel')},
+                 objects=objects)
+
+
+def _gear_script(spec: GearSpec, level: LevelOfDetail) -> str:
+    return gear_script(spec, flank_points=DRAFT_FLANK_POINTS if level.name == 'draft' else FLANK_POINTS)
+
+
+# ---- Registry --------------------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class PartType:
+    """A part the library builds: command keywords, spec parser and builder
+
+    ``build`` returns a ``Scene``; ``script`` (instead) returns FreeCAD
+    code directly, for generators that do not go through the scene graph.
+    """
+    name: str
+    keywords: str  # regular expression matched against the lower-cased command
+    parse: Callable[[str], Any]
+    build: Optional[Callable[[Any], Scene]] = None
+    script: Optional[Callable[[Any, LevelOfDetail], str]] = None
+    excludes: str = r'(?!)'  # commands matching this are not this part
+
+
+PARTS: Dict[str, PartType] = {}
+
+
+def register_part(part: PartType) -> None:
+    """Add (or replace) a part type in the library"""
+    if (part.build is None) == (part.script is None):
+        raise ValueError(f"Part {part.name!r} needs exactly one of build and script")
+    PARTS[part.name] = part
+
+
+for _part in (
+    PartType('gear', r'\b(?:gears?|pinion)\b', parse_gear_command, script=_gear_script,
+             excludes=r'\bgear\s*(?:box|train)|\bgearbox'),
+    PartType('bolt', r'\b(?:bolts?|screws?)\b(?!\s*(?:circle|holes?|pattern))', _parse_bolt, _build_bolt),
+    PartType('nut', r'\b(?:hex\s*)?nuts?\b', _parse_nut, _build_nut),
+    PartType('washer', r'\bwashers?\b', _parse_washer, _build_washer),
+    PartType('flange', r'\bflanges?\b', _parse_flange, _build_flange),
+    PartType('shaft', r'\b(?:shafts?|axles?)\b(?!\s*(?:holes?|bores?|diameter))', _parse_shaft, _build_shaft),
+    PartType('bracket', r'\b(?:(?:l|angle)[\s-]*brackets?|brackets?)\b', _parse_bracket, _build_bracket),
+    PartType('bearing', r'\b(?:ball\s*)?bearings?\b', _parse_bearing, _build_bearing,
+             excludes=r'\bload[\s-]*bearing'),
+):
+    register_part(_part)
+
+
+# Words that make something else the subject of a command ("house with wall brackets")
+_SUBJECTS = re.compile(r'\b(?:\d*\s*bhk|house|home|apartment|flat|villa|building|room|bedroom|kitchen|bathroom'
+                       r'|office|school|wall|floor|roof|stairs?|lift|elevator|plot|car|vehicle|truck|bike|bicycle'
+                       r'|robot|furniture|table|chair|shel(?:f|ves)|cabinet|sculpture|statue|lightning)\b')
+# Words after which a part is only mentioned, not asked for ("car with gear shift")
+_LINKS = re.compile(r'\b(?:with|for|of|on|in|into|to|from|and|having|featuring|including|that|which)\b')
+# Sizes and standard designations: "M8x40", "DN80", "6204", "25 mm", "30 teeth"
+_DESIGNATION = re.compile(rf'\bm\d+(?:\.\d+)?(?:\s*[x×]\s*\d+)?\b|\bdn\s*\d+\b|\b(?:6[02]\d{{2}}|608)\b'
+                          rf'|{_NUMBER}\s*(?:mm|cm|inch(?:es)?|in|")(?![\w.])|\b\d+\s*teeth\b')
+
+
+def _designated(text: str, match: re.Match) -> bool:
+    """Whether a size or designation stands within three words of the part noun"""
+    words = text[:match.start()].split()[-3:] + [match.group()] + text[match.end():].split()[:3]
+    return _DESIGNATION.search(' '.join(words)) is not None
+
+
+def match_part(command: str) -> Optional[Tuple[PartType, Any]]:
+    """The part a command asks for and its spec, or ``None``
+
+    When a command names several parts ("nut for an M8 bolt"), the one
+    named first is built. A part noun only counts when it is what the
+    command asks for: named before any "with", "for"... in a command
+    about nothing else (no house, car, sculpture...), or given a size or
+    standard designation ("house fixings: M8 bolt").
+    """
+    text = command.lower()
+    found = []
+    for part in PARTS.values():
+        match = re.search(part.keywords, text)
+        if match and not re.search(part.excludes, text):
+            found.append((match.start(), part, match))
+    if not found:
+        return None
+    start, part, match = min(found, key=lambda item: item[0])
+    link = _LINKS.search(text)
+    asked = (link is None or start < link.start()) and _SUBJECTS.search(text) is None
+    if not (asked or _designated(text, match)):
+        return None
+    spec = part.parse(text)
+    return (part, spec) if spec is not None else None
+
+
+def part_script(part: PartType, spec: Any, level: LevelOfDetail) -> str:
+    """FreeCAD script for ``spec``, checked with the geometry evaluator
+
+    Raises ``ValueError`` when the spec is invalid or the script does not
+    produce a sound model.
+    """
+    if hasattr(spec, 'validate'):
+        spec.validate()
+    if part.script is not None:
+        code = part.script(spec, level)
+    else:
+        scene = part.build(spec)
+        errors = validate_scene(scene.to_dict())
+        if errors:
+            raise ValueError(f"Invalid {part.name} scene: {'; '.join(errors)}")
+        code = compile_scene(scene, level)
+    report = evaluate_script(code, CHECK_TIMEOUT)
+    if not report.success or report.issues or not report.objects:
+        problems = report.error or '; '.join(report.issues) or "no objects"
+        raise ValueError(f"The {part.name} script does not build: {problems}")
+    return code
+
+
+def spec_summary(spec: Any) -> str:
+    """Short "name=value" description of a spec, for logs"""
+    if not is_dataclass(spec):
+        return str(spec)
+    return ', '.join(f"{item.name}={getattr(spec, item.name)}" for item in fields(spec)
+                     if getattr(spec, item.name) is not None)
@@ -0,0 +1,238 @@
+"""
+CPU software rasterizer for model thumbnails
+
+Renders triangle meshes to small RGB images with NumPy only, so past
+generations can be shown without FreeCAD or a GPU. Meshes come from the
+in-process geometry evaluator (``mesh_from_shapes``: the exposed faces of
+each shape's cell grid) or from an exported STL (``read_stl``).
+
+``render`` projects the mesh orthographically for an isometric or top
+view, shades every triangle flat (Lambert with an ambient term, lit from
+the viewer's upper left) and resolves visibility with a z-buffer. Pixels
+are rasterized a chunk of triangles at a time: every triangle's screen
+bounding box is expanded into candidate fragments with ``repeat``, the
+barycentric test and depth interpolation run on all fragments at once,
+and the nearest fragment per pixel is picked with a ``lexsort``. A depth
+cue darkens far pixels so the flat top view still shows heights.
+
+``encode_png`` writes the image as an 8-bit RGB PNG with ``zlib``.
+"""
+import re
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.geometry_evaluator import Shape
+
+# Screen right, screen up and the direction towards the viewer
+_ISOMETRIC = np.array([[1, 1, 0], [-1, 1, 2], [1, -1, 1]], dtype=float)  # FreeCAD's front-right-top view
+VIEWS: Dict[str, np.ndarray] = {
+    'isometric': _ISOMETRIC / np.linalg.norm(_ISOMETRIC, axis=1, keepdims=True),
+    'top': np.eye(3),
+}
+
+BACKGROUND = (245, 246, 248)
+PALETTE = np.array([
+    (0.85, 0.80, 0.72), (0.62, 0.72, 0.84), (0.78, 0.64, 0.56), (0.66, 0.78, 0.64),
+    (0.86, 0.74, 0.50), (0.70, 0.66, 0.80), (0.60, 0.76, 0.76), (0.82, 0.62, 0.66),
+])
+AMBIENT = 0.35
+DIFFUSE = 0.65
+DEPTH_CUE = 0.25  # the farthest pixels are this much darker than the nearest
+MARGIN = 0.06  # of the image size on every side
+
+CHUNK_FRAGMENTS = 1 << 21  # candidate fragments rasterized at once
+
+_STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')])
+_STL_VERTEX = re.compile(rb'vertex\s+(\S+)\s+(\S+)\s+(\S+)')
+
+
+@dataclass
+class Mesh:
+    """Triangles with one RGB colour (0..1) each"""
+    triangles: np.ndarray = field(default_factory=lambda: np.zeros((0, 3, 3)))  # (n, 3 vertices, xyz)
+    colors: np.ndarray = field(default_factory=lambda: np.zeros((0, 3)))  # (n, rgb)
+
+    def __len__(self) -> int:
+        return len(self.triangles)
+
+    @classmethod
+    def concatenate(cls, meshes: Iterable['Mesh']) -> 'Mesh':
+        meshes = [mesh for mesh in meshes if len(mesh)]
+        if not meshes:
+            return cls()
+        return cls(np.concatenate([mesh.triangles for mesh in meshes]),
+                   np.concatenate([mesh.colors for mesh in meshes]))
+
+
+def mesh_from_shape(shape: Shape, color=PALETTE[0]) -> Mesh:
+    """Triangles on the boundary of a shape's filled cells, in world coordinates
+
+    Cells at least half full count as solid, so holes cut through a cell
+    stay open; a shape with no such cell (a single-cell cone) is drawn
+    from every partly filled cell instead.
+    """
+    edges, fill, _ = shape.world()
+    if fill.size == 0:
+        return Mesh()
+    solid = fill >= 0.5
+    if not solid.any():
+        solid = fill > 0
+    padded = np.pad(solid, 1).astype(np.int8)
+
+    quads = []
+    for axis in range(3):
+        b, c = (axis + 1) % 3, (axis + 2) % 3
+        # +1 where the solid starts along ``axis`` (face points backwards), -1 where it ends
+        change = np.diff(padded, axis=axis)
+        inner = [slice(1, -1)] * 3
+        inner[axis] = slice(None)
+        change = change[tuple(inner)]
+        for sign in (1, -1):
+            cells = np.nonzero(change == sign)
+            k, i, j = cells[axis], cells[b], cells[c]
+            corners = np.empty((len(k), 4, 3))
+            corners[:, :, axis] = edges[axis][k][:, None]
+            corners[:, :, b] = np.stack([edges[b][i], edges[b][i + 1], edges[b][i + 1], edges[b][i]], axis=1)
+            corners[:, :, c] = np.stack([edges[c][j], edges[c][j], edges[c][j + 1], edges[c][j + 1]], axis=1)
+            # b x c points along +axis; reverse the winding for backward faces
+            quads.append(corners if sign == -1 else corners[:, ::-1])
+    quads = np.concatenate(quads)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    return Mesh(triangles, np.tile(np.asarray(color, dtype=float), (len(triangles), 1)))
+
+
+def mesh_from_shapes(shapes: Union[Dict[str, Shape], Iterable[Shape]]) -> Mesh:
+    """One mesh for several shapes (``GeometryReport.shapes``), coloured per shape"""
+    if isinstance(shapes, dict):
+        shapes = shapes.values()
+    return Mesh.concatenate(mesh_from_shape(shape, PALETTE[index % len(PALETTE)])
+                            for index, shape in enumerate(shapes))
+
+
+def read_stl(source: Union[str, Path, bytes], color=PALETTE[0]) -> Mesh:
+    """Mesh from a binary or ASCII STL file (or its contents)"""
+    data = source if isinstance(source, bytes) else Path(source).read_bytes()
+    count = struct.unpack_from('<I', data, 80)[0] if len(data) >= 84 else -1
+    if len(data) == 84 + count * _STL_RECORD.itemsize:
+        triangles = np.frombuffer(data, _STL_RECORD, count, 84)['vertices'].astype(float)
+    else:
+        vertices = np.array(_STL_VERTEX.findall(data), dtype=float)
+        triangles = vertices[:len(vertices) // 3 * 3].reshape(-1, 3, 3)
+    return Mesh(triangles, np.tile(np.asarray(color, dtype=float), (len(triangles), 1)))
+
+
+def _shade(triangles: np.ndarray, colors: np.ndarray, basis: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Flat-shaded colours and the non-degenerate triangles they belong to"""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    keep = lengths > 1e-12
+    light = basis.T @ np.array([-0.35, 0.55, 0.75])
+    light /= np.linalg.norm(light)
+    # Both sides are lit alike, STL windings cannot be trusted
+    lambert = np.abs(normals[keep] @ light) / lengths[keep]
+    return colors[keep] * (AMBIENT + DIFFUSE * lambert)[:, None], keep
+
+
+def _rasterize(screen: np.ndarray, depth: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-pixel nearest depth and triangle index (-1 where nothing is drawn)"""
+    zbuffer = np.full(size * size, -np.inf)
+    owner = np.full(size * size, -1)
+
+    # Pixel centres at +0.5; each triangle covers the centres inside its bounding box
+    lower = np.clip(np.ceil(screen.min(axis=1) - 0.5), 0, size).astype(int)
+    upper = np.clip(np.floor(screen.max(axis=1) - 0.5), -1, size - 1).astype(int)
+    width, height = np.maximum(upper - lower + 1, 0).T
+    counts = width * height
+    totals = np.cumsum(counts)
+
+    x0, y0 = screen[:, 0, 0], screen[:, 0, 1]
+    ex1, ey1 = screen[:, 1, 0] - x0, screen[:, 1, 1] - y0
+    ex2, ey2 = screen[:, 2, 0] - x0, screen[:, 2, 1] - y0
+    area = ex1 * ey2 - ex2 * ey1
+    area = np.where(np.abs(area) > 1e-12, area, np.nan)  # edge-on triangles cover nothing
+
+    start = 0
+    while start < len(counts):
+        offset = totals[start - 1] if start else 0
+        stop = max(int(np.searchsorted(totals, offset + CHUNK_FRAGMENTS, side='right')), start + 1)
+        chunk = np.arange(start, stop)
+        triangle = np.repeat(chunk, counts[chunk])
+        local = np.arange(len(triangle)) - np.repeat(totals[chunk] - counts[chunk] - offset, counts[chunk])
+        px = lower[triangle, 0] + local % width[triangle]
+        py = lower[triangle, 1] + local // width[triangle]
+        start = stop
+
+        dx, dy = px + 0.5 - x0[triangle], py + 0.5 - y0[triangle]
+        with np.errstate(invalid='ignore'):
+            l1 = (dx * ey2[triangle] - ex2[triangle] * dy) / area[triangle]
+            l2 = (ex1[triangle] * dy - dx * ey1[triangle]) / area[triangle]
+            inside = (l1 >= -1e-9) & (l2 >= -1e-9) & (l1 + l2 <= 1 + 1e-9)
+        triangle, l1, l2 = triangle[inside], l1[inside], l2[inside]
+        pixel = py[inside] * size + px[inside]
+        z = depth[triangle, 0] * (1 - l1 - l2) + depth[triangle, 1] * l1 + depth[triangle, 2] * l2
+
+        # Nearest fragment per pixel within the chunk, then against the buffer
+        order = np.lexsort((-z, pixel))
+        pixel, first = np.unique(pixel[order], return_index=True)
+        nearest = order[first]
+        closer = z[nearest] > zbuffer[pixel]
+        zbuffer[pixel[closer]] = z[nearest[closer]]
+        owner[pixel[closer]] = triangle[nearest[closer]]
+    return zbuffer, owner
+
+
+def render(mesh: Mesh, view: str = 'isometric', size: int = 160, background=BACKGROUND) -> np.ndarray:
+    """(size, size, 3) uint8 image of ``mesh``, fitted to the frame"""
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view {view!r}, expected one of {sorted(VIEWS)}")
+    image = np.empty((size * size, 3), dtype=np.uint8)
+    image[:] = background
+    if not len(mesh):
+        return image.reshape(size, size, 3)
+
+    basis = VIEWS[view]
+    colors, keep = _shade(mesh.triangles, mesh.colors, basis)
+    projected = mesh.triangles[keep] @ basis.T  # (n, 3, [right, up, towards viewer])
+    if not len(projected):
+        return image.reshape(size, size, 3)
+
+    lower = projected[:, :, :2].reshape(-1, 2).min(axis=0)
+    upper = projected[:, :, :2].reshape(-1, 2).max(axis=0)
+    scale = size * (1 - 2 * MARGIN) / max(float(np.max(upper - lower)), 1e-9)
+    centre = (lower + upper) / 2
+    screen = np.empty(projected.shape[:2] + (2,))
+    screen[..., 0] = (projected[..., 0] - centre[0]) * scale + size / 2
+    screen[..., 1] = size / 2 - (projected[..., 1] - centre[1]) * scale  # image rows grow downwards
+
+    zbuffer, owner = _rasterize(screen, projected[..., 2], size)
+    drawn = owner >= 0
+    near, far = projected[..., 2].max(), projected[..., 2].min()
+    cue = 1 - DEPTH_CUE * (near - zbuffer[drawn]) / max(near - far, 1e-9)
+    image[drawn] = np.clip(colors[owner[drawn]] * cue[:, None] * 255, 0, 255).round().astype(np.uint8)
+    return image.reshape(size, size, 3)
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """8-bit RGB PNG of a (height, width, 3) uint8 image"""
+    height, width, _ = image.shape
+    rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, width * 3)])  # filter: none
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows.tobytes(), 9))
+            + chunk(b'IEND', b''))
+
+
+def render_png(mesh: Mesh, view: str = 'isometric', size: int = 160) -> Optional[bytes]:
+    """PNG thumbnail of ``mesh``, or ``None`` for an empty mesh"""
+    if not len(mesh):
+        return None
+    return encode_png(render(mesh, view, size))
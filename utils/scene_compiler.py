@@ -0,0 +1,237 @@
+"""
+Compilation of scene graphs into FreeCAD scripts
+
+``compile_scene`` emits the script the optimizer passes would otherwise
+have to recover from free-form code:
+
+* differences cut all their tools with one compound, unions run a single
+  ``multiFuse``,
+* instances of a definition and repeated top-level primitives share one
+  shape and differ only in their object Placement,
+* nodes tagged with a ``detail`` feature, and fillets, are left out when
+  the level of detail does not build them,
+* colours go into ``ViewObject`` statements after each object, which
+  ``utils.script_partition`` treats as presentation.
+"""
+import builtins
+import keyword
+import math
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.level_of_detail import LevelOfDetail
+from utils.scene_graph import PRIMITIVES, Node, Scene, Transform
+
+# Names a variable must not take: keywords, and names the script itself reads
+RESERVED_NAMES = (frozenset(keyword.kwlist) | frozenset(getattr(keyword, 'softkwlist', ()))
+                  | frozenset(dir(builtins)) | {'doc'})
+
+# First comment of every compiled script
+COMPILED_HEADER = "# Compiled from a scene graph"
+
+CONSTRUCTORS = {
+    'box': 'makeBox',
+    'cylinder': 'makeCylinder',
+    'cone': 'makeCone',
+    'sphere': 'makeSphere',
+    'torus': 'makeTorus',
+}
+
+# Prisms have no Part constructor: one polygon face extruded once
+PRISM = "Part.Face(Part.makePolygon([{points}], True)).extrude(FreeCAD.Vector(0, 0, {height}))"
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _vector(values) -> str:
+    return f"FreeCAD.Vector({', '.join(_number(v) for v in values)})"
+
+
+def _placement(transform: Transform) -> str:
+    return (f"FreeCAD.Placement({_vector(transform.translate)}, "
+            f"FreeCAD.Rotation({_vector(transform.axis)}, {_number(transform.angle)}))")
+
+
+class _Compiler:
+    def __init__(self, scene: Scene, level: Optional[LevelOfDetail]):
+        self.scene = scene
+        self.level = level
+        self.lines: List[str] = []
+        self.variables: Set[str] = {'doc', 'FreeCAD', 'Part'}
+        self.object_names: Set[str] = set()
+        self.definitions: Dict[str, Optional[str]] = {}
+        self.shared: Dict[Tuple, str] = {}
+        self._collect_names(scene.objects)
+
+    def _collect_names(self, nodes: List[Node]) -> None:
+        for node in nodes:
+            if node.name:
+                self.object_names.add(node.name)
+            if node.type == 'group':
+                self._collect_names(node.children)
+
+    def emit(self, line: str) -> None:
+        self.lines.append(line)
+
+    def variable(self, hint: str) -> str:
+        base = re.sub(r'\W+', '_', hint).strip('_').lower() or 'shape'
+        if base[0].isdigit():
+            base = f"_{base}"
+        if base in RESERVED_NAMES:
+            base = f"{base}_"
+        name, counter = base, 1
+        while name in self.variables:
+            counter += 1
+            name = f"{base}_{counter}"
+        self.variables.add(name)
+        return name
+
+    def object_name(self, node: Node) -> str:
+        if node.name:
+            return node.name
+        base = node.type.capitalize()
+        counter = 1
+        while f"{base}_{counter}" in self.object_names:
+            counter += 1
+        name = f"{base}_{counter}"
+        self.object_names.add(name)
+        return name
+
+    def builds(self, node: Node) -> bool:
+        return node.detail is None or self.level is None or self.level.builds(node.detail)
+
+    def primitive(self, node: Node, hint: str) -> str:
+        var = self.variable(hint)
+        if node.type == 'prism':
+            sides, radius = int(node.params['sides']), float(node.params['radius'])
+            corners = [(radius * math.cos(2 * math.pi * i / sides), radius * math.sin(2 * math.pi * i / sides), 0)
+                       for i in range(sides)]
+            points = ', '.join(_vector(round(v, 6) for v in corner) for corner in corners)
+            self.emit(f"{var} = {PRISM.format(points=points, height=_number(node.params['height']))}")
+            return var
+        args = ', '.join(_number(node.params[param]) for param in PRIMITIVES[node.type])
+        self.emit(f"{var} = Part.{CONSTRUCTORS[node.type]}({args})")
+        return var
+
+    def definition(self, name: str) -> Optional[str]:
+        """Variable holding a definition's shape, built on first use"""
+        if name not in self.definitions:
+            self.emit(f"# Definition: {name}")
+            self.definitions[name] = self.shape(self.scene.definitions[name], f"{name}_shape")
+        return self.definitions[name]
+
+    def shape(self, node: Node, hint: str, place: bool = True) -> Optional[str]:
+        """Emit statements building ``node``'s shape; ``None`` when it is left out"""
+        if node.is_primitive:
+            var = self.primitive(node, hint)
+        elif node.type == 'instance':
+            definition = self.definition(node.ref)
+            if definition is None:
+                return None
+            var = self.variable(hint)
+            self.emit(f"{var} = {definition}.copy()")
+        else:
+            kept = [child for child in node.children if self.builds(child)]
+            if node.type == 'difference' and (not kept or kept[0] is not node.children[0]):
+                return None  # nothing left to cut from
+            parts = [var for var in (self.shape(child, f"{hint}_part") for child in kept) if var]
+            if not parts:
+                return None
+            base, tools = parts[0], parts[1:]
+            var = self.variable(hint) if tools else base
+            if node.type == 'union' and tools:
+                self.emit(f"{var} = {base}.multiFuse([{', '.join(tools)}])")
+            elif node.type == 'difference' and len(tools) == 1:
+                self.emit(f"{var} = {base}.cut({tools[0]})")
+            elif node.type == 'difference' and tools:
+                self.emit(f"{var} = {base}.cut(Part.makeCompound([{', '.join(tools)}]))")
+            elif node.type == 'intersection' and tools:
+                self.emit(f"{var} = {base}" + ''.join(f".common({tool})" for tool in tools))
+
+        if node.fillet and (self.level is None or self.level.fillets):
+            self.emit(f"{var} = {var}.makeFillet({_number(node.fillet)}, {var}.Edges)")
+        if place and node.transform.angle:
+            self.emit(f"{var}.rotate(FreeCAD.Vector(0, 0, 0), {_vector(node.transform.axis)}, "
+                      f"{_number(node.transform.angle)})")
+        if place and any(node.transform.translate):
+            self.emit(f"{var}.translate({_vector(node.transform.translate)})")
+        return var
+
+    def object_shape(self, node: Node, name: str) -> Optional[str]:
+        """Shape of a document object; identical shapes are built once"""
+        if node.type == 'instance':
+            return self.definition(node.ref)
+        if node.is_primitive and not node.fillet:
+            key = (node.type,) + tuple(float(node.params[param]) for param in PRIMITIVES[node.type])
+            if key not in self.shared:
+                self.shared[key] = self.primitive(node, f"{name}_shape")
+            return self.shared[key]
+        return self.shape(node, f"{name}_shape", place=False)
+
+    def add_object(self, node: Node, placements: List[str], group: Optional[str] = None) -> None:
+        if not self.builds(node):
+            return
+        name = self.object_name(node)
+        if not node.transform.identity:
+            placements = placements + [_placement(node.transform)]
+
+        self.emit("")
+        self.emit(f"# {name}")
+        if node.type == 'group':
+            var = self.variable(name)
+            self.emit(f'{var} = doc.addObject("App::DocumentObjectGroup", "{name}")')
+            if group:
+                self.emit(f"{group}.addObject({var})")
+            for child in node.children:
+                self.add_object(child, placements, var)
+            return
+
+        shape = self.object_shape(node, name)
+        if shape is None:
+            return
+        var = self.variable(f"{name}_obj")
+        self.emit(f'{var} = doc.addObject("Part::Feature", "{name}")')
+        self.emit(f"{var}.Shape = {shape}")
+        if node.label:
+            self.emit(f"{var}.Label = {node.label!r}")
+        if placements:
+            self.emit(f"{var}.Placement = {placements[0]}" + ''.join(f".multiply({p})" for p in placements[1:]))
+        if group:
+            self.emit(f"{group}.addObject({var})")
+        material = self.scene.materials.get(node.material) if node.material else None
+        if material:
+            self.emit(f"{var}.ViewObject.ShapeColor = {tuple(float(c) for c in material.color)}")
+            if material.transparency:
+                self.emit(f"{var}.ViewObject.Transparency = {int(material.transparency)}")
+
+    def compile(self) -> str:
+        self.emit("import FreeCAD")
+        self.emit("import Part")
+        self.emit("")
+        self.emit(COMPILED_HEADER)
+        self.emit(f'doc = FreeCAD.newDocument("{re.sub(r"[^A-Za-z0-9_]+", "_", self.scene.name)}")')
+        for node in self.scene.objects:
+            self.add_object(node, [])
+        self.emit("")
+        self.emit("doc.recompute()")
+        self.emit("")
+        self.emit("try:")
+        self.emit("    if hasattr(FreeCAD, 'Gui') and FreeCAD.Gui:")
+        self.emit("        FreeCAD.Gui.SendMsgToActiveView(\"ViewFit\")")
+        self.emit("        FreeCAD.Gui.ActiveDocument.activeView().viewIsometric()")
+        self.emit("except Exception:")
+        self.emit("    pass")
+        return '\n'.join(self.lines) + '\n'
+
+
+def compile_scene(scene: Scene, level: Optional[LevelOfDetail] = None) -> str:
+    """FreeCAD script building ``scene`` at ``level`` (full detail by default)"""
+    return _Compiler(scene, level).compile()
+
+
+def is_compiled_scene(code: str) -> bool:
+    """Whether ``code`` came from ``compile_scene``, already at its level of detail"""
+    return COMPILED_HEADER in code.splitlines()
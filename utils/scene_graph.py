@@ -0,0 +1,331 @@
+"""
+Scene-graph intermediate representation for generated models
+
+Instead of free-form Python, the model can describe a scene as JSON:
+primitives, booleans, groups and instances of shared definitions, each
+with an optional transform, material and detail tag. The structure is
+validated up front, so every later step (level of detail, batching,
+instancing, caching, parallel builds) works on known data rather than on
+reverse-engineered code. ``utils.scene_compiler`` turns a ``Scene`` into
+a FreeCAD script.
+
+Example::
+
+    {"name": "Pavilion",
+     "materials": {"concrete": {"color": [0.8, 0.8, 0.75]}},
+     "definitions": {"column": {"type": "cylinder", "radius": 150, "height": 3000}},
+     "objects": [
+       {"type": "difference", "name": "Slab", "material": "concrete", "children": [
+         {"type": "box", "length": 6000, "width": 4000, "height": 200},
+         {"type": "cylinder", "radius": 300, "height": 200, "translate": [3000, 2000, 0],
+          "detail": "openings"}]},
+       {"type": "instance", "ref": "column", "name": "Column_1", "translate": [0, 0, 200]}]}
+"""
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from utils.exceptions import SceneGraphError
+from utils.level_of_detail import DETAIL_FEATURES
+
+# Primitive type -> required dimensions (mm)
+PRIMITIVES = {
+    'box': ('length', 'width', 'height'),
+    'cylinder': ('radius', 'height'),
+    'cone': ('radius1', 'radius2', 'height'),
+    'sphere': ('radius',),
+    'torus': ('radius1', 'radius2'),
+    'prism': ('sides', 'radius', 'height'),  # regular polygon, radius to the corners
+}
+
+# Dimensions that may be zero (a cone ending in a point)
+ZERO_ALLOWED = {('cone', 'radius1'), ('cone', 'radius2')}
+
+BOOLEANS = ('union', 'difference', 'intersection')
+
+NODE_TYPES = tuple(PRIMITIVES) + BOOLEANS + ('group', 'instance')
+
+NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Format description given to the language model
+SCENE_GRAPH_FORMAT = """Answer with one JSON object describing the scene (all lengths in mm, angles in degrees):
+{"name": str,
+ "materials": {material_name: {"color": [r, g, b] (0-1), "transparency": 0-100}},
+ "definitions": {definition_name: node},   (shapes reused by "instance" nodes)
+ "objects": [node, ...]}                   (one document object per entry)
+A node is {"type": t, ...} where t is one of
+  "box" (length, width, height), "cylinder" (radius, height), "cone" (radius1, radius2, height),
+  "sphere" (radius), "torus" (radius1, radius2), "prism" (sides, radius to the corners, height),
+  "union" / "difference" / "intersection" (children: [node, ...]; difference cuts the
+  later children from the first), "group" (children, top level only) or "instance" (ref: definition_name).
+Every node may have "name" (letters, digits, underscore), "label" (display name), "translate": [x, y, z],
+"rotate": {"axis": [x, y, z], "angle": degrees}, "material", "fillet" (edge radius) and
+"detail" (one of openings, fillets, furniture, small_features) marking optional features."""
+
+
+@dataclass
+class Transform:
+    """Rotation about an axis through the origin, then translation"""
+    translate: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+    axis: Tuple[float, float, float] = (0.0, 0.0, 1.0)
+    angle: float = 0.0  # degrees
+
+    @property
+    def identity(self) -> bool:
+        return self.angle == 0 and not any(self.translate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        if any(self.translate):
+            result['translate'] = list(self.translate)
+        if self.angle:
+            result['rotate'] = {'axis': list(self.axis), 'angle': self.angle}
+        return result
+
+
+@dataclass
+class Material:
+    color: Tuple[float, float, float]
+    transparency: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {'color': list(self.color)}
+        if self.transparency:
+            result['transparency'] = self.transparency
+        return result
+
+
+@dataclass
+class Node:
+    """One scene-graph node; ``type`` decides which fields are used"""
+    type: str
+    name: Optional[str] = None
+    params: Dict[str, float] = field(default_factory=dict)  # primitive dimensions
+    children: List['Node'] = field(default_factory=list)  # booleans and groups
+    ref: Optional[str] = None  # instances
+    transform: Transform = field(default_factory=Transform)
+    material: Optional[str] = None
+    fillet: Optional[float] = None
+    detail: Optional[str] = None  # left out at levels of detail that skip this feature
+    label: Optional[str] = None  # document object label, defaults to the name
+
+    @property
+    def is_primitive(self) -> bool:
+        return self.type in PRIMITIVES
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {'type': self.type}
+        if self.name:
+            result['name'] = self.name
+        result.update(self.params)
+        if self.children:
+            result['children'] = [child.to_dict() for child in self.children]
+        if self.ref:
+            result['ref'] = self.ref
+        result.update(self.transform.to_dict())
+        for key in ('label', 'material', 'fillet', 'detail'):
+            if getattr(self, key) is not None:
+                result[key] = getattr(self, key)
+        return result
+
+
+@dataclass
+class Scene:
+    name: str = "Model"
+    materials: Dict[str, Material] = field(default_factory=dict)
+    definitions: Dict[str, Node] = field(default_factory=dict)
+    objects: List[Node] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'materials': {name: material.to_dict() for name, material in self.materials.items()},
+            'definitions': {name: node.to_dict() for name, node in self.definitions.items()},
+            'objects': [node.to_dict() for node in self.objects],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+
+def _number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _vector(value: Any) -> bool:
+    return isinstance(value, (list, tuple)) and len(value) == 3 and all(_number(v) for v in value)
+
+
+class _Validator:
+    def __init__(self, data: Dict[str, Any]):
+        self.errors: List[str] = []
+        self.materials = data.get('materials') or {}
+        self.definitions = data.get('definitions') or {}
+
+    def error(self, path: str, message: str) -> None:
+        self.errors.append(f"{path}: {message}")
+
+    def material(self, name: str, value: Any) -> None:
+        path = f"materials.{name}"
+        if not isinstance(value, dict) or not _vector(value.get('color')):
+            self.error(path, "needs a color [r, g, b]")
+        elif not all(0 <= c <= 1 for c in value['color']):
+            self.error(path, "color components must be between 0 and 1")
+        transparency = value.get('transparency', 0) if isinstance(value, dict) else 0
+        if not _number(transparency) or not 0 <= transparency <= 100:
+            self.error(path, "transparency must be between 0 and 100")
+
+    def node(self, node: Any, path: str, top_level: bool) -> None:
+        if not isinstance(node, dict):
+            self.error(path, "node must be an object")
+            return
+        kind = node.get('type')
+        if kind not in NODE_TYPES:
+            self.error(path, f"unknown type {kind!r}")
+            return
+
+        if kind in PRIMITIVES:
+            for param in PRIMITIVES[kind]:
+                value = node.get(param)
+                if not _number(value) or value < 0 or (value == 0 and (kind, param) not in ZERO_ALLOWED):
+                    self.error(path, f"{kind} needs a positive {param!r}")
+            if kind == 'cone' and _number(node.get('radius1')) and _number(node.get('radius2')) \
+                    and node['radius1'] == node['radius2'] == 0:
+                self.error(path, "cone needs a non-zero radius")
+            if kind == 'prism' and _number(node.get('sides')) and (node['sides'] < 3 or node['sides'] % 1):
+                self.error(path, "prism needs a whole number of 'sides', at least 3")
+        elif kind == 'instance':
+            if not isinstance(node.get('ref'), str) or node['ref'] not in self.definitions:
+                self.error(path, f"instance of unknown definition {node.get('ref')!r}")
+        else:
+            children = node.get('children')
+            if not isinstance(children, list) or not children:
+                self.error(path, f"{kind} needs a non-empty 'children' list")
+                children = []
+            if kind == 'group' and not top_level:
+                self.error(path, "groups are only allowed at the top level")
+            for index, child in enumerate(children):
+                self.node(child, f"{path}.children[{index}]", top_level and kind == 'group')
+
+        name = node.get('name')
+        if name is not None and (not isinstance(name, str) or not NAME_PATTERN.match(name)):
+            self.error(path, f"invalid name {name!r} (letters, digits and underscores only)")
+        if node.get('label') is not None and not isinstance(node['label'], str):
+            self.error(path, "label must be a string")
+        if 'translate' in node and not _vector(node['translate']):
+            self.error(path, "translate must be [x, y, z]")
+        if 'rotate' in node:
+            rotate = node['rotate']
+            if not isinstance(rotate, dict) or not _vector(rotate.get('axis')) \
+                    or not any(rotate['axis']) or not _number(rotate.get('angle')):
+                self.error(path, "rotate must be {\"axis\": [x, y, z], \"angle\": degrees}")
+        if node.get('material') is not None and (not isinstance(node['material'], str)
+                                                 or node['material'] not in self.materials):
+            self.error(path, f"unknown material {node['material']!r}")
+        if node.get('fillet') is not None and not (_number(node['fillet']) and node['fillet'] > 0):
+            self.error(path, "fillet must be a positive radius")
+        if node.get('detail') is not None and not (isinstance(node['detail'], str)
+                                                   and node['detail'] in DETAIL_FEATURES):
+            self.error(path, f"detail must be one of {', '.join(DETAIL_FEATURES)}")
+
+    def cycles(self) -> None:
+        """Definitions must not instance themselves, directly or indirectly"""
+        def refs(node: Any) -> List[str]:
+            if not isinstance(node, dict):
+                return []
+            found = [node['ref']] if node.get('type') == 'instance' and isinstance(node.get('ref'), str) else []
+            for child in node.get('children') or []:
+                found.extend(refs(child))
+            return found
+
+        state: Dict[str, str] = {}
+
+        def visit(name: str) -> None:
+            state[name] = 'visiting'
+            for ref in refs(self.definitions[name]):
+                if ref not in self.definitions:
+                    continue
+                if state.get(ref) == 'visiting':
+                    self.error(f"definitions.{name}", f"instances itself through {ref!r}")
+                elif ref not in state:
+                    visit(ref)
+            state[name] = 'done'
+
+        for name in self.definitions:
+            if name not in state:
+                visit(name)
+
+
+def validate_scene(data: Any) -> List[str]:
+    """Problems with a scene in its JSON form; empty when it is valid"""
+    if not isinstance(data, dict):
+        return ["scene must be a JSON object"]
+    validator = _Validator(data)
+    if not isinstance(validator.materials, dict) or not isinstance(validator.definitions, dict):
+        return ["materials and definitions must be objects"]
+    if 'name' in data and not isinstance(data['name'], str):
+        validator.error('name', "must be a string")
+    for name, material in validator.materials.items():
+        validator.material(name, material)
+    for name, definition in validator.definitions.items():
+        validator.node(definition, f"definitions.{name}", top_level=False)
+    validator.cycles()
+
+    objects = data.get('objects')
+    if not isinstance(objects, list) or not objects:
+        validator.error('objects', "needs at least one node")
+        objects = []
+    for index, node in enumerate(objects):
+        validator.node(node, f"objects[{index}]", top_level=True)
+
+    def object_names(nodes: List[Any]):
+        for node in nodes:
+            if isinstance(node, dict) and isinstance(node.get('name'), str):
+                yield node['name']
+            if isinstance(node, dict) and node.get('type') == 'group' and isinstance(node.get('children'), list):
+                yield from object_names(node['children'])
+
+    # Every top-level node and group member becomes a document object
+    names = Counter(object_names(objects))
+    for name, count in names.items():
+        if count > 1:
+            validator.error('objects', f"name {name!r} is used {count} times")
+    return validator.errors
+
+
+def _build_node(data: Dict[str, Any]) -> Node:
+    kind = data['type']
+    rotate = data.get('rotate') or {}
+    transform = Transform(translate=tuple(float(v) for v in data.get('translate', (0, 0, 0))),
+                          axis=tuple(float(v) for v in rotate.get('axis', (0, 0, 1))),
+                          angle=float(rotate.get('angle', 0)))
+    return Node(type=kind, name=data.get('name'),
+                params={param: data[param] for param in PRIMITIVES.get(kind, ())},
+                children=[_build_node(child) for child in data.get('children') or []],
+                ref=data.get('ref'), transform=transform, material=data.get('material'),
+                fillet=data.get('fillet'), detail=data.get('detail'), label=data.get('label'))
+
+
+def parse_scene(source: Union[str, Dict[str, Any]]) -> Scene:
+    """Validate a scene (JSON text or its parsed form) and build the dataclasses
+
+    Raises ``SceneGraphError`` listing every problem found.
+    """
+    if isinstance(source, str):
+        try:
+            source = json.loads(source)
+        except ValueError as e:
+            raise SceneGraphError([f"not valid JSON: {e}"])
+    errors = validate_scene(source)
+    if errors:
+        raise SceneGraphError(errors)
+    return Scene(
+        name=source.get('name') or "Model",
+        materials={name: Material(color=tuple(value['color']), transparency=int(value.get('transparency', 0)))
+                   for name, value in (source.get('materials') or {}).items()},
+        definitions={name: _build_node(node) for name, node in (source.get('definitions') or {}).items()},
+        objects=[_build_node(node) for node in source['objects']],
+    )
@@ -0,0 +1,48 @@
+"""
+Canonical hashing of generated scripts
+
+Two scripts that differ only in comments, blank lines, quoting or
+docstrings compile to the same AST, so they get the same hash. Caches of
+execution results and exported artifacts are keyed on it.
+"""
+import ast
+import hashlib
+import json
+from typing import Any, Optional
+
+from .logging_config import get_logger
+
+logger = get_logger("ai")
+
+
+def _strip_docstrings(tree: ast.AST) -> ast.AST:
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            body = node.body
+            if (body and isinstance(body[0], ast.Expr)
+                    and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str)):
+                node.body = body[1:] or [ast.Pass()]
+    return tree
+
+
+def canonical_script(code: str) -> str:
+    """Layout-independent form of ``code``
+
+    Scripts that do not parse fall back to their text with trailing
+    whitespace and blank lines removed.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        logger.debug("Hashing unparsable script by its text")
+        return "\n".join(line.rstrip() for line in code.splitlines() if line.strip())
+    return ast.dump(_strip_docstrings(tree), annotate_fields=False, include_attributes=False)
+
+
+def script_hash(code: str, options: Optional[Any] = None) -> str:
+    """SHA-256 of the canonical script plus JSON-serializable ``options``"""
+    digest = hashlib.sha256(canonical_script(code).encode("utf-8"))
+    if options is not None:
+        digest.update(b"\0")
+        digest.update(json.dumps(options, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return digest.hexdigest()
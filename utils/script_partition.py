@@ -0,0 +1,376 @@
+"""
+Partitioning of generated scripts into independent subassemblies
+
+Template and LLM scripts build a model as a flat sequence of top-level
+statements: constants, helper functions, then one block per wall, slab or
+room that creates shapes and adds them to the document. Those blocks
+rarely depend on each other. ``partition_script`` splits a script into
+
+* a prelude (imports, helpers, constants, the document) every part needs,
+* subassemblies: groups of statements connected through the variables
+  they define and read, and through the document objects they create and
+  look up by name (``doc.getObject("Base")``, ``doc.Base``), each building
+  its own document objects,
+* presentation statements (``obj.ViewObject...``) that only matter in the
+  GUI, and
+* a tail (``doc.recompute()``, prints, view commands) run once at the end.
+
+Subassemblies can then be built in separate processes and reassembled
+(see ``services/parallel_builder.py``).
+"""
+import ast
+import builtins
+import textwrap
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from utils.code_optimizer import PURE_FUNCTIONS, SHAPE_CONSTRUCTORS
+from utils.cost_estimator import CostWeights, estimate_cost
+from utils.logging_config import get_logger
+
+logger = get_logger("ai")
+
+DOCUMENT_FACTORIES = ('FreeCAD.newDocument', 'App.newDocument')
+DOCUMENT_ALIASES = ('FreeCAD.ActiveDocument', 'App.ActiveDocument')
+
+# Document members that neither name nor enumerate objects
+DOCUMENT_MEMBERS = frozenset((
+    'addObject', 'recompute', 'save', 'saveAs', 'Name', 'Label', 'FileName',
+    'openTransaction', 'commitTransaction', 'abortTransaction', 'undo', 'redo',
+))
+# Document methods addressing one object by its name
+DOCUMENT_LOOKUPS = frozenset(('getObject', 'removeObject'))
+# Document members reaching objects without naming them
+DOCUMENT_COLLECTIONS = frozenset((
+    'Objects', 'RootObjects', 'ActiveObject', 'TopologicalSortedObjects',
+    'getObjectsByLabel', 'findObjects', 'getObjectsByType',
+))
+
+# Cheap calls allowed in prelude constants; shape construction is the work being split
+PRELUDE_CALLS = (PURE_FUNCTIONS - SHAPE_CONSTRUCTORS) | frozenset(
+    ('len', 'range', 'list', 'dict', 'tuple', 'str', 'sum', 'sorted', 'enumerate', 'zip')
+) | frozenset(DOCUMENT_FACTORIES)
+
+PRELUDE_STATEMENTS = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef, ast.Pass)
+
+
+@dataclass
+class Subassembly:
+    """Statements that build one independent group of document objects"""
+    index: int
+    statements: List[str] = field(default_factory=list)
+    # (object name, variable, statement) for GUI-only statements
+    presentation: List[Tuple[str, str, str]] = field(default_factory=list)
+    cost: float = 0.0
+
+
+@dataclass
+class ScriptPartition:
+    """A script split into a shared prelude, subassemblies and a tail"""
+    prelude: List[str]
+    document: Optional[str]  # variable holding the model document
+    subassemblies: List[Subassembly]
+    tail: List[str] = field(default_factory=list)
+
+    @classmethod
+    def whole(cls, code: str) -> 'ScriptPartition':
+        """The script as a single subassembly, for scripts that cannot be split"""
+        return cls(prelude=[], document=None, subassemblies=[Subassembly(0, [code])])
+
+    def part_script(self, subassemblies: Sequence[Subassembly]) -> str:
+        statements = self.prelude + [s for sub in subassemblies for s in sub.statements]
+        return '\n'.join(statements) + '\n'
+
+    def batches(self, count: int) -> List[List[Subassembly]]:
+        """Group subassemblies into at most ``count`` parts of similar predicted cost"""
+        bins: List[List[Subassembly]] = [[] for _ in range(max(1, min(count, len(self.subassemblies))))]
+        loads = [0.0] * len(bins)
+        # Longest processing time first: the costliest piece goes to the idlest part
+        for sub in sorted(self.subassemblies, key=lambda s: s.cost, reverse=True):
+            target = loads.index(min(loads))
+            bins[target].append(sub)
+            loads[target] += sub.cost
+        return [sorted(batch, key=lambda s: s.index) for batch in bins if batch]
+
+    def assembly_script(self, parts: Sequence[Sequence[Tuple[str, str, str]]],
+                        presentation: Sequence[Sequence[Tuple[str, str, str]]] = ()) -> str:
+        """Script loading built shapes (name, label, BRep path) into one document
+
+        ``presentation`` holds each part's GUI-only statements, replayed on
+        the loaded objects when FreeCAD runs with a GUI.
+        """
+        document = self.document or '_document'
+        lines = ['import FreeCAD', 'import Part'] + self.prelude
+        if not self.document:
+            lines.append('_document = FreeCAD.newDocument("Assembly")')
+        lines += [
+            '',
+            '# Shapes built in parallel, one BRep file per object',
+            'def _load_parts(parts):',
+            '    objects = {}',
+            '    for name, label, path in parts:',
+            '        shape = Part.Shape()',
+            '        shape.importBrep(path)',
+            f'        obj = {document}.addObject("Part::Feature", name)',
+            '        obj.Shape = shape',
+            '        obj.Label = label',
+            '        objects[name] = obj',
+            '    return objects',
+        ]
+        for index, loads in enumerate(parts):
+            lines += ['', f'_objects = _load_parts({list(map(tuple, loads))!r})']
+            for name, variable, statement in (presentation[index] if index < len(presentation) else ()):
+                lines += [f'if FreeCAD.GuiUp and {name!r} in _objects:',
+                          f'    {variable} = _objects[{name!r}]',
+                          textwrap.indent(statement, '    ')]
+        lines += [''] + self.tail
+        return '\n'.join(lines) + '\n'
+
+
+def _source(lines: List[str], stmt: ast.stmt) -> str:
+    start = min([stmt.lineno] + [d.lineno for d in getattr(stmt, 'decorator_list', [])])
+    return '\n'.join(lines[start - 1:stmt.end_lineno])
+
+
+def _dotted(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f'{base}.{node.attr}' if base else None
+    return None
+
+
+def _root(node: ast.expr) -> Optional[str]:
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Call)):
+        node = node.func if isinstance(node, ast.Call) else node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _local_names(stmt: ast.AST) -> Set[str]:
+    """Names bound by comprehensions and lambdas, which do not leak"""
+    names = set()
+    for node in ast.walk(stmt):
+        if isinstance(node, ast.comprehension):
+            names.update(n.id for n in ast.walk(node.target) if isinstance(n, ast.Name))
+        elif isinstance(node, ast.Lambda):
+            names.update(a.arg for a in node.args.args)
+    return names
+
+
+def _stored(stmt: ast.stmt) -> Set[str]:
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {stmt.name}
+    if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+        return {(alias.asname or alias.name).split('.')[0] for alias in stmt.names}
+    names = set()
+    for node in ast.walk(stmt):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            names.add(node.name)
+    return names - _local_names(stmt)
+
+
+def _loaded(stmt: ast.stmt) -> Set[str]:
+    names = {node.id for node in ast.walk(stmt) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+    return names - _local_names(stmt)
+
+
+def _is_prelude_block(stmt: ast.stmt) -> bool:
+    """Imports and definitions, also inside a guarded ``try`` import"""
+    if isinstance(stmt, PRELUDE_STATEMENTS):
+        return True
+    if isinstance(stmt, ast.Try):
+        blocks = [stmt.body, stmt.orelse, stmt.finalbody] + [handler.body for handler in stmt.handlers]
+        return all(isinstance(s, PRELUDE_STATEMENTS) for block in blocks for s in block)
+    return False
+
+
+def _presentation_target(stmt: ast.stmt) -> Optional[str]:
+    """Variable whose ``ViewObject`` the statement styles, if that is all it does"""
+    if isinstance(stmt, (ast.Assign, ast.AugAssign)):
+        targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+        if len(targets) == 1 and '.ViewObject' in (_dotted(targets[0]) or ''):
+            return _root(targets[0])
+    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+        if '.ViewObject' in (_dotted(stmt.value.func) or ''):
+            return _root(stmt.value.func)
+    return None
+
+
+def _added_object(stmt: ast.stmt, document: str) -> Optional[Tuple[str, str]]:
+    """``(variable, object name)`` for ``var = doc.addObject("Type", "Name")``"""
+    if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name)):
+        return None
+    call = stmt.value
+    if (isinstance(call, ast.Call) and _dotted(call.func) == f'{document}.addObject' and len(call.args) >= 2
+            and isinstance(call.args[1], ast.Constant) and isinstance(call.args[1].value, str)):
+        return stmt.targets[0].id, call.args[1].value
+    return None
+
+
+def _document_links(stmt: ast.AST, documents: Set[str]) -> Tuple[Set[str], Set[str], bool]:
+    """Object names ``stmt`` reads and creates through the document
+
+    The flag is set when the statement reaches objects in a way that cannot
+    be resolved statically: ``doc.Objects``, label lookups, computed names.
+    """
+    reads: Set[str] = set()
+    creates: Set[str] = set()
+    whole = False
+    calls = set()
+    for node in ast.walk(stmt):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and _dotted(node.func.value) in documents):
+            continue
+        calls.add(id(node.func))
+        method = node.func.attr
+        name = node.args[1 if method == 'addObject' else 0] if len(node.args) > (method == 'addObject') else None
+        constant = name.value if isinstance(name, ast.Constant) and isinstance(name.value, str) else None
+        if method == 'addObject':
+            # Objects with computed names are unknown, so looking them up later gives up
+            if constant:
+                creates.add(constant)
+        elif method in DOCUMENT_LOOKUPS and constant:
+            reads.add(constant)
+        elif method not in DOCUMENT_MEMBERS:
+            whole = True
+    for node in ast.walk(stmt):
+        if (isinstance(node, ast.Attribute) and id(node) not in calls
+                and _dotted(node.value) in documents and node.attr not in DOCUMENT_MEMBERS):
+            if node.attr in DOCUMENT_LOOKUPS or node.attr in DOCUMENT_COLLECTIONS:
+                whole = True
+            else:
+                # ``doc.Base`` is the object named Base
+                reads.add(node.attr)
+    return reads, creates, whole
+
+
+def partition_script(code: str, weights: Optional[CostWeights] = None) -> Optional[ScriptPartition]:
+    """Split ``code`` into independent subassemblies; ``None`` if it cannot be split safely"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    lines = code.splitlines()
+    store_counts = Counter(name for stmt in tree.body for name in _stored(stmt))
+    builtin_names = set(dir(builtins))
+
+    prelude: List[str] = []
+    prelude_names: Set[str] = set()
+    constants: Set[str] = set()  # prelude variables (not modules or functions)
+    document: Optional[str] = None
+    tail: List[str] = []
+    statements: List[Tuple[int, str]] = []  # (index, source) of subassembly statements
+    presentation: List[Tuple[int, Tuple[str, str, str]]] = []
+    definer: Dict[str, int] = {}  # variable -> statement that last defined it
+    current_object: Dict[str, str] = {}  # variable -> object name it holds
+    creator: Dict[str, int] = {}  # object name -> statement that created it
+    parent = list(range(len(tree.body)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for index, stmt in enumerate(tree.body):
+        source = _source(lines, stmt)
+        stored, loaded = _stored(stmt), _loaded(stmt)
+        reads, creates, whole = _document_links(stmt, {document, *DOCUMENT_ALIASES} - {None})
+
+        if _is_prelude_block(stmt):
+            if reads or whole:
+                # A helper looking objects up would tie together the parts calling it
+                logger.debug(f"Not partitioning: line {stmt.lineno} reads document objects in a definition")
+                return None
+            prelude.append(source)
+            prelude_names |= stored
+            continue
+
+        if (isinstance(stmt, ast.Assign) and all(isinstance(t, ast.Name) for t in stmt.targets)
+                and not (reads or creates or whole)
+                and all(store_counts[name] == 1 for name in stored)
+                and all(name in prelude_names or name in builtin_names or name not in store_counts
+                        for name in loaded)
+                and all(_dotted(node.func) in PRELUDE_CALLS
+                        for node in ast.walk(stmt.value) if isinstance(node, ast.Call))):
+            prelude.append(source)
+            prelude_names |= stored
+            if isinstance(stmt.value, ast.Call) and _dotted(stmt.value.func) in DOCUMENT_FACTORIES:
+                document = stmt.targets[0].id
+            else:
+                constants |= stored
+            continue
+
+        if document is None:
+            # Geometry before (or without) a document variable cannot be reassembled
+            return None
+
+        # Mutating shared constants would make parts see different values
+        mutated = {_root(t) for t in getattr(stmt, 'targets', [getattr(stmt, 'target', None)])
+                   if isinstance(t, (ast.Attribute, ast.Subscript))}
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call) and isinstance(stmt.value.func, ast.Attribute):
+            mutated.add(_root(stmt.value.func))
+        if mutated & constants:
+            logger.debug(f"Not partitioning: line {stmt.lineno} mutates {mutated & constants}")
+            return None
+
+        # Objects reached through the document tie the statement to the group
+        # that created them; anything unresolved could live in any part
+        unknown = reads - creator.keys()
+        if unknown:
+            logger.debug(f"Not partitioning: line {stmt.lineno} reads unknown objects {unknown}")
+            return None
+        for name in reads | (creates & creator.keys()):
+            parent[find(index)] = find(creator[name])
+
+        variable = _presentation_target(stmt)
+        if variable in definer:
+            parent[find(index)] = find(definer[variable])
+            if variable in current_object:
+                presentation.append((index, (current_object[variable], variable, source)))
+            continue
+
+        uses = [name for name in loaded if name in definer]
+        defines = stored - prelude_names
+        if not uses and not defines and not reads and not creates:
+            # The tail runs on the reassembled document, where doc.Objects is complete
+            tail.append(source)
+            continue
+        if whole:
+            logger.debug(f"Not partitioning: line {stmt.lineno} enumerates document objects")
+            return None
+
+        for name in uses:
+            parent[find(index)] = find(definer[name])
+        for name in creates:
+            creator[name] = index
+        for name in defines:
+            definer[name] = index
+            current_object.pop(name, None)
+        added = _added_object(stmt, document)
+        if added:
+            current_object[added[0]] = added[1]
+        statements.append((index, source))
+
+    groups: Dict[int, Subassembly] = {}
+    for index, source in statements:
+        root = find(index)
+        if root not in groups:
+            groups[root] = Subassembly(len(groups))
+        groups[root].statements.append(source)
+    for index, item in presentation:
+        groups[find(index)].presentation.append(item)
+
+    subassemblies = list(groups.values())
+    if len(subassemblies) < 2:
+        return None
+    weights = weights or CostWeights()
+    for sub in subassemblies:
+        # Every part pays the start-up once, so only the geometry work is balanced
+        sub.cost = estimate_cost('\n'.join(sub.statements), weights).predicted_seconds - weights.startup
+    logger.info(f"Partitioned script into {len(subassemblies)} independent subassemblies")
+    return ScriptPartition(prelude=prelude, document=document, subassemblies=subassemblies, tail=tail)